@@ -77,7 +77,7 @@ class ActividadDialog(tk.Toplevel):
 
         if success:
             messagebox.showinfo("Éxito", "Actividad guardada correctamente.", parent=self)
-            self.app_controller.refresh_case_window(self.caso_id)
+            self.app_controller.refresh_case_window(self.caso_id, ["seguimiento"])
             self.destroy()
         else:
             messagebox.showerror("Error", "No se pudo guardar la actividad.", parent=self)
@@ -73,18 +73,12 @@ class LPMSAgentIntegration:
         try:
             logger.info(f"Obteniendo datos del caso {case_id}...")
 
-            # Obtener datos básicos del caso
-            case_data = db.get_case_by_id(case_id)
-            if not case_data:
+            # Caso, cliente y partes salen del contexto del caso (una consulta, en caché)
+            contexto = db.get_contexto_caso(case_id)
+            if not contexto:
                 raise AgentIntegrationError(f"Caso {case_id} no encontrado")
-
-            # Obtener cliente asociado
-            client_data = None
-            if case_data.get('cliente_id'):
-                client_data = db.get_client_by_id(case_data['cliente_id'])
-
-            # Obtener partes del caso
-            parties_data = db.get_roles_by_caso_id(case_id)
+            case_data = contexto.caso
+            client_data = contexto.cliente
 
             # Obtener actividades del caso
             activities_data = db.get_actividades_by_caso_id(case_id)
@@ -97,22 +91,23 @@ class LPMSAgentIntegration:
                 "estado": case_data.get("estado", ""),
                 "descripcion": case_data.get("descripcion", ""),
                 "cliente": {
-                    "id": client_data.get("id") if client_data else None,
-                    "nombre": client_data.get("nombre", "") if client_data else "",
-                    "direccion": client_data.get("direccion", "") if client_data else "",
-                    "email": client_data.get("email", "") if client_data else "",
-                    "whatsapp": client_data.get("whatsapp", "") if client_data else ""
+                    "id": client_data.get("id"),
+                    "nombre": client_data.get("nombre", ""),
+                    "direccion": client_data.get("direccion", ""),
+                    "email": client_data.get("email", ""),
+                    "whatsapp": client_data.get("whatsapp", "")
                 } if client_data else None,
                 "partes": [
                     {
-                        "rol": party.get("rol", ""),
+                        "rol": party.get("rol_principal", ""),
                         "nombre_completo": party.get("nombre_completo", ""),
-                        "tipo_persona": party.get("tipo_persona", ""),
-                        "cuit_cuil": party.get("cuit_cuil", ""),
-                        "domicilio": party.get("domicilio", ""),
+                        "tipo_persona": "Jurídica" if party.get("es_persona_juridica") else "Física",
+                        "cuit_cuil": party.get("cuit") or party.get("dni") or "",
+                        "domicilio": party.get("domicilio_legal") or party.get("domicilio_real") or "",
                         "telefono": party.get("telefono", ""),
-                        "email": party.get("email", "")
-                    } for party in parties_data
+                        "email": party.get("email", ""),
+                        "representantes": [rep.get("nombre_completo", "") for rep in contexto.representantes_de(party["rol_id"])]
+                    } for party in contexto.roles
                 ],
                 "actividades": [
                     {
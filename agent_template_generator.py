@@ -150,26 +150,25 @@ FIRMAS:
     def _get_case_data(self, case_id: int) -> Optional[Dict[str, Any]]:
         """Obtener datos completos del caso"""
         try:
-            case = db.get_case_by_id(case_id)
-            if not case:
+            contexto = db.get_contexto_caso(case_id)
+            if not contexto:
                 return None
 
-            # Obtener partes del caso
-            actors = []
-            defendants = []
-
-            # Aquí iría la lógica para obtener actores y demandados
-            # Por ahora, devolver datos básicos del caso
+            # Actores y demandados con sus representantes, del contexto del caso
             return {
-                'case': case,
-                'actors': actors,
-                'defendants': defendants
+                'case': contexto.caso,
+                'actors': [self._party_with_representatives(contexto, party) for party in contexto.actores],
+                'defendants': [self._party_with_representatives(contexto, party) for party in contexto.demandados]
             }
 
         except Exception as e:
             print(f"[ERROR] Obteniendo datos del caso: {e}")
             return None
 
+    def _party_with_representatives(self, contexto, party: Dict[str, Any]) -> Dict[str, Any]:
+        """Parte con la lista de sus representantes en el formato de _format_parties_list"""
+        return dict(party, representantes=contexto.representantes_de(party['rol_id']))
+
     def _prepare_template_data(self, case_data: Dict[str, Any], agreement_data: Dict[str, Any]) -> Dict[str, str]:
         """Preparar datos para el template"""
         case = case_data['case']
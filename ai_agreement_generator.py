@@ -187,19 +187,12 @@ class AIAgreementGenerator:
             Dict con datos estructurados del caso
         """
         try:
-            # Obtener datos básicos del caso
-            case_data = db.get_case_by_id(case_id)
-            if not case_data:
+            # Caso, cliente y partes salen del contexto del caso (una consulta, en caché)
+            contexto = db.get_contexto_caso(case_id)
+            if not contexto:
                 return {}
-
-            # Obtener partes del caso
-            actors = db.get_partes_by_caso_and_tipo(case_id, 'ACTOR')
-            defendants = db.get_partes_by_caso_and_tipo(case_id, 'DEMANDADO')
-
-            # Obtener datos del cliente
-            client_data = None
-            if case_data.get('cliente_id'):
-                client_data = db.get_client_by_id(case_data['cliente_id'])
+            case_data = contexto.caso
+            client_data = contexto.cliente
 
             # Estructurar datos para IA
             ai_data = {
@@ -215,73 +208,47 @@ class AIAgreementGenerator:
                     'notas': case_data.get('notas', '')
                 },
                 'client': {
-                    'nombre': client_data.get('nombre', '') if client_data else '',
-                    'apellido': client_data.get('apellido', '') if client_data else '',
-                    'dni': client_data.get('dni', '') if client_data else '',
-                    'cuit': client_data.get('cuit', '') if client_data else '',
-                    'domicilio': client_data.get('domicilio', '') if client_data else '',
-                    'telefono': client_data.get('telefono', '') if client_data else '',
-                    'email': client_data.get('email', '') if client_data else ''
+                    'nombre': client_data.get('nombre', ''),
+                    'apellido': client_data.get('apellido', ''),
+                    'dni': client_data.get('dni', ''),
+                    'cuit': client_data.get('cuit', ''),
+                    'domicilio': client_data.get('direccion', ''),
+                    'telefono': client_data.get('whatsapp', ''),
+                    'email': client_data.get('email', '')
                 },
-                'actors': [],
-                'defendants': []
+                'actors': [self._party_info_for_ai(contexto, actor) for actor in contexto.actores],
+                'defendants': [self._party_info_for_ai(contexto, defendant) for defendant in contexto.demandados]
             }
 
-            # Procesar actores
-            for actor in actors:
-                actor_info = {
-                    'id': actor.get('id'),
-                    'nombre_completo': actor.get('nombre_completo', ''),
-                    'dni': actor.get('dni', ''),
-                    'cuit': actor.get('cuit', ''),
-                    'domicilio_real': actor.get('domicilio_real', ''),
-                    'domicilio_legal': actor.get('domicilio_legal', ''),
-                    'telefono': actor.get('telefono', ''),
-                    'email': actor.get('email', ''),
-                    'datos_bancarios': actor.get('datos_bancarios', ''),
-                    'representantes': []
-                }
-
-                # Obtener representantes del actor
-                representantes = self._get_representatives_for_party(actor.get('id'), case_id)
-                actor_info['representantes'] = representantes
-
-                ai_data['actors'].append(actor_info)
-
-            # Procesar demandados
-            for defendant in defendants:
-                defendant_info = {
-                    'id': defendant.get('id'),
-                    'nombre_completo': defendant.get('nombre_completo', ''),
-                    'dni': defendant.get('dni', ''),
-                    'cuit': defendant.get('cuit', ''),
-                    'domicilio_real': defendant.get('domicilio_real', ''),
-                    'domicilio_legal': defendant.get('domicilio_legal', ''),
-                    'telefono': defendant.get('telefono', ''),
-                    'email': defendant.get('email', ''),
-                    'datos_bancarios': defendant.get('datos_bancarios', ''),
-                    'representantes': []
-                }
-
-                # Obtener representantes del demandado
-                representantes = self._get_representatives_for_party(defendant.get('id'), case_id)
-                defendant_info['representantes'] = representantes
-
-                ai_data['defendants'].append(defendant_info)
-
             return ai_data
 
         except Exception as e:
             self.logger.error(f"Error obteniendo datos del caso {case_id}: {e}")
             return {}
 
-    def _get_representatives_for_party(self, party_id: int, case_id: int) -> List[Dict[str, Any]]:
+    def _party_info_for_ai(self, contexto, party: Dict[str, Any]) -> Dict[str, Any]:
+        """Datos de una parte del contexto del caso, con sus representantes."""
+        return {
+            'id': party.get('rol_id'),
+            'nombre_completo': party.get('nombre_completo', ''),
+            'dni': party.get('dni', ''),
+            'cuit': party.get('cuit', ''),
+            'domicilio_real': party.get('domicilio_real', ''),
+            'domicilio_legal': party.get('domicilio_legal', ''),
+            'telefono': party.get('telefono', ''),
+            'email': party.get('email', ''),
+            'datos_bancarios': party.get('datos_bancarios', ''),
+            'representantes': self._get_representatives_for_party(party.get('rol_id'), contexto.caso_id, contexto)
+        }
+
+    def _get_representatives_for_party(self, party_id: int, case_id: int, contexto=None) -> List[Dict[str, Any]]:
         """
         Obtiene los representantes legales de una parte.
 
         Args:
-            party_id: ID de la parte
+            party_id: ID del rol de la parte
             case_id: ID del caso
+            contexto: ContextoCaso ya obtenido (si no, se toma de la caché)
 
         Returns:
             Lista de representantes
@@ -289,22 +256,20 @@ class AIAgreementGenerator:
         representantes = []
 
         try:
-            # Obtener roles relacionados con esta parte
-            roles = db.get_roles_by_case_id(case_id)
-
-            for rol in roles:
-                # Verificar si este rol representa a la parte actual
-                if (rol.get('representa_a_id') == party_id or
-                    rol.get('id') == party_id):
-                    representante_info = {
-                        'id': rol.get('id'),
-                        'nombre_completo': rol.get('nombre_completo', ''),
-                        'cuit': rol.get('cuit', ''),
-                        'personeria': rol.get('datos_bancarios', 'Poder General Judicial'),
-                        'telefono': rol.get('telefono', ''),
-                        'email': rol.get('email', '')
-                    }
-                    representantes.append(representante_info)
+            contexto = contexto or db.get_contexto_caso(case_id)
+            if not contexto:
+                return representantes
+
+            for rol in contexto.representantes_de(party_id):
+                representante_info = {
+                    'id': rol.get('rol_id'),
+                    'nombre_completo': rol.get('nombre_completo', ''),
+                    'cuit': rol.get('cuit', ''),
+                    'personeria': rol.get('datos_bancarios') or 'Poder General Judicial',
+                    'telefono': rol.get('telefono', ''),
+                    'email': rol.get('email', '')
+                }
+                representantes.append(representante_info)
 
         except Exception as e:
             self.logger.warning(f"Error obteniendo representantes para parte {party_id}: {e}")
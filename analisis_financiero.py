@@ -0,0 +1,336 @@
+"""
+Análisis Financiero - Analítica de cuenta corriente a nivel de todo el estudio
+
+Carga `movimientos_cuenta` en una sola consulta en streaming (COPY) hacia
+columnas NumPy/pandas y calcula agregados vectorizados por cliente, mes,
+tipo de movimiento y etapa procesal, además de saldos pendientes y
+antigüedad de los gastos no recuperados.
+"""
+
+import datetime
+import io
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import crm_database as db
+
+logger = logging.getLogger('analisis_financiero')
+
+# Tramos de antigüedad (en días) para los gastos pendientes de recupero
+TRAMOS_ANTIGUEDAD = ['0-30 días', '31-60 días', '61-90 días', 'Más de 90 días']
+_LIMITES_TRAMOS = [-np.inf, 30, 60, 90, np.inf]
+
+_SQL_MOVIMIENTOS = """
+    COPY (
+        SELECT
+            m.id,
+            m.caso_id,
+            c.cliente_id,
+            cl.nombre AS cliente_nombre,
+            c.caratula,
+            COALESCE(NULLIF(c.etapa_procesal, ''), 'Sin etapa') AS etapa_procesal,
+            m.fecha,
+            m.tipo_movimiento,
+            m.monto
+        FROM movimientos_cuenta m
+        JOIN casos c ON c.id = m.caso_id
+        JOIN clientes cl ON cl.id = c.cliente_id
+        ORDER BY m.caso_id, m.fecha, m.id
+    ) TO STDOUT WITH (FORMAT CSV, HEADER TRUE)
+"""
+
+# Cambia ante cualquier alta, edición o baja: los triggers de
+# totales_cuenta_caso actualizan updated_at en cada operación. El hash cubre
+# los datos del caso y del cliente que muestran los agregados (carátula, etapa,
+# cliente y su nombre), que pueden cambiar sin tocar los movimientos.
+_SQL_CLAVE_CACHE = """
+    SELECT
+        (SELECT MAX(id) FROM movimientos_cuenta),
+        (SELECT MAX(updated_at) FROM totales_cuenta_caso),
+        (SELECT COALESCE(SUM(cantidad_movimientos), 0) FROM totales_cuenta_caso),
+        (SELECT md5(string_agg(concat_ws('|', c.id, c.cliente_id, cl.nombre, c.caratula, c.etapa_procesal),
+                               E'\\n' ORDER BY c.id))
+         FROM totales_cuenta_caso t
+         JOIN casos c ON c.id = t.caso_id
+         JOIN clientes cl ON cl.id = c.cliente_id)
+"""
+
+_DTYPES_MOVIMIENTOS = {
+    'id': np.int64,
+    'caso_id': np.int64,
+    'cliente_id': np.int64,
+    'cliente_nombre': 'string',
+    'caratula': 'string',
+    'etapa_procesal': 'category',
+    'tipo_movimiento': 'category',
+    'monto': np.float64,
+}
+
+
+def preparar_movimientos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega las columnas derivadas que usan todos los agregados.
+
+    Args:
+        df: DataFrame con las columnas de `_SQL_MOVIMIENTOS`
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con `ingreso`, `gasto` y `mes`
+    """
+    es_ingreso = (df['tipo_movimiento'] == 'Ingreso').to_numpy()
+    monto = df['monto'].to_numpy(dtype=np.float64)
+    df['ingreso'] = np.where(es_ingreso, monto, 0.0)
+    df['gasto'] = np.where(es_ingreso, 0.0, monto)
+    # Formatear sólo los meses distintos, no cada fila
+    meses = pd.Categorical(df['fecha'].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]'))
+    df['mes'] = meses.rename_categories(pd.DatetimeIndex(meses.categories).strftime('%Y-%m'))
+    return df
+
+
+def agregar_por(df: pd.DataFrame, columnas) -> pd.DataFrame:
+    """
+    Suma ingresos y gastos agrupando por las columnas indicadas.
+
+    Args:
+        df: Movimientos preparados con `preparar_movimientos`
+        columnas: Columna o lista de columnas de agrupación
+
+    Returns:
+        pd.DataFrame: Una fila por grupo con ingresos, gastos, saldo y cantidad
+    """
+    if isinstance(columnas, str):
+        columnas = [columnas]
+    agrupado = df.groupby(columnas, sort=True, observed=True)
+    resultado = agrupado[['ingreso', 'gasto']].sum()
+    resultado['saldo'] = resultado['ingreso'] - resultado['gasto']
+    resultado['cantidad'] = agrupado.size()
+    return resultado.reset_index()
+
+
+def calcular_saldos_pendientes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve los casos cuyos gastos superan a los ingresos (saldo a cobrar).
+
+    Args:
+        df: Movimientos preparados
+
+    Returns:
+        pd.DataFrame: Casos con saldo negativo, ordenados por monto pendiente
+    """
+    por_caso = agregar_por(df, ['cliente_id', 'cliente_nombre', 'caso_id', 'caratula'])
+    pendientes = por_caso[por_caso['saldo'] < 0].copy()
+    pendientes['pendiente'] = -pendientes['saldo']
+    return pendientes.sort_values('pendiente', ascending=False).reset_index(drop=True)
+
+
+def calcular_antiguedad(df: pd.DataFrame, fecha_corte: Optional[datetime.date] = None) -> pd.DataFrame:
+    """
+    Distribuye los gastos no recuperados por tramos de antigüedad.
+
+    Los ingresos de cada caso se imputan a sus gastos más antiguos primero
+    (FIFO), de forma vectorizada: el pendiente de cada gasto es su parte del
+    acumulado de gastos que excede el total de ingresos del caso.
+
+    Args:
+        df: Movimientos preparados
+        fecha_corte: Fecha de referencia (por defecto, hoy)
+
+    Returns:
+        pd.DataFrame: Una fila por cliente con el pendiente de cada tramo y el total
+    """
+    fecha_corte = pd.Timestamp(fecha_corte or datetime.date.today())
+    columnas_salida = ['cliente_id', 'cliente_nombre'] + TRAMOS_ANTIGUEDAD + ['total_pendiente']
+
+    gastos = df[df['tipo_movimiento'] == 'Gasto']
+    if gastos.empty:
+        return pd.DataFrame(columns=columnas_salida)
+    gastos = gastos.sort_values(['caso_id', 'fecha', 'id'], kind='mergesort')
+
+    ingresos_por_caso = df.groupby('caso_id', sort=False)['ingreso'].sum()
+    acumulado = gastos.groupby('caso_id', sort=False)['monto'].cumsum().to_numpy()
+    cubierto = gastos['caso_id'].map(ingresos_por_caso).fillna(0.0).to_numpy()
+    monto = gastos['monto'].to_numpy()
+    pendiente = np.minimum(np.maximum(acumulado - cubierto, 0.0), monto)
+
+    dias = (fecha_corte - gastos['fecha']).dt.days.to_numpy()
+    tramo = pd.cut(dias, bins=_LIMITES_TRAMOS, labels=TRAMOS_ANTIGUEDAD)
+
+    detalle = pd.DataFrame({
+        'cliente_id': gastos['cliente_id'].to_numpy(),
+        'cliente_nombre': gastos['cliente_nombre'].to_numpy(),
+        'tramo': tramo,
+        'pendiente': pendiente,
+    })
+    detalle = detalle[detalle['pendiente'] > 0]
+    if detalle.empty:
+        return pd.DataFrame(columns=columnas_salida)
+
+    tabla = detalle.pivot_table(
+        index=['cliente_id', 'cliente_nombre'],
+        columns='tramo',
+        values='pendiente',
+        aggfunc='sum',
+        fill_value=0.0,
+        observed=False,
+    ).reindex(columns=TRAMOS_ANTIGUEDAD, fill_value=0.0)
+    tabla['total_pendiente'] = tabla.sum(axis=1)
+    tabla.columns.name = None
+    return tabla.reset_index().sort_values('total_pendiente', ascending=False).reset_index(drop=True)
+
+
+class AnalisisFinanciero:
+    """
+    Analítica de facturación de todo el estudio sobre `movimientos_cuenta`.
+
+    Los movimientos se cargan una vez en memoria y los resultados se reutilizan
+    hasta que cambia la clave de invalidación (máximo id de movimiento, última
+    actualización de totales, cantidad total de movimientos y un hash de la
+    carátula, etapa y cliente de los casos con movimientos).
+    """
+
+    def __init__(self, db_module=db):
+        self.db = db_module
+        self._lock = threading.Lock()
+        self._clave_cache: Optional[Tuple] = None
+        self._movimientos: Optional[pd.DataFrame] = None
+        self._resultados: Dict[str, pd.DataFrame] = {}
+        self._fecha_resultados: Optional[datetime.date] = None
+
+    # ========================================
+    # CARGA E INVALIDACIÓN
+    # ========================================
+
+    def _obtener_clave_cache(self, conn) -> Tuple:
+        with conn.cursor() as cur:
+            cur.execute(_SQL_CLAVE_CACHE)
+            return tuple(cur.fetchone())
+
+    def _cargar_movimientos(self, conn) -> pd.DataFrame:
+        inicio = time.perf_counter()
+        buffer = io.StringIO()
+        with conn.cursor() as cur:
+            cur.copy_expert(_SQL_MOVIMIENTOS, buffer)
+        buffer.seek(0)
+        df = pd.read_csv(buffer, dtype=_DTYPES_MOVIMIENTOS, parse_dates=['fecha'])
+        df = preparar_movimientos(df)
+        logger.info(f"Movimientos cargados para análisis: {len(df)} filas en {time.perf_counter() - inicio:.3f}s")
+        return df
+
+    def obtener_movimientos(self, forzar_recarga: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Devuelve los movimientos en memoria, recargándolos sólo si cambiaron.
+
+        Args:
+            forzar_recarga: Ignora la caché y vuelve a leer la base
+
+        Returns:
+            pd.DataFrame o None si no hay conexión
+        """
+        conn = self.db.connect_db()
+        if not conn:
+            return self._movimientos
+
+        try:
+            with self._lock:
+                clave = self._obtener_clave_cache(conn)
+                if forzar_recarga or self._movimientos is None or clave != self._clave_cache:
+                    self._movimientos = self._cargar_movimientos(conn)
+                    self._clave_cache = clave
+                    self._resultados = {}
+                return self._movimientos
+        except Exception as e:
+            logger.error(f"Error al cargar movimientos para análisis financiero: {e}")
+            return self._movimientos
+        finally:
+            conn.close()
+
+    def invalidar(self):
+        """Descarta los datos y resultados en caché."""
+        with self._lock:
+            self._clave_cache = None
+            self._movimientos = None
+            self._resultados = {}
+
+    # ========================================
+    # RESULTADOS
+    # ========================================
+
+    def calcular_resumen(self, forzar_recarga: bool = False) -> Dict[str, pd.DataFrame]:
+        """
+        Calcula (o devuelve desde caché) todos los agregados del estudio.
+
+        Returns:
+            dict: DataFrames 'por_cliente', 'por_mes', 'por_tipo', 'por_etapa',
+                  'saldos_pendientes' y 'antiguedad'
+        """
+        df = self.obtener_movimientos(forzar_recarga)
+        if df is None:
+            return {}
+
+        hoy = datetime.date.today()
+        with self._lock:
+            if self._resultados and self._fecha_resultados == hoy:
+                return self._resultados
+
+            inicio = time.perf_counter()
+            resultados = {
+                'por_cliente': agregar_por(df, ['cliente_id', 'cliente_nombre']),
+                'por_mes': agregar_por(df, 'mes'),
+                'por_tipo': agregar_por(df, 'tipo_movimiento'),
+                'por_etapa': agregar_por(df, 'etapa_procesal'),
+                'saldos_pendientes': calcular_saldos_pendientes(df),
+                'antiguedad': calcular_antiguedad(df, hoy),
+            }
+            self._resultados = resultados
+            self._fecha_resultados = hoy
+            logger.info(f"Resumen financiero del estudio calculado en {time.perf_counter() - inicio:.3f}s")
+            return resultados
+
+    def exportar_xlsx(self, ruta_archivo: str) -> bool:
+        """
+        Exporta todos los agregados a un libro Excel, una hoja por agregado.
+
+        Args:
+            ruta_archivo: Ruta del archivo .xlsx a generar
+
+        Returns:
+            bool: True si el archivo se generó correctamente
+        """
+        resultados = self.calcular_resumen()
+        if not resultados:
+            return False
+
+        hojas = {
+            'por_cliente': 'Por Cliente',
+            'por_mes': 'Por Mes',
+            'por_tipo': 'Por Tipo',
+            'por_etapa': 'Por Etapa Procesal',
+            'saldos_pendientes': 'Saldos Pendientes',
+            'antiguedad': 'Antigüedad de Saldos',
+        }
+        try:
+            with pd.ExcelWriter(ruta_archivo, engine='openpyxl') as writer:
+                for clave, titulo in hojas.items():
+                    resultados[clave].to_excel(writer, sheet_name=titulo, index=False)
+            logger.info(f"Análisis financiero exportado a: {ruta_archivo}")
+            return True
+        except Exception as e:
+            logger.error(f"Error al exportar análisis financiero a XLSX: {e}")
+            return False
+
+    def get_estadisticas(self) -> Dict[str, Any]:
+        """Información sobre el estado de la caché, útil para diagnóstico."""
+        return {
+            'movimientos_en_memoria': 0 if self._movimientos is None else len(self._movimientos),
+            'clave_cache': self._clave_cache,
+            'resultados_en_cache': list(self._resultados.keys()),
+        }
+
+
+# Instancia compartida: conserva la caché entre aperturas del reporte
+analisis_financiero = AnalisisFinanciero()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Árbol de Partes - Modelo de la vista jerárquica de la pestaña Partes y
+actualización incremental del Treeview.
+
+`construir_nodos()` calcula, sin tocar Tk, qué nodos debe mostrar el árbol
+(grupos por rol, abogados con representaciones múltiples, representantes bajo
+su representado) en orden de visualización. `aplicar_diferencias()` compara
+ese modelo con lo que ya muestra el Treeview e inserta, mueve, actualiza o
+borra sólo lo que cambió: al editar una parte no se reconstruye todo el árbol,
+no parpadea y se conservan la selección y los grupos plegados.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+ORDEN_ROLES = ['Actor', 'Demandado', 'Tercero', 'Abogado', 'Apoderado', 'Perito', 'Testigo']
+
+# Columnas de contactos que get_roles_by_caso_id repite en cada rol
+COLUMNAS_CONTACTO = ('nombre_completo', 'es_persona_juridica', 'dni', 'cuit', 'domicilio_real',
+                     'domicilio_legal', 'email', 'telefono', 'notas_generales', 'contacto_created_at')
+
+ICONOS_ROL = {
+    'Actor': '⚖️',
+    'Demandado': '🛡️',
+    'Tercero': '👥',
+    'Abogado': '👨‍💼',
+    'Apoderado': '📋',
+    'Perito': '🔬',
+    'Testigo': '👁️',
+    'Juez': '⚖️',
+    'Secretario': '📝',
+    'Oficial': '👮',
+}
+
+
+def icono_rol(rol: str) -> str:
+    return ICONOS_ROL.get(rol, '👤')
+
+
+def icono_grupo(rol: str) -> str:
+    return '📁' + icono_rol(rol)
+
+
+class NodoArbol(NamedTuple):
+    iid: str
+    padre: str
+    valores: tuple
+    tags: tuple
+
+
+def iid_rol(rol_id) -> str:
+    return f"rol_{rol_id}"
+
+
+def _valores_rol(rol: dict) -> tuple:
+    rol_principal = rol.get('rol_principal', 'N/A')
+    person_icon = "🏢" if rol.get('es_persona_juridica') else "👤"
+    nombre = f"{icono_rol(rol_principal)} {person_icon} {rol.get('nombre_completo', 'N/A')}"
+    return (rol['rol_id'], nombre, rol_principal, rol.get('rol_secundario', '') or '')
+
+
+def ordenar_roles(roles) -> List[dict]:
+    """Mismo orden que get_roles_by_caso_id: por rol principal y luego por nombre."""
+    def clave(rol):
+        rol_principal = rol.get('rol_principal')
+        orden = ORDEN_ROLES.index(rol_principal) if rol_principal in ORDEN_ROLES[:6] else 6
+        return orden, rol.get('nombre_completo') or ''
+    return sorted(roles, key=clave)
+
+
+def construir_nodos(roles: List[dict], multiple_representations: Optional[Dict] = None) -> List[NodoArbol]:
+    """
+    Nodos del árbol de partes en orden de visualización (cada padre antes que sus hijos).
+
+    Reproduce la agrupación histórica de PartesTab: un grupo por rol principal,
+    los abogados con representación múltiple como nodo propio dentro de
+    "Abogados" y cada representante colgando de la parte que representa.
+    """
+    multiple_representations = multiple_representations or {}
+    hijos: Dict[str, List[str]] = {'': []}
+    nodos: Dict[str, NodoArbol] = {}
+    iid_por_rol: Dict[int, str] = {}
+
+    def agregar(iid, padre, valores, tags):
+        nodos[iid] = NodoArbol(iid, padre, tuple(valores), tuple(tags))
+        hijos.setdefault(padre, []).append(iid)
+        hijos.setdefault(iid, [])
+
+    # Los roles "sombra" de una representación múltiple no se muestran
+    sombras = {rep['rol_id'] for info in multiple_representations.values()
+               for rep in info['representations'] if rep.get('is_secondary')}
+    principales = {info.get('primary_role_id') for info in multiple_representations.values()}
+    visibles = [r for r in roles if r.get('rol_id') not in sombras]
+
+    roles_por_tipo: Dict[str, List[dict]] = {}
+    abogados_multiples: Dict[int, tuple] = {}
+    for rol in visibles:
+        contacto_id = rol.get('contacto_id')
+        if (rol.get('rol_principal') in ('Abogado', 'Apoderado') and contacto_id
+                and contacto_id in multiple_representations and contacto_id not in abogados_multiples
+                and rol.get('rol_id') in principales):
+            abogados_multiples[contacto_id] = (rol, multiple_representations[contacto_id])
+            continue
+        if contacto_id not in abogados_multiples:
+            roles_por_tipo.setdefault(rol.get('rol_principal', 'Sin Rol'), []).append(rol)
+
+    tipos = sorted(roles_por_tipo, key=lambda r: ORDEN_ROLES.index(r) if r in ORDEN_ROLES else len(ORDEN_ROLES))
+    for tipo in tipos:
+        grupo = f"group_{tipo}"
+        agregar(grupo, '', ('', f"{icono_grupo(tipo)} {tipo}s ({len(roles_por_tipo[tipo])})", '', ''), ('group',))
+        for rol in roles_por_tipo[tipo]:
+            iid_por_rol[rol['rol_id']] = iid_rol(rol['rol_id'])
+            agregar(iid_rol(rol['rol_id']), grupo, _valores_rol(rol), ('role',))
+
+    if abogados_multiples:
+        grupo = "group_Abogado"
+        cantidad = len(roles_por_tipo.get('Abogado', [])) + len(abogados_multiples)
+        valores_grupo = ('', f"{icono_grupo('Abogado')} Abogados ({cantidad})", '', '')
+        if grupo in nodos:
+            nodos[grupo] = nodos[grupo]._replace(valores=valores_grupo)
+        else:
+            agregar(grupo, '', valores_grupo, ('group',))
+        for contacto_id, (rol, info) in abogados_multiples.items():
+            representaciones = info['representations']
+            main_icon = "🏢" if rol.get('es_persona_juridica') else "👤"
+            multi_iid = f"multi_rep_{contacto_id}"
+            texto = f"🔗 {main_icon} {info['lawyer_name']} - Representaciones Múltiples ({len(representaciones)})"
+            agregar(multi_iid, grupo, ('', texto, 'Múltiples Representaciones', ''), ('multi_representation',))
+            for i, rep in enumerate(representaciones):
+                texto_rep = f"  ↳ {icono_rol(rep['represented_role'])} Representa a: {rep['represented_name']} ({rep['represented_role']})"
+                agregar(f"rep_{contacto_id}_{i}", multi_iid, ('', texto_rep, '', ''), ('representation_item',))
+            iid_por_rol[info.get('primary_role_id', rol['rol_id'])] = multi_iid
+
+    # Cada representante pasa a colgar de la parte que representa
+    for rol in roles:
+        representante = iid_por_rol.get(rol.get('rol_id'))
+        representado = iid_por_rol.get(rol.get('representa_a_id'))
+        if not representante or not representado or _es_ancestro(nodos, representante, representado):
+            continue
+        nodo = nodos[representante]
+        hijos[nodo.padre].remove(representante)
+        hijos[representado].append(representante)
+        valores = list(nodo.valores)
+        if not str(valores[1]).startswith('↳'):
+            nombre = rol.get('nombre_completo', 'N/A') + (" 📄" if rol.get('es_persona_juridica') else "")
+            valores[1] = f"↳ {nombre}"
+        nodos[representante] = nodo._replace(padre=representado, valores=tuple(valores), tags=('representative',))
+
+    ordenados = []
+
+    def recorrer(padre):
+        for iid in hijos.get(padre, []):
+            ordenados.append(nodos[iid])
+            recorrer(iid)
+
+    recorrer('')
+    return ordenados
+
+
+def _es_ancestro(nodos, posible_ancestro, iid):
+    """True si `posible_ancestro` es `iid` o alguno de sus padres (mover crearía un ciclo)."""
+    while iid:
+        if iid == posible_ancestro:
+            return True
+        iid = nodos[iid].padre
+    return False
+
+
+def _normalizar(valor) -> tuple:
+    # Tk devuelve '' para tuplas vacías y puede convertir números
+    if not valor:
+        return ()
+    return tuple(str(v) for v in valor)
+
+
+def aplicar_diferencias(tree, nodos: List[NodoArbol]) -> Dict[str, int]:
+    """
+    Lleva el Treeview `tree` al estado descrito por `nodos` tocando sólo lo que cambió.
+    Los nodos que ya existían conservan su estado abierto/cerrado y su selección.
+    """
+    cambios = {'insertados': 0, 'movidos': 0, 'actualizados': 0, 'eliminados': 0}
+    deseados = {nodo.iid for nodo in nodos}
+    posiciones: Dict[str, int] = {}
+
+    for nodo in nodos:
+        indice = posiciones.get(nodo.padre, 0)
+        posiciones[nodo.padre] = indice + 1
+        if not tree.exists(nodo.iid):
+            tree.insert(nodo.padre, indice, iid=nodo.iid, values=nodo.valores, tags=nodo.tags, open=True)
+            cambios['insertados'] += 1
+            continue
+        if tree.parent(nodo.iid) != nodo.padre or tree.index(nodo.iid) != indice:
+            tree.move(nodo.iid, nodo.padre, indice)
+            cambios['movidos'] += 1
+        if (_normalizar(tree.item(nodo.iid, 'values')) != _normalizar(nodo.valores)
+                or _normalizar(tree.item(nodo.iid, 'tags')) != _normalizar(nodo.tags)):
+            tree.item(nodo.iid, values=nodo.valores, tags=nodo.tags)
+            cambios['actualizados'] += 1
+
+    # Lo que sobra ya no tiene hijos deseados: todos se movieron a su lugar arriba
+    sobrantes = []
+    pendientes = list(tree.get_children(''))
+    while pendientes:
+        iid = pendientes.pop()
+        if iid not in deseados:
+            sobrantes.append(iid)
+        pendientes.extend(tree.get_children(iid))
+    for iid in sobrantes:
+        if tree.exists(iid):
+            tree.delete(iid)
+            cambios['eliminados'] += 1
+    return cambios
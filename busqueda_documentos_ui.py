@@ -0,0 +1,119 @@
+import tkinter as tk
+from tkinter import ttk
+import os
+
+import crm_database as db
+from ejecutor_datos import ejecutor_datos, indicador_cursor
+from indice_documentos import indice_documentos
+
+
+def open_busqueda_documentos(parent, app_controller, caso_id=None, caso_caratula=None):
+    """Abre la búsqueda en el contenido de los documentos (de un caso o de todos)."""
+    return BusquedaDocumentosWindow(parent, app_controller, caso_id, caso_caratula)
+
+
+class BusquedaDocumentosWindow(tk.Toplevel):
+    """Búsqueda de texto completo sobre el índice local de documentos de los casos"""
+
+    # Espera tras la última tecla antes de consultar el índice
+    DEMORA_BUSQUEDA_MS = 250
+
+    def __init__(self, parent, app_controller, caso_id=None, caso_caratula=None):
+        super().__init__(parent)
+        self.app_controller = app_controller
+        self.caso_id = caso_id
+        self.caratulas = {}
+        self._caso_por_ruta = {}
+        self._busqueda_programada = None
+
+        alcance = f"Caso: {caso_caratula}" if caso_id else "Todos los casos"
+        self.title(f"Buscar en Documentos - {alcance}")
+        self.geometry("900x550")
+        self.transient(parent)
+
+        self._setup_ui()
+        self.search_entry.focus_set()
+
+        if caso_id is None:
+            # Carátulas para mostrar a qué caso pertenece cada resultado
+            ejecutor_datos.enviar(
+                db.get_casos_con_carpeta,
+                al_completar=lambda casos: self.caratulas.update({c['id']: c['caratula'] for c in casos}),
+            )
+
+    def _setup_ui(self):
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_entry.bind('<KeyRelease>', self._on_search_change)
+        self.search_entry.bind('<Return>', lambda e: self._buscar())
+
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        columnas = ('Documento', 'Caso', 'Fragmento')
+        self.results_tree = ttk.Treeview(tree_frame, columns=columnas, show='headings', selectmode='browse')
+        self.results_tree.heading('Documento', text='Documento')
+        self.results_tree.heading('Caso', text='Caso')
+        self.results_tree.heading('Fragmento', text='Fragmento')
+        self.results_tree.column('Documento', width=220, stretch=tk.NO)
+        self.results_tree.column('Caso', width=200, stretch=tk.NO)
+        self.results_tree.column('Fragmento', width=440, stretch=True)
+        if self.caso_id:
+            self.results_tree.configure(displaycolumns=('Documento', 'Fragmento'))
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        self.results_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.results_tree.bind("<Double-1>", self._on_double_click)
+
+        self.status_lbl = ttk.Label(main_frame, text="Escriba una o más palabras. Doble clic abre el documento.")
+        self.status_lbl.pack(fill=tk.X, pady=(5, 0))
+
+    def _on_search_change(self, event=None):
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.after(self.DEMORA_BUSQUEDA_MS, self._buscar)
+
+    def _buscar(self):
+        self._busqueda_programada = None
+        texto = self.search_var.get().strip()
+        if not texto:
+            ejecutor_datos.cancelar(('busqueda_documentos', id(self)))
+            self.results_tree.delete(*self.results_tree.get_children())
+            return
+        ejecutor_datos.enviar(
+            indice_documentos.buscar, texto, self.caso_id,
+            clave=('busqueda_documentos', id(self)),
+            al_completar=self._mostrar_resultados,
+            al_fallar=lambda error: self.status_lbl.config(text=f"Error en la búsqueda: {error}"),
+            indicador=indicador_cursor(self),
+        )
+
+    def _mostrar_resultados(self, resultados):
+        self.results_tree.delete(*self.results_tree.get_children())
+        self._caso_por_ruta = {}
+        for resultado in resultados:
+            ruta = resultado['ruta']
+            fragmento = " ".join((resultado['fragmento'] or "").split())
+            caso = self.caratulas.get(resultado['caso_id'], f"Caso {resultado['caso_id']}")
+            self.results_tree.insert('', tk.END, iid=ruta, values=(resultado['nombre'], caso, fragmento), tags=('file',))
+            self._caso_por_ruta[ruta] = resultado['caso_id']
+        if resultados:
+            self.status_lbl.config(text=f"{len(resultados)} documento(s) encontrados.")
+        else:
+            estadisticas = indice_documentos.estadisticas()
+            self.status_lbl.config(text=f"Sin resultados ({estadisticas['archivos']} documentos indexados).")
+
+    def _on_double_click(self, event):
+        item_id = self.results_tree.identify_row(event.y)
+        if not item_id or not os.path.isfile(item_id):
+            return
+        # Reutiliza la apertura de documentos de la pestaña Documentación (registra la actividad)
+        caso_id = self._caso_por_ruta.get(item_id)
+        self.app_controller.on_document_double_click_from_tab(event, self.results_tree, caso_id, None)
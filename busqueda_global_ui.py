@@ -0,0 +1,120 @@
+import tkinter as tk
+from tkinter import ttk
+
+import crm_database as db
+from ejecutor_datos import ejecutor_datos, indicador_cursor
+
+
+def open_busqueda_global(parent, app_controller):
+    """Abre la búsqueda de texto completo en notas, actividades, tareas y consultas."""
+    return BusquedaGlobalWindow(parent, app_controller)
+
+
+class BusquedaGlobalWindow(tk.Toplevel):
+    """Búsqueda de texto completo (tsvector en PostgreSQL) sobre los textos libres del estudio"""
+
+    DEMORA_BUSQUEDA_MS = 250
+    LIMITE_RESULTADOS = 100
+
+    # Tipo de resultado -> (etiqueta del filtro, pestaña de la ventana del caso que lo muestra)
+    TIPOS = {
+        'caso': ("Notas de casos", 'detalles'),
+        'actividad': ("Actividades", 'seguimiento'),
+        'tarea': ("Tareas", 'tareas'),
+        'consulta': ("Consultas de prospectos", None),
+    }
+
+    def __init__(self, parent, app_controller):
+        super().__init__(parent)
+        self.app_controller = app_controller
+        self._resultados = {}
+        self._busqueda_programada = None
+
+        self.title("Buscar en Notas, Actividades y Consultas")
+        self.geometry("950x550")
+        self.transient(parent)
+
+        self._setup_ui()
+        self.search_entry.focus_set()
+
+    def _setup_ui(self):
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_entry.bind('<KeyRelease>', self._on_search_change)
+        self.search_entry.bind('<Return>', lambda e: self._buscar())
+
+        filtros_frame = ttk.Frame(main_frame)
+        filtros_frame.pack(fill=tk.X, pady=(0, 10))
+        self.tipo_vars = {}
+        for tipo, (etiqueta, _) in self.TIPOS.items():
+            var = tk.BooleanVar(value=True)
+            ttk.Checkbutton(filtros_frame, text=etiqueta, variable=var, command=self._buscar).pack(side=tk.LEFT, padx=(0, 10))
+            self.tipo_vars[tipo] = var
+
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        columnas = ('Tipo', 'Título', 'Fecha', 'Fragmento')
+        self.results_tree = ttk.Treeview(tree_frame, columns=columnas, show='headings', selectmode='browse')
+        for columna, ancho, estirar in (('Tipo', 90, tk.NO), ('Título', 220, tk.NO), ('Fecha', 90, tk.NO), ('Fragmento', 480, True)):
+            self.results_tree.heading(columna, text=columna)
+            self.results_tree.column(columna, width=ancho, stretch=estirar)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        self.results_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.results_tree.bind("<Double-1>", self._on_double_click)
+
+        self.status_lbl = ttk.Label(
+            main_frame,
+            text='Admite "frase exacta", -excluir y or. Las coincidencias se marcan entre [corchetes]. Doble clic abre el caso o el prospecto.',
+        )
+        self.status_lbl.pack(fill=tk.X, pady=(5, 0))
+
+    def _on_search_change(self, event=None):
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.after(self.DEMORA_BUSQUEDA_MS, self._buscar)
+
+    def _buscar(self):
+        self._busqueda_programada = None
+        texto = self.search_var.get().strip()
+        tipos = [tipo for tipo, var in self.tipo_vars.items() if var.get()]
+        if not texto or not tipos:
+            ejecutor_datos.cancelar(('busqueda_global', id(self)))
+            self.results_tree.delete(*self.results_tree.get_children())
+            return
+        ejecutor_datos.enviar(
+            db.buscar_texto_completo, texto, tipos, limite=self.LIMITE_RESULTADOS,
+            clave=('busqueda_global', id(self)),
+            al_completar=self._mostrar_resultados,
+            al_fallar=lambda error: self.status_lbl.config(text=f"Error en la búsqueda: {error}"),
+            indicador=indicador_cursor(self),
+        )
+
+    def _mostrar_resultados(self, resultados):
+        self.results_tree.delete(*self.results_tree.get_children())
+        self._resultados = {}
+        for resultado in resultados:
+            iid = f"{resultado['tipo']}-{resultado['id']}"
+            fecha = resultado['fecha'].strftime("%d-%m-%Y") if resultado.get('fecha') else ""
+            fragmento = " ".join((resultado['fragmento'] or "").split())
+            valores = (self.TIPOS[resultado['tipo']][0], resultado['titulo'] or "", fecha, fragmento)
+            self.results_tree.insert('', tk.END, iid=iid, values=valores)
+            self._resultados[iid] = resultado
+        self.status_lbl.config(text=f"{len(resultados)} resultado(s)." if resultados else "Sin resultados.")
+
+    def _on_double_click(self, event):
+        resultado = self._resultados.get(self.results_tree.identify_row(event.y))
+        if not resultado:
+            return
+        if resultado['tipo'] == 'consulta':
+            self.app_controller.open_prospects_window(resultado['prospecto_id'])
+        elif resultado['caso_id']:
+            self.app_controller.abrir_caso_por_id(resultado['caso_id'], self.TIPOS[resultado['tipo']][1])
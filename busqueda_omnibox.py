@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Búsqueda Global (omnibox) - Búsqueda mientras se escribe sobre clientes, casos,
+contactos y prospectos.
+
+La base mantiene por triggers una tabla precalculada (`indice_omnibox`) con un
+tsvector por entidad, así que cada consulta es un único acceso por índice GIN
+con prefijos ("garc lop" encuentra "García López"). Del lado de Python se
+normaliza el texto igual que fn_normalizar_omnibox() y se guardan en una caché
+corta los últimos resultados: al borrar con retroceso no se vuelve a la base.
+"""
+
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import crm_database as db
+
+logger = logging.getLogger('busqueda_omnibox')
+
+
+def normalizar_busqueda(texto: str) -> str:
+    """Minúsculas, sin acentos y con todo lo que no sea letra o dígito convertido en espacio."""
+    sin_acentos = "".join(
+        c for c in unicodedata.normalize('NFKD', (texto or "").lower())
+        if not unicodedata.combining(c)
+    )
+    return " ".join(re.findall(r'[^\W_]+', sin_acentos))
+
+
+def construir_tsquery(texto: str) -> Optional[Tuple[str, str]]:
+    """
+    Tsquery 'simple' en la que cada palabra es un prefijo obligatorio, junto
+    con el texto normalizado (para el bono de título que empieza igual).
+    Devuelve None si no queda ninguna palabra.
+    """
+    normalizado = normalizar_busqueda(texto)
+    if not normalizado:
+        return None
+    return " & ".join(f"{palabra}:*" for palabra in normalizado.split()), normalizado
+
+
+class ServicioOmnibox:
+    """Búsqueda global con caché LRU de corta duración y medición de latencia."""
+
+    MIN_CARACTERES = 2
+    LIMITE = 15
+    MAX_CONSULTAS_CACHEADAS = 128
+    # Los datos cambian poco mientras se escribe; pasado este tiempo se vuelve a consultar
+    VIGENCIA_CACHE_SEGUNDOS = 15
+    # Por encima de esto la búsqueda deja de sentirse instantánea
+    OBJETIVO_MS = 50
+
+    def __init__(self, db_module=None, reloj=time.monotonic):
+        self.db = db_module or db
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.ultimo_tiempo_ms = None
+
+    def buscar(self, texto: str, limite: int = LIMITE) -> List[dict]:
+        """Resultados ordenados por relevancia; cada uno con tipo, entidad_id, titulo y detalle."""
+        consulta = construir_tsquery(texto)
+        if consulta is None or len(consulta[1]) < self.MIN_CARACTERES:
+            return []
+        tsquery, normalizado = consulta
+        clave = (normalizado, limite)
+
+        ahora = self._reloj()
+        with self._lock:
+            cacheado = self._cache.get(clave)
+            if cacheado and ahora - cacheado[0] < self.VIGENCIA_CACHE_SEGUNDOS:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+                return cacheado[1]
+
+        inicio = time.perf_counter()
+        resultados = self.db.buscar_omnibox(tsquery, normalizado, limite)
+        self.ultimo_tiempo_ms = (time.perf_counter() - inicio) * 1000
+        if self.ultimo_tiempo_ms > self.OBJETIVO_MS:
+            logger.warning(f"Búsqueda global lenta: '{normalizado}' tardó {self.ultimo_tiempo_ms:.0f} ms")
+
+        with self._lock:
+            self.fallos += 1
+            self._cache[clave] = (ahora, resultados)
+            self._cache.move_to_end(clave)
+            while len(self._cache) > self.MAX_CONSULTAS_CACHEADAS:
+                self._cache.popitem(last=False)
+        return resultados
+
+    def invalidar(self):
+        """Descarta los resultados cacheados (p. ej. tras dar de alta un cliente)."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Instancia compartida; la usa el cuadro de búsqueda de la ventana principal
+servicio_omnibox = ServicioOmnibox()
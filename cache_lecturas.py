@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Caché de lecturas - Datos de referencia y entidades por ID conservados en
+memoria entre consultas.
+
+Las etapas procesales, las etiquetas, los modelos de escritos y los datos del
+usuario se releían de la base cada vez que se abría un diálogo o se armaba un
+documento, y get_case_by_id / get_client_by_id se repetían varias veces por
+acción para el mismo registro. `CacheLectura` guarda el resultado de cada
+consulta con una vigencia propia por entidad y, para las búsquedas por ID, un
+tope de entradas con desalojo LRU. Las funciones de crm_database que modifican
+esas tablas invalidan explícitamente; la vigencia queda como red de seguridad
+ante cambios hechos por otras instancias o fuera de la aplicación.
+
+Los contadores `aciertos`/`fallos` de cada caché (ver `estadisticas_caches()`)
+sirven para ajustar vigencias y tamaños.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+_CACHES: List["CacheLectura"] = []
+
+
+def _copiar(valor):
+    """Copia de dicts y listas (anidados) para que quien llama no modifique lo cacheado."""
+    if isinstance(valor, dict):
+        return {clave: _copiar(elemento) for clave, elemento in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar(elemento) for elemento in valor]
+    return valor
+
+
+class CacheLectura:
+    """
+    Caché de lectura por clave. `obtener(clave, cargar)` devuelve lo guardado si
+    sigue vigente o llama a `cargar()`; un resultado None (registro inexistente o
+    error de conexión) no se guarda. Es seguro entre hilos: si una invalidación
+    llega mientras otra consulta está en curso, el resultado de esa consulta no
+    se guarda.
+    """
+
+    def __init__(self, nombre: str, vigencia_segundos: float, max_entradas: Optional[int] = None,
+                 reloj: Callable[[], float] = time.monotonic, registrar: bool = True):
+        self.nombre = nombre
+        self.vigencia_segundos = vigencia_segundos
+        self.max_entradas = max_entradas
+        self._reloj = reloj
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        if registrar:
+            _CACHES.append(self)
+
+    def obtener(self, clave: Hashable, cargar: Callable[[], object]):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and self._reloj() - entrada[1] < self.vigencia_segundos:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return _copiar(entrada[0])
+            self.fallos += 1
+            generacion = self._generacion
+        valor = cargar()
+        if valor is None:
+            return None
+        self._guardar(clave, valor, generacion)
+        return _copiar(valor)
+
+    def obtener_varias(self, claves: Iterable[Hashable],
+                       cargar_varias: Callable[[List[Hashable]], Optional[Dict[Hashable, object]]]):
+        """
+        Como `obtener` para varias claves a la vez: `cargar_varias(faltantes)` recibe
+        las claves que no estaban vigentes y devuelve {clave: valor} en una sola
+        lectura. Devuelve {clave: valor} en el orden de `claves`, o None si la carga
+        falló.
+        """
+        claves = list(claves)
+        encontrados, faltantes = {}, []
+        with self._lock:
+            for clave in claves:
+                entrada = self._entradas.get(clave)
+                if entrada and self._reloj() - entrada[1] < self.vigencia_segundos:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    encontrados[clave] = _copiar(entrada[0])
+                else:
+                    self.fallos += 1
+                    faltantes.append(clave)
+            generacion = self._generacion
+        if faltantes:
+            cargados = cargar_varias(faltantes)
+            if cargados is None:
+                return None
+            for clave in faltantes:
+                valor = cargados.get(clave)
+                if valor is not None:
+                    self._guardar(clave, valor, generacion)
+                encontrados[clave] = _copiar(valor)
+        return {clave: encontrados[clave] for clave in claves}
+
+    def _guardar(self, clave, valor, generacion: int):
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._entradas[clave] = (valor, self._reloj())
+            self._entradas.move_to_end(clave)
+            if self.max_entradas is not None:
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+                    self.desalojos += 1
+
+    def invalidar(self, clave: Hashable = None):
+        """Olvida la entrada de `clave`, o todas si no se indica clave."""
+        with self._lock:
+            self._generacion += 1
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
+
+    def estadisticas(self) -> Dict[str, object]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'nombre': self.nombre,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'vigencia_segundos': self.vigencia_segundos,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0.0,
+            }
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.aciertos = self.fallos = self.desalojos = 0
+
+
+def estadisticas_caches() -> List[Dict[str, object]]:
+    """Contadores de todas las cachés de lectura creadas en el proceso."""
+    return [cache.estadisticas() for cache in _CACHES]
+
+
+def invalidar_caches():
+    """Vacía todas las cachés de lectura (p. ej. después de restaurar un backup)."""
+    for cache in _CACHES:
+        cache.invalidar()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Calendario de Audiencias - Datos de la agenda global por mes.
+
+El calendario marcaba cada fecha que alguna vez tuvo una audiencia
+(get_fechas_con_audiencias devolvía toda la historia) y la lista del día
+consultaba la base en cada clic. `CalendarioAudiencias` trabaja con el mes
+visible y sus vecinos (el calendario muestra días de ambos): se leen juntos con
+una consulta por rango de fechas y quedan en crm_database.cache_audiencias_mes,
+de modo que las marcas y la lista del día salen de la misma lectura. Al
+mostrar un mes se precargan en segundo plano los meses siguientes a los
+vecinos, para que navegar no espere a la base.
+
+Guardar o eliminar una audiencia invalida sólo su mes (ver
+crm_database._invalidar_meses_audiencias); los avisos de otras instancias
+invalidan todos.
+"""
+
+import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import crm_database as db
+
+Mes = Tuple[int, int]
+
+
+def mes_relativo(anio: int, mes: int, desplazamiento: int) -> Mes:
+    """(anio, mes) desplazado `desplazamiento` meses."""
+    indice = anio * 12 + (mes - 1) + desplazamiento
+    return indice // 12, indice % 12 + 1
+
+
+def _como_fecha(valor) -> datetime.date:
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return datetime.date.fromisoformat(str(valor)[:10])
+
+
+class CalendarioAudiencias:
+    """Audiencias por mes para las marcas del calendario y la lista del día seleccionado."""
+
+    def __init__(self, leer_meses: Callable[[List[Mes]], Optional[Dict[Mes, List[dict]]]] = None):
+        self._leer_meses = leer_meses or db.get_audiencias_meses
+
+    @staticmethod
+    def meses_visibles(anio: int, mes: int) -> List[Mes]:
+        return [mes_relativo(anio, mes, -1), (anio, mes), mes_relativo(anio, mes, 1)]
+
+    def fechas_con_audiencias(self, anio: int, mes: int) -> List[datetime.date]:
+        """Fechas con al menos una audiencia en el mes visible y sus vecinos."""
+        meses = self._leer_meses(self.meses_visibles(anio, mes)) or {}
+        return sorted({_como_fecha(audiencia['fecha'])
+                       for audiencias in meses.values() for audiencia in audiencias or []})
+
+    def audiencias_del_dia(self, fecha) -> List[dict]:
+        """Audiencias de `fecha` (date o 'AAAA-MM-DD'), ordenadas por hora."""
+        fecha = _como_fecha(fecha)
+        meses = self._leer_meses(self.meses_visibles(fecha.year, fecha.month)) or {}
+        return [audiencia for audiencia in meses.get((fecha.year, fecha.month)) or []
+                if _como_fecha(audiencia['fecha']) == fecha]
+
+    def precargar_vecinos(self, anio: int, mes: int):
+        """Lee los meses que pasan a ser vecinos al avanzar o retroceder un mes."""
+        self._leer_meses([mes_relativo(anio, mes, -2), mes_relativo(anio, mes, 2)])
+
+
+calendario_audiencias = CalendarioAudiencias()
@@ -1,3 +1,5 @@
+import logging
+import time
 import tkinter as tk
 from tkinter import ttk
 
@@ -9,8 +11,15 @@ from partes_ui import PartesTab
 from seguimiento_ui import SeguimientoTab
 from cuenta_corriente_ui import CuentaCorrienteTab
 
+logger = logging.getLogger('case_detail_window')
+
+
 class CaseDetailWindow(tk.Toplevel):
+    # Espera tras la última interacción antes de precargar una pestaña oculta
+    PRECARGA_DEMORA_MS = 150
+
     def __init__(self, parent, app_controller, case_id):
+        self._inicio_apertura = time.perf_counter()
         super().__init__(parent)
         self.app_controller = app_controller
         self.case_id = case_id
@@ -42,84 +51,157 @@ class CaseDetailWindow(tk.Toplevel):
         # self.detalles_tab.load_details(self.case_data) # Se llama desde el __init__ de DetallesTab ahora
 
         # Pestaña 1: Documentación
-        # DocumentosTab necesita case_data para la ruta inicial de la carpeta.
-        self.documentos_tab = DocumentosTab(self.notebook, self.app_controller, self.case_data)
+        # El escaneo de la carpeta se difiere hasta que la pestaña se muestra o se precarga.
+        self.documentos_tab = DocumentosTab(self.notebook, self.app_controller, self.case_data, cargar_al_iniciar=False)
         self.notebook.add(self.documentos_tab, text="Documentación")
-        # La carga inicial de documentos se hace en el __init__ de DocumentosTab
 
         # Pestaña 2: Tareas/Plazos
         self.tareas_tab = TareasTab(self.notebook, self.app_controller) # app_controller para diálogos
         self.notebook.add(self.tareas_tab, text="Tareas/Plazos")
-        #if self.case_id: # Solo cargar si hay case_id (debería haberlo si case_data existe)
-         #   self.tareas_tab.load_tareas(self.case_id) 
-         #   self.tareas_tab.set_add_button_state()     
 
         # Pestaña 3: Partes
         self.partes_tab = PartesTab(self.notebook, self.app_controller) # app_controller para diálogos
         self.notebook.add(self.partes_tab, text="Partes")
-        #if self.case_id:
-        #    self.partes_tab.load_partes(self.case_id)
-        #    self.partes_tab.set_add_button_state(None) 
 
         # Pestaña 4: Seguimiento
         self.seguimiento_tab = SeguimientoTab(self.notebook, self.app_controller) # app_controller para diálogos
         self.notebook.add(self.seguimiento_tab, text="Seguimiento")
-        #if self.case_id:
-        #    self.seguimiento_tab.load_actividades(self.case_id)
-        #    self.seguimiento_tab.set_add_button_state(None)
 
         # Pestaña 5: Cuenta Corriente
         self.cuenta_corriente_tab = CuentaCorrienteTab(self.notebook, self.app_controller)
         self.notebook.add(self.cuenta_corriente_tab, text="Cuenta Corriente") 
-        
+
+        # Nombre de cada pestaña -> widget, en el orden en que se precargan
+        self.pestanas = {
+            'detalles': self.detalles_tab,
+            'documentos': self.documentos_tab,
+            'tareas': self.tareas_tab,
+            'partes': self.partes_tab,
+            'seguimiento': self.seguimiento_tab,
+            'cuenta_corriente': self.cuenta_corriente_tab,
+        }
+        # Pestañas cuyos datos hay que (re)cargar. Detalles ya se cargó en su __init__.
+        self.pestanas_sucias = set(self.pestanas) - {'detalles'}
+        self._precarga_programada = None
+        self.tiempos_carga = {}
+
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
         # Seleccionamos la primera pestaña para que el notebook sea visible al abrir
         self.notebook.select(self.detalles_tab)
-        
-        # Cargar los datos después de un breve retraso para asegurar que la UI esté lista
-        self.after(100, self.load_all_tabs_data)
 
-    def load_all_tabs_data(self):
-        """Carga o recarga los datos de todas las pestañas."""
-        # Primero, refrescamos los datos del caso por si han cambiado
-        self.case_data = self.app_controller.db_crm.get_case_by_id(self.case_id)
-        if not self.case_data:
-            print(f"Error: No se encontraron datos para el caso {self.case_id} al recargar.")
-            return
+        # Con la primera pestaña visible la ventana ya es usable; el resto se carga en tiempos muertos
+        self.after_idle(self._registrar_tiempo_interactivo)
+        self._programar_precarga()
 
-        print(f"Cargando/Recargando datos para todas las pestañas del caso {self.case_id}")
-        
-        # Load each tab independently to prevent one error from affecting others
-        try:
-            self.detalles_tab.load_details(self.case_data)
-        except Exception as e:
-            print(f"Error cargando detalles: {e}")
-            
-        try:
-            self.documentos_tab.load_case_documents(self.case_data.get('ruta_carpeta', ''))
-        except Exception as e:
-            print(f"Error cargando documentos: {e}")
-            
-        try:
-            self.tareas_tab.load_tareas(self.case_id)
-        except Exception as e:
-            print(f"Error cargando tareas: {e}")
-            
-        try:
-            self.partes_tab.load_partes(self.case_id)
-        except Exception as e:
-            print(f"Error cargando partes: {e}")
-            
+    def _registrar_tiempo_interactivo(self):
+        tiempo_ms = (time.perf_counter() - self._inicio_apertura) * 1000
+        self.tiempos_carga['interactivo'] = tiempo_ms
+        logger.info(f"Caso {self.case_id}: ventana interactiva en {tiempo_ms:.0f} ms")
+        print(f"[Rendimiento] Ventana del caso {self.case_id} interactiva en {tiempo_ms:.0f} ms")
+
+    def pestana_visible(self):
+        """Nombre de la pestaña seleccionada, o None si no se puede determinar."""
         try:
-            self.seguimiento_tab.load_actividades(self.case_id)
-        except Exception as e:
-            print(f"Error cargando seguimiento: {e}")
-            
-        # Always try to load the economic module
+            seleccionada = self.nametowidget(self.notebook.select())
+        except (tk.TclError, KeyError):
+            return None
+        for nombre, widget in self.pestanas.items():
+            if widget is seleccionada:
+                return nombre
+        return None
+
+    def seleccionar_pestana(self, nombre):
+        """Muestra la pestaña `nombre` (la carga, si está sucia, vía <<NotebookTabChanged>>)."""
+        widget = self.pestanas.get(nombre)
+        if widget is not None:
+            self.notebook.select(widget)
+
+    def _on_tab_changed(self, event=None):
+        nombre = self.pestana_visible()
+        if nombre in self.pestanas_sucias:
+            self._cargar_pestana(nombre)
+
+    def _cargar_pestana(self, tab_name):
+        """Carga los datos de una pestaña y la marca como limpia."""
+        if tab_name in ('detalles', 'documentos'):
+            case_data = self.app_controller.db_crm.get_case_by_id(self.case_id)
+            if not case_data:
+                print(f"Error: No se encontraron datos para el caso {self.case_id} al recargar.")
+                return
+            self.case_data = case_data
+
+        loaders = {
+            'detalles': lambda: self.detalles_tab.load_details(self.case_data),
+            'documentos': lambda: self.documentos_tab.load_case_documents(self.case_data.get('ruta_carpeta', '')),
+            'tareas': lambda: self.tareas_tab.load_tareas(self.case_id),
+            'partes': lambda: self.partes_tab.load_partes(self.case_id),
+            'seguimiento': lambda: self.seguimiento_tab.load_actividades(self.case_id),
+            'cuenta_corriente': lambda: self.cuenta_corriente_tab.load_movimientos(self.case_id, show_loading=False),
+        }
+        loader = loaders.get(tab_name)
+        if not loader:
+            print(f"Advertencia: pestaña desconocida '{tab_name}'")
+            return
+
+        # Se marca limpia antes de cargar: un error no debe reintentarse en cada cambio de pestaña
+        self.pestanas_sucias.discard(tab_name)
+        inicio = time.perf_counter()
         try:
-            self.cuenta_corriente_tab.load_movimientos(self.case_id)
-            print(f"[Cuenta Corriente] Datos cargados exitosamente para caso {self.case_id}")
+            loader()
         except Exception as e:
-            print(f"Error cargando cuenta corriente: {e}")
+            print(f"Error cargando pestaña '{tab_name}' del caso {self.case_id}: {e}")
+            return
+        self.tiempos_carga[tab_name] = (time.perf_counter() - inicio) * 1000
+        logger.debug(f"Caso {self.case_id}: pestaña '{tab_name}' cargada en {self.tiempos_carga[tab_name]:.0f} ms")
+
+    def _programar_precarga(self):
+        """Agenda la carga de la siguiente pestaña oculta para cuando la UI esté ociosa."""
+        if self._precarga_programada is None and self.pestanas_sucias:
+            # after() deja pasar la interacción del usuario; after_idle() espera a que la cola se vacíe
+            self._precarga_programada = self.after(
+                self.PRECARGA_DEMORA_MS, lambda: self.after_idle(self._precargar_siguiente)
+            )
+
+    def _precargar_siguiente(self):
+        self._precarga_programada = None
+        if not self.winfo_exists():
+            return
+        visible = self.pestana_visible()
+        if visible in self.pestanas_sucias:
+            self._cargar_pestana(visible)
+        else:
+            for nombre in self.pestanas:
+                if nombre in self.pestanas_sucias:
+                    self._cargar_pestana(nombre)
+                    break
+        # Una pestaña por ciclo ocioso para no bloquear la interfaz
+        self._programar_precarga()
+
+    def marcar_sucias(self, pestanas=None):
+        """
+        Marca pestañas como desactualizadas (todas si pestanas es None). La visible
+        se recarga en el acto; las ocultas se precargan en tiempos muertos.
+        """
+        nombres = set(self.pestanas) if pestanas is None else set(pestanas) & set(self.pestanas)
+        self.pestanas_sucias |= nombres
+        visible = self.pestana_visible()
+        if visible in self.pestanas_sucias:
+            self._cargar_pestana(visible)
+        self._programar_precarga()
+
+    def load_all_tabs_data(self):
+        """Carga o recarga los datos de todas las pestañas de inmediato."""
+        print(f"Cargando/Recargando datos para todas las pestañas del caso {self.case_id}")
+        for nombre in self.pestanas:
+            self._cargar_pestana(nombre)
+
+    def refresh_tab(self, tab_name):
+        """
+        Recarga una pestaña: 'detalles', 'documentos', 'tareas', 'partes',
+        'seguimiento' o 'cuenta_corriente'. Si no está visible se recarga al mostrarse.
+        """
+        self.marcar_sucias([tab_name])
 
     # -*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-
     # 2. NUEVO MÉTODO PARA SELECCIONAR UNA PESTAÑA
@@ -131,28 +213,19 @@ class CaseDetailWindow(tk.Toplevel):
             print(f"Error: No se pudo seleccionar la pestaña con índice {tab_index}")
     # -*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-
 
-# En case_detail_window.py, DENTRO de la clase CaseDetailWindow
-
-    def refresh_active_tab(self):
-        """Recarga todas las pestañas para asegurar consistencia de datos."""
+    def refresh_active_tab(self, pestanas=None):
+        """
+        Refresca la ventana tras un cambio. `pestanas` limita la recarga a las
+        pestañas afectadas; sin él se consideran desactualizadas todas.
+        """
         try:
-            print(f"[Refresh] Recargando todas las pestañas para caso ID {self.case_id}...")
-            # Solución robusta: recargar todas las pestañas en lugar de solo la activa
-            self.load_all_tabs_data()
-            print(f"[Refresh] Recarga completa finalizada para caso ID {self.case_id}")
+            self.marcar_sucias(pestanas)
         except Exception as e:
-            print(f"[Refresh] Error al recargar pestañas: {e}")
-        
-        # (Añadir aquí otras pestañas si es necesario en el futuro)
-        
-        except Exception as e:
-            print(f"Error al intentar refrescar la pestaña activa: {e}")
-        
-        print(f"Orden de refresco recibida para la ventana del caso {self.case_id}.")
-        # La forma más robusta es simplemente recargar todo.
-        # Es rápido y evita problemas de sincronización.
-        self.load_all_tabs_data()
+            print(f"[Refresh] Error al recargar pestañas del caso {self.case_id}: {e}")
 
     def on_close(self):
+        if self._precarga_programada is not None:
+            self.after_cancel(self._precarga_programada)
+            self._precarga_programada = None
         self.app_controller.on_case_window_close(self.case_id) # Notificar al controlador principal
         self.destroy()
\ No newline at end of file
@@ -2,7 +2,6 @@
 Case Dialog Manager - Refactorizado desde main_app.py
 Maneja toda la lógica relacionada con la interfaz de casos
 """
-from docxtpl import DocxTemplate
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import crm_database as db
@@ -12,19 +11,13 @@ import locale
 import logging
 import time
 import traceback
+import importlib.util
 
-# Import for generic document generation
-try:
-    from docx import Document
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.shared import Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+# docxtpl, python-docx y num2words se importan recién al generar un documento:
+# este módulo se carga al abrir la ventana principal y no debe demorarla.
+DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
 
-from escrito_generico_dialog import EscritoGenericoDialog
-
-from num2words import num2words
+from ejecutor_datos import ejecutor_datos, indicador_cursor
 
 class ErrorMessageManager:
     """
@@ -5159,6 +5152,7 @@ class CaseManager:
                 print(f"[WARNING] {warning_msg}")
             
             # Generar documento
+            from docxtpl import DocxTemplate
             doc = DocxTemplate(template_path)
             required_vars = doc.get_undeclared_template_variables()
             safe_context = self._prepare_safe_context(document_context, required_vars)
@@ -5890,13 +5884,14 @@ class CaseManager:
             caso_id: ID del caso
         """
         try:
+            contexto = self.db.get_contexto_caso(caso_id)
             for parte in lista_partes:
                 parte_id = parte.get('id')
                 if not parte_id:
                     continue
                 
                 # Obtener representantes existentes
-                representantes = self.db.get_representatives_by_party_id(parte_id)
+                representantes = contexto.representantes_de(parte_id) if contexto else []
                 
                 if representantes:
                     # Usar el primer representante disponible
@@ -5904,7 +5899,7 @@ class CaseManager:
                     parte['representante'] = {
                         'nombre_completo': rep.get('nombre_completo', ''),
                         'matricula': rep.get('matricula', ''),
-                        'domicilio': rep.get('domicilio', ''),
+                        'domicilio': rep.get('domicilio_legal') or rep.get('domicilio_real', ''),
                         'telefono': rep.get('telefono', ''),
                         'email': rep.get('email', '')
                     }
@@ -5965,10 +5960,12 @@ class CaseManager:
             actores_texto = self._format_parties_text(lista_actores, 'ACTOR')
             demandados_texto = self._format_parties_text(lista_demandados, 'DEMANDADO')
 
-            # Preparar datos estructurados para el nuevo template
+            # Preparar datos estructurados para el nuevo template; los representantes
+            # salen del contexto del caso (una consulta en caché para todas las partes)
             case_id = caso_data.get('id')
-            ACTORES = self._prepare_parties_with_representatives(lista_actores, 'ACTOR', case_id)
-            DEMANDADOS = self._prepare_parties_with_representatives(lista_demandados, 'DEMANDADO', case_id)
+            contexto = self.db.get_contexto_caso(case_id) if case_id else None
+            ACTORES = self._prepare_parties_with_representatives(lista_actores, 'ACTOR', case_id, contexto)
+            DEMANDADOS = self._prepare_parties_with_representatives(lista_demandados, 'DEMANDADO', case_id, contexto)
 
             # Obtener detalles del caso
             detalles_caso = caso_data.get('notas', 'Sin detalles adicionales del caso.')
@@ -6130,6 +6127,7 @@ class CaseManager:
                     print(f"[WARNING] Advertencia de plantilla: {warning.get('message', 'Advertencia desconocida')}")
             
             # Generar documento
+            from docxtpl import DocxTemplate
             doc = DocxTemplate(template_path)
             required_vars = doc.get_undeclared_template_variables()
             safe_context = self._prepare_safe_context(document_context, required_vars)
@@ -6479,7 +6477,7 @@ class CaseManager:
             print(f"[WARNING] Error generando nombre de archivo para escrito genérico: {e}")
             return f"Borrador - {datetime.date.today().strftime('%Y%m%d')}.docx"
 
-    def _prepare_parties_with_representatives(self, parties_list, party_type, case_id=None):
+    def _prepare_parties_with_representatives(self, parties_list, party_type, case_id=None, contexto=None):
         """
         Prepara una lista estructurada de partes con sus representantes para el template.
 
@@ -6487,6 +6485,7 @@ class CaseManager:
             parties_list (list): Lista de partes del caso
             party_type (str): Tipo de parte ('ACTOR' o 'DEMANDADO')
             case_id (int): ID del caso
+            contexto (ContextoCaso): Contexto del caso ya obtenido (opcional)
 
         Returns:
             list: Lista de diccionarios con información de cada parte y sus representantes
@@ -6506,14 +6505,14 @@ class CaseManager:
 
             # Buscar representantes de esta parte
             if case_id:
-                representantes = self._get_representatives_for_party(party.get('id'), party.get('id'), case_id)
+                representantes = self._get_representatives_for_party(party.get('id'), party.get('id'), case_id, contexto)
                 party_info['representantes'] = representantes
 
             parties_data.append(party_info)
 
         return parties_data
 
-    def _get_representatives_for_party(self, rol_id, party_id, case_id):
+    def _get_representatives_for_party(self, rol_id, party_id, case_id, contexto=None):
         """
         Obtiene los representantes legales de una parte específica.
 
@@ -6521,6 +6520,7 @@ class CaseManager:
             rol_id (int): ID del rol de la parte
             party_id (int): ID de la parte
             case_id (int): ID del caso
+            contexto (ContextoCaso): Contexto del caso ya obtenido (si no, se toma de la caché)
 
         Returns:
             list: Lista de representantes con su información
@@ -6528,10 +6528,11 @@ class CaseManager:
         representantes = []
 
         try:
-            # Obtener roles relacionados con esta parte
-            roles = db.get_roles_by_case_id(case_id)
+            contexto = contexto or db.get_contexto_caso(case_id)
+            if not contexto:
+                return representantes
 
-            for rol in roles:
+            for rol in contexto.roles:
                 # Verificar si este rol representa a la parte actual
                 if rol.get('representa_a_id') == party_id or rol.get('representa_a_id') == rol_id:
                     representante_info = {
@@ -6721,7 +6722,7 @@ class CaseManager:
                 parent=self.app_controller.root,
             )   
             dialog.destroy()
-            self.app_controller._refresh_open_case_window(saved_case_id)
+            self.app_controller._refresh_open_case_window(saved_case_id, ["detalles", "documentos"])
 
         # Recargar la lista de casos del cliente actual
             if self.app_controller.selected_client:
@@ -6735,36 +6736,8 @@ class CaseManager:
 
     def _save_case_tags(self, case_id, etiquetas_str):
         """Guarda las etiquetas del caso"""
-        # Obtener los nombres de las etiquetas ingresadas por el usuario
-        nombres_etiquetas_nuevas = [
-            tag.strip().lower() for tag in etiquetas_str.split(",") if tag.strip()
-        ]
-
-        # Obtener las etiquetas actualmente asignadas al caso desde la BD
-        etiquetas_actuales_obj_db = self.db.get_etiquetas_de_caso(case_id)
-        nombres_etiquetas_actuales_db = {
-            e["nombre_etiqueta"].lower() for e in etiquetas_actuales_obj_db
-        }
-
-        # Determinar qué etiquetas añadir y cuáles quitar
-        ids_etiquetas_a_asignar = set()
-        for nombre_tag_nuevo in nombres_etiquetas_nuevas:
-            tag_id = self.db.add_etiqueta(nombre_tag_nuevo)
-            if tag_id:
-                ids_etiquetas_a_asignar.add(tag_id)
-
-        etiquetas_ids_actuales_db = {
-            e["id_etiqueta"] for e in etiquetas_actuales_obj_db
-        }
-
-        # Etiquetas a asignar (nuevas o que ya estaban y deben permanecer)
-        for tag_id_to_assign in ids_etiquetas_a_asignar:
-            self.db.asignar_etiqueta_a_caso(case_id, tag_id_to_assign)
-
-        # Etiquetas a quitar (estaban en BD pero no en la nueva lista del usuario)
-        ids_etiquetas_a_quitar = etiquetas_ids_actuales_db - ids_etiquetas_a_asignar
-        for tag_id_to_remove in ids_etiquetas_a_quitar:
-            self.db.quitar_etiqueta_de_caso(case_id, tag_id_to_remove)
+        # Crear, asignar y quitar etiquetas en una sola transacción
+        self.db.set_etiquetas_de_caso(case_id, etiquetas_str.split(","))
 
     def delete_case(self):
         """Elimina el caso seleccionado"""
@@ -6864,7 +6837,7 @@ class CaseManager:
                 success = self.db.add_actividad_caso(caso_id, fecha_hora, tipo, descripcion, self.app_controller.current_user)
 
             if success:
-                self.app_controller._refresh_open_case_window(caso_id)
+                self.app_controller._refresh_open_case_window(caso_id, ["seguimiento"])
                 dialog.destroy()
             else:
                 messagebox.showerror("Error", "No se pudo guardar la actividad.", parent=dialog)
@@ -6876,35 +6849,58 @@ class CaseManager:
         ttk.Button(button_frame, text="Cancelar", command=dialog.destroy).pack(side=tk.LEFT)
 
 
-    def load_cases_by_client(self, client_id):
-        """Carga la lista de casos de un cliente en el TreeView"""
-        try:
-            # Validar parámetro de entrada
-            if client_id is None or client_id == "":
-                print(f"Error: client_id inválido: {client_id}")
-                return False
+    def load_cases_by_client(self, client_id, esperar=False):
+        """
+        Carga la lista de casos de un cliente en el TreeView. La consulta corre en
+        segundo plano; con esperar=True corre en el hilo actual y el resultado
+        indica si se cargaron casos. Devuelve False si la carga no pudo iniciarse
+        o (con esperar=True) si falló la consulta.
+        """
+        # Validar parámetro de entrada
+        if client_id is None or client_id == "":
+            print(f"Error: client_id inválido: {client_id}")
+            return False
 
-            # Convertir a entero si es necesario
-            try:
-                client_id = int(client_id)
-            except (ValueError, TypeError):
-                print(f"Error: client_id debe ser un número entero válido: {client_id}")
-                return False
+        # Convertir a entero si es necesario
+        try:
+            client_id = int(client_id)
+        except (ValueError, TypeError):
+            print(f"Error: client_id debe ser un número entero válido: {client_id}")
+            return False
 
-            print(f"Cargando casos para cliente ID: {client_id}")
+        print(f"Cargando casos para cliente ID: {client_id}")
 
+        try:
             # Limpiar estado anterior
             self.clear_case_list()
             self.app_controller.selected_case = None
 
-            # Obtener casos de la base de datos
-            try:
-                cases = self.db.get_cases_by_client(client_id)
-                if cases is None:
-                    print(f"Error: No se pudieron obtener casos para cliente {client_id}")
+            if esperar:
+                try:
+                    cases = self.db.get_cases_by_client(client_id)
+                except Exception as db_error:
+                    print(f"Error de base de datos al obtener casos para cliente {client_id}: {db_error}")
                     return False
-            except Exception as db_error:
-                print(f"Error de base de datos al obtener casos para cliente {client_id}: {db_error}")
+                return self._mostrar_casos_cliente(client_id, cases)
+
+            # Si el usuario elige otro cliente antes de que termine, esta carga queda obsoleta
+            ejecutor_datos.enviar(
+                self.db.get_cases_by_client, client_id,
+                clave='casos_por_cliente',
+                al_completar=lambda cases: self._mostrar_casos_cliente(client_id, cases),
+                al_fallar=lambda error: print(f"Error de base de datos al obtener casos para cliente {client_id}: {error}"),
+                indicador=indicador_cursor(self.app_controller.case_tree),
+            )
+            return True
+        except Exception as e:
+            print(f"Error general al cargar casos para cliente {client_id}: {e}")
+            return False
+
+    def _mostrar_casos_cliente(self, client_id, cases):
+        """Vuelca en el TreeView los casos obtenidos por load_cases_by_client"""
+        try:
+            if cases is None:
+                print(f"Error: No se pudieron obtener casos para cliente {client_id}")
                 return False
 
             print(f"Encontrados {len(cases)} casos para cliente {client_id}")
@@ -6921,18 +6917,6 @@ class CaseManager:
                     case_id = case["id"]
                     caratula = case.get("caratula", "Sin carátula")
 
-                    # Obtener etiquetas del caso
-                    try:
-                        etiquetas_obj = self.db.get_etiquetas_de_caso(case_id)
-                        if etiquetas_obj:
-                            etiquetas_nombres = [e.get("nombre_etiqueta", "") for e in etiquetas_obj if e]
-                            etiquetas_str = ", ".join(etiquetas_nombres) if etiquetas_nombres else ""
-                        else:
-                            etiquetas_str = ""
-                    except Exception as tag_error:
-                        print(f"Error al obtener etiquetas para caso {case_id}: {tag_error}")
-                        etiquetas_str = ""
-
                     # Formatear número de expediente y año
                     num_exp = case.get("numero_expediente", "")
                     anio_car = case.get("anio_caratula", "")
@@ -7037,6 +7021,7 @@ class CaseManager:
                 return
             
             # Open dialog to get user input
+            from escrito_generico_dialog import EscritoGenericoDialog
             dialog = EscritoGenericoDialog(self.app_controller.root)
             user_input = dialog.get_user_input()
             
@@ -7177,6 +7162,10 @@ class CaseManager:
     def _crear_documento_word(self, contexto):
         """Crea el documento Word usando python-docx"""
         try:
+            from docx import Document
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            from docx.shared import Inches
+
             # Create new document
             doc = Document()
             
@@ -7293,7 +7282,7 @@ class CaseManager:
             
             if actividad_id:
                 # Refresh the case window if it's open
-                self.app_controller._refresh_open_case_window(caso_id)
+                self.app_controller._refresh_open_case_window(caso_id, ["seguimiento", "documentos"])
             else:
                 print("Advertencia: No se pudo registrar la actividad de generación de documento")
                 
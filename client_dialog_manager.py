@@ -199,30 +199,8 @@ class ClientManager:
 
     def _save_client_tags(self, client_id, etiquetas_str):
         """Guarda las etiquetas del cliente"""
-        # Obtener los nombres de las etiquetas ingresadas por el usuario
-        nombres_etiquetas_nuevas = [tag.strip().lower() for tag in etiquetas_str.split(',') if tag.strip()]
-        
-        # Obtener las etiquetas actualmente asignadas al cliente desde la BD
-        etiquetas_actuales_obj_db = self.db.get_etiquetas_de_cliente(client_id)
-        nombres_etiquetas_actuales_db = {e['nombre_etiqueta'].lower() for e in etiquetas_actuales_obj_db}
-
-        # Determinar qué etiquetas añadir y cuáles quitar
-        ids_etiquetas_a_asignar = set()
-        for nombre_tag_nuevo in nombres_etiquetas_nuevas:
-            tag_id = self.db.add_etiqueta(nombre_tag_nuevo)
-            if tag_id:
-                ids_etiquetas_a_asignar.add(tag_id)
-        
-        etiquetas_ids_actuales_db = {e['id_etiqueta'] for e in etiquetas_actuales_obj_db}
-
-        # Etiquetas a asignar (nuevas o que ya estaban y deben permanecer)
-        for tag_id_to_assign in ids_etiquetas_a_asignar:
-            self.db.asignar_etiqueta_a_cliente(client_id, tag_id_to_assign)
-
-        # Etiquetas a quitar (estaban en BD pero no en la nueva lista del usuario)
-        ids_etiquetas_a_quitar = etiquetas_ids_actuales_db - ids_etiquetas_a_asignar
-        for tag_id_to_remove in ids_etiquetas_a_quitar:
-            self.db.quitar_etiqueta_de_cliente(client_id, tag_id_to_remove)
+        # Crear, asignar y quitar etiquetas en una sola transacción
+        self.db.set_etiquetas_de_cliente(client_id, etiquetas_str.split(','))
 
     def delete_client(self):
         """Elimina el cliente seleccionado"""
@@ -7,15 +7,15 @@ import webbrowser
 import urllib.parse
 
 
-def open_contactos_manager(root):
+def open_contactos_manager(root, contacto_id=None):
     """Función para abrir el gestor de contactos desde main_app.py"""
-    ContactosManagerWindow(root)
+    ContactosManagerWindow(root, contacto_id)
 
 
 class ContactosManagerWindow(tk.Toplevel):
     """Ventana principal para gestión centralizada de contactos"""
 
-    def __init__(self, parent):
+    def __init__(self, parent, contacto_id=None):
         super().__init__(parent)
         self.parent = parent
         self.title("Gestor de Contactos - LPMS Legal")
@@ -35,6 +35,11 @@ class ContactosManagerWindow(tk.Toplevel):
         # Cargar datos iniciales
         self._load_contacts()
 
+        # Abierto desde la búsqueda global: mostrar directamente ese contacto
+        if contacto_id is not None and self.contacts_tree.exists(str(contacto_id)):
+            self.contacts_tree.selection_set(str(contacto_id))
+            self.contacts_tree.see(str(contacto_id))
+
         # Centrar ventana
         self._center_window()
 
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Contexto de Caso - Foto canónica de un caso para documentos, modelos de
+escritos y el agente IA.
+
+El generador de acuerdos, los modelos de escritos, los generadores con IA y la
+integración del agente armaban cada uno sus propios datos del caso con
+consultas separadas (caso, cliente, roles, y una lectura de todos los roles
+por cada parte para encontrar sus representantes). crm_database.get_contexto_caso()
+trae caso, cliente, roles con sus contactos y datos del abogado en una sola
+consulta, la guarda en caché hasta que cambian el caso o sus roles, y la
+entrega como `ContextoCaso`: los consumidores sólo eligen qué campos mostrar.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from grafo_representaciones import orden_rol
+
+ROLES_ACTOR = ('actor', 'actora')
+ROLES_DEMANDADO = ('demandado', 'demandada')
+
+
+class ContextoCaso:
+    """
+    Caso (`caso`, la fila de get_case_by_id), cliente, abogado (datos_usuario)
+    y roles (mismas columnas que get_roles_by_caso_id sin jerarquía). Los
+    representantes de una parte son los roles cuyo representa_a_id apunta a
+    ella, incluidos los roles "sombra" de las representaciones múltiples.
+    """
+
+    def __init__(self, caso: dict, cliente: Optional[dict] = None, roles: List[dict] = (),
+                 abogado: Optional[dict] = None):
+        self.caso = caso
+        self.cliente = cliente or {}
+        self.abogado = abogado or {}
+        self.roles = sorted(roles, key=lambda rol: (orden_rol(rol.get('rol_principal')),
+                                                    rol.get('nombre_completo') or '', rol['rol_id']))
+        self._por_id: Dict[int, dict] = {rol['rol_id']: rol for rol in self.roles}
+        self._representantes: Dict[int, List[dict]] = defaultdict(list)
+        for rol in self.roles:
+            if rol.get('representa_a_id') in self._por_id:
+                self._representantes[rol['representa_a_id']].append(rol)
+
+    @property
+    def caso_id(self):
+        return self.caso.get('id')
+
+    def rol(self, rol_id) -> Optional[dict]:
+        return self._por_id.get(rol_id)
+
+    def partes(self, *roles_principales) -> List[dict]:
+        """Roles cuyo rol_principal (sin distinguir mayúsculas) está entre `roles_principales`."""
+        buscados = {rol.lower() for rol in roles_principales}
+        return [rol for rol in self.roles if (rol.get('rol_principal') or '').lower() in buscados]
+
+    @property
+    def actores(self) -> List[dict]:
+        return self.partes(*ROLES_ACTOR)
+
+    @property
+    def demandados(self) -> List[dict]:
+        return self.partes(*ROLES_DEMANDADO)
+
+    def representantes_de(self, rol_id) -> List[dict]:
+        """Roles que representan directamente a `rol_id`, un rol por contacto."""
+        representantes, vistos = [], set()
+        for rol in self._representantes.get(rol_id, ()):
+            if rol['contacto_id'] not in vistos:
+                vistos.add(rol['contacto_id'])
+                representantes.append(rol)
+        return representantes
+
+    def como_dict(self) -> dict:
+        """Representación serializable: partes con su lista de representantes."""
+        return {
+            'caso': self.caso,
+            'cliente': self.cliente,
+            'abogado': self.abogado,
+            'partes': [dict(rol, representantes=self.representantes_de(rol['rol_id'])) for rol in self.roles],
+        }
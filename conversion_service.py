@@ -150,37 +150,20 @@ class ConversionService:
             dict: Estadísticas de conversión
         """
         try:
-            # Obtener todos los prospectos
-            prospectos = self.db.get_todos_los_prospectos()
+            # Totales y agrupación por mes (últimos 12 meses) calculados en la base de datos
+            estadisticas = self.db.get_estadisticas_conversion(meses=12)
+            if estadisticas is None:
+                return {}
 
-            total_prospectos = len(prospectos)
-            convertidos = len([p for p in prospectos if p.get("estado") == "Convertido"])
+            total_prospectos = estadisticas["total_prospectos"]
+            convertidos = estadisticas["convertidos"]
             tasa_conversion = (convertidos / total_prospectos * 100) if total_prospectos > 0 else 0
 
-            # Conversiones por mes (últimos 12 meses)
-            conversiones_por_mes = {}
-            ahora = datetime.datetime.now()
-
-            for i in range(12):
-                mes = ahora - datetime.timedelta(days=i*30)
-                mes_str = mes.strftime("%Y-%m")
-                conversiones_por_mes[mes_str] = 0
-
-            for prospecto in prospectos:
-                if prospecto.get("estado") == "Convertido" and prospecto.get("fecha_conversion"):
-                    try:
-                        fecha_conv = datetime.datetime.strptime(prospecto["fecha_conversion"], "%Y-%m-%d %H:%M:%S")
-                        mes_str = fecha_conv.strftime("%Y-%m")
-                        if mes_str in conversiones_por_mes:
-                            conversiones_por_mes[mes_str] += 1
-                    except (ValueError, TypeError):
-                        continue
-
             return {
                 "total_prospectos": total_prospectos,
                 "convertidos": convertidos,
                 "tasa_conversion": round(tasa_conversion, 2),
-                "conversiones_por_mes": conversiones_por_mes
+                "conversiones_por_mes": estadisticas["conversiones_por_mes"]
             }
 
         except Exception as e:
@@ -198,31 +181,8 @@ class ConversionService:
             list: Lista de conversiones recientes
         """
         try:
-            # Calcular fecha límite
-            fecha_limite = datetime.datetime.now() - datetime.timedelta(days=dias)
-            fecha_limite_str = fecha_limite.strftime("%Y-%m-%d %H:%M:%S")
-
-            # Obtener prospectos convertidos recientemente
-            prospectos = self.db.get_todos_los_prospectos()
-            conversiones_recientes = []
-
-            for prospecto in prospectos:
-                if (prospecto.get("estado") == "Convertido" and
-                    prospecto.get("fecha_conversion") and
-                    prospecto["fecha_conversion"] >= fecha_limite_str):
-
-                    conversiones_recientes.append({
-                        "prospecto_id": prospecto["id"],
-                        "prospecto_nombre": prospecto.get("nombre", "N/A"),
-                        "cliente_id": prospecto.get("convertido_a_cliente_id"),
-                        "fecha_conversion": prospecto.get("fecha_conversion"),
-                        "contacto": prospecto.get("contacto", "N/A")
-                    })
-
-            # Ordenar por fecha de conversión (más reciente primero)
-            conversiones_recientes.sort(key=lambda x: x["fecha_conversion"], reverse=True)
-
-            return conversiones_recientes
+            # Prospectos convertidos recientemente, más reciente primero
+            return self.db.get_conversiones_recientes(dias)
 
         except Exception as e:
             print(f"Error buscando conversiones recientes: {e}")
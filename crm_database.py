@@ -5,6 +5,12 @@ import os
 import time  # Para timestamps
 import datetime  # Para fechas de audiencias
 import logging
+import uuid
+
+from grafo_representaciones import CacheGrafos, GrafoRepresentaciones, filas_representacion_desde_notas
+from escritura_lotes import TAMANO_PAGINA, insertar_lote, transaccion
+from cache_lecturas import CacheLectura, estadisticas_caches
+from contexto_caso import ContextoCaso
 
 # Configurar logging para operaciones de base de datos
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +19,14 @@ db_logger = logging.getLogger('crm_database')
 # Nombre del archivo de la base de datos (ya no se usa con PostgreSQL)
 DATABASE_FILE = 'crm_legal_db.db'
 
+# Identifica las conexiones de esta instancia de la aplicación (application_name).
+# Los triggers de notificación lo incluyen para que cada instancia ignore el eco
+# de sus propios cambios en el canal LISTEN/NOTIFY.
+ID_SESION_APP = f"lpms-{uuid.uuid4().hex[:12]}"
+
+# Canal de PostgreSQL por el que se publican los cambios de filas
+CANAL_CAMBIOS = 'lpms_cambios'
+
 def get_db_config():
     """Lee el archivo config.ini y devuelve los parámetros de la BD."""
     config = configparser.ConfigParser()
@@ -25,7 +39,10 @@ def get_db_config():
 def connect_db():
     """Establece una conexión con la base de datos PostgreSQL."""
     try:
-        params = get_db_config()
+        params = dict(get_db_config())
+        # Siempre el ID de sesión: fn_notificar_cambio lo publica como 'origen' y
+        # escucha_cambios descarta por él los avisos de esta misma instancia
+        params['application_name'] = ID_SESION_APP
         conn = psycopg2.connect(**params)
         return conn
     except (Exception, psycopg2.DatabaseError) as error:
@@ -70,7 +87,78 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=True):
         return None
     finally:
         conn.close()
-        
+
+# --- Notificación de cambios en los datos ---
+# Los componentes que mantienen estado derivado (planificador de recordatorios,
+# vistas abiertas) se suscriben aquí en lugar de volver a consultar la base.
+_listeners_cambios = []
+
+def registrar_listener_cambios(callback):
+    """
+    Registra una función que se llamará tras cada alta, edición o baja confirmada.
+
+    Args:
+        callback (callable): Recibe (tabla, operacion, registro_id, caso_id, remoto=False).
+            operacion es 'INSERT', 'UPDATE' o 'DELETE'; remoto es True cuando el
+            cambio lo hizo otra instancia y llegó por LISTEN/NOTIFY.
+    """
+    if callback not in _listeners_cambios:
+        _listeners_cambios.append(callback)
+
+def quitar_listener_cambios(callback):
+    """Quita un listener registrado con registrar_listener_cambios."""
+    if callback in _listeners_cambios:
+        _listeners_cambios.remove(callback)
+
+def notificar_cambio(tabla, operacion, registro_id, caso_id=None, remoto=False):
+    """Avisa a los listeners registrados que una fila cambió."""
+    for callback in list(_listeners_cambios):
+        try:
+            callback(tabla, operacion, registro_id, caso_id, remoto=remoto)
+        except Exception as e:
+            db_logger.error(f"Error en listener de cambios ({tabla} {operacion} {registro_id}): {e}")
+
+# --- Cachés de lectura (ver cache_lecturas) ---
+# Las tablas de referencia cambian poco y se invalidan en sus funciones de escritura;
+# las búsquedas por ID tienen tope de entradas y vigencia corta porque los triggers de
+# casos no avisan todos los cambios (p. ej. last_activity_timestamp).
+cache_etapas = CacheLectura('etapas_procesales', vigencia_segundos=3600)
+cache_datos_usuario = CacheLectura('datos_usuario', vigencia_segundos=600)
+cache_etiquetas = CacheLectura('etiquetas', vigencia_segundos=300)
+cache_modelos_escritos = CacheLectura('modelos_escritos', vigencia_segundos=600)
+cache_casos = CacheLectura('casos_por_id', vigencia_segundos=60, max_entradas=256)
+cache_clientes = CacheLectura('clientes_por_id', vigencia_segundos=120, max_entradas=256)
+cache_contextos = CacheLectura('contextos_caso', vigencia_segundos=120, max_entradas=64)
+cache_audiencias_mes = CacheLectura('audiencias_por_mes', vigencia_segundos=300, max_entradas=24)
+
+def _invalidar_cache_caso(case_id=None):
+    """Olvida la fila y el contexto del caso (o de todos los casos si no se indica)."""
+    cache_casos.invalidar(case_id)
+    cache_contextos.invalidar(case_id)
+
+def _invalidar_caches_por_cambio(tabla, operacion, registro_id, caso_id, remoto=False):
+    """Listener de cambios: mantiene las cachés de lectura al día con lo que avisan los triggers."""
+    if tabla == 'casos':
+        _invalidar_cache_caso(registro_id)
+    elif tabla in ('roles_en_caso', 'representaciones'):
+        cache_contextos.invalidar(caso_id)
+    elif tabla == 'contactos':
+        # Los datos del contacto viajan en los roles de todos sus casos
+        cache_contextos.invalidar()
+    if tabla == 'casos' or (tabla == 'audiencias' and remoto):
+        # Las filas de la agenda llevan la carátula; los avisos remotos no dicen la fecha
+        cache_audiencias_mes.invalidar()
+
+def _invalidar_meses_audiencias(*fechas):
+    """Olvida los meses de la agenda que contienen las fechas indicadas (date o 'AAAA-MM-DD')."""
+    for fecha in fechas:
+        if isinstance(fecha, str):
+            fecha = datetime.date.fromisoformat(fecha[:10])
+        if fecha:
+            cache_audiencias_mes.invalidar((fecha.year, fecha.month))
+
+registrar_listener_cambios(_invalidar_caches_por_cambio)
+
 def get_parties_by_case_id(caso_id):
     """
     Obtiene todas las partes (parties) asociadas a un caso.
@@ -83,8 +171,9 @@ def get_parties_by_case_id(caso_id):
         list: Lista de diccionarios con información de las partes
     """
     try:
-        # Usar la función existente get_roles_by_case_id y adaptar el formato
-        roles_data = get_roles_by_case_id(caso_id)
+        # Los roles salen del contexto del caso en caché
+        contexto = get_contexto_caso(caso_id)
+        roles_data = sorted(contexto.roles, key=lambda rol: (rol.get('rol_principal') or '', rol.get('nombre_completo') or '')) if contexto else []
 
         parties = []
         for role in roles_data:
@@ -165,9 +254,288 @@ def get_roles_by_case_id(caso_id):
         
         
 
+# Tablas cuyos cambios se publican en CANAL_CAMBIOS
+TABLAS_NOTIFICADAS = ('casos', 'tareas', 'audiencias', 'roles_en_caso', 'representaciones', 'actividades_caso', 'movimientos_cuenta')
+
+# Búsqueda de texto completo: tabla -> columnas (con su peso) que forman busqueda_tsv
+COLUMNAS_BUSQUEDA = {
+    'casos': (('caratula', 'A'), ('notas', 'B')),
+    'actividades_caso': (('descripcion', 'A'), ('tipo_actividad', 'C')),
+    'tareas': (('descripcion', 'A'), ('notas', 'B')),
+    'consultas': (('relato_original_cliente', 'B'), ('hechos_reformulados_ia', 'B'),
+                  ('encuadre_legal_preliminar', 'C'), ('resultado_consulta', 'C')),
+}
+
+def _expresion_tsv(columnas, prefijo=''):
+    """Expresión SQL que arma el tsvector en español de una fila a partir de sus columnas ponderadas."""
+    return " || ".join(
+        f"setweight(to_tsvector('spanish', coalesce({prefijo}{columna}, '')), '{peso}')"
+        for columna, peso in columnas
+    )
+
+def _comandos_busqueda_texto():
+    """Columna tsvector, trigger que la mantiene e índice GIN para cada tabla de COLUMNAS_BUSQUEDA."""
+    comandos = []
+    for tabla, columnas in COLUMNAS_BUSQUEDA.items():
+        lista_columnas = ", ".join(columna for columna, _ in columnas)
+        comandos += [
+            f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS busqueda_tsv TSVECTOR;",
+            f"""
+            CREATE OR REPLACE FUNCTION fn_busqueda_tsv_{tabla}() RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.busqueda_tsv := {_expresion_tsv(columnas, 'NEW.')};
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            f"DROP TRIGGER IF EXISTS trg_busqueda_tsv_{tabla} ON {tabla};",
+            f"""
+            CREATE TRIGGER trg_busqueda_tsv_{tabla}
+            BEFORE INSERT OR UPDATE OF {lista_columnas} ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION fn_busqueda_tsv_{tabla}();
+            """,
+            f"CREATE INDEX IF NOT EXISTS idx_{tabla}_busqueda_tsv ON {tabla} USING GIN (busqueda_tsv);",
+        ]
+    return tuple(comandos)
+
+# Búsqueda global (omnibox): tipo -> tabla de origen, columnas que disparan la
+# actualización y SELECT que arma título, detalle y los textos (peso A y B) a indexar.
+FUENTES_OMNIBOX = {
+    'cliente': {
+        'tabla': 'clientes',
+        'columnas': ('nombre', 'email', 'whatsapp', 'direccion'),
+        'select': """
+            SELECT x.id, x.nombre AS titulo, concat_ws(' · ', x.email, x.whatsapp) AS detalle,
+                   x.nombre AS texto_a, concat_ws(' ', x.email, x.whatsapp, x.direccion) AS texto_b
+            FROM clientes x""",
+    },
+    'caso': {
+        'tabla': 'casos',
+        'columnas': ('caratula', 'numero_expediente', 'anio_caratula', 'juzgado', 'jurisdiccion', 'cliente_id'),
+        'select': """
+            SELECT x.id, x.caratula AS titulo,
+                   concat_ws(' · ', nullif(concat_ws('/', x.numero_expediente, x.anio_caratula), ''), x.juzgado, cl.nombre) AS detalle,
+                   concat_ws(' ', x.caratula, x.numero_expediente, x.anio_caratula) AS texto_a,
+                   concat_ws(' ', x.juzgado, x.jurisdiccion, cl.nombre) AS texto_b
+            FROM casos x JOIN clientes cl ON cl.id = x.cliente_id""",
+    },
+    'contacto': {
+        'tabla': 'contactos',
+        'columnas': ('nombre_completo', 'dni', 'cuit', 'email', 'telefono'),
+        'select': """
+            SELECT x.id, x.nombre_completo AS titulo,
+                   concat_ws(' · ', nullif(concat_ws(' ', x.dni, x.cuit), ''), x.email, x.telefono) AS detalle,
+                   x.nombre_completo AS texto_a, concat_ws(' ', x.dni, x.cuit, x.email, x.telefono) AS texto_b
+            FROM contactos x""",
+    },
+    'prospecto': {
+        'tabla': 'prospectos',
+        'columnas': ('nombre', 'contacto', 'estado'),
+        'select': """
+            SELECT x.id, x.nombre AS titulo, concat_ws(' · ', x.estado, x.contacto) AS detalle,
+                   x.nombre AS texto_a, x.contacto AS texto_b
+            FROM prospectos x""",
+    },
+}
+
+def _insert_omnibox(tipo, filtro=""):
+    """INSERT ... SELECT que vuelca en indice_omnibox las filas de un tipo (opcionalmente filtradas)."""
+    return f"""
+        INSERT INTO indice_omnibox (tipo, entidad_id, titulo, detalle, titulo_normalizado, vector)
+        SELECT '{tipo}', s.id, s.titulo, s.detalle, fn_normalizar_omnibox(s.titulo),
+               setweight(to_tsvector('simple', fn_normalizar_omnibox(s.texto_a)), 'A') ||
+               setweight(to_tsvector('simple', fn_normalizar_omnibox(s.texto_b)), 'B')
+        FROM ({FUENTES_OMNIBOX[tipo]['select']}) s {filtro}
+    """
+
+def _comandos_omnibox():
+    """Tabla precalculada de la búsqueda global y triggers que la mantienen al día."""
+    comandos = [
+        """
+        CREATE TABLE IF NOT EXISTS indice_omnibox (
+            tipo TEXT NOT NULL,
+            entidad_id INTEGER NOT NULL,
+            titulo TEXT NOT NULL,
+            detalle TEXT,
+            titulo_normalizado TEXT NOT NULL,
+            vector TSVECTOR NOT NULL,
+            PRIMARY KEY (tipo, entidad_id)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_indice_omnibox_vector ON indice_omnibox USING GIN (vector);",
+        # Minúsculas, sin acentos y sólo letras/dígitos: igual que normalizar_busqueda() del lado de Python
+        """
+        CREATE OR REPLACE FUNCTION fn_normalizar_omnibox(texto TEXT) RETURNS TEXT AS $$
+            SELECT btrim(regexp_replace(
+                translate(lower(coalesce(texto, '')), 'áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc'),
+                '[^[:alnum:]]+', ' ', 'g'))
+        $$ LANGUAGE sql IMMUTABLE;
+        """,
+    ]
+    for tipo, fuente in FUENTES_OMNIBOX.items():
+        tabla = fuente['tabla']
+        # Al renombrar un cliente cambia el detalle de sus casos
+        extra = ""
+        if tipo == 'cliente':
+            extra = "IF TG_OP = 'UPDATE' AND NEW.nombre IS DISTINCT FROM OLD.nombre THEN PERFORM fn_omnibox_caso(id) FROM casos WHERE cliente_id = NEW.id; END IF;"
+        comandos += [
+            f"""
+            CREATE OR REPLACE FUNCTION fn_omnibox_{tipo}(p_id INTEGER) RETURNS VOID AS $$
+            BEGIN
+                DELETE FROM indice_omnibox WHERE tipo = '{tipo}' AND entidad_id = p_id;
+                {_insert_omnibox(tipo, "WHERE s.id = p_id")};
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            f"""
+            CREATE OR REPLACE FUNCTION fn_omnibox_trg_{tabla}() RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    DELETE FROM indice_omnibox WHERE tipo = '{tipo}' AND entidad_id = OLD.id;
+                    RETURN OLD;
+                END IF;
+                PERFORM fn_omnibox_{tipo}(NEW.id);
+                {extra}
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            f"DROP TRIGGER IF EXISTS trg_omnibox_{tabla} ON {tabla};",
+            f"""
+            CREATE TRIGGER trg_omnibox_{tabla}
+            AFTER INSERT OR DELETE OR UPDATE OF {", ".join(fuente['columnas'])} ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION fn_omnibox_trg_{tabla}();
+            """,
+        ]
+    return tuple(comandos)
+
+def triggers_por_fila(tabla):
+    """
+    Triggers FOR EACH ROW que indexan `tabla` (busqueda_tsv, indice_omnibox) y
+    publican sus cambios. Una carga masiva los desactiva y después llama a
+    sql_reindexar_filas con los ids insertados.
+    """
+    triggers = []
+    if tabla in COLUMNAS_BUSQUEDA:
+        triggers.append(f"trg_busqueda_tsv_{tabla}")
+    if any(fuente['tabla'] == tabla for fuente in FUENTES_OMNIBOX.values()):
+        triggers.append(f"trg_omnibox_{tabla}")
+    if tabla in TABLAS_NOTIFICADAS:
+        triggers.append(f"trg_notificar_{tabla}")
+    return triggers
+
+def sql_reindexar_filas(tabla):
+    """
+    Lo que hacen los triggers de triggers_por_fila, de una vez para las filas con
+    id = ANY(%(ids)s): tsvector, entradas de indice_omnibox y un único NOTIFY.
+    """
+    sentencias = []
+    if tabla in COLUMNAS_BUSQUEDA:
+        sentencias.append(f"UPDATE {tabla} SET busqueda_tsv = {_expresion_tsv(COLUMNAS_BUSQUEDA[tabla])} "
+                          f"WHERE id = ANY(%(ids)s)")
+    for tipo, fuente in FUENTES_OMNIBOX.items():
+        if fuente['tabla'] == tabla:
+            sentencias.append(_insert_omnibox(tipo, "WHERE s.id = ANY(%(ids)s)"))
+    if tabla in TABLAS_NOTIFICADAS:
+        sentencias.append(f"""
+            SELECT pg_notify('{CANAL_CAMBIOS}', json_build_object(
+                'tabla', '{tabla}', 'op', 'INSERT', 'id', NULL, 'caso_id', NULL,
+                'origen', current_setting('application_name', true))::TEXT)
+        """)
+    return sentencias
+
+# Búsquedas ILIKE '%texto%' por nombre: sin índice trigram recorren toda la tabla
+_COMANDOS_TRIGRAMA = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX IF NOT EXISTS idx_prospectos_nombre_trgm ON prospectos USING GIN (nombre gin_trgm_ops);",
+)
+
+# Instante de aviso de los recordatorios calculado por la base (columnas generadas,
+# PostgreSQL 12+). Los índices parciales cubren sólo los recordatorios activos, así
+# que las consultas del planificador no crecen con el histórico de tareas/audiencias.
+# recordatorio_activo se compara como ::int porque hay bases con la columna INTEGER.
+# {p} es el prefijo de tabla: vacío en la columna generada, el alias en las consultas
+# que calculan el aviso en línea cuando la columna no existe (ver _columna_aviso).
+_EXPRESIONES_AVISO = {
+    'audiencias': "(({p}fecha + {p}hora) - COALESCE(NULLIF({p}recordatorio_minutos, 0), 15) * INTERVAL '1 minute')",
+    'tareas': "(({p}fecha_vencimiento - COALESCE(NULLIF({p}recordatorio_dias_antes, 0), 1)) + TIME '00:00')",
+}
+
+_COMANDOS_AVISOS = (
+    f"""
+    ALTER TABLE audiencias ADD COLUMN IF NOT EXISTS notify_at TIMESTAMP
+        GENERATED ALWAYS AS {_EXPRESIONES_AVISO['audiencias'].format(p='')} STORED;
+    """,
+    f"""
+    ALTER TABLE tareas ADD COLUMN IF NOT EXISTS notify_at TIMESTAMP
+        GENERATED ALWAYS AS {_EXPRESIONES_AVISO['tareas'].format(p='')} STORED;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_audiencias_aviso ON audiencias (fecha, notify_at)
+        WHERE recordatorio_activo::int = 1;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_tareas_aviso ON tareas (fecha_vencimiento, notify_at)
+        WHERE recordatorio_activo::int = 1 AND estado NOT IN ('Completada', 'Cancelada');
+    """,
+)
+
+# True/False según create_tables haya podido crear las columnas notify_at; None
+# hasta saberlo (se consulta information_schema la primera vez)
+_avisos_precalculados = None
+
+def _columna_aviso(cur, tabla, alias):
+    """
+    Expresión del instante de aviso de `tabla` para una consulta con un cursor
+    RealDictCursor: la columna notify_at si existe, o el mismo cálculo en línea.
+    """
+    global _avisos_precalculados
+    if _avisos_precalculados is None:
+        cur.execute("""
+            SELECT COUNT(*) AS cantidad FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name IN ('audiencias', 'tareas')
+              AND column_name = 'notify_at'
+        """)
+        _avisos_precalculados = cur.fetchone()['cantidad'] == 2
+        if not _avisos_precalculados:
+            db_logger.warning("Sin columnas notify_at: el aviso de los recordatorios se calcula en cada consulta")
+    if _avisos_precalculados:
+        return f"{alias}.notify_at"
+    return _EXPRESIONES_AVISO[tabla].format(p=f"{alias}.")
+
+def _ejecutar_opcionales(cur, nombre, comandos):
+    """Ejecuta comandos de esquema no imprescindibles; si fallan, avisa sin abortar create_tables."""
+    cur.execute(f"SAVEPOINT {nombre}")
+    try:
+        for command in comandos:
+            cur.execute(command)
+        cur.execute(f"RELEASE SAVEPOINT {nombre}")
+        return True
+    except psycopg2.Error as e:
+        cur.execute(f"ROLLBACK TO SAVEPOINT {nombre}")
+        print(f"Aviso: no se aplicó '{nombre}': {e}")
+        return False
+
+def _migracion_aplicada(cur, nombre):
+    """True si la migración de datos `nombre` ya se ejecutó en esta base."""
+    cur.execute("SELECT 1 FROM migraciones_aplicadas WHERE nombre = %s", (nombre,))
+    return cur.fetchone() is not None
+
+def _marcar_migracion(cur, nombre):
+    """Registra la migración `nombre` para no repetirla en los próximos arranques."""
+    cur.execute("INSERT INTO migraciones_aplicadas (nombre) VALUES (%s) ON CONFLICT (nombre) DO NOTHING", (nombre,))
+
 def create_tables():
     """Crea las tablas en la base de datos PostgreSQL si no existen."""
+    global _avisos_precalculados
     commands = (
+        # Migraciones de datos de una sola vez (rellenos iniciales), para no repetirlas en cada arranque
+        """
+        CREATE TABLE IF NOT EXISTS migraciones_aplicadas (
+            nombre TEXT PRIMARY KEY,
+            aplicada_en TIMESTAMP DEFAULT NOW()
+        );
+        """,
         """
         CREATE TABLE IF NOT EXISTS clientes (
             id SERIAL PRIMARY KEY,
@@ -229,6 +597,24 @@ def create_tables():
             UNIQUE (caso_id, contacto_id, rol_principal) -- Evita duplicar el mismo rol para la misma persona en un caso
         );
         """,
+        # Representación múltiple: un abogado (rol principal) representa a varias partes del
+        # caso; cada una conserva un rol "sombra" del abogado con representa_a_id.
+        """
+        CREATE TABLE IF NOT EXISTS representaciones (
+            id SERIAL PRIMARY KEY,
+            grupo_id TEXT NOT NULL,
+            caso_id INTEGER NOT NULL REFERENCES casos(id) ON DELETE CASCADE,
+            rol_abogado_id INTEGER NOT NULL REFERENCES roles_en_caso(id) ON DELETE CASCADE,
+            rol_representado_id INTEGER NOT NULL REFERENCES roles_en_caso(id) ON DELETE CASCADE,
+            rol_sombra_id INTEGER REFERENCES roles_en_caso(id) ON DELETE SET NULL,
+            created_at BIGINT,
+            UNIQUE (grupo_id, rol_representado_id)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_representaciones_caso ON representaciones (caso_id);",
+        "CREATE INDEX IF NOT EXISTS idx_representaciones_abogado ON representaciones (rol_abogado_id);",
+        "CREATE INDEX IF NOT EXISTS idx_representaciones_representado ON representaciones (rol_representado_id);",
+        "CREATE INDEX IF NOT EXISTS idx_representaciones_sombra ON representaciones (rol_sombra_id) WHERE rol_sombra_id IS NOT NULL;",
         """
         CREATE TABLE IF NOT EXISTS etapas_procesales (
             id SERIAL PRIMARY KEY,
@@ -363,6 +749,67 @@ def create_tables():
         """,
         "CREATE INDEX IF NOT EXISTS idx_movimientos_caso_id ON movimientos_cuenta (caso_id);",
         "CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos_cuenta (fecha DESC);",
+        # Totales por caso mantenidos por trigger: el resumen financiero se lee en O(1)
+        """
+        CREATE TABLE IF NOT EXISTS totales_cuenta_caso (
+            caso_id INTEGER PRIMARY KEY REFERENCES casos(id) ON DELETE CASCADE,
+            total_ingresos NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            total_gastos NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            saldo NUMERIC(14, 2) GENERATED ALWAYS AS (total_ingresos - total_gastos) STORED,
+            cantidad_movimientos INTEGER NOT NULL DEFAULT 0,
+            ultimo_movimiento DATE,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+        """,
+        """
+        CREATE OR REPLACE FUNCTION fn_actualizar_totales_cuenta() RETURNS TRIGGER AS $$
+        BEGIN
+            -- Restar la fila anterior (UPDATE/DELETE)
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE totales_cuenta_caso
+                SET total_ingresos = total_ingresos - CASE WHEN OLD.tipo_movimiento = 'Ingreso' THEN OLD.monto ELSE 0 END,
+                    total_gastos = total_gastos - CASE WHEN OLD.tipo_movimiento = 'Gasto' THEN OLD.monto ELSE 0 END,
+                    cantidad_movimientos = cantidad_movimientos - 1,
+                    updated_at = NOW()
+                WHERE caso_id = OLD.caso_id;
+            END IF;
+
+            -- Sumar la fila nueva (INSERT/UPDATE)
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO totales_cuenta_caso (caso_id, total_ingresos, total_gastos, cantidad_movimientos, ultimo_movimiento)
+                VALUES (
+                    NEW.caso_id,
+                    CASE WHEN NEW.tipo_movimiento = 'Ingreso' THEN NEW.monto ELSE 0 END,
+                    CASE WHEN NEW.tipo_movimiento = 'Gasto' THEN NEW.monto ELSE 0 END,
+                    1,
+                    NEW.fecha
+                )
+                ON CONFLICT (caso_id) DO UPDATE
+                SET total_ingresos = totales_cuenta_caso.total_ingresos + EXCLUDED.total_ingresos,
+                    total_gastos = totales_cuenta_caso.total_gastos + EXCLUDED.total_gastos,
+                    cantidad_movimientos = totales_cuenta_caso.cantidad_movimientos + 1,
+                    ultimo_movimiento = GREATEST(totales_cuenta_caso.ultimo_movimiento, EXCLUDED.ultimo_movimiento),
+                    updated_at = NOW();
+            END IF;
+
+            -- Si se quitó o movió el movimiento más reciente, recalcular la última fecha
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE totales_cuenta_caso t
+                SET ultimo_movimiento = (SELECT MAX(m.fecha) FROM movimientos_cuenta m WHERE m.caso_id = OLD.caso_id)
+                WHERE t.caso_id = OLD.caso_id
+                  AND (t.ultimo_movimiento IS NULL OR OLD.fecha >= t.ultimo_movimiento);
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        "DROP TRIGGER IF EXISTS trg_totales_cuenta_caso ON movimientos_cuenta;",
+        """
+        CREATE TRIGGER trg_totales_cuenta_caso
+        AFTER INSERT OR UPDATE OR DELETE ON movimientos_cuenta
+        FOR EACH ROW EXECUTE FUNCTION fn_actualizar_totales_cuenta();
+        """,
         """
         CREATE TABLE IF NOT EXISTS prospectos (
             id SERIAL PRIMARY KEY,
@@ -378,6 +825,8 @@ def create_tables():
         """,
         "CREATE INDEX IF NOT EXISTS idx_prospectos_estado ON prospectos (estado);",
         "CREATE INDEX IF NOT EXISTS idx_prospectos_fecha_consulta ON prospectos (fecha_primera_consulta);",
+        "CREATE INDEX IF NOT EXISTS idx_prospectos_fecha_id ON prospectos (fecha_primera_consulta DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_prospectos_fecha_conversion ON prospectos (fecha_conversion) WHERE fecha_conversion IS NOT NULL;",
         """
         CREATE TABLE IF NOT EXISTS consultas (
             id SERIAL PRIMARY KEY,
@@ -392,6 +841,49 @@ def create_tables():
         """,
         "CREATE INDEX IF NOT EXISTS idx_consultas_prospecto_id ON consultas (prospecto_id);",
         "CREATE INDEX IF NOT EXISTS idx_consultas_fecha ON consultas (fecha_consulta DESC);",
+        # Publicación de cambios por LISTEN/NOTIFY para refrescar otras instancias
+        """
+        CREATE OR REPLACE FUNCTION fn_notificar_cambio() RETURNS TRIGGER AS $$
+        DECLARE
+            fila JSONB;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                fila := to_jsonb(OLD);
+            ELSE
+                fila := to_jsonb(NEW);
+            END IF;
+
+            -- update_last_activity toca casos en casi cada operación: no publicar
+            -- si sólo cambiaron las marcas de actividad/inactividad (o el tsvector de búsqueda)
+            IF TG_OP = 'UPDATE'
+               AND (fila - 'last_activity_timestamp' - 'last_inactivity_notification_timestamp' - 'busqueda_tsv')
+                   = (to_jsonb(OLD) - 'last_activity_timestamp' - 'last_inactivity_notification_timestamp' - 'busqueda_tsv') THEN
+                RETURN NULL;
+            END IF;
+
+            PERFORM pg_notify('""" + CANAL_CAMBIOS + """', json_build_object(
+                'tabla', TG_TABLE_NAME,
+                'op', TG_OP,
+                'id', (fila->>'id')::INTEGER,
+                'caso_id', CASE WHEN TG_TABLE_NAME = 'casos' THEN (fila->>'id')::INTEGER
+                                ELSE (fila->>'caso_id')::INTEGER END,
+                'origen', current_setting('application_name', true)
+            )::TEXT);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+    ) + _comandos_busqueda_texto() + _comandos_omnibox() + tuple(
+        sql
+        for tabla in TABLAS_NOTIFICADAS
+        for sql in (
+            f"DROP TRIGGER IF EXISTS trg_notificar_{tabla} ON {tabla};",
+            f"""
+            CREATE TRIGGER trg_notificar_{tabla}
+            AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION fn_notificar_cambio();
+            """,
+        )
     )
 
     conn = None
@@ -425,7 +917,42 @@ def create_tables():
                     print("Insertando fila inicial en 'datos_usuario'...")
                     cur.execute("INSERT INTO datos_usuario (id) VALUES (1)")
 
+                # --- Inicializar totales de cuenta corriente para movimientos previos al trigger ---
+                cur.execute("SELECT EXISTS (SELECT 1 FROM totales_cuenta_caso)")
+                if not cur.fetchone()[0]:
+                    print("Calculando 'totales_cuenta_caso' a partir de los movimientos existentes...")
+                    cur.execute(_SQL_RECALCULAR_TOTALES_CUENTA)
+
+                # --- Completar busqueda_tsv de filas anteriores al trigger (una vez por tabla) ---
+                for tabla, columnas in COLUMNAS_BUSQUEDA.items():
+                    migracion = f"busqueda_tsv_{tabla}"
+                    if _migracion_aplicada(cur, migracion):
+                        continue
+                    cur.execute(f"UPDATE {tabla} SET busqueda_tsv = {_expresion_tsv(columnas)} WHERE busqueda_tsv IS NULL")
+                    if cur.rowcount:
+                        print(f"Índice de búsqueda de '{tabla}' completado para {cur.rowcount} filas existentes.")
+                    _marcar_migracion(cur, migracion)
+
+                # --- Poblar la búsqueda global con los datos previos a sus triggers ---
+                cur.execute("SELECT EXISTS (SELECT 1 FROM indice_omnibox)")
+                if not cur.fetchone()[0]:
+                    print("Construyendo 'indice_omnibox' a partir de los datos existentes...")
+                    for tipo in FUENTES_OMNIBOX:
+                        cur.execute(_insert_omnibox(tipo))
+
+                # --- Pasar a 'representaciones' los grupos que sólo figuraban en las notas (una vez) ---
+                if not _migracion_aplicada(cur, "representaciones_desde_notas"):
+                    migradas = migrar_representaciones_desde_notas(cur)
+                    if migradas:
+                        print(f"Migradas {migradas} representaciones múltiples desde las notas de los roles.")
+                    _marcar_migracion(cur, "representaciones_desde_notas")
+
+                # --- Opcionales: pg_trgm puede no estar disponible; columnas generadas requieren PostgreSQL 12+ ---
+                _ejecutar_opcionales(cur, "indices_trigram", _COMANDOS_TRIGRAMA)
+                avisos_precalculados = _ejecutar_opcionales(cur, "avisos_recordatorio", _COMANDOS_AVISOS)
+
             conn.commit()
+            _avisos_precalculados = avisos_precalculados
             print("Esquema de base de datos completo creado/verificado con éxito")
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Error al crear tablas: {error}")
@@ -435,9 +962,37 @@ def create_tables():
         if conn:
             conn.close()
 
+def contar_tablas_usuario():
+    """
+    Cantidad de tablas de usuario (con o sin datos) para el total del progreso de
+    pg_dump. None si hubo un error.
+    """
+    conn = connect_db()
+    total = None
+    if conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*) FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE c.relkind = 'r'
+                      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                      AND n.nspname NOT LIKE 'pg_toast%'
+                """)
+                total = cur.fetchone()[0]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al contar tablas: {e}")
+        finally:
+            conn.close()
+    return total
+
 # --- Funciones CRUD para Datos de Usuario ---
 
 def get_datos_usuario():
+    """Datos del usuario (fila id = 1), desde la caché."""
+    return cache_datos_usuario.obtener(1, _leer_datos_usuario)
+
+def _leer_datos_usuario():
     conn = connect_db()
     datos = None
     if conn:
@@ -479,6 +1034,8 @@ def save_datos_usuario(**kwargs):
                 else:
                     print("Datos del usuario no necesitaron actualización o no se encontró la fila (id=1).")
                     success = True
+                cache_datos_usuario.invalidar()
+                cache_contextos.invalidar()
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al guardar datos del usuario: {e}")
             conn.rollback()
@@ -526,6 +1083,10 @@ def get_clients():
     return clients
 
 def get_client_by_id(client_id):
+    """Cliente por ID, desde la caché."""
+    return cache_clientes.obtener(client_id, lambda: _leer_cliente(client_id))
+
+def _leer_cliente(client_id):
     conn = connect_db()
     client_data = None
     if conn:
@@ -554,6 +1115,8 @@ def update_client(client_id, nombre, direccion, email, whatsapp):
                 ''', (nombre, direccion, email, whatsapp, client_id))
                 conn.commit()
                 success = True
+                cache_clientes.invalidar(client_id)
+                _invalidar_cache_caso()  # los casos del cliente llevan su nombre
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al actualizar cliente ID {client_id}: {e}")
             conn.rollback()
@@ -570,6 +1133,8 @@ def delete_client(client_id):
                 cur.execute('DELETE FROM clientes WHERE id = %s', (client_id,))
                 conn.commit()
                 success = True
+                cache_clientes.invalidar(client_id)
+                _invalidar_cache_caso()
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al eliminar cliente ID {client_id}: {e}")
             conn.rollback()
@@ -768,9 +1333,12 @@ def delete_contacto(contacto_id):
 # --- Funciones CRUD para Etapas Procesales ---
 
 def get_todas_las_etapas():
-    """Obtiene todas las etapas procesales ordenadas por el campo 'orden'."""
+    """Obtiene todas las etapas procesales ordenadas por el campo 'orden' (desde la caché)."""
+    return cache_etapas.obtener('todas', _leer_etapas) or []
+
+def _leer_etapas():
     conn = connect_db()
-    etapas = []
+    etapas = None
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
@@ -848,6 +1416,7 @@ def update_case_inactivity_notified(case_id):
                     WHERE id = %s
                 ''', (timestamp, case_id))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 success = cur.rowcount > 0
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al actualizar timestamp de notificación de inactividad para caso ID {case_id}: {e}")
@@ -947,6 +1516,10 @@ def get_cases_by_client(cliente_id):
     return cases
 
 def get_case_by_id(case_id):
+    """Caso por ID con el nombre del cliente, desde la caché."""
+    return cache_casos.obtener(case_id, lambda: _leer_caso(case_id))
+
+def _leer_caso(case_id):
     conn = connect_db()
     case_data = None
     if conn:
@@ -967,6 +1540,64 @@ def get_case_by_id(case_id):
             conn.close()
     return case_data
 
+# Caso, cliente, roles con su contacto y datos del abogado en una sola consulta
+_SQL_CONTEXTO_CASO = """
+    SELECT ca.*, cl.nombre AS nombre_cliente,
+        jsonb_build_object('id', cl.id, 'nombre', cl.nombre, 'direccion', cl.direccion,
+                           'email', cl.email, 'whatsapp', cl.whatsapp, 'created_at', cl.created_at) AS contexto_cliente,
+        (SELECT to_jsonb(u) FROM datos_usuario u WHERE u.id = 1) AS contexto_abogado,
+        COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'rol_id', r.id, 'caso_id', r.caso_id, 'contacto_id', r.contacto_id,
+                'rol_principal', r.rol_principal, 'rol_secundario', r.rol_secundario,
+                'representa_a_id', r.representa_a_id, 'datos_bancarios', r.datos_bancarios,
+                'notas_del_rol', r.notas_del_rol, 'rol_created_at', r.created_at,
+                'nombre_completo', c.nombre_completo, 'es_persona_juridica', c.es_persona_juridica,
+                'dni', c.dni, 'cuit', c.cuit, 'domicilio_real', c.domicilio_real,
+                'domicilio_legal', c.domicilio_legal, 'email', c.email, 'telefono', c.telefono,
+                'notas_generales', c.notas_generales, 'contacto_created_at', c.created_at
+            ) ORDER BY r.id)
+            FROM roles_en_caso r
+            JOIN contactos c ON c.id = r.contacto_id
+            WHERE r.caso_id = ca.id
+        ), '[]'::jsonb) AS contexto_roles
+    FROM casos ca
+    JOIN clientes cl ON cl.id = ca.cliente_id
+    WHERE ca.id = %s
+"""
+
+def _leer_contexto_caso(case_id):
+    conn = connect_db()
+    contexto = None
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(_SQL_CONTEXTO_CASO, (case_id,))
+                row = cur.fetchone()
+                if row:
+                    caso = dict(row)
+                    contexto = {
+                        'cliente': caso.pop('contexto_cliente'),
+                        'abogado': caso.pop('contexto_abogado'),
+                        'roles': caso.pop('contexto_roles'),
+                        'caso': caso,
+                    }
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener contexto del caso ID {case_id}: {e}")
+        finally:
+            conn.close()
+    return contexto
+
+def get_contexto_caso(case_id):
+    """
+    Contexto completo del caso (ContextoCaso) para documentos, modelos de escritos
+    y el agente IA, desde la caché. None si el caso no existe o no se pudo leer.
+    """
+    if not case_id:
+        return None
+    datos = cache_contextos.obtener(case_id, lambda: _leer_contexto_caso(case_id))
+    return ContextoCaso(**datos) if datos else None
+
 def update_case(case_id, caratula, numero_expediente, anio_caratula, juzgado, jurisdiccion, etapa_procesal, notas, ruta_carpeta, inactivity_threshold_days, inactivity_enabled):
     conn = connect_db()
     success = False
@@ -981,6 +1612,7 @@ def update_case(case_id, caratula, numero_expediente, anio_caratula, juzgado, ju
                     WHERE id = %s
                 ''', (caratula, numero_expediente, anio_caratula, juzgado, jurisdiccion, etapa_procesal, notas, ruta_carpeta, inactivity_threshold_days, inactivity_enabled, case_id))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 if cur.rowcount > 0:
                     update_last_activity(case_id)
                 success = True
@@ -999,6 +1631,7 @@ def delete_case(case_id):
             with conn.cursor() as cur:
                 cur.execute('DELETE FROM casos WHERE id = %s', (case_id,))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 success = True
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al eliminar caso ID {case_id}: {e}")
@@ -1015,6 +1648,7 @@ def update_case_folder(case_id, folder_path):
             with conn.cursor() as cur:
                 cur.execute('UPDATE casos SET ruta_carpeta = %s WHERE id = %s', (folder_path, case_id))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 if cur.rowcount > 0:
                     update_last_activity(case_id)
                 success = True
@@ -1043,6 +1677,7 @@ def update_etapa_procesal(case_id, nueva_etapa):
             with conn.cursor() as cur:
                 cur.execute('UPDATE casos SET etapa_procesal = %s WHERE id = %s', (nueva_etapa, case_id))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 if cur.rowcount > 0:
                     update_last_activity(case_id)
                     success = True
@@ -1062,6 +1697,7 @@ def update_last_activity(case_id):
                 timestamp = int(time.time())
                 cur.execute('UPDATE casos SET last_activity_timestamp = %s WHERE id = %s', (timestamp, case_id))
                 conn.commit()
+                _invalidar_cache_caso(case_id)
                 success = True
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al actualizar timestamp de actividad para caso ID {case_id}: {e}")
@@ -1312,6 +1948,7 @@ def add_tarea(descripcion, caso_id=None, fecha_vencimiento=None, prioridad='Medi
                 conn.commit()
                 if new_id and caso_id:
                     update_last_activity(caso_id)
+                notificar_cambio('tareas', 'INSERT', new_id, caso_id)
                 print(f"Tarea ID {new_id} ('{descripcion[:30]}...') agregada.")
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al agregar tarea: {e}")
@@ -1435,6 +2072,7 @@ def update_tarea(tarea_id, descripcion, fecha_vencimiento=None, prioridad=None,
                     update_last_activity(current_tarea['caso_id'])
                 
                 success = True
+                notificar_cambio('tareas', 'UPDATE', tarea_id, current_tarea.get('caso_id'))
                 print(f"Tarea ID {tarea_id} actualizada.")
                 
         except (Exception, psycopg2.DatabaseError) as e:
@@ -1461,6 +2099,7 @@ def delete_tarea(tarea_id):
                     if row_check and row_check['caso_id']:
                         update_last_activity(row_check['caso_id'])
                     success = True
+                    notificar_cambio('tareas', 'DELETE', tarea_id, row_check['caso_id'] if row_check else None)
                     print(f"Tarea ID {tarea_id} eliminada.")
                 else:
                     print(f"Advertencia: Tarea ID {tarea_id} no encontrada para eliminar.")
@@ -1487,7 +2126,9 @@ def add_audiencia(caso_id, fecha, hora, descripcion, link="", recordatorio_activ
                 ''', (caso_id, fecha, hora, descripcion, link, int(recordatorio_activo), recordatorio_minutos, timestamp))
                 new_id = cur.fetchone()[0]
                 conn.commit()
+                _invalidar_meses_audiencias(fecha)
                 update_last_activity(caso_id)
+                notificar_cambio('audiencias', 'INSERT', new_id, caso_id)
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al agregar audiencia: {e}")
             conn.rollback()
@@ -1566,7 +2207,7 @@ def update_audiencia(audiencia_id, fecha, hora, descripcion, link="", recordator
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute('SELECT caso_id FROM audiencias WHERE id = %s', (audiencia_id,))
+                cur.execute('SELECT caso_id, fecha FROM audiencias WHERE id = %s', (audiencia_id,))
                 row_check = cur.fetchone()
 
                 cur.execute('''
@@ -1578,7 +2219,10 @@ def update_audiencia(audiencia_id, fecha, hora, descripcion, link="", recordator
                 conn.commit()
                 
                 if cur.rowcount > 0 and row_check:
+                    # La audiencia pudo cambiar de mes: invalidar el anterior y el nuevo
+                    _invalidar_meses_audiencias(row_check['fecha'], fecha)
                     update_last_activity(row_check['caso_id'])
+                    notificar_cambio('audiencias', 'UPDATE', audiencia_id, row_check['caso_id'])
                 success = True
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al actualizar audiencia ID {audiencia_id}: {e}")
@@ -1593,14 +2237,16 @@ def delete_audiencia(audiencia_id):
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute('SELECT caso_id FROM audiencias WHERE id = %s', (audiencia_id,))
+                cur.execute('SELECT caso_id, fecha FROM audiencias WHERE id = %s', (audiencia_id,))
                 row_check = cur.fetchone()
 
                 cur.execute('DELETE FROM audiencias WHERE id = %s', (audiencia_id,))
                 conn.commit()
                 
                 if cur.rowcount > 0 and row_check:
+                    _invalidar_meses_audiencias(row_check['fecha'])
                     update_last_activity(row_check['caso_id'])
+                    notificar_cambio('audiencias', 'DELETE', audiencia_id, row_check['caso_id'])
                 success = True
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al eliminar audiencia ID {audiencia_id}: {e}")
@@ -1632,101 +2278,44 @@ def es_audiencia_vencida(fecha, hora):
         # En caso de error, ser conservador y no considerar vencida
         return False
 
-def get_audiencias_con_recordatorio_activo():
-    """
-    Obtiene audiencias que tienen recordatorio activo para verificar notificaciones.
-    Filtra automáticamente audiencias vencidas usando optimización SQL y validación adicional.
+def get_audiencias_con_recordatorio_activo(ahora=None, hasta=None):
     """
+    Obtiene audiencias con recordatorio activo que todavía no comenzaron.
+    El instante de aviso (notify_at) lo calcula la base, o la consulta si la base
+    no tiene la columna generada.
+
+    Args:
+        ahora (datetime, optional): Instante de referencia (por defecto, ahora)
+        hasta (datetime, optional): Sólo audiencias cuyo aviso cae antes de este
+            instante (la ventana del planificador); None para todas
+    """
+    ahora = ahora or datetime.datetime.now()
+    condiciones = ["a.recordatorio_activo::int = 1",
+                   "a.fecha >= %s",
+                   "(a.fecha + a.hora) > %s"]
+    params = [ahora.date(), ahora]
     conn = connect_db()
     audiencias = []
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                # Optimized query: filter at SQL level for better performance
-                # Get audiencias from today onwards, then filter by time in Python for today's audiencias
-                cur.execute('''
+                aviso = _columna_aviso(cur, 'audiencias', 'a')
+                if hasta is not None:
+                    condiciones.append(f"{aviso} < %s")
+                    params.append(hasta)
+                cur.execute(f'''
                     SELECT a.*, c.caratula, cl.nombre as nombre_cliente
                     FROM audiencias a
                     JOIN casos c ON a.caso_id = c.id
                     JOIN clientes cl ON c.cliente_id = cl.id
-                    WHERE a.recordatorio_activo = 1 
-                      AND a.fecha::date >= CURRENT_DATE
-                    ORDER BY a.fecha, a.hora
-                ''')
-                rows = cur.fetchall()
-                audiencias_candidatas = [dict(row) for row in rows]
-                
-                # Additional filtering for today's audiencias considering time
-                audiencias = []
-                audiencias_filtradas_por_hora = 0
-                audiencias_futuras = 0
-                
-                for audiencia in audiencias_candidatas:
-                    # Use improved date utility function for expiration check
-                    if not es_audiencia_vencida(audiencia['fecha'], audiencia['hora']):
-                        audiencias.append(audiencia)
-                        # Count future vs today audiencias for logging
-                        fecha_aud = audiencia['fecha']
-                        if isinstance(fecha_aud, str):
-                            try:
-                                fecha_aud = datetime.datetime.strptime(fecha_aud, '%Y-%m-%d').date()
-                            except ValueError:
-                                pass
-                        
-                        if isinstance(fecha_aud, datetime.date) and fecha_aud > datetime.date.today():
-                            audiencias_futuras += 1
-                    else:
-                        audiencias_filtradas_por_hora += 1
-                
-                # Enhanced logging for debugging
-                total_candidatas = len(audiencias_candidatas)
-                total_validas = len(audiencias)
-                
-                db_logger.info(f"Audiencias con recordatorio: {total_candidatas} candidatas, {total_validas} válidas")
-                
-                if total_validas > 0:
-                    print(f"[DB] [OK] {total_validas} audiencias con recordatorio activo validas")
-                    print(f"    - {audiencias_futuras} futuras, {total_validas - audiencias_futuras} para hoy")
-                    if audiencias_filtradas_por_hora > 0:
-                        print(f"    - {audiencias_filtradas_por_hora} filtradas por hora vencida")
-                else:
-                    print("[DB] ⚠ No se encontraron audiencias con recordatorio activo válidas")
-                    if audiencias_filtradas_por_hora > 0:
-                        print(f"    - {audiencias_filtradas_por_hora} audiencias de hoy ya vencidas")
-                    if total_candidatas == 0:
-                        print("    - No hay audiencias con recordatorio activo en la base de datos")
-                    
+                    WHERE {" AND ".join(condiciones)}
+                    ORDER BY {aviso}
+                ''', params)
+                audiencias = [dict(row) for row in cur.fetchall()]
+                db_logger.info(f"Audiencias con recordatorio pendiente: {len(audiencias)}")
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"[ERROR] Error al obtener audiencias con recordatorio activo: {e}")
             db_logger.error(f"Error in get_audiencias_con_recordatorio_activo: {e}")
-            
-            # Fallback query without date filtering - create new cursor
-            try:
-                print("[DB] Intentando consulta fallback sin filtro de fecha...")
-                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as fallback_cur:
-                    fallback_cur.execute('''
-                        SELECT a.*, c.caratula, cl.nombre as nombre_cliente
-                        FROM audiencias a
-                        JOIN casos c ON a.caso_id = c.id
-                        JOIN clientes cl ON c.cliente_id = cl.id
-                        WHERE a.recordatorio_activo = 1
-                        ORDER BY a.fecha, a.hora
-                    ''')
-                    rows = fallback_cur.fetchall()
-                    all_audiencias = [dict(row) for row in rows]
-                    
-                    # Filter expired audiencias manually
-                    audiencias = []
-                    for audiencia in all_audiencias:
-                        if not es_audiencia_vencida(audiencia['fecha'], audiencia['hora']):
-                            audiencias.append(audiencia)
-                    
-                    print(f"[DB] Consulta fallback exitosa: {len(audiencias)} audiencias válidas de {len(all_audiencias)} totales")
-                
-            except (Exception, psycopg2.DatabaseError) as e2:
-                print(f"[ERROR] Error en consulta fallback: {e2}")
-                db_logger.error(f"Error in fallback query: {e2}")
-                
         finally:
             conn.close()
     
@@ -1756,7 +2345,10 @@ def get_audiencias_proximas(dias_adelante=7):
     return audiencias
 
 def get_tareas_para_notificacion():
-    """Obtiene tareas que necesitan notificación de recordatorio"""
+    """
+    Obtiene tareas que necesitan notificación de recordatorio hoy: ya alcanzaron su
+    instante de aviso (notify_at), no vencieron y no se notificaron hoy.
+    """
     conn = connect_db()
     tareas = []
     if conn:
@@ -1764,59 +2356,24 @@ def get_tareas_para_notificacion():
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 # Obtener fecha actual para comparaciones
                 fecha_hoy = datetime.date.today()
-                
-                cur.execute('''
+                aviso = _columna_aviso(cur, 'tareas', 't')
+
+                cur.execute(f'''
                     SELECT t.*, c.caratula, cl.nombre as nombre_cliente
                     FROM tareas t
                     LEFT JOIN casos c ON t.caso_id = c.id
                     LEFT JOIN clientes cl ON c.cliente_id = cl.id
-                    WHERE t.recordatorio_activo = 1
+                    WHERE t.recordatorio_activo::int = 1
                       AND t.estado NOT IN ('Completada', 'Cancelada')
-                      AND t.fecha_vencimiento IS NOT NULL
+                      AND t.fecha_vencimiento >= %s
+                      AND {aviso} < %s
                       AND (
                           t.fecha_ultima_notificacion IS NULL 
-                          OR DATE(t.fecha_ultima_notificacion) < %s
+                          OR t.fecha_ultima_notificacion < %s
                       )
-                      AND CAST(t.fecha_vencimiento AS DATE) >= %s
                     ORDER BY t.fecha_vencimiento
-                ''', (fecha_hoy, fecha_hoy))
-                rows = cur.fetchall()
-                
-                # Filtrar tareas que realmente necesitan notificación según días de anticipación
-                tareas_filtradas = []
-                for row in rows:
-                    tarea = dict(row)
-                    fecha_vencimiento = tarea['fecha_vencimiento']
-                    dias_antes = tarea.get('recordatorio_dias_antes', 1) or 1
-                    
-                    try:
-                        # Convertir fecha_vencimiento a date
-                        if isinstance(fecha_vencimiento, str):
-                            # Manejar formato ISO con tiempo
-                            if 'T' in fecha_vencimiento:
-                                fecha_vencimiento = datetime.datetime.fromisoformat(fecha_vencimiento.replace('T', ' ')).date()
-                            else:
-                                fecha_vencimiento = datetime.datetime.strptime(fecha_vencimiento, '%Y-%m-%d').date()
-                        elif isinstance(fecha_vencimiento, datetime.datetime):
-                            fecha_vencimiento = fecha_vencimiento.date()
-                        
-                        # Calcular fecha de notificación
-                        fecha_notificacion = fecha_vencimiento - datetime.timedelta(days=dias_antes)
-                        
-                        # Solo notificar si:
-                        # 1. Hoy es la fecha de notificación o después
-                        # 2. La tarea no ha vencido hace más de 30 días (evitar notificaciones de tareas muy vencidas)
-                        dias_desde_vencimiento = (fecha_hoy - fecha_vencimiento).days
-                        
-                        if (fecha_hoy >= fecha_notificacion and 
-                            dias_desde_vencimiento <= 30):  # Máximo 30 días después del vencimiento
-                            tareas_filtradas.append(tarea)
-                            
-                    except (ValueError, TypeError) as e:
-                        print(f"Error procesando fecha de tarea ID {tarea['id']}: {e}")
-                        continue
-                
-                tareas = tareas_filtradas
+                ''', (fecha_hoy, fecha_hoy + datetime.timedelta(days=1), fecha_hoy))
+                tareas = [dict(row) for row in cur.fetchall()]
                 
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al obtener tareas para notificación: {e}")
@@ -1846,6 +2403,213 @@ def update_fecha_ultima_notificacion_tarea(tarea_id):
             conn.close()
     return success
 
+def get_tareas_con_recordatorio_activo(hasta=None):
+    """
+    Obtiene las tareas pendientes con recordatorio activo que aún no vencieron.
+    A diferencia de get_tareas_para_notificacion, no filtra por "ya notificada hoy":
+    el planificador de recordatorios usa fecha_ultima_notificacion para calcular
+    el próximo instante de aviso.
+
+    Args:
+        hasta (datetime, optional): Sólo tareas cuyo aviso (notify_at) empieza antes
+            de este instante (la ventana del planificador); None para todas
+    """
+    condicion_ventana, params = "", [datetime.date.today()]
+    conn = connect_db()
+    tareas = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                if hasta is not None:
+                    condicion_ventana = f"AND {_columna_aviso(cur, 'tareas', 't')} < %s"
+                    params.append(hasta)
+                cur.execute(f'''
+                    SELECT t.*, c.caratula AS caso_caratula, cl.nombre as nombre_cliente
+                    FROM tareas t
+                    LEFT JOIN casos c ON t.caso_id = c.id
+                    LEFT JOIN clientes cl ON c.cliente_id = cl.id
+                    WHERE t.recordatorio_activo::int = 1
+                      AND t.estado NOT IN ('Completada', 'Cancelada')
+                      AND t.fecha_vencimiento >= %s
+                      {condicion_ventana}
+                    ORDER BY t.fecha_vencimiento
+                ''', params)
+                tareas = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener tareas con recordatorio activo: {e}")
+        finally:
+            conn.close()
+    return tareas
+
+def get_casos_con_control_inactividad():
+    """
+    Obtiene los datos necesarios para programar las alertas de inactividad de
+    todos los casos que tienen el control habilitado.
+    """
+    conn = connect_db()
+    casos = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute('''
+                    SELECT id, caratula, cliente_id, last_activity_timestamp,
+                           inactivity_threshold_days, last_inactivity_notification_timestamp
+                    FROM casos
+                    WHERE inactivity_enabled = 1
+                      AND last_activity_timestamp IS NOT NULL
+                ''')
+                casos = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener casos con control de inactividad: {e}")
+        finally:
+            conn.close()
+    return casos
+
+def get_casos_con_carpeta():
+    """Obtiene id, carátula y carpeta de los casos que tienen carpeta de documentos asignada."""
+    conn = connect_db()
+    casos = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute('''
+                    SELECT id, caratula, ruta_carpeta
+                    FROM casos
+                    WHERE ruta_carpeta IS NOT NULL AND ruta_carpeta <> ''
+                    ORDER BY id
+                ''')
+                casos = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener casos con carpeta: {e}")
+        finally:
+            conn.close()
+    return casos
+
+# --- Búsqueda de texto completo (notas, actividades, tareas y consultas) ---
+
+# Por tipo de resultado: tabla, joins, título, fecha y texto del que sale el fragmento
+_FUENTES_BUSQUEDA = {
+    'caso': {
+        'from': "casos x",
+        'caso_id': "x.id", 'prospecto_id': "NULL::INTEGER",
+        'titulo': "x.caratula", 'fecha': "to_timestamp(x.created_at)",
+        'texto': "coalesce(x.notas, '')",
+    },
+    'actividad': {
+        'from': "actividades_caso x JOIN casos c ON c.id = x.caso_id",
+        'caso_id': "x.caso_id", 'prospecto_id': "NULL::INTEGER",
+        'titulo': "c.caratula || ' - ' || x.tipo_actividad", 'fecha': "x.fecha_hora",
+        'texto': "x.descripcion",
+    },
+    'tarea': {
+        'from': "tareas x LEFT JOIN casos c ON c.id = x.caso_id",
+        'caso_id': "x.caso_id", 'prospecto_id': "NULL::INTEGER",
+        'titulo': "coalesce(c.caratula, 'Tarea general')", 'fecha': "x.fecha_creacion",
+        'texto': "concat_ws(E'\\n', x.descripcion, x.notas)",
+    },
+    'consulta': {
+        'from': "consultas x JOIN prospectos p ON p.id = x.prospecto_id",
+        'caso_id': "NULL::INTEGER", 'prospecto_id': "x.prospecto_id",
+        'titulo': "'Consulta de ' || p.nombre", 'fecha': "x.fecha_consulta::TIMESTAMP",
+        'texto': "concat_ws(E'\\n', x.relato_original_cliente, x.hechos_reformulados_ia, "
+                 "x.encuadre_legal_preliminar, x.resultado_consulta)",
+    },
+}
+
+def buscar_texto_completo(texto, tipos=None, caso_id=None, limite=50):
+    """
+    Busca `texto` (sintaxis tipo buscador web: "frase exacta", -excluir, or) en
+    las notas de casos, actividades, tareas y consultas de prospectos.
+
+    Cada fuente elige por índice GIN sus mejores `limite` filas según ts_rank_cd y
+    sólo sobre esas se calcula el fragmento resaltado (ts_headline es lo costoso).
+    Devuelve dicts con tipo, id, caso_id, prospecto_id, titulo, fecha, rango y fragmento.
+    """
+    if not texto or not texto.strip():
+        return []
+    tipos = [t for t in (tipos or _FUENTES_BUSQUEDA) if t in _FUENTES_BUSQUEDA]
+    if caso_id is not None:
+        tipos = [t for t in tipos if t != 'consulta']
+    if not tipos:
+        return []
+
+    subconsultas = []
+    parametros = []
+    for tipo in tipos:
+        fuente = _FUENTES_BUSQUEDA[tipo]
+        filtro_caso = f" AND {fuente['caso_id']} = %s" if caso_id is not None else ""
+        subconsultas.append(f'''
+            (SELECT '{tipo}' AS tipo, x.id, {fuente['caso_id']} AS caso_id, {fuente['prospecto_id']} AS prospecto_id,
+                    {fuente['titulo']} AS titulo, {fuente['fecha']} AS fecha,
+                    ts_rank_cd(x.busqueda_tsv, q.consulta) AS rango, {fuente['texto']} AS texto
+             FROM {fuente['from']}, q
+             WHERE x.busqueda_tsv @@ q.consulta{filtro_caso}
+             ORDER BY rango DESC
+             LIMIT %s)
+        ''')
+        if caso_id is not None:
+            parametros.append(caso_id)
+        parametros.append(limite)
+
+    sql = f'''
+        WITH q AS (SELECT websearch_to_tsquery('spanish', %s) AS consulta),
+        mejores AS (
+            SELECT * FROM ({" UNION ALL ".join(subconsultas)}) candidatos
+            ORDER BY rango DESC
+            LIMIT %s
+        )
+        SELECT m.tipo, m.id, m.caso_id, m.prospecto_id, m.titulo, m.fecha, m.rango,
+               ts_headline('spanish', m.texto, q.consulta,
+                           'StartSel=[, StopSel=], MaxFragments=2, MaxWords=18, MinWords=6, FragmentDelimiter=" … "') AS fragmento
+        FROM mejores m, q
+        ORDER BY m.rango DESC
+    '''
+    parametros = [texto.strip()] + parametros + [limite]
+
+    conn = connect_db()
+    resultados = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, parametros)
+                resultados = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error en la búsqueda de texto completo: {e}")
+        finally:
+            conn.close()
+    return resultados
+
+def buscar_omnibox(consulta_tsquery, prefijo_titulo, limite=15):
+    """
+    Busca en indice_omnibox (clientes, casos, contactos y prospectos) con una
+    tsquery 'simple' de prefijos ya normalizada (ver busqueda_omnibox.py).
+
+    El orden combina ts_rank (título pesa más que detalle) con un bono cuando
+    el título empieza por `prefijo_titulo`, y a igualdad prefiere títulos cortos.
+    """
+    sql = """
+        SELECT tipo, entidad_id, titulo, detalle,
+               ts_rank(vector, q) + CASE WHEN titulo_normalizado LIKE %s THEN 1 ELSE 0 END AS rango
+        FROM indice_omnibox, to_tsquery('simple', %s) q
+        WHERE vector @@ q
+        ORDER BY rango DESC, length(titulo), titulo
+        LIMIT %s
+    """
+    # El prefijo viene normalizado (sólo letras, dígitos y espacios): no hay comodines que escapar
+    patron = prefijo_titulo + '%'
+    conn = connect_db()
+    resultados = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, (patron, consulta_tsquery, limite))
+                resultados = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error en la búsqueda global: {e}")
+        finally:
+            conn.close()
+    return resultados
+
 # --- (OBSOLETO) Funciones CRUD para Partes Intervinientes ---
 # Estas funciones interactúan con la tabla `partes_intervinientes` que ha sido reemplazada 
 # por el sistema `contactos` + `roles_en_caso`. Se mantienen para consulta pero no deben usarse en código nuevo.
@@ -2614,7 +3378,9 @@ def update_contacto(contacto_id, datos_contacto):
         conn.rollback()
     finally:
         conn.close()
-        
+
+    if success:
+        notificar_cambio('contactos', 'UPDATE', contacto_id)
     return success
 
 def search_contactos(termino_busqueda, filtros=None, limite=50):
@@ -2784,6 +3550,191 @@ def search_contactos_fuzzy(termino_busqueda, umbral_similitud=0.3):
         
     return contactos
 
+def get_contactos_para_deduplicacion():
+    """Todos los contactos con la cantidad de roles de cada uno, en una consulta."""
+    conn = connect_db()
+    contactos = []
+    if not conn:
+        return contactos
+
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT c.id, c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit,
+                       c.domicilio_real, c.domicilio_legal, c.email, c.telefono, c.created_at,
+                       COALESCE(r.cantidad_roles, 0) AS cantidad_roles
+                FROM contactos c
+                LEFT JOIN (
+                    SELECT contacto_id, COUNT(*) AS cantidad_roles FROM roles_en_caso GROUP BY contacto_id
+                ) r ON r.contacto_id = c.id
+            """)
+            contactos = [dict(row) for row in cur.fetchall()]
+    except (Exception, psycopg2.DatabaseError) as e:
+        db_logger.error(f"Error al obtener contactos para deduplicación: {e}")
+    finally:
+        conn.close()
+
+    return contactos
+
+def detectar_contactos_duplicados(umbral=None):
+    """
+    Propuestas de fusión de contactos duplicados en todo el directorio.
+    Ver duplicados_contactos.detectar_duplicados para el formato.
+    """
+    from duplicados_contactos import UMBRAL_PROPUESTA, detectar_duplicados
+    return detectar_duplicados(get_contactos_para_deduplicacion(), umbral or UMBRAL_PROPUESTA)
+
+def fusionar_contactos(conservar_id, fusionar_ids):
+    """
+    Fusiona los contactos `fusionar_ids` en `conservar_id`, en una transacción:
+
+    - sus roles pasan a `conservar_id`; si el mismo caso ya tiene ese rol principal
+      (la restricción UNIQUE (caso_id, contacto_id, rol_principal) no admite dos) se
+      conserva uno solo. Lo que apuntaba al repetido pasa al que queda, y si ambos
+      representaban a partes distintas, el que queda las representa a todas en un
+      grupo de `representaciones`;
+    - los datos vacíos del contacto conservado se completan con los de los fusionados
+      y sus notas se agregan;
+    - los contactos fusionados se eliminan.
+
+    Returns:
+        dict: {'roles_reasignados', 'roles_unificados', 'contactos_eliminados', 'casos'}
+              o None si falla
+    """
+    fusionar_ids = sorted({int(i) for i in fusionar_ids if i and int(i) != int(conservar_id)})
+    if not conservar_id or not fusionar_ids:
+        return None
+
+    conn = connect_db()
+    if not conn:
+        return None
+
+    resultado = None
+    todos = [int(conservar_id)] + fusionar_ids
+    try:
+        with conn.cursor() as cur:
+            # Bloquear los contactos involucrados para que nadie les agregue roles a mitad de la fusión
+            cur.execute("SELECT id FROM contactos WHERE id = ANY(%s) ORDER BY id FOR UPDATE", (todos,))
+            if len(cur.fetchall()) != len(todos):
+                print(f"Error al fusionar contactos: alguno de {todos} no existe")
+                conn.rollback()
+                return None
+
+            # Para cada (caso, rol principal) queda un solo rol, como exige la restricción
+            # UNIQUE de roles_en_caso: el del contacto conservado si lo tiene
+            cur.execute("""
+                CREATE TEMP TABLE fusion_roles ON COMMIT DROP AS
+                SELECT id, caso_id, FIRST_VALUE(id) OVER (
+                           PARTITION BY caso_id, rol_principal
+                           ORDER BY (contacto_id = %(conservar)s) DESC, id
+                       ) AS queda
+                FROM roles_en_caso
+                WHERE contacto_id = ANY(%(todos)s)
+            """, {'conservar': conservar_id, 'todos': todos})
+            # Si los roles unificados representaban a partes distintas (el mismo abogado
+            # cargado dos veces, una por cada cliente), el que queda las representa a
+            # todas: se registran en su grupo de representaciones (o en uno nuevo)
+            cur.execute("""
+                WITH partes AS (
+                    SELECT DISTINCT f.queda, r.representa_a_id AS representado
+                    FROM fusion_roles f JOIN roles_en_caso r ON r.id = f.id
+                    WHERE r.representa_a_id IS NOT NULL AND r.representa_a_id <> f.queda
+                ), multiples AS (
+                    SELECT queda FROM partes GROUP BY queda HAVING COUNT(*) > 1
+                )
+                INSERT INTO representaciones (grupo_id, caso_id, rol_abogado_id, rol_representado_id, created_at)
+                SELECT COALESCE((SELECT rp.grupo_id FROM representaciones rp
+                                 JOIN fusion_roles g ON g.id = rp.rol_abogado_id
+                                 WHERE g.queda = q.id
+                                 ORDER BY (rp.rol_abogado_id = q.id) DESC, rp.id LIMIT 1), 'fusion_' || q.id),
+                       q.caso_id, q.id, p.representado, %(ahora)s
+                FROM partes p
+                JOIN multiples m ON m.queda = p.queda
+                JOIN roles_en_caso q ON q.id = p.queda
+                ON CONFLICT (grupo_id, rol_representado_id) DO NOTHING
+            """, {'ahora': int(time.time())})
+            # El que queda hereda el representado del repetido si no tenía uno propio
+            cur.execute("""
+                UPDATE roles_en_caso q SET representa_a_id = d.representa_a_id
+                FROM (
+                    SELECT DISTINCT ON (f.queda) f.queda, r.representa_a_id
+                    FROM fusion_roles f JOIN roles_en_caso r ON r.id = f.id
+                    WHERE f.id <> f.queda AND r.representa_a_id IS NOT NULL AND r.representa_a_id <> f.queda
+                    ORDER BY f.queda, f.id
+                ) d
+                WHERE q.id = d.queda AND q.representa_a_id IS NULL
+            """)
+            cur.execute("""
+                UPDATE roles_en_caso r SET representa_a_id = f.queda
+                FROM fusion_roles f
+                WHERE r.representa_a_id = f.id AND f.id <> f.queda AND r.id <> f.queda
+            """)
+            for columna in ('rol_abogado_id', 'rol_sombra_id'):
+                cur.execute(f"""
+                    UPDATE representaciones rp SET {columna} = f.queda
+                    FROM fusion_roles f
+                    WHERE rp.{columna} = f.id AND f.id <> f.queda
+                """)
+            cur.execute("""
+                UPDATE representaciones rp SET rol_representado_id = f.queda
+                FROM fusion_roles f
+                WHERE rp.rol_representado_id = f.id AND f.id <> f.queda
+                  AND NOT EXISTS (
+                      SELECT 1 FROM representaciones otra
+                      WHERE otra.grupo_id = rp.grupo_id AND otra.rol_representado_id = f.queda
+                  )
+            """)
+            cur.execute("""
+                DELETE FROM roles_en_caso r USING fusion_roles f
+                WHERE r.id = f.id AND f.id <> f.queda
+            """)
+            roles_unificados = cur.rowcount
+            cur.execute("""
+                UPDATE roles_en_caso SET contacto_id = %s WHERE contacto_id = ANY(%s)
+            """, (conservar_id, fusionar_ids))
+            roles_reasignados = cur.rowcount
+            cur.execute("SELECT DISTINCT caso_id FROM fusion_roles")
+            casos = [fila[0] for fila in cur.fetchall()]
+
+            # Completar los datos vacíos del conservado con los del fusionado más antiguo que los tenga
+            completar = ', '.join(
+                f"""{columna} = COALESCE(NULLIF(d.{columna}, ''), (
+                        SELECT o.{columna} FROM contactos o
+                        WHERE o.id = ANY(%(fusionar)s) AND NULLIF(o.{columna}, '') IS NOT NULL
+                        ORDER BY o.id LIMIT 1))"""
+                for columna in ('dni', 'cuit', 'domicilio_real', 'domicilio_legal', 'email', 'telefono')
+            )
+            cur.execute(f"""
+                UPDATE contactos d SET {completar},
+                    notas_generales = NULLIF(concat_ws(E'\\n', NULLIF(d.notas_generales, ''), (
+                        SELECT string_agg(o.notas_generales, E'\\n' ORDER BY o.id) FROM contactos o
+                        WHERE o.id = ANY(%(fusionar)s) AND NULLIF(o.notas_generales, '') IS NOT NULL)), '')
+                WHERE d.id = %(conservar)s
+            """, {'fusionar': fusionar_ids, 'conservar': conservar_id})
+            cur.execute("DELETE FROM contactos WHERE id = ANY(%s)", (fusionar_ids,))
+            contactos_eliminados = cur.rowcount
+        conn.commit()
+        resultado = {
+            'roles_reasignados': roles_reasignados,
+            'roles_unificados': roles_unificados,
+            'contactos_eliminados': contactos_eliminados,
+            'casos': casos,
+        }
+        db_logger.info(f"Contactos {fusionar_ids} fusionados en {conservar_id}: {resultado}")
+    except (Exception, psycopg2.DatabaseError) as e:
+        db_logger.error(f"Error al fusionar contactos {fusionar_ids} en {conservar_id}: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    if resultado:
+        for contacto_id in fusionar_ids:
+            notificar_cambio('contactos', 'DELETE', contacto_id)
+        notificar_cambio('contactos', 'UPDATE', conservar_id)
+        for caso_id in resultado['casos']:
+            notificar_cambio('roles_en_caso', 'UPDATE', None, caso_id)
+    return resultado
+
 def get_contactos_recientes(limite=10):
     """
     Obtiene los contactos creados más recientemente.
@@ -2898,7 +3849,9 @@ def delete_contacto(contacto_id):
         conn.rollback()
     finally:
         conn.close()
-        
+
+    if success:
+        notificar_cambio('contactos', 'DELETE', contacto_id)
     return success
 
 def count_casos_por_contacto_id(contacto_id):
@@ -3014,145 +3967,40 @@ def validate_multiple_representation_consistency(caso_id):
     """
     Valida la consistencia de las representaciones múltiples en un caso.
     Retorna un diccionario con errores encontrados y sugerencias de corrección.
+    Se resuelve sobre el grafo de representaciones en caché del caso.
     """
-    conn = connect_db()
-    if not conn:
+    grafo = get_grafo_representaciones(caso_id)
+    if grafo is None:
         return {'error': 'No se pudo conectar a la base de datos'}
-    
-    validation_results = {
-        'errors': [],
-        'warnings': [],
-        'orphaned_representations': [],
-        'inconsistent_groups': [],
-        'suggestions': []
-    }
-    
-    try:
-        with conn.cursor() as cur:
-            # Obtener todos los roles del caso
-            cur.execute("""
-                SELECT r.id, r.contacto_id, r.rol_principal, r.notas_del_rol, r.representa_a_id,
-                       c.nombre_completo
-                FROM roles_en_caso r
-                JOIN contactos c ON r.contacto_id = c.id
-                WHERE r.caso_id = %s
-            """, (caso_id,))
-            
-            roles = cur.fetchall()
-            
-            # Analizar representaciones múltiples
-            multiple_rep_groups = {}
-            orphaned_reps = []
-            
-            for rol_id, contacto_id, rol_principal, notas, representa_a_id, nombre in roles:
-                notas = notas or ''
-                
-                # Verificar representaciones múltiples
-                if 'REPRESENTACION_MULTIPLE' in notas:
-                    import re
-                    group_match = re.search(r'REPRESENTACION_MULTIPLE:([^:]+):([^]]+)', notas)
-                    
-                    if group_match:
-                        rep_type = group_match.group(1)  # PRIMARY o SECONDARY
-                        group_id = group_match.group(2)
-                        
-                        if group_id not in multiple_rep_groups:
-                            multiple_rep_groups[group_id] = {
-                                'primary': None,
-                                'secondary': [],
-                                'lawyer_name': None
-                            }
-                        
-                        if rep_type == 'PRIMARY':
-                            if multiple_rep_groups[group_id]['primary'] is not None:
-                                validation_results['errors'].append(
-                                    f"Grupo {group_id}: Múltiples roles PRIMARY encontrados"
-                                )
-                            multiple_rep_groups[group_id]['primary'] = rol_id
-                            multiple_rep_groups[group_id]['lawyer_name'] = nombre
-                        elif rep_type == 'SECONDARY':
-                            multiple_rep_groups[group_id]['secondary'].append(rol_id)
-                    else:
-                        validation_results['warnings'].append(
-                            f"Rol {rol_id} ({nombre}): Nota de representación múltiple malformada"
-                        )
-                
-                # Verificar representaciones huérfanas
-                if representa_a_id:
-                    # Verificar que el rol representado existe
-                    represented_exists = any(r[0] == representa_a_id for r in roles)
-                    if not represented_exists:
-                        orphaned_reps.append({
-                            'rol_id': rol_id,
-                            'nombre': nombre,
-                            'representa_a_id_inexistente': representa_a_id
-                        })
-            
-            # Validar grupos de representación múltiple
-            for group_id, group_data in multiple_rep_groups.items():
-                if group_data['primary'] is None:
-                    validation_results['errors'].append(
-                        f"Grupo {group_id}: No se encontró rol PRIMARY"
-                    )
-                
-                if not group_data['secondary']:
-                    validation_results['warnings'].append(
-                        f"Grupo {group_id}: No hay roles SECONDARY (representación múltiple sin representados)"
-                    )
-            
-            # Registrar representaciones huérfanas
-            validation_results['orphaned_representations'] = orphaned_reps
-            
-            # Generar sugerencias
-            if orphaned_reps:
-                validation_results['suggestions'].append(
-                    "Ejecutar limpieza de representaciones huérfanas con clean_orphaned_representations()"
-                )
-            
-            if validation_results['errors']:
-                validation_results['suggestions'].append(
-                    "Revisar y corregir manualmente los grupos de representación múltiple inconsistentes"
-                )
-    
-    except Exception as e:
-        validation_results['error'] = f"Error durante validación: {str(e)}"
-    finally:
-        conn.close()
-    
-    return validation_results
+    return grafo.validar_consistencia()
 
 def clean_orphaned_representations(caso_id):
     """
-    Limpia representaciones huérfanas en un caso específico.
+    Limpia representaciones huérfanas en un caso específico: un único UPDATE
+    sobre todo el caso, en una transacción.
     """
-    conn = connect_db()
-    if not conn:
-        return False
-    
     try:
-        with conn.cursor() as cur:
-            # Limpiar representa_a_id que apuntan a roles inexistentes
+        with transaccion(connect_db) as cur:
+            # Limpiar representa_a_id que apuntan a roles inexistentes o de otro caso
             cur.execute("""
-                UPDATE roles_en_caso 
+                UPDATE roles_en_caso r
                 SET representa_a_id = NULL 
-                WHERE caso_id = %s 
-                AND representa_a_id NOT IN (
-                    SELECT id FROM roles_en_caso WHERE caso_id = %s
+                WHERE r.caso_id = %s 
+                AND r.representa_a_id IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM roles_en_caso rep
+                    WHERE rep.id = r.representa_a_id AND rep.caso_id = r.caso_id
                 )
-            """, (caso_id, caso_id))
-            
+            """, (caso_id,))
             cleaned_count = cur.rowcount
-            conn.commit()
-            
-            print(f"Limpiadas {cleaned_count} representaciones huérfanas en caso {caso_id}")
-            return True
-            
-    except Exception as e:
+    except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error limpiando representaciones huérfanas: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
+
+    if cleaned_count:
+        notificar_cambio('roles_en_caso', 'UPDATE', None, caso_id)
+    print(f"Limpiadas {cleaned_count} representaciones huérfanas en caso {caso_id}")
+    return True
 
 def fix_duplicate_multiple_representations(caso_id):
     """
@@ -3165,12 +4013,16 @@ def fix_duplicate_multiple_representations(caso_id):
     
     try:
         with conn.cursor() as cur:
-            # Encontrar abogados con múltiples roles en el mismo caso
+            # Encontrar abogados con múltiples roles en el mismo caso que no estén ya agrupados
             cur.execute("""
                 SELECT contacto_id, COUNT(*) as role_count
-                FROM roles_en_caso 
+                FROM roles_en_caso r
                 WHERE caso_id = %s 
                 AND rol_principal IN ('Abogado', 'Apoderado')
+                AND NOT EXISTS (
+                    SELECT 1 FROM representaciones rp
+                    WHERE rp.rol_abogado_id = r.id OR rp.rol_sombra_id = r.id
+                )
                 GROUP BY contacto_id
                 HAVING COUNT(*) > 1
             """, (caso_id,))
@@ -3186,11 +4038,15 @@ def fix_duplicate_multiple_representations(caso_id):
             for contacto_id, role_count in duplicate_lawyers:
                 print(f"Corrigiendo abogado contacto_id {contacto_id} con {role_count} roles")
                 
-                # Obtener todos los roles de este abogado en el caso
+                # Obtener todos los roles sin agrupar de este abogado en el caso
                 cur.execute("""
                     SELECT id, rol_principal, rol_secundario, representa_a_id, notas_del_rol
-                    FROM roles_en_caso 
+                    FROM roles_en_caso r
                     WHERE caso_id = %s AND contacto_id = %s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM representaciones rp
+                        WHERE rp.rol_abogado_id = r.id OR rp.rol_sombra_id = r.id
+                    )
                     ORDER BY id
                 """, (caso_id, contacto_id))
                 
@@ -3251,20 +4107,22 @@ def fix_duplicate_multiple_representations(caso_id):
                     WHERE id = %s
                 """, (new_notas, primary_id))
                 
-                # Crear roles shadow
+                # Crear roles shadow y registrar el grupo, en la misma transacción que el resto
+                # de la corrección: si algo falla no queda una reparación a medias
+                filas_grupo = []
                 for party in represented_parties:
-                    shadow_data = {
-                        'caso_id': caso_id,
-                        'contacto_id': contacto_id,
-                        'rol_principal': rol_principal,
-                        'rol_secundario': rol_secundario,
-                        'representa_a_id': party['party_id'],
-                        'notas_del_rol': f"[REPRESENTACION_MULTIPLE:SECONDARY:{group_id}] Shadow role for {party['party_name']}"
-                    }
-                    
-                    shadow_role_id = add_rol_a_caso(shadow_data)
-                    if shadow_role_id:
-                        print(f"Creado rol shadow {shadow_role_id} para {party['party_name']}")
+                    cur.execute("""
+                        INSERT INTO roles_en_caso
+                            (caso_id, contacto_id, rol_principal, rol_secundario, representa_a_id, notas_del_rol, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        RETURNING id
+                    """, (caso_id, contacto_id, rol_principal, rol_secundario, party['party_id'],
+                          f"[REPRESENTACION_MULTIPLE:SECONDARY:{group_id}] Shadow role for {party['party_name']}",
+                          int(time.time())))
+                    shadow_role_id = cur.fetchone()[0]
+                    filas_grupo.append((group_id, caso_id, primary_id, party['party_id'], shadow_role_id))
+                    print(f"Creado rol shadow {shadow_role_id} para {party['party_name']}")
+                _registrar_representaciones(cur, filas_grupo)
                 
                 # Eliminar roles duplicados
                 for role_id in roles_to_delete:
@@ -3273,7 +4131,9 @@ def fix_duplicate_multiple_representations(caso_id):
                 
                 print(f"Corregido abogado contacto_id {contacto_id}: 1 rol principal + {len(represented_parties)} roles shadow")
             
+            cur.execute('UPDATE casos SET last_activity_timestamp = %s WHERE id = %s', (int(time.time()), caso_id))
             conn.commit()
+            notificar_cambio('roles_en_caso', 'UPDATE', None, caso_id)
             print(f"Corrección completada para caso {caso_id}")
             return True
             
@@ -3284,6 +4144,44 @@ def fix_duplicate_multiple_representations(caso_id):
     finally:
         conn.close()
 
+def _registrar_representaciones(cur, filas):
+    """
+    Inserta filas (grupo_id, caso_id, rol_abogado_id, rol_representado_id, rol_sombra_id)
+    en `representaciones`. Las que apuntan a roles inexistentes o de otro caso se omiten.
+    Devuelve cuántas se insertaron.
+    """
+    ahora = int(time.time())
+    filas = [tuple(fila) + (ahora,) for fila in filas]
+    if not filas:
+        return 0
+    # Un solo INSERT ... SELECT FROM (VALUES ...) para todo el lote
+    insertadas = psycopg2.extras.execute_values(cur, """
+        INSERT INTO representaciones (grupo_id, caso_id, rol_abogado_id, rol_representado_id, rol_sombra_id, created_at)
+        SELECT v.grupo_id, v.caso_id, v.rol_abogado_id, v.rol_representado_id, v.rol_sombra_id, v.created_at
+        FROM (VALUES %s) AS v (grupo_id, caso_id, rol_abogado_id, rol_representado_id, rol_sombra_id, created_at)
+        WHERE EXISTS (SELECT 1 FROM roles_en_caso WHERE id = v.rol_abogado_id AND caso_id = v.caso_id)
+          AND EXISTS (SELECT 1 FROM roles_en_caso WHERE id = v.rol_representado_id AND caso_id = v.caso_id)
+        ON CONFLICT (grupo_id, rol_representado_id) DO NOTHING
+        RETURNING id
+    """, filas, template="(%s, %s::int, %s::int, %s::int, %s::int, %s::bigint)",
+        page_size=TAMANO_PAGINA, fetch=True)
+    return len(insertadas)
+
+def migrar_representaciones_desde_notas(cur):
+    """
+    Convierte las representaciones múltiples guardadas como marcas
+    [REPRESENTACION_MULTIPLE:PRIMARY|SECONDARY:<grupo>] en `notas_del_rol` en filas
+    de `representaciones`. Idempotente. Devuelve cuántas filas se crearon.
+    """
+    cur.execute("""
+        SELECT id, caso_id, contacto_id, representa_a_id, notas_del_rol
+        FROM roles_en_caso
+        WHERE notas_del_rol LIKE '%REPRESENTACION_MULTIPLE:%'
+    """)
+    columnas = [desc[0] for desc in cur.description]
+    roles = [dict(zip(columnas, fila)) for fila in cur.fetchall()]
+    return _registrar_representaciones(cur, filas_representacion_desde_notas(roles))
+
 def get_representation_group_id(contacto_id, caso_id):
     """
     Genera un ID único para un grupo de representación múltiple.
@@ -3349,6 +4247,7 @@ def detect_multiple_representations_in_case(caso_id):
     """
     Detecta todos los casos de representación múltiple en un caso basándose en las notas del rol.
     Funciona con la nueva estructura donde hay un rol principal y roles shadow.
+    Se resuelve sobre el grafo de representaciones en caché del caso.
     
     Args:
         caso_id (int): ID del caso
@@ -3358,106 +4257,9 @@ def detect_multiple_representations_in_case(caso_id):
     """
     if not caso_id:
         return {}
-        
-    conn = connect_db()
-    if not conn:
-        return {}
 
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Buscar roles principales de representación múltiple
-            cur.execute("""
-                SELECT 
-                    r.contacto_id,
-                    r.id as rol_id,
-                    r.rol_principal,
-                    r.notas_del_rol,
-                    c.nombre_completo as lawyer_name
-                FROM roles_en_caso r
-                JOIN contactos c ON r.contacto_id = c.id
-                WHERE r.caso_id = %s
-                AND r.rol_principal IN ('Abogado', 'Apoderado')
-                AND r.notas_del_rol LIKE '%REPRESENTACION_MULTIPLE:PRIMARY:%'
-            """, (caso_id,))
-            
-            primary_roles = cur.fetchall()
-            multiple_reps = {}
-            
-            for primary_role in primary_roles:
-                contacto_id = primary_role['contacto_id']
-                notas = primary_role['notas_del_rol'] or ''
-                
-                # Extraer group_id
-                import re
-                group_match = re.search(r'REPRESENTACION_MULTIPLE:PRIMARY:([^]]+)', notas)
-                if not group_match:
-                    continue
-                
-                group_id = group_match.group(1)
-                
-                # Buscar roles shadow asociados a este grupo
-                cur.execute("""
-                    SELECT 
-                        r.id as shadow_rol_id,
-                        r.representa_a_id,
-                        represented.rol_principal as represented_role,
-                        represented_contact.nombre_completo as represented_name
-                    FROM roles_en_caso r
-                    LEFT JOIN roles_en_caso represented ON r.representa_a_id = represented.id
-                    LEFT JOIN contactos represented_contact ON represented.contacto_id = represented_contact.id
-                    WHERE r.caso_id = %s 
-                    AND r.contacto_id = %s
-                    AND r.notas_del_rol LIKE %s
-                """, (caso_id, contacto_id, f'%REPRESENTACION_MULTIPLE:SECONDARY:{group_id}%'))
-                
-                shadow_roles = cur.fetchall()
-                
-                # Construir lista de representaciones
-                representations = []
-                for shadow in shadow_roles:
-                    if shadow['representa_a_id'] and shadow['represented_name']:
-                        representations.append({
-                            'rol_id': shadow['shadow_rol_id'],
-                            'represented_role': shadow['represented_role'],
-                            'represented_name': shadow['represented_name'],
-                            'represents_id': shadow['representa_a_id'],
-                            'is_secondary': True
-                        })
-                
-                # Si no hay roles shadow, intentar extraer de las notas del rol principal
-                if not representations:
-                    # Parsear las notas para extraer representaciones
-                    lines = notas.split('\n')
-                    for line in lines:
-                        if '[ID:' in line and ']' in line:
-                            # Extraer información de la línea como "- Nombre (Rol) [ID:123]"
-                            match = re.search(r'-\s*(.+?)\s*\((.+?)\)\s*\[ID:(\d+)\]', line)
-                            if match:
-                                name, role, party_id = match.groups()
-                                representations.append({
-                                    'rol_id': primary_role['rol_id'],
-                                    'represented_role': role.strip(),
-                                    'represented_name': name.strip(),
-                                    'represents_id': int(party_id),
-                                    'is_secondary': False
-                                })
-                
-                if representations:
-                    multiple_reps[contacto_id] = {
-                        'lawyer_name': primary_role['lawyer_name'],
-                        'representations': representations,
-                        'is_multiple': True,
-                        'primary_role_id': primary_role['rol_id'],
-                        'group_id': group_id
-                    }
-            
-            return multiple_reps
-            
-    except (Exception, psycopg2.DatabaseError) as e:
-        print(f"Error al detectar representaciones múltiples en caso {caso_id}: {e}")
-        return {}
-    finally:
-        conn.close()
+    grafo = get_grafo_representaciones(caso_id)
+    return grafo.representaciones_multiples() if grafo is not None else {}
 
 def validate_multiple_representation_request(contacto_id, caso_id, represented_party_ids):
     """
@@ -3520,9 +4322,110 @@ def validate_multiple_representation_request(contacto_id, caso_id, represented_p
     
     return len(errors) == 0, errors
 
+def _crear_representaciones_multiples(cur, contacto_id, caso_id, rol_data, represented_party_ids):
+    """
+    Crea el rol principal del abogado, un rol "sombra" por cada parte representada y
+    las filas de `representaciones`, sobre el cursor `cur` y sin confirmar: los roles
+    se insertan en un solo INSERT multi-fila y las representaciones en otro.
+    Devuelve el dict de resultado o None si falta el caso, el contacto o alguna parte.
+    """
+    cur.execute("""
+        SELECT EXISTS (SELECT 1 FROM casos WHERE id = %s),
+               EXISTS (SELECT 1 FROM contactos WHERE id = %s)
+    """, (caso_id, contacto_id))
+    caso_existe, contacto_existe = cur.fetchone()
+    if not caso_existe or not contacto_existe:
+        print(f"Error: no existe el caso {caso_id} o el contacto {contacto_id}")
+        return None
+
+    # Datos de todas las partes representadas en una sola consulta
+    cur.execute("""
+        SELECT r.id, r.rol_principal, c.nombre_completo
+        FROM roles_en_caso r
+        JOIN contactos c ON r.contacto_id = c.id
+        WHERE r.id = ANY(%s) AND r.caso_id = %s
+    """, (list(represented_party_ids), caso_id))
+    partes = {fila[0]: fila for fila in cur.fetchall()}
+    faltantes = [party_id for party_id in represented_party_ids if party_id not in partes]
+    if faltantes:
+        print(f"Error: roles {faltantes} no existen en el caso {caso_id}")
+        return None
+    represented_details = [{
+        'party_id': party_id,
+        'party_name': partes[party_id][2] or 'N/A',
+        'party_role': partes[party_id][1] or 'N/A'
+    } for party_id in represented_party_ids]
+
+    def _texto(valor):
+        if isinstance(valor, str):
+            valor = valor.strip()
+        return valor or None
+
+    rol_principal = _texto(rol_data.get('rol_principal')) or 'Abogado'
+    rol_secundario = _texto(rol_data.get('rol_secundario'))
+
+    # Las mismas validaciones que add_rol_a_caso aplicaba a cada fila cuando se
+    # insertaban de a una: duplicados y referencias circulares
+    if rol_principal not in ['Abogado', 'Apoderado']:
+        cur.execute("""
+            SELECT id FROM roles_en_caso
+            WHERE caso_id = %s AND contacto_id = %s AND rol_principal = %s
+        """, (caso_id, contacto_id, rol_principal))
+        if cur.fetchone():
+            print(f"Error: el contacto {contacto_id} ya tiene el rol '{rol_principal}' en el caso {caso_id}")
+            return None
+    grafo = _grafo_en_transaccion(cur.connection, caso_id)
+    circulares = [party_id for party_id in represented_party_ids if grafo.crearia_ciclo(party_id)]
+    if circulares:
+        print(f"Error: representar a los roles {circulares} crearía una referencia circular")
+        return None
+
+    # Generar ID de grupo para esta representación múltiple
+    group_id = get_representation_group_id(contacto_id, caso_id)
+
+    # Las notas del rol principal siguen listando las partes, para mostrarlas en la interfaz
+    notas_existentes = rol_data.get('notas_del_rol', '') or ''
+    notas_representacion = f"[REPRESENTACION_MULTIPLE:PRIMARY:{group_id}]\n"
+    notas_representacion += f"Representa a {len(represented_party_ids)} parte(s):\n"
+    for detail in represented_details:
+        notas_representacion += f"- {detail['party_name']} ({detail['party_role']}) [ID:{detail['party_id']}]\n"
+
+    ahora = int(time.time())
+    columnas = ['caso_id', 'contacto_id', 'rol_principal', 'rol_secundario',
+                'representa_a_id', 'datos_bancarios', 'notas_del_rol', 'created_at']
+    # Para representaciones múltiples el rol principal no usa representa_a_id;
+    # cada rol "shadow" mantiene la relación con una parte
+    filas = [(caso_id, contacto_id, rol_principal, rol_secundario, None,
+              _texto(rol_data.get('datos_bancarios')),
+              f"{notas_existentes}\n{notas_representacion}".strip(), ahora)]
+    filas += [(caso_id, contacto_id, rol_principal, rol_secundario, detail['party_id'], None,
+               f"[REPRESENTACION_MULTIPLE:SECONDARY:{group_id}] Shadow role for {detail['party_name']}", ahora)
+              for detail in represented_details]
+    creados = insertar_lote(cur, 'roles_en_caso', columnas, filas, retorno='id, representa_a_id')
+
+    primary_role_id = next(rol_id for rol_id, representa_a_id in creados if representa_a_id is None)
+    sombra_por_parte = {representa_a_id: rol_id for rol_id, representa_a_id in creados if representa_a_id is not None}
+    shadow_roles = [dict(detail, rol_id=sombra_por_parte[detail['party_id']]) for detail in represented_details]
+
+    # Registrar el grupo en la tabla normalizada
+    _registrar_representaciones(cur, [
+        (group_id, caso_id, primary_role_id, shadow['party_id'], shadow['rol_id']) for shadow in shadow_roles
+    ])
+    cur.execute('UPDATE casos SET last_activity_timestamp = %s WHERE id = %s', (ahora, caso_id))
+
+    return {
+        'primary_role_id': primary_role_id,
+        'group_id': group_id,
+        'total_representations': len(represented_party_ids),
+        'represented_parties': represented_details,
+        'shadow_roles': shadow_roles,
+        'success': True
+    }
+
 def create_multiple_representations(contacto_id, caso_id, rol_data, represented_party_ids):
     """
     Crea un abogado con representaciones múltiples usando UN SOLO ROL.
+    Todos los roles y representaciones se escriben en una única transacción.
     
     Args:
         contacto_id (int): ID del contacto (abogado)
@@ -3545,88 +4448,24 @@ def create_multiple_representations(contacto_id, caso_id, rol_data, represented_
     
     try:
         with conn.cursor() as cur:
-            # Generar ID de grupo para esta representación múltiple
-            group_id = get_representation_group_id(contacto_id, caso_id)
-            
-            # Preparar datos del rol principal (UN SOLO ROL para el abogado)
-            role_data = rol_data.copy()
-            role_data['caso_id'] = caso_id
-            role_data['contacto_id'] = contacto_id
-            
-            # Para representaciones múltiples, no usar representa_a_id en el rol principal
-            # En su lugar, usar las notas para indicar las representaciones múltiples
-            role_data['representa_a_id'] = None
-            
-            # Crear lista de partes representadas para las notas
-            represented_details = []
-            for party_id in represented_party_ids:
-                party_info = get_role_details(party_id)
-                if party_info:
-                    represented_details.append({
-                        'party_id': party_id,
-                        'party_name': party_info.get('nombre_completo', 'N/A'),
-                        'party_role': party_info.get('rol_principal', 'N/A')
-                    })
-            
-            # Crear notas detalladas de representación múltiple
-            notas_existentes = role_data.get('notas_del_rol', '') or ''
-            notas_representacion = f"[REPRESENTACION_MULTIPLE:PRIMARY:{group_id}]\n"
-            notas_representacion += f"Representa a {len(represented_party_ids)} parte(s):\n"
-            
-            for detail in represented_details:
-                notas_representacion += f"- {detail['party_name']} ({detail['party_role']}) [ID:{detail['party_id']}]\n"
-            
-            role_data['notas_del_rol'] = f"{notas_existentes}\n{notas_representacion}".strip()
-            
-            # Crear el rol principal del abogado
-            primary_role_id = add_rol_a_caso(role_data)
-            
-            if not primary_role_id:
-                print("Error al crear el rol principal del abogado")
-                return None
-            
-            # Crear roles "shadow" para cada parte representada (para mantener las relaciones)
-            shadow_roles = []
-            for i, party_id in enumerate(represented_party_ids):
-                shadow_data = {
-                    'caso_id': caso_id,
-                    'contacto_id': contacto_id,
-                    'rol_principal': rol_data.get('rol_principal', 'Abogado'),
-                    'rol_secundario': rol_data.get('rol_secundario', ''),
-                    'representa_a_id': party_id,
-                    'notas_del_rol': f"[REPRESENTACION_MULTIPLE:SECONDARY:{group_id}] Shadow role for {represented_details[i]['party_name']}"
-                }
-                
-                shadow_role_id = add_rol_a_caso(shadow_data)
-                if shadow_role_id:
-                    shadow_roles.append({
-                        'rol_id': shadow_role_id,
-                        'party_id': party_id,
-                        'party_name': represented_details[i]['party_name'],
-                        'party_role': represented_details[i]['party_role']
-                    })
-                else:
-                    print(f"Advertencia: No se pudo crear rol shadow para party_id {party_id}")
-            
-            print(f"Creado abogado con representaciones múltiples: rol principal {primary_role_id}, {len(shadow_roles)} roles shadow")
-            
-            return {
-                'primary_role_id': primary_role_id,
-                'group_id': group_id,
-                'total_representations': len(represented_party_ids),
-                'represented_parties': represented_details,
-                'shadow_roles': shadow_roles,
-                'success': True
-            }
+            result = _crear_representaciones_multiples(cur, contacto_id, caso_id, rol_data, represented_party_ids)
+        if not result:
+            conn.rollback()
+            return None
+        conn.commit()
+        notificar_cambio('roles_en_caso', 'INSERT', result['primary_role_id'], caso_id)
+        notificar_cambio('representaciones', 'INSERT', result['primary_role_id'], caso_id)
+
+        print(f"Creado abogado con representaciones múltiples: rol principal {result['primary_role_id']}, "
+              f"{len(result['shadow_roles'])} roles shadow")
+        return result
             
-    except Exception as e:
+    except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error al crear representaciones múltiples: {e}")
         conn.rollback()
         return None
     finally:
         conn.close()
-    
-    return None
 
 def get_multiple_representations(rol_id):
     """
@@ -3659,9 +4498,27 @@ def get_multiple_representations(rol_id):
             if not lawyer_role:
                 return None
             
-            # Verificar si es un rol de representación múltiple
-            notas = lawyer_role.get('notas_del_rol', '') or ''
-            if 'REPRESENTACION_MULTIPLE' not in notas:
+            # Verificar si es un rol de representación múltiple (como abogado principal o rol sombra)
+            cur.execute("""
+                SELECT 
+                    rp.grupo_id,
+                    COALESCE(rp.rol_sombra_id, rp.rol_abogado_id) as lawyer_role_id,
+                    rp.rol_representado_id as representa_a_id,
+                    party_r.rol_principal as party_role,
+                    party_c.nombre_completo as party_name
+                FROM representaciones rp
+                JOIN roles_en_caso party_r ON rp.rol_representado_id = party_r.id
+                JOIN contactos party_c ON party_r.contacto_id = party_c.id
+                WHERE rp.grupo_id = (
+                    SELECT grupo_id FROM representaciones
+                    WHERE rol_abogado_id = %s OR rol_sombra_id = %s
+                    LIMIT 1
+                )
+                ORDER BY party_r.rol_principal, party_c.nombre_completo
+            """, (rol_id, rol_id))
+            representations = cur.fetchall()
+
+            if not representations:
                 # Es una representación simple
                 if lawyer_role.get('representa_a_id'):
                     cur.execute("""
@@ -3685,32 +4542,7 @@ def get_multiple_representations(rol_id):
                         }
                 return None
             
-            # Es representación múltiple - extraer group_id
-            import re
-            group_match = re.search(r'REPRESENTACION_MULTIPLE:[^:]+:([^]]+)', notas)
-            if not group_match:
-                return None
-            
-            group_id = group_match.group(1)
-            
-            # Obtener todos los roles del mismo grupo
-            cur.execute("""
-                SELECT 
-                    r.id as lawyer_role_id,
-                    r.representa_a_id,
-                    party_r.rol_principal as party_role,
-                    party_c.nombre_completo as party_name
-                FROM roles_en_caso r
-                LEFT JOIN roles_en_caso party_r ON r.representa_a_id = party_r.id
-                LEFT JOIN contactos party_c ON party_r.contacto_id = party_c.id
-                WHERE r.contacto_id = %s 
-                AND r.caso_id = %s
-                AND r.notas_del_rol LIKE %s
-                AND r.representa_a_id IS NOT NULL
-                ORDER BY party_r.rol_principal, party_c.nombre_completo
-            """, (lawyer_role['contacto_id'], lawyer_role['caso_id'], f'%{group_id}%'))
-            
-            representations = cur.fetchall()
+            group_id = representations[0]['grupo_id']
             
             represented_parties = []
             for rep in representations:
@@ -3756,39 +4588,46 @@ def update_multiple_representations(primary_role_id, new_represented_party_ids):
     current_info = get_multiple_representations(primary_role_id)
     if not current_info:
         return False
+
+    contacto_id = current_info.get('lawyer_contact_id')
+    caso_id = current_info.get('case_id')
+    if not current_info['is_multiple']:
+        rol_actual = get_role_details(primary_role_id)
+        if not rol_actual:
+            return False
+        contacto_id, caso_id = rol_actual['contacto_id'], rol_actual['caso_id']
+
+    is_valid, errors = validate_multiple_representation_request(contacto_id, caso_id, new_represented_party_ids)
+    if not is_valid:
+        print(f"Error en validación de representación múltiple: {errors}")
+        return False
     
     conn = connect_db()
     if not conn:
         return False
     
+    # Borrado del grupo anterior y creación del nuevo en la misma transacción:
+    # si algo falla el abogado conserva sus representaciones actuales
+    success = False
     try:
         with conn.cursor() as cur:
             # Si es representación múltiple, eliminar todos los roles del grupo
             if current_info['is_multiple']:
                 group_id = current_info['group_id']
                 
-                # Eliminar todos los roles del grupo
+                # Eliminar todos los roles del grupo (sus filas de representaciones caen en cascada)
                 cur.execute("""
                     DELETE FROM roles_en_caso 
-                    WHERE contacto_id = %s 
-                    AND caso_id = %s 
-                    AND notas_del_rol LIKE %s
-                """, (current_info['lawyer_contact_id'], current_info['case_id'], f'%{group_id}%'))
+                    WHERE id = %s OR id IN (
+                        SELECT rol_abogado_id FROM representaciones WHERE grupo_id = %s
+                        UNION
+                        SELECT rol_sombra_id FROM representaciones WHERE grupo_id = %s
+                    )
+                """, (primary_role_id, group_id, group_id))
             else:
                 # Es representación simple, eliminar solo el rol actual
                 cur.execute("DELETE FROM roles_en_caso WHERE id = %s", (primary_role_id,))
             
-            # Obtener datos del rol original para recrear
-            cur.execute("""
-                SELECT r.*, c.nombre_completo
-                FROM roles_en_caso r
-                JOIN contactos c ON r.contacto_id = c.id
-                WHERE r.contacto_id = %s AND r.caso_id = %s
-                AND r.rol_principal IN ('Abogado', 'Apoderado')
-                LIMIT 1
-            """, (current_info['lawyer_contact_id'], current_info['case_id']))
-            
-            # Si no hay rol base, usar datos por defecto
             rol_data = {
                 'rol_principal': 'Abogado',
                 'rol_secundario': '',
@@ -3797,28 +4636,24 @@ def update_multiple_representations(primary_role_id, new_represented_party_ids):
             }
             
             # Crear nuevas representaciones
-            result = create_multiple_representations(
-                current_info['lawyer_contact_id'],
-                current_info['case_id'],
-                rol_data,
-                new_represented_party_ids
-            )
+            result = _crear_representaciones_multiples(cur, contacto_id, caso_id, rol_data, new_represented_party_ids)
             
-            if result and result.get('success'):
-                conn.commit()
-                return True
-            else:
-                conn.rollback()
-                return False
+        if result and result.get('success'):
+            conn.commit()
+            success = True
+        else:
+            conn.rollback()
                 
-    except Exception as e:
+    except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error al actualizar representaciones múltiples: {e}")
         conn.rollback()
-        return False
     finally:
         conn.close()
     
-    return False
+    if success:
+        notificar_cambio('roles_en_caso', 'UPDATE', primary_role_id, caso_id)
+        notificar_cambio('representaciones', 'UPDATE', primary_role_id, caso_id)
+    return success
 
 def get_role_details(rol_id):
     """
@@ -3857,65 +4692,34 @@ def get_role_details(rol_id):
 
 # --- Funciones CRUD para Roles en Caso ---
 
-def _validate_no_circular_reference(conn, representa_a_id, caso_id, visited=None):
+def _grafo_en_transaccion(conn, caso_id):
+    """
+    Grafo de representaciones leído con la conexión de la escritura en curso (una
+    sola consulta), para validar contra el estado que esa transacción ve.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        return _leer_grafo(cur, caso_id)
+
+def _validate_no_circular_reference(conn, representa_a_id, caso_id):
     """
     Función auxiliar para validar que no se creen referencias circulares en representa_a_id.
     """
-    if visited is None:
-        visited = set()
-    
-    if representa_a_id in visited:
-        return False  # Referencia circular detectada
-    
-    visited.add(representa_a_id)
-    
     try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT representa_a_id FROM roles_en_caso WHERE id = %s AND caso_id = %s",
-                (representa_a_id, caso_id)
-            )
-            result = cur.fetchone()
-            
-            if result and result[0]:
-                return _validate_no_circular_reference(conn, result[0], caso_id, visited)
+        return not _grafo_en_transaccion(conn, caso_id).crearia_ciclo(representa_a_id)
     except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error validando referencia circular: {e}")
         return False
-    
-    return True
 
-def _validate_no_circular_reference_for_update(conn, representa_a_id, caso_id, current_rol_id, visited=None):
+def _validate_no_circular_reference_for_update(conn, representa_a_id, caso_id, current_rol_id):
     """
     Función auxiliar para validar referencias circulares en actualizaciones.
-    Excluye el rol actual de la validación.
+    Falla también si el rol pasaría a representarse a sí mismo, directa o indirectamente.
     """
-    if visited is None:
-        visited = set()
-    
-    if representa_a_id == current_rol_id:
-        return False  # Un rol no puede representarse a sí mismo
-    
-    if representa_a_id in visited:
-        return False  # Referencia circular detectada
-    
-    visited.add(representa_a_id)
-    
     try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT representa_a_id FROM roles_en_caso WHERE id = %s AND caso_id = %s",
-                (representa_a_id, caso_id)
-            )
-            result = cur.fetchone()
-            
-            if result and result[0]:
-                return _validate_no_circular_reference_for_update(conn, result[0], caso_id, current_rol_id, visited)
+        return not _grafo_en_transaccion(conn, caso_id).crearia_ciclo(representa_a_id, current_rol_id)
     except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error validando referencia circular en actualización: {e}")
         return False
-    
-    return True
 
 def _is_multiple_representation_request(datos_rol):
     """
@@ -4063,6 +4867,7 @@ def add_rol_a_caso(datos_rol):
             
             # Actualizar actividad del caso
             update_last_activity(caso_id)
+            notificar_cambio('roles_en_caso', 'INSERT', new_id, caso_id)
             db_logger.info(f"Rol '{rol_principal}' agregado exitosamente al caso {caso_id} con ID: {new_id}")
             
     except psycopg2.IntegrityError as e:
@@ -4079,6 +4884,68 @@ def add_rol_a_caso(datos_rol):
         
     return new_id
 
+# Roles de un caso con los datos de su contacto: base del grafo de representaciones
+_SQL_ROLES_CASO = """
+    SELECT 
+        r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
+        r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
+        c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
+        c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at
+    FROM roles_en_caso r
+    JOIN contactos c ON r.contacto_id = c.id
+    WHERE r.caso_id = %s
+    ORDER BY r.id
+"""
+
+_SQL_REPRESENTACIONES_CASO = """
+    SELECT grupo_id, rol_abogado_id, rol_representado_id, rol_sombra_id
+    FROM representaciones
+    WHERE caso_id = %s
+    ORDER BY id
+"""
+
+def _leer_grafo(cur, caso_id):
+    """Roles y representaciones del caso con un cursor RealDictCursor ya abierto."""
+    cur.execute(_SQL_ROLES_CASO, (caso_id,))
+    roles = [dict(row) for row in cur.fetchall()]
+    cur.execute(_SQL_REPRESENTACIONES_CASO, (caso_id,))
+    return GrafoRepresentaciones(roles, [dict(row) for row in cur.fetchall()])
+
+def _cargar_roles_grafo(caso_id):
+    """Carga para la caché de grafos: el grafo del caso, o None si la consulta falló."""
+    conn = connect_db()
+    if not conn:
+        db_logger.error("No se pudo conectar a la base de datos para obtener roles")
+        return None
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            return _leer_grafo(cur, caso_id)
+    except (Exception, psycopg2.DatabaseError) as e:
+        db_logger.error(f"Error al obtener roles para el caso ID {caso_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+# Un grafo por caso, vigente hasta que cambian sus roles (ver grafo_representaciones)
+grafos_representacion = CacheGrafos(_cargar_roles_grafo)
+registrar_listener_cambios(grafos_representacion.on_cambio_datos)
+
+def get_estadisticas_caches():
+    """Aciertos y fallos de las cachés de lectura y de grafos, para ajustar vigencias y tamaños."""
+    estadisticas = estadisticas_caches()
+    estadisticas.append(grafos_representacion.estadisticas())
+    return estadisticas
+
+def get_grafo_representaciones(caso_id):
+    """
+    Grafo de representaciones del caso (GrafoRepresentaciones), desde la caché.
+    Responde ciclos, profundidad, ancestros y grupos de representación múltiple
+    sin más consultas. None si no se pudo leer la base.
+    """
+    if not caso_id:
+        return None
+    return grafos_representacion.obtener(caso_id)
+
 def get_roles_by_caso_id(caso_id, incluir_jerarquia=True):
     """
     Obtiene todos los roles de un caso con información jerárquica optimizada.
@@ -4094,6 +4961,15 @@ def get_roles_by_caso_id(caso_id, incluir_jerarquia=True):
         db_logger.warning("get_roles_by_caso_id llamado sin caso_id")
         return []
 
+    if incluir_jerarquia:
+        # La jerarquía sale del grafo en caché en lugar de un CTE recursivo por carga
+        grafo = get_grafo_representaciones(caso_id)
+        if grafo is None:
+            return []
+        roles = grafo.roles_jerarquicos()
+        db_logger.info(f"Obtenidos {len(roles)} roles para caso {caso_id}")
+        return roles
+
     conn = connect_db()
     roles = []
     if not conn:
@@ -4101,91 +4977,73 @@ def get_roles_by_caso_id(caso_id, incluir_jerarquia=True):
         return roles
 
     try:
-        # Consulta optimizada con información jerárquica
-        if incluir_jerarquia:
-            sql = """
-                WITH RECURSIVE jerarquia_roles AS (
-                    -- Roles principales (no representan a nadie)
-                    SELECT 
-                        r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
-                        r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
-                        c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
-                        c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at,
-                        0 as nivel_jerarquia,
-                        ARRAY[r.id] as ruta_jerarquia,
-                        NULL::text as representado_nombre
-                    FROM roles_en_caso r
-                    JOIN contactos c ON r.contacto_id = c.id
-                    WHERE r.caso_id = %s AND r.representa_a_id IS NULL
-                    
-                    UNION ALL
-                    
-                    -- Roles que representan a otros (recursivo)
-                    SELECT 
-                        r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
-                        r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
-                        c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
-                        c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at,
-                        jr.nivel_jerarquia + 1,
-                        jr.ruta_jerarquia || r.id,
-                        jr.nombre_completo as representado_nombre
-                    FROM roles_en_caso r
-                    JOIN contactos c ON r.contacto_id = c.id
-                    JOIN jerarquia_roles jr ON r.representa_a_id = jr.rol_id
-                    WHERE r.caso_id = %s
-                )
-                SELECT 
-                    *,
-                    CASE 
-                        WHEN rol_principal = 'Actor' THEN 1
-                        WHEN rol_principal = 'Demandado' THEN 2
-                        WHEN rol_principal = 'Tercero' THEN 3
-                        WHEN rol_principal = 'Abogado' THEN 4
-                        WHEN rol_principal = 'Apoderado' THEN 5
-                        WHEN rol_principal = 'Perito' THEN 6
-                        ELSE 7
-                    END as orden_rol
-                FROM jerarquia_roles
-                ORDER BY orden_rol, nivel_jerarquia, nombre_completo;
-            """
-            params = (caso_id, caso_id)
-        else:
-            # Consulta simple sin jerarquía para mejor rendimiento
-            sql = """
-                SELECT 
-                    r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
-                    r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
-                    c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
-                    c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at,
-                    CASE 
-                        WHEN r.rol_principal = 'Actor' THEN 1
-                        WHEN r.rol_principal = 'Demandado' THEN 2
-                        WHEN r.rol_principal = 'Tercero' THEN 3
-                        WHEN r.rol_principal = 'Abogado' THEN 4
-                        WHEN r.rol_principal = 'Apoderado' THEN 5
-                        WHEN r.rol_principal = 'Perito' THEN 6
-                        ELSE 7
-                    END as orden_rol
-                FROM roles_en_caso r
-                JOIN contactos c ON r.contacto_id = c.id
-                WHERE r.caso_id = %s
-                ORDER BY orden_rol, c.nombre_completo;
-            """
-            params = (caso_id,)
+        # Consulta simple sin jerarquía para mejor rendimiento
+        sql = """
+            SELECT 
+                r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
+                r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
+                c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
+                c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at,
+                CASE 
+                    WHEN r.rol_principal = 'Actor' THEN 1
+                    WHEN r.rol_principal = 'Demandado' THEN 2
+                    WHEN r.rol_principal = 'Tercero' THEN 3
+                    WHEN r.rol_principal = 'Abogado' THEN 4
+                    WHEN r.rol_principal = 'Apoderado' THEN 5
+                    WHEN r.rol_principal = 'Perito' THEN 6
+                    ELSE 7
+                END as orden_rol
+            FROM roles_en_caso r
+            JOIN contactos c ON r.contacto_id = c.id
+            WHERE r.caso_id = %s
+            ORDER BY orden_rol, c.nombre_completo;
+        """
 
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
+            cur.execute(sql, (caso_id,))
             rows = cur.fetchall()
             roles = [dict(row) for row in rows]
             
         db_logger.info(f"Obtenidos {len(roles)} roles para caso {caso_id}")
         
     except (Exception, psycopg2.DatabaseError) as e:
-        db_logger.error(f"Error al obtener roles para el caso ID {caso_id}: {e}")
+        db_logger.error(f"Error al obtener roles para el caso ID {caso_id}: {e}")
+    finally:
+        conn.close()
+        
+    return roles
+
+def get_rol_en_caso(rol_id):
+    """
+    Obtiene un único rol con las mismas columnas que get_roles_by_caso_id(incluir_jerarquia=False).
+    Lo usa la pestaña Partes para reflejar un alta o edición sin volver a leer todo el caso.
+    
+    Returns:
+        dict: El rol, o None si no existe o hubo un error
+    """
+    conn = connect_db()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT 
+                    r.id as rol_id, r.caso_id, r.contacto_id, r.rol_principal, r.rol_secundario, 
+                    r.representa_a_id, r.datos_bancarios, r.notas_del_rol, r.created_at as rol_created_at,
+                    c.nombre_completo, c.es_persona_juridica, c.dni, c.cuit, c.domicilio_real,
+                    c.domicilio_legal, c.email, c.telefono, c.notas_generales, c.created_at as contacto_created_at
+                FROM roles_en_caso r
+                JOIN contactos c ON r.contacto_id = c.id
+                WHERE r.id = %s
+            """, (rol_id,))
+            row = cur.fetchone()
+            return dict(row) if row else None
+    except (Exception, psycopg2.DatabaseError) as e:
+        db_logger.error(f"Error al obtener el rol ID {rol_id}: {e}")
+        return None
     finally:
         conn.close()
-        
-    return roles
 
 def get_roles_estadisticas_caso(caso_id):
     """
@@ -4321,8 +5179,6 @@ def update_rol(rol_id, datos_rol):
 
             # Validar referencias circulares si se está actualizando representa_a_id
             if 'representa_a_id' in datos_rol and datos_rol['representa_a_id']:
-                # Crear una copia temporal para validar sin incluir el rol actual
-                temp_visited = {rol_id}  # Excluir el rol actual de la validación
                 if not _validate_no_circular_reference_for_update(conn, datos_rol['representa_a_id'], caso_id, rol_id):
                     print("Error: La actualización de representación crearía una referencia circular.")
                     return False
@@ -4335,6 +5191,7 @@ def update_rol(rol_id, datos_rol):
             success = cur.rowcount > 0
             if success:
                 update_last_activity(caso_id)
+                notificar_cambio('roles_en_caso', 'UPDATE', rol_id, caso_id)
                 print(f"Rol ID {rol_id} actualizado correctamente.")
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Error al actualizar rol ID {rol_id}: {error}")
@@ -4371,52 +5228,46 @@ def delete_rol(rol_id):
             notas_del_rol = notas_del_rol or ''
             
             # Verificar si es un rol con representaciones múltiples
-            is_multiple_rep = 'REPRESENTACION_MULTIPLE' in notas_del_rol
+            cur.execute("""
+                SELECT grupo_id FROM representaciones
+                WHERE rol_abogado_id = %s OR rol_sombra_id = %s
+                LIMIT 1
+            """, (rol_id, rol_id))
+            grupo = cur.fetchone()
             
-            if is_multiple_rep and rol_principal in ['Abogado', 'Apoderado']:
-                print(f"Eliminando abogado con representaciones múltiples: {rol_id}")
+            if grupo:
+                group_id = grupo[0]
+                print(f"Eliminando rol de un grupo de representación múltiple: {rol_id}")
+                print(f"Limpiando grupo de representación múltiple: {group_id}")
+                
+                # Encontrar todos los roles relacionados con este grupo
+                cur.execute("""
+                    SELECT r.id, r.notas_del_rol
+                    FROM roles_en_caso r
+                    WHERE r.id IN (
+                        SELECT rol_abogado_id FROM representaciones WHERE grupo_id = %s
+                        UNION
+                        SELECT rol_sombra_id FROM representaciones WHERE grupo_id = %s
+                    )
+                """, (group_id, group_id))
+                
+                related_roles = cur.fetchall()
                 
-                # Extraer group_id de las notas
+                # Limpiar las notas de representación múltiple de los roles relacionados
                 import re
-                group_match = re.search(r'REPRESENTACION_MULTIPLE:[^:]+:([^]]+)', notas_del_rol)
+                for related_rol_id, related_notas in related_roles:
+                    if related_rol_id != rol_id:  # No procesar el rol que se va a eliminar
+                        cleaned_notas = re.sub(r'\[REPRESENTACION_MULTIPLE:[^]]+\]', '', related_notas or '')
+                        cleaned_notas = re.sub(r'\n+', '\n', cleaned_notas).strip()
+                        cur.execute("""
+                            UPDATE roles_en_caso 
+                            SET notas_del_rol = %s
+                            WHERE id = %s
+                        """, (cleaned_notas if cleaned_notas else None, related_rol_id))
+                        print(f"Limpiado rol relacionado ID {related_rol_id}")
                 
-                if group_match:
-                    group_id = group_match.group(1)
-                    print(f"Limpiando grupo de representación múltiple: {group_id}")
-                    
-                    # Encontrar todos los roles relacionados con este grupo
-                    cur.execute("""
-                        SELECT id, notas_del_rol, representa_a_id 
-                        FROM roles_en_caso 
-                        WHERE caso_id = %s 
-                        AND (notas_del_rol LIKE %s OR notas_del_rol LIKE %s)
-                    """, (caso_id, f'%REPRESENTACION_MULTIPLE:PRIMARY:{group_id}%', f'%REPRESENTACION_MULTIPLE:SECONDARY:{group_id}%'))
-                    
-                    related_roles = cur.fetchall()
-                    
-                    # Limpiar las notas de representación múltiple de los roles relacionados
-                    for related_rol_id, related_notas, related_representa_a_id in related_roles:
-                        if related_rol_id != rol_id:  # No procesar el rol que se va a eliminar
-                            # Limpiar las notas de representación múltiple
-                            cleaned_notas = re.sub(r'\[REPRESENTACION_MULTIPLE:[^]]+\]', '', related_notas or '')
-                            cleaned_notas = re.sub(r'\n+', '\n', cleaned_notas).strip()
-                            
-                            # Si este rol tenía representa_a_id, limpiarlo también
-                            new_representa_a_id = None
-                            if related_representa_a_id == rol_id:
-                                # Este rol representaba al rol que se está eliminando, limpiar la relación
-                                new_representa_a_id = None
-                            else:
-                                new_representa_a_id = related_representa_a_id
-                            
-                            # Actualizar el rol relacionado
-                            cur.execute("""
-                                UPDATE roles_en_caso 
-                                SET notas_del_rol = %s, representa_a_id = %s 
-                                WHERE id = %s
-                            """, (cleaned_notas if cleaned_notas else None, new_representa_a_id, related_rol_id))
-                            
-                            print(f"Limpiado rol relacionado ID {related_rol_id}")
+                # El grupo se disuelve: los roles sombra quedan como representaciones simples
+                cur.execute("DELETE FROM representaciones WHERE grupo_id = %s", (group_id,))
             
             # Limpiar cualquier rol que tenga representa_a_id apuntando al rol que se elimina
             cur.execute("""
@@ -4437,6 +5288,7 @@ def delete_rol(rol_id):
                 conn.commit()
                 if caso_id:
                     update_last_activity(caso_id)
+                notificar_cambio('roles_en_caso', 'DELETE', rol_id, caso_id)
                 print(f"Rol ID {rol_id} eliminado del caso con limpieza completa de representaciones.")
             else:
                 conn.rollback()
@@ -4479,6 +5331,8 @@ def add_etiqueta(nombre_etiqueta):
                     if res_insert:
                         etiqueta_id = res_insert[0]
                 conn.commit()
+                if not res:
+                    cache_etiquetas.invalidar()
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Error en add_etiqueta: {error}")
         if conn: conn.rollback()
@@ -4487,9 +5341,12 @@ def add_etiqueta(nombre_etiqueta):
     return etiqueta_id
 
 def get_etiquetas():
-    """Obtiene todas las etiquetas."""
+    """Obtiene todas las etiquetas (desde la caché)."""
+    return cache_etiquetas.obtener('todas', _leer_etiquetas) or []
+
+def _leer_etiquetas():
     conn = connect_db()
-    etiquetas = []
+    etiquetas = None
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
@@ -4614,6 +5471,41 @@ def get_etiquetas_de_caso(caso_id):
             conn.close()
     return etiquetas
 
+def _reemplazar_etiquetas(tabla_relacion, columna_entidad, entidad_id, nombres_etiquetas):
+    """
+    Deja a la entidad exactamente con `nombres_etiquetas` en una sola transacción:
+    crea las etiquetas que falten, asigna las nuevas y quita las demás, con una
+    sentencia por paso en lugar de una conexión por etiqueta.
+    """
+    nombres = sorted({nombre.strip().lower() for nombre in nombres_etiquetas if nombre and nombre.strip()})
+    try:
+        with transaccion(connect_db) as cur:
+            etiqueta_ids = []
+            if nombres:
+                insertar_lote(cur, 'etiquetas', ['nombre_etiqueta'], [(nombre,) for nombre in nombres],
+                              conflicto='(nombre_etiqueta) DO NOTHING')
+                cur.execute("SELECT id_etiqueta FROM etiquetas WHERE nombre_etiqueta = ANY(%s)", (nombres,))
+                etiqueta_ids = [fila[0] for fila in cur.fetchall()]
+                insertar_lote(cur, tabla_relacion, [columna_entidad, 'etiqueta_id'],
+                              [(entidad_id, etiqueta_id) for etiqueta_id in etiqueta_ids],
+                              conflicto='DO NOTHING')
+            cur.execute(f"DELETE FROM {tabla_relacion} WHERE {columna_entidad} = %s AND etiqueta_id <> ALL(%s::int[])",
+                        (entidad_id, etiqueta_ids))
+        if nombres:
+            cache_etiquetas.invalidar()
+        return True
+    except (Exception, psycopg2.DatabaseError) as e:
+        print(f"Error al guardar etiquetas de {columna_entidad} {entidad_id}: {e}")
+        return False
+
+def set_etiquetas_de_caso(caso_id, nombres_etiquetas):
+    """Reemplaza las etiquetas de un caso por `nombres_etiquetas` (creando las que no existan)."""
+    return _reemplazar_etiquetas('caso_etiquetas', 'caso_id', caso_id, nombres_etiquetas)
+
+def set_etiquetas_de_cliente(cliente_id, nombres_etiquetas):
+    """Reemplaza las etiquetas de un cliente por `nombres_etiquetas` (creando las que no existan)."""
+    return _reemplazar_etiquetas('cliente_etiquetas', 'cliente_id', cliente_id, nombres_etiquetas)
+
 # --- Funciones CRUD para Modelos de Escritos ---
 
 def add_modelo_escrito(nombre_modelo, categoria, ruta_plantilla, descripcion=""):
@@ -4630,6 +5522,7 @@ def add_modelo_escrito(nombre_modelo, categoria, ruta_plantilla, descripcion="")
                 ''', (nombre_modelo, categoria, ruta_plantilla, descripcion, timestamp))
                 new_id = cur.fetchone()[0]
                 conn.commit()
+                cache_modelos_escritos.invalidar()
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al agregar modelo de escrito: {e}")
             conn.rollback()
@@ -4638,9 +5531,12 @@ def add_modelo_escrito(nombre_modelo, categoria, ruta_plantilla, descripcion="")
     return new_id
 
 def get_modelos_escritos():
-    """Obtiene todos los modelos de escritos."""
+    """Obtiene todos los modelos de escritos (desde la caché)."""
+    return cache_modelos_escritos.obtener('todos', _leer_modelos_escritos) or []
+
+def _leer_modelos_escritos():
     conn = connect_db()
-    modelos = []
+    modelos = None
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
@@ -4684,6 +5580,7 @@ def update_modelo_escrito(modelo_id, nombre_modelo, categoria, ruta_plantilla, d
                 ''', (nombre_modelo, categoria, ruta_plantilla, descripcion, modelo_id))
                 conn.commit()
                 success = True
+                cache_modelos_escritos.invalidar()
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al actualizar modelo de escrito ID {modelo_id}: {e}")
             conn.rollback()
@@ -4701,6 +5598,7 @@ def delete_modelo_escrito(modelo_id):
                 cur.execute('DELETE FROM modelos_escritos WHERE id = %s', (modelo_id,))
                 conn.commit()
                 success = True
+                cache_modelos_escritos.invalidar()
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al eliminar modelo de escrito ID {modelo_id}: {e}")
             conn.rollback()
@@ -4763,6 +5661,58 @@ def get_audiencias_by_fecha(fecha):
         if conn: conn.close()
     return audiencias
 
+def _tramos_de_meses(meses):
+    """Rangos [desde, hasta) de fechas que cubren los meses (anio, mes), uno por tramo de meses consecutivos."""
+    tramos = []
+    for anio, mes in sorted(set(meses)):
+        desde = datetime.date(anio, mes, 1)
+        hasta = datetime.date(anio + mes // 12, mes % 12 + 1, 1)
+        if tramos and tramos[-1][1] == desde:
+            tramos[-1] = (tramos[-1][0], hasta)
+        else:
+            tramos.append((desde, hasta))
+    return tramos
+
+def _leer_audiencias_meses(meses):
+    """Audiencias de los meses indicados, agrupadas por (anio, mes); None si hubo un error."""
+    sql = """
+        SELECT a.*, ca.caratula as caso_caratula
+        FROM audiencias a
+        JOIN casos ca ON a.caso_id = ca.id
+        WHERE a.fecha >= %s AND a.fecha < %s
+        ORDER BY a.fecha, a.hora;
+    """
+    conn = connect_db()
+    if not conn:
+        return None
+    audiencias = {mes: [] for mes in meses}
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            # Una consulta por rango (usa idx_audiencias_fecha) en lugar de una por mes o por día
+            for desde, hasta in _tramos_de_meses(meses):
+                cur.execute(sql, (desde, hasta))
+                for row in cur.fetchall():
+                    audiencias[(row['fecha'].year, row['fecha'].month)].append(dict(row))
+        return audiencias
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Error al obtener audiencias por mes: {error}")
+        return None
+    finally:
+        conn.close()
+
+def get_audiencias_meses(meses):
+    """
+    Audiencias (mismas columnas que get_audiencias_by_fecha) de los meses indicados.
+    Los meses ya leídos salen de caché; los demás se leen juntos.
+
+    Args:
+        meses (list): Tuplas (anio, mes)
+
+    Returns:
+        dict: {(anio, mes): [audiencias ordenadas por fecha y hora]} o None si hubo un error
+    """
+    return cache_audiencias_mes.obtener_varias(meses, _leer_audiencias_meses)
+
 # --- Funciones CRUD para Movimientos de Cuenta ---
 
 def add_movimiento(datos_movimiento):
@@ -5031,9 +5981,71 @@ def delete_movimiento(movimiento_id):
             conn.close()
     return success
 
+# Recalcula los totales de todos los casos con un único GROUP BY (usado para la
+# carga inicial y para reparar desvíos detectados por el verificador).
+_SQL_RECALCULAR_TOTALES_CUENTA = '''
+    INSERT INTO totales_cuenta_caso (caso_id, total_ingresos, total_gastos, cantidad_movimientos, ultimo_movimiento, updated_at)
+    SELECT
+        caso_id,
+        COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'Ingreso'), 0),
+        COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'Gasto'), 0),
+        COUNT(*),
+        MAX(fecha),
+        NOW()
+    FROM movimientos_cuenta
+    GROUP BY caso_id
+    ON CONFLICT (caso_id) DO UPDATE
+    SET total_ingresos = EXCLUDED.total_ingresos,
+        total_gastos = EXCLUDED.total_gastos,
+        cantidad_movimientos = EXCLUDED.cantidad_movimientos,
+        ultimo_movimiento = EXCLUDED.ultimo_movimiento,
+        updated_at = NOW()
+'''
+
+def _get_totales_cuenta_caso(caso_id):
+    """
+    Lee la fila de totales mantenida por trigger para un caso.
+
+    Args:
+        caso_id (int): ID del caso
+
+    Returns:
+        dict: Totales del caso (ceros si el caso no tiene movimientos) o None si hay error
+    """
+    totales = {
+        'total_ingresos': 0,
+        'total_gastos': 0,
+        'saldo_actual': 0,
+        'cantidad_movimientos': 0,
+        'ultimo_movimiento': None
+    }
+    conn = connect_db()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                SELECT total_ingresos, total_gastos, saldo, cantidad_movimientos, ultimo_movimiento
+                FROM totales_cuenta_caso
+                WHERE caso_id = %s
+            ''', (caso_id,))
+            row = cur.fetchone()
+            if row:
+                totales['total_ingresos'] = row[0]
+                totales['total_gastos'] = row[1]
+                totales['saldo_actual'] = row[2]
+                totales['cantidad_movimientos'] = row[3]
+                totales['ultimo_movimiento'] = row[4]
+    except (Exception, psycopg2.DatabaseError) as e:
+        print(f"Error al obtener totales de cuenta para el caso ID {caso_id}: {e}")
+        return None
+    finally:
+        conn.close()
+    return totales
+
 def get_saldo_caso(caso_id):
     """
-    Calcula el saldo actual de un caso (ingresos - gastos).
+    Obtiene el saldo actual de un caso (ingresos - gastos).
     
     Args:
         caso_id (int): ID del caso
@@ -5041,38 +6053,12 @@ def get_saldo_caso(caso_id):
     Returns:
         Decimal: Saldo actual del caso
     """
-    conn = connect_db()
-    saldo = 0
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                # Calcular total de ingresos
-                cur.execute('''
-                    SELECT COALESCE(SUM(monto), 0) 
-                    FROM movimientos_cuenta 
-                    WHERE caso_id = %s AND tipo_movimiento = 'Ingreso'
-                ''', (caso_id,))
-                total_ingresos = cur.fetchone()[0]
-                
-                # Calcular total de gastos
-                cur.execute('''
-                    SELECT COALESCE(SUM(monto), 0) 
-                    FROM movimientos_cuenta 
-                    WHERE caso_id = %s AND tipo_movimiento = 'Gasto'
-                ''', (caso_id,))
-                total_gastos = cur.fetchone()[0]
-                
-                saldo = total_ingresos - total_gastos
-                
-        except (Exception, psycopg2.DatabaseError) as e:
-            print(f"Error al calcular saldo para el caso ID {caso_id}: {e}")
-        finally:
-            conn.close()
-    return saldo
+    totales = _get_totales_cuenta_caso(caso_id)
+    return totales['saldo_actual'] if totales else 0
 
 def get_total_ingresos_caso(caso_id):
     """
-    Calcula el total de ingresos de un caso.
+    Obtiene el total de ingresos de un caso.
     
     Args:
         caso_id (int): ID del caso
@@ -5080,26 +6066,12 @@ def get_total_ingresos_caso(caso_id):
     Returns:
         Decimal: Total de ingresos del caso
     """
-    conn = connect_db()
-    total = 0
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute('''
-                    SELECT COALESCE(SUM(monto), 0) 
-                    FROM movimientos_cuenta 
-                    WHERE caso_id = %s AND tipo_movimiento = 'Ingreso'
-                ''', (caso_id,))
-                total = cur.fetchone()[0]
-        except (Exception, psycopg2.DatabaseError) as e:
-            print(f"Error al calcular total de ingresos para el caso ID {caso_id}: {e}")
-        finally:
-            conn.close()
-    return total
+    totales = _get_totales_cuenta_caso(caso_id)
+    return totales['total_ingresos'] if totales else 0
 
 def get_total_gastos_caso(caso_id):
     """
-    Calcula el total de gastos de un caso.
+    Obtiene el total de gastos de un caso.
     
     Args:
         caso_id (int): ID del caso
@@ -5107,26 +6079,14 @@ def get_total_gastos_caso(caso_id):
     Returns:
         Decimal: Total de gastos del caso
     """
-    conn = connect_db()
-    total = 0
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute('''
-                    SELECT COALESCE(SUM(monto), 0) 
-                    FROM movimientos_cuenta 
-                    WHERE caso_id = %s AND tipo_movimiento = 'Gasto'
-                ''', (caso_id,))
-                total = cur.fetchone()[0]
-        except (Exception, psycopg2.DatabaseError) as e:
-            print(f"Error al calcular total de gastos para el caso ID {caso_id}: {e}")
-        finally:
-            conn.close()
-    return total
+    totales = _get_totales_cuenta_caso(caso_id)
+    return totales['total_gastos'] if totales else 0
 
 def get_resumen_financiero_caso(caso_id):
     """
     Obtiene un resumen financiero completo de un caso.
+    Lee la fila de `totales_cuenta_caso`, que los triggers de
+    `movimientos_cuenta` mantienen al día en cada alta, edición o baja.
     
     Args:
         caso_id (int): ID del caso
@@ -5134,43 +6094,100 @@ def get_resumen_financiero_caso(caso_id):
     Returns:
         dict: Resumen con totales, saldo y estadísticas
     """
+    totales = _get_totales_cuenta_caso(caso_id)
+    if totales is None:
+        return {
+            'total_ingresos': 0,
+            'total_gastos': 0,
+            'saldo_actual': 0,
+            'cantidad_movimientos': 0,
+            'ultimo_movimiento': None
+        }
+    return totales
+
+def _desvios_totales_cuenta(filas):
+    """Filas (real vs. registrado por caso) cuyos totales, cantidad o última fecha no coinciden."""
+    return [
+        dict(fila) for fila in filas
+        if (fila['ingresos_reales'] != fila['ingresos_registrados']
+            or fila['gastos_reales'] != fila['gastos_registrados']
+            or fila['cantidad_real'] != fila['cantidad_registrada']
+            or fila['ultimo_real'] != fila['ultimo_registrado'])
+    ]
+
+def verificar_consistencia_totales_cuenta(reparar=False):
+    """
+    Recalcula en bloque los totales de todos los casos y los compara con
+    `totales_cuenta_caso` para detectar desvíos.
+    
+    Args:
+        reparar (bool): Si True, reescribe los totales de los casos con desvío
+    
+    Returns:
+        dict: {'casos_verificados', 'desvios': [...], 'reparados'} o None si hay error
+    """
     conn = connect_db()
-    resumen = {
-        'total_ingresos': 0,
-        'total_gastos': 0,
-        'saldo_actual': 0,
-        'cantidad_movimientos': 0,
-        'ultimo_movimiento': None
-    }
+    if not conn:
+        return None
     
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                # Obtener totales y estadísticas en una sola consulta
+    resultado = {'casos_verificados': 0, 'desvios': [], 'reparados': 0}
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute('''
+                WITH reales AS (
+                    SELECT
+                        caso_id,
+                        COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'Ingreso'), 0) AS total_ingresos,
+                        COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'Gasto'), 0) AS total_gastos,
+                        COUNT(*) AS cantidad_movimientos,
+                        MAX(fecha) AS ultimo_movimiento
+                    FROM movimientos_cuenta
+                    GROUP BY caso_id
+                )
+                SELECT
+                    COALESCE(r.caso_id, t.caso_id) AS caso_id,
+                    COALESCE(r.total_ingresos, 0) AS ingresos_reales,
+                    COALESCE(t.total_ingresos, 0) AS ingresos_registrados,
+                    COALESCE(r.total_gastos, 0) AS gastos_reales,
+                    COALESCE(t.total_gastos, 0) AS gastos_registrados,
+                    COALESCE(r.cantidad_movimientos, 0) AS cantidad_real,
+                    COALESCE(t.cantidad_movimientos, 0) AS cantidad_registrada,
+                    r.ultimo_movimiento AS ultimo_real,
+                    t.ultimo_movimiento AS ultimo_registrado
+                FROM reales r
+                FULL OUTER JOIN totales_cuenta_caso t ON t.caso_id = r.caso_id
+            ''')
+            filas = cur.fetchall()
+            resultado['casos_verificados'] = len(filas)
+            resultado['desvios'] = _desvios_totales_cuenta(filas)
+            
+            if resultado['desvios']:
+                db_logger.warning(
+                    f"Totales de cuenta corriente con desvío en {len(resultado['desvios'])} casos"
+                )
+            
+            if reparar and resultado['desvios']:
+                casos_con_desvio = [d['caso_id'] for d in resultado['desvios']]
+                # Los casos sin movimientos quedan con la fila en cero
                 cur.execute('''
-                    SELECT 
-                        COALESCE(SUM(CASE WHEN tipo_movimiento = 'Ingreso' THEN monto ELSE 0 END), 0) as total_ingresos,
-                        COALESCE(SUM(CASE WHEN tipo_movimiento = 'Gasto' THEN monto ELSE 0 END), 0) as total_gastos,
-                        COUNT(*) as cantidad_movimientos,
-                        MAX(fecha) as ultimo_movimiento
-                    FROM movimientos_cuenta 
-                    WHERE caso_id = %s
-                ''', (caso_id,))
-                
-                row = cur.fetchone()
-                if row:
-                    resumen['total_ingresos'] = row[0]
-                    resumen['total_gastos'] = row[1]
-                    resumen['saldo_actual'] = row[0] - row[1]  # ingresos - gastos
-                    resumen['cantidad_movimientos'] = row[2]
-                    resumen['ultimo_movimiento'] = row[3]
-                    
-        except (Exception, psycopg2.DatabaseError) as e:
-            print(f"Error al obtener resumen financiero para el caso ID {caso_id}: {e}")
-        finally:
-            conn.close()
+                    UPDATE totales_cuenta_caso
+                    SET total_ingresos = 0, total_gastos = 0, cantidad_movimientos = 0,
+                        ultimo_movimiento = NULL, updated_at = NOW()
+                    WHERE caso_id = ANY(%s)
+                ''', (casos_con_desvio,))
+                cur.execute(_SQL_RECALCULAR_TOTALES_CUENTA)
+                conn.commit()
+                resultado['reparados'] = len(casos_con_desvio)
+                db_logger.info(f"Totales de cuenta corriente reparados para {len(casos_con_desvio)} casos")
+    except (Exception, psycopg2.DatabaseError) as e:
+        print(f"Error al verificar consistencia de totales de cuenta: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
     
-    return resumen
+    return resultado
+
 
 # --- Función de inicialización ---
 
@@ -5248,6 +6265,150 @@ def get_todos_los_prospectos():
     
     return prospectos
 
+def _patron_contiene(texto):
+    """Patrón ILIKE '%texto%' con los comodines del texto escapados."""
+    escapado = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escapado}%"
+
+def _condiciones_prospectos(estados=None, nombre=None, fecha_desde=None, fecha_hasta=None):
+    """Condiciones y parámetros para los filtros de la lista de prospectos."""
+    condiciones, params = [], []
+    if estados:
+        condiciones.append("p.estado = ANY(%s)")
+        params.append(list(estados))
+    if nombre and nombre.strip():
+        condiciones.append("p.nombre ILIKE %s")
+        params.append(_patron_contiene(nombre.strip()))
+    if fecha_desde:
+        condiciones.append("p.fecha_primera_consulta >= %s")
+        params.append(fecha_desde)
+    if fecha_hasta:
+        condiciones.append("p.fecha_primera_consulta <= %s")
+        params.append(fecha_hasta)
+    return condiciones, params
+
+def _filtros_prospectos(estados=None, nombre=None, fecha_desde=None, fecha_hasta=None):
+    """Cláusula WHERE y parámetros para los filtros de la lista de prospectos."""
+    condiciones, params = _condiciones_prospectos(estados, nombre, fecha_desde, fecha_hasta)
+    return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), params
+
+def buscar_prospectos(estados=None, nombre=None, fecha_desde=None, fecha_hasta=None, limite=None, desplazamiento=0):
+    """
+    Prospectos filtrados en el servidor (estado, nombre parcial, rango de fecha de
+    primera consulta), en el orden de get_todos_los_prospectos.
+
+    Args:
+        estados (list, optional): Estados a incluir
+        nombre (str, optional): Texto contenido en el nombre (sin distinguir mayúsculas)
+        fecha_desde, fecha_hasta (date, optional): Rango de fecha de primera consulta
+        limite (int, optional): Cantidad máxima de filas (None = todas)
+        desplazamiento (int): Filas a saltear (paginación)
+
+    Returns:
+        tuple: (lista de prospectos, total de prospectos que cumplen los filtros)
+    """
+    where, params = _filtros_prospectos(estados, nombre, fecha_desde, fecha_hasta)
+    sql = f'''
+        SELECT p.*,
+               c.nombre as cliente_convertido_nombre,
+               COUNT(*) OVER () AS total_filtrado
+        FROM prospectos p
+        LEFT JOIN clientes c ON p.convertido_a_cliente_id = c.id
+        {where}
+        ORDER BY p.fecha_primera_consulta DESC, p.nombre ASC, p.id
+    '''
+    paginacion = []
+    if limite is not None:
+        sql += " LIMIT %s OFFSET %s"
+        paginacion = [limite, desplazamiento]
+
+    conn = connect_db()
+    prospectos, total = [], 0
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params + paginacion)
+                prospectos = [dict(row) for row in cur.fetchall()]
+                if prospectos:
+                    total = prospectos[0]['total_filtrado']
+                elif desplazamiento:
+                    # Página fuera de rango: el total igual hace falta para la navegación
+                    cur.execute(f"SELECT COUNT(*) AS total FROM prospectos p{where}", params)
+                    total = cur.fetchone()['total']
+                for prospecto in prospectos:
+                    del prospecto['total_filtrado']
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al buscar prospectos: {e}")
+        finally:
+            conn.close()
+
+    return prospectos, total
+
+def get_pagina_prospectos(estados=None, nombre=None, fecha_desde=None, fecha_hasta=None,
+                          despues_de=None, hasta_id=None, limite=100):
+    """
+    Página de prospectos por clave (fecha_primera_consulta, id), del más reciente
+    al más antiguo, con los mismos filtros que buscar_prospectos. A diferencia de
+    LIMIT/OFFSET, el costo de cada página no crece con su posición en la lista.
+
+    Args:
+        despues_de (tuple, optional): (fecha_primera_consulta, id) de la última fila
+            ya cargada; None para la primera página
+        hasta_id (int, optional): En lugar de `limite` filas, trae todas hasta el
+            prospecto indicado inclusive (para mostrarlo en la lista)
+        limite (int): Cantidad máxima de filas (se ignora con hasta_id)
+
+    Returns:
+        list: Prospectos de la página
+    """
+    condiciones, params = _condiciones_prospectos(estados, nombre, fecha_desde, fecha_hasta)
+    if despues_de is not None:
+        condiciones.append("(p.fecha_primera_consulta, p.id) < (%s, %s)")
+        params.extend(despues_de)
+    if hasta_id is not None:
+        condiciones.append("(p.fecha_primera_consulta, p.id) >= "
+                           "(SELECT fecha_primera_consulta, id FROM prospectos WHERE id = %s)")
+        params.append(hasta_id)
+    sql = f'''
+        SELECT p.*, c.nombre as cliente_convertido_nombre
+        FROM prospectos p
+        LEFT JOIN clientes c ON p.convertido_a_cliente_id = c.id
+        {" WHERE " + " AND ".join(condiciones) if condiciones else ""}
+        ORDER BY p.fecha_primera_consulta DESC, p.id DESC
+    '''
+    if hasta_id is None:
+        sql += " LIMIT %s"
+        params.append(limite)
+
+    conn = connect_db()
+    prospectos = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                prospectos = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener página de prospectos: {e}")
+        finally:
+            conn.close()
+    return prospectos
+
+def contar_prospectos(estados=None, nombre=None, fecha_desde=None, fecha_hasta=None):
+    """Cantidad de prospectos que cumplen los filtros de buscar_prospectos (None si hubo un error)."""
+    where, params = _filtros_prospectos(estados, nombre, fecha_desde, fecha_hasta)
+    conn = connect_db()
+    total = None
+    if conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT COUNT(*) FROM prospectos p{where}", params)
+                total = cur.fetchone()[0]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al contar prospectos: {e}")
+        finally:
+            conn.close()
+    return total
+
 def get_prospecto_by_id(prospecto_id):
     """
     Obtiene un prospecto específico por su ID.
@@ -5492,6 +6653,8 @@ def delete_cliente(cliente_id):
             
             if success:
                 print(f"Cliente ID {cliente_id} eliminado exitosamente")
+                cache_clientes.invalidar(cliente_id)
+                _invalidar_cache_caso()
                 
     except (Exception, psycopg2.DatabaseError) as e:
         print(f"Error al eliminar cliente {cliente_id}: {e}")
@@ -5941,7 +7104,7 @@ def get_prospectos_por_estado(estado):
 def get_estadisticas_prospectos():
     """
     Obtiene estadísticas generales sobre los prospectos.
-    
+
     Returns:
         dict: Diccionario con estadísticas de prospectos
     """
@@ -5952,45 +7115,95 @@ def get_estadisticas_prospectos():
         'convertidos_mes_actual': 0,
         'consultas_mes_actual': 0
     }
-    
+
     if conn:
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                # Total de prospectos
-                cur.execute("SELECT COUNT(*) as total FROM prospectos")
-                estadisticas['total_prospectos'] = cur.fetchone()['total']
-                
-                # Prospectos por estado
-                cur.execute('''
-                    SELECT estado, COUNT(*) as cantidad 
-                    FROM prospectos 
-                    GROUP BY estado
-                ''')
-                for row in cur.fetchall():
-                    estadisticas['por_estado'][row['estado']] = row['cantidad']
-                
-                # Convertidos en el mes actual
-                cur.execute('''
-                    SELECT COUNT(*) as cantidad 
-                    FROM prospectos 
-                    WHERE estado = 'Convertido' 
-                    AND EXTRACT(YEAR FROM fecha_conversion) = EXTRACT(YEAR FROM CURRENT_DATE)
-                    AND EXTRACT(MONTH FROM fecha_conversion) = EXTRACT(MONTH FROM CURRENT_DATE)
-                ''')
-                estadisticas['convertidos_mes_actual'] = cur.fetchone()['cantidad']
-                
-                # Consultas en el mes actual
+                # Una sola consulta; los rangos del mes actual aprovechan los índices de fecha
                 cur.execute('''
-                    SELECT COUNT(*) as cantidad 
-                    FROM consultas 
-                    WHERE EXTRACT(YEAR FROM fecha_consulta) = EXTRACT(YEAR FROM CURRENT_DATE)
-                    AND EXTRACT(MONTH FROM fecha_consulta) = EXTRACT(MONTH FROM CURRENT_DATE)
+                    WITH mes AS (
+                        SELECT date_trunc('month', CURRENT_DATE)::date AS desde,
+                               (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date AS hasta
+                    )
+                    SELECT
+                        (SELECT COUNT(*) FROM prospectos) AS total_prospectos,
+                        (SELECT COALESCE(jsonb_object_agg(estado, cantidad), '{}'::jsonb)
+                         FROM (SELECT estado, COUNT(*) AS cantidad FROM prospectos GROUP BY estado) e) AS por_estado,
+                        (SELECT COUNT(*) FILTER (WHERE p.estado = 'Convertido')
+                         FROM prospectos p
+                         WHERE p.fecha_conversion >= mes.desde AND p.fecha_conversion < mes.hasta) AS convertidos_mes_actual,
+                        (SELECT COUNT(*) FROM consultas c
+                         WHERE c.fecha_consulta >= mes.desde AND c.fecha_consulta < mes.hasta) AS consultas_mes_actual
+                    FROM mes
                 ''')
-                estadisticas['consultas_mes_actual'] = cur.fetchone()['cantidad']
-                
+                row = cur.fetchone()
+                if row:
+                    estadisticas.update(dict(row))
+
         except (Exception, psycopg2.DatabaseError) as e:
             print(f"Error al obtener estadísticas de prospectos: {e}")
         finally:
             conn.close()
-    
-    return estadisticas
\ No newline at end of file
+
+    return estadisticas
+
+def get_estadisticas_conversion(meses=12):
+    """
+    Totales de conversión de prospectos y conversiones por mes calendario
+    (los últimos `meses`, incluido el actual), agrupadas en el servidor.
+
+    Returns:
+        dict: total_prospectos, convertidos y conversiones_por_mes {'AAAA-MM': cantidad}
+              del mes más reciente al más antiguo, o None si hubo un error
+    """
+    conn = connect_db()
+    if not conn:
+        return None
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute('''
+                SELECT COUNT(*) AS total_prospectos,
+                       COUNT(*) FILTER (WHERE estado = 'Convertido') AS convertidos
+                FROM prospectos
+            ''')
+            estadisticas = dict(cur.fetchone())
+            cur.execute('''
+                SELECT to_char(m.mes, 'YYYY-MM') AS mes, COUNT(p.id) AS cantidad
+                FROM generate_series(date_trunc('month', CURRENT_DATE) - (%s - 1) * INTERVAL '1 month',
+                                     date_trunc('month', CURRENT_DATE), INTERVAL '1 month') AS m(mes)
+                LEFT JOIN prospectos p
+                       ON p.estado = 'Convertido'
+                      AND p.fecha_conversion >= m.mes
+                      AND p.fecha_conversion < m.mes + INTERVAL '1 month'
+                GROUP BY m.mes
+                ORDER BY m.mes DESC
+            ''', (meses,))
+            estadisticas['conversiones_por_mes'] = {row['mes']: row['cantidad'] for row in cur.fetchall()}
+            return estadisticas
+    except (Exception, psycopg2.DatabaseError) as e:
+        print(f"Error al obtener estadísticas de conversión: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_conversiones_recientes(dias=30):
+    """Prospectos convertidos en los últimos `dias` días, del más reciente al más antiguo."""
+    conn = connect_db()
+    conversiones = []
+    if conn:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute('''
+                    SELECT id AS prospecto_id, nombre AS prospecto_nombre,
+                           convertido_a_cliente_id AS cliente_id, fecha_conversion, contacto
+                    FROM prospectos
+                    WHERE estado = 'Convertido'
+                      AND fecha_conversion >= CURRENT_DATE - %s
+                    ORDER BY fecha_conversion DESC, id DESC
+                ''', (dias,))
+                conversiones = [dict(row) for row in cur.fetchall()]
+        except (Exception, psycopg2.DatabaseError) as e:
+            print(f"Error al obtener conversiones recientes: {e}")
+        finally:
+            conn.close()
+    return conversiones
@@ -4,6 +4,7 @@ from tkinter import ttk, messagebox
 from decimal import Decimal
 import datetime
 from movimiento_dialog import show_add_ingreso_dialog, show_add_gasto_dialog, show_edit_movimiento_dialog
+from ejecutor_datos import ejecutor_datos, indicador_cursor
 
 class CuentaCorrienteTab(ttk.Frame):
     def __init__(self, parent, app_controller, *args, **kwargs):
@@ -272,26 +273,38 @@ class CuentaCorrienteTab(ttk.Frame):
             self.load_movimientos(self.caso_id)
     
     def load_movimientos(self, caso_id, show_loading=True):
-        """Load financial movements for a case with performance optimizations."""
+        """Load financial movements for a case in the background and display them."""
         self.caso_id = caso_id
         self.selected_movimiento_id = None
         
-        # Show loading indicator for large datasets
-        if show_loading:
-            self._show_loading_indicator()
+        if not caso_id:
+            self.movimientos_tree.delete(*self.movimientos_tree.get_children())
+            self._update_summary(0, 0, 0)
+            self._update_button_states()
+            return
         
+        # The loading row follows the pending query, so it disappears even if a newer request supersedes this one
+        indicador = self._set_loading_indicator if show_loading else indicador_cursor(self.movimientos_tree)
+        ejecutor_datos.enviar(
+            self._fetch_movimientos, caso_id,
+            clave=('movimientos', id(self)),
+            al_completar=lambda datos: self._display_movimientos(caso_id, datos),
+            al_fallar=lambda error: self._on_movimientos_error(caso_id, error),
+            indicador=indicador,
+        )
+
+    def _fetch_movimientos(self, caso_id):
+        """Runs on the executor pool: database access only."""
+        movimientos = self.db_crm.get_movimientos_by_caso_id(caso_id)
+        resumen = self.db_crm.get_resumen_financiero_caso(caso_id)
+        return movimientos, resumen
+
+    def _display_movimientos(self, caso_id, datos):
+        movimientos, resumen = datos
         try:
             # Clear existing data efficiently
             self.movimientos_tree.delete(*self.movimientos_tree.get_children())
             
-            if not caso_id:
-                self._update_summary(0, 0, 0)
-                self._update_button_states()
-                return
-            
-            # Load movements with pagination for large datasets
-            movimientos = self.db_crm.get_movimientos_by_caso_id(caso_id)
-            
             # Performance optimization: batch insert for large datasets
             try:
                 movimientos_list = list(movimientos) if movimientos else []
@@ -304,7 +317,6 @@ class CuentaCorrienteTab(ttk.Frame):
                 self._show_no_data_message()
             
             # Update financial summary
-            resumen = self.db_crm.get_resumen_financiero_caso(caso_id)
             self._update_summary(
                 resumen['total_ingresos'],
                 resumen['total_gastos'],
@@ -314,21 +326,23 @@ class CuentaCorrienteTab(ttk.Frame):
         except Exception as e:
             print(f"Error loading movements: {e}")
             # Don't show error dialog in production to avoid interrupting user workflow
-            # messagebox.showerror("Error", f"Error al cargar movimientos: {str(e)}", parent=self)
         finally:
-            # Hide loading indicator
-            if show_loading:
-                try:
-                    self._hide_loading_indicator()
-                except:
-                    pass  # Ignore errors in cleanup
-            
             # Always update button states, even if there was an error
             try:
                 self._update_button_states()
                 print(f"[Cuenta Corriente] Botones actualizados para caso {caso_id}")
             except Exception as e:
                 print(f"[Cuenta Corriente] Error actualizando botones: {e}")
+
+    def _on_movimientos_error(self, caso_id, error):
+        print(f"Error loading movements for case {caso_id}: {error}")
+        self._update_button_states()
+
+    def _set_loading_indicator(self, activo):
+        if activo:
+            self._show_loading_indicator()
+        else:
+            self._hide_loading_indicator()
             
     def _show_loading_indicator(self):
         """Show loading indicator for better user experience."""
@@ -493,9 +507,6 @@ class CuentaCorrienteTab(ttk.Frame):
         result = show_add_ingreso_dialog(self, self.app_controller, self.caso_id)
         if result:
             self.load_movimientos(self.caso_id)  # Refresh the display
-            # Notify parent window to refresh other tabs if needed
-            if hasattr(self.app_controller, 'refresh_case_window'):
-                self.app_controller.refresh_case_window(self.caso_id)
     
     def _add_gasto(self):
         """Add a new expense movement."""
@@ -505,9 +516,6 @@ class CuentaCorrienteTab(ttk.Frame):
         result = show_add_gasto_dialog(self, self.app_controller, self.caso_id)
         if result:
             self.load_movimientos(self.caso_id)  # Refresh the display
-            # Notify parent window to refresh other tabs if needed
-            if hasattr(self.app_controller, 'refresh_case_window'):
-                self.app_controller.refresh_case_window(self.caso_id)
     
     def _edit_movimiento(self):
         """Edit the selected movement."""
@@ -523,9 +531,6 @@ class CuentaCorrienteTab(ttk.Frame):
         result = show_edit_movimiento_dialog(self, self.app_controller, movimiento_data)
         if result:
             self.load_movimientos(self.caso_id)  # Refresh the display
-            # Notify parent window to refresh other tabs if needed
-            if hasattr(self.app_controller, 'refresh_case_window'):
-                self.app_controller.refresh_case_window(self.caso_id)
     
     def _on_edit_movimiento(self, event=None):
         """Handle double-click to edit movement."""
@@ -557,9 +562,6 @@ class CuentaCorrienteTab(ttk.Frame):
             if success:
                 messagebox.showinfo("Éxito", f"El {tipo} ha sido eliminado correctamente.", parent=self)
                 self.load_movimientos(self.caso_id)  # Refresh the display
-                # Notify parent window to refresh other tabs if needed
-                if hasattr(self.app_controller, 'refresh_case_window'):
-                    self.app_controller.refresh_case_window(self.caso_id)
             else:
                 messagebox.showerror("Error", f"No se pudo eliminar el {tipo}.", parent=self)
     
@@ -123,7 +123,7 @@ def debug_case_loading():
 
             # Test load_cases_by_client
             print("\n[7] Testing load_cases_by_client method...")
-            result = case_manager.load_cases_by_client(client_id)
+            result = case_manager.load_cases_by_client(client_id, esperar=True)
 
             if result:
                 print(f"[OK] load_cases_by_client completed successfully")
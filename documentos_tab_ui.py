@@ -5,14 +5,29 @@ import sys
 import subprocess
 import datetime
 
+from ejecutor_datos import ejecutor_datos, indicador_cursor
+from explorador_documentos import cache_carpetas, vigilante_carpetas, valores_fila
+
 class DocumentosTab(ttk.Frame):
-    def __init__(self, parent, app_controller, case_data):
+    # Filas insertadas por ciclo de after(); mantiene la interfaz fluida con miles de archivos
+    FILAS_POR_BLOQUE = 200
+    # Espera para agrupar ráfagas de eventos del vigilante (p. ej. copiar muchos archivos)
+    DEMORA_RECARGA_MS = 300
+
+    def __init__(self, parent, app_controller, case_data, cargar_al_iniciar=True):
         super().__init__(parent, padding="10")
         self.app_controller = app_controller
         self.case_data = case_data
         self.case_id = case_data.get('id')
+        self.carpeta_actual = None
+        self._generacion = 0  # invalida poblaciones por bloques de una carpeta anterior
+        self._vigilancia = None  # (ruta, id_suscripcion)
+        self._recarga_programada = None
         self.create_widgets()
-        self.load_case_documents(self.case_data.get('ruta_carpeta', ''))
+        self.bind("<Destroy>", self._on_destroy, add="+")
+        # CaseDetailWindow difiere el escaneo de la carpeta hasta que la pestaña se muestra
+        if cargar_al_iniciar:
+            self.load_case_documents(self.case_data.get('ruta_carpeta', ''))
 
     def create_widgets(self):
         self.columnconfigure(0, weight=1)
@@ -33,6 +48,9 @@ class DocumentosTab(ttk.Frame):
         self.open_folder_btn = ttk.Button(folder_frame, text="Abrir Carpeta", command=self.open_case_folder, width=12)
         self.open_folder_btn.grid(row=0, column=2, sticky=tk.E)
 
+        self.search_content_btn = ttk.Button(folder_frame, text="Buscar en Contenido...", command=self.buscar_en_contenido)
+        self.search_content_btn.grid(row=0, column=3, sticky=tk.E, padx=(5, 0))
+
         ttk.Label(self, text="Archivos y Carpetas:").grid(row=2, column=0, pady=(5, 5), sticky=tk.NW)
         
         documents_tree_frame = ttk.Frame(self)
@@ -56,13 +74,144 @@ class DocumentosTab(ttk.Frame):
         self.document_tree.bind("<Double-1>", self.on_document_double_click)
 
     def load_case_documents(self, folder_path):
-        # Utiliza los métodos del app_controller que ya existen
-        self.app_controller.clear_document_list_for_tab(self.document_tree)
-        self.app_controller.load_case_documents_for_tab(self.document_tree, folder_path, self.case_data)
-        
+        """Muestra una carpeta. El listado se obtiene en segundo plano (con caché) y se vuelca por bloques."""
+        self.carpeta_actual = folder_path
+        self._generacion += 1
+
         # Actualizar labels y botones de esta pestaña
         self.folder_path_lbl.config(text=folder_path if folder_path else "Carpeta no asignada")
         self.open_folder_btn.config(state=tk.NORMAL if folder_path and os.path.isdir(folder_path) else tk.DISABLED)
+        self._vigilar(folder_path)
+
+        if not folder_path or not os.path.isdir(folder_path):
+            ejecutor_datos.cancelar(('documentos', id(self)))
+            self._limpiar_lista()
+            self.document_tree.insert('', tk.END, values=("Carpeta no asignada o no encontrada.", "", ""),
+                                      iid="no_folder_or_invalid")
+            return
+
+        self._solicitar_listado(folder_path, incremental=False)
+        # Al navegar por subcarpetas no hace falta volver a recorrer todo el árbol del caso
+        if folder_path == self.case_data.get('ruta_carpeta'):
+            self._actualizar_indice()
+
+    def _actualizar_indice(self):
+        """Pide al indexador de fondo que ponga al día el índice de texto de la carpeta del caso."""
+        indexador = getattr(self.app_controller, 'indexador_documentos', None)
+        if indexador and self.case_data.get('ruta_carpeta'):
+            indexador.encolar_caso(self.case_id, self.case_data['ruta_carpeta'])
+
+    def buscar_en_contenido(self):
+        self.app_controller._abrir_busqueda_documentos(self.case_id, self.case_data.get('caratula'))
+
+    def _solicitar_listado(self, folder_path, incremental):
+        generacion = self._generacion
+        ejecutor_datos.enviar(
+            cache_carpetas.obtener, folder_path,
+            clave=('documentos', id(self)),
+            al_completar=lambda entradas: self._mostrar_listado(folder_path, entradas, generacion, incremental),
+            al_fallar=lambda error: self._mostrar_error_listado(error),
+            indicador=indicador_cursor(self.document_tree),
+        )
+
+    def _limpiar_lista(self):
+        self.document_tree.delete(*self.document_tree.get_children())
+
+    def _mostrar_error_listado(self, error):
+        self._limpiar_lista()
+        self.document_tree.insert('', tk.END, values=(f"Error al leer dir: {error}", "", ""), iid="error_dir_listing")
+
+    def _fila_subir_nivel(self, folder_path):
+        """Fila '[..]' si la carpeta mostrada es una subcarpeta de la del caso."""
+        root_case_folder = self.case_data.get('ruta_carpeta', '') or ''
+        if not root_case_folder or os.path.normpath(folder_path) == os.path.normpath(root_case_folder):
+            return None
+        parent_dir = os.path.dirname(folder_path)
+        if parent_dir == os.path.normpath(root_case_folder) or parent_dir.startswith(os.path.normpath(root_case_folder) + os.sep):
+            return parent_dir
+        return None
+
+    def _mostrar_listado(self, folder_path, entradas, generacion, incremental):
+        if generacion != self._generacion or folder_path != self.carpeta_actual:
+            return
+        if incremental:
+            # Detener los bloques pendientes de una carga completa: la diferencia inserta lo que falte
+            self._generacion += 1
+            self._aplicar_diferencias(folder_path, entradas)
+            return
+
+        self._limpiar_lista()
+        parent_dir = self._fila_subir_nivel(folder_path)
+        if parent_dir:
+            self.document_tree.insert('', 0, values=("[..] Subir Nivel", "Carpeta", ""),
+                                      iid=parent_dir, tags=('parent_folder',))
+        self._insertar_bloque(entradas, 0, generacion)
+
+    def _insertar_bloque(self, entradas, inicio, generacion):
+        if generacion != self._generacion or not self.winfo_exists():
+            return
+        fin = min(inicio + self.FILAS_POR_BLOQUE, len(entradas))
+        for entrada in entradas[inicio:fin]:
+            self.document_tree.insert('', tk.END, values=valores_fila(entrada), iid=entrada.ruta,
+                                      tags=('folder',) if entrada.es_carpeta else ('file',))
+        if fin < len(entradas):
+            self.after(1, self._insertar_bloque, entradas, fin, generacion)
+
+    def _aplicar_diferencias(self, folder_path, entradas):
+        """Actualiza en su lugar la lista ya mostrada: quita, agrega y reordena sólo lo que cambió."""
+        nuevas = {entrada.ruta: entrada for entrada in entradas}
+        offset = 1 if self._fila_subir_nivel(folder_path) else 0
+        for iid in self.document_tree.get_children():
+            if 'parent_folder' in self.document_tree.item(iid, 'tags'):
+                continue
+            if iid not in nuevas:
+                self.document_tree.delete(iid)
+        for indice, entrada in enumerate(entradas, start=offset):
+            valores = valores_fila(entrada)
+            if self.document_tree.exists(entrada.ruta):
+                if tuple(self.document_tree.item(entrada.ruta, 'values')) != valores:
+                    self.document_tree.item(entrada.ruta, values=valores)
+                if self.document_tree.index(entrada.ruta) != indice:
+                    self.document_tree.move(entrada.ruta, '', indice)
+            else:
+                self.document_tree.insert('', indice, values=valores, iid=entrada.ruta,
+                                          tags=('folder',) if entrada.es_carpeta else ('file',))
+
+    # --- Vigilancia de la carpeta mostrada ---
+
+    def _vigilar(self, folder_path):
+        if self._vigilancia and self._vigilancia[0] == folder_path:
+            return
+        self._dejar_de_vigilar()
+        if folder_path and os.path.isdir(folder_path):
+            id_suscripcion = vigilante_carpetas.vigilar(
+                folder_path, lambda ruta: self.after(0, self._on_carpeta_cambiada, ruta)
+            )
+            if id_suscripcion is not None:
+                self._vigilancia = (folder_path, id_suscripcion)
+
+    def _dejar_de_vigilar(self):
+        if self._vigilancia:
+            vigilante_carpetas.dejar_de_vigilar(*self._vigilancia)
+            self._vigilancia = None
+
+    def _on_carpeta_cambiada(self, ruta):
+        if not self.carpeta_actual or os.path.normpath(ruta) != os.path.normpath(self.carpeta_actual):
+            return
+        if self._recarga_programada is not None:
+            self.after_cancel(self._recarga_programada)
+        self._recarga_programada = self.after(self.DEMORA_RECARGA_MS, self._recargar_por_cambio)
+
+    def _recargar_por_cambio(self):
+        self._recarga_programada = None
+        if self.carpeta_actual and os.path.isdir(self.carpeta_actual):
+            self._solicitar_listado(self.carpeta_actual, incremental=True)
+            self._actualizar_indice()
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._dejar_de_vigilar()
+            ejecutor_datos.cancelar(('documentos', id(self)))
 
     def select_case_folder(self):
         # Llama a la lógica del controlador principal, pero actualiza su propia UI
@@ -80,4 +229,10 @@ class DocumentosTab(ttk.Frame):
         self.app_controller.open_case_folder_from_tab(self.case_data)
         
     def on_document_double_click(self, event):
+        item_id = self.document_tree.identify_row(event.y)
+        item_tags = self.document_tree.item(item_id, 'tags') if item_id else ()
+        if ('folder' in item_tags or 'parent_folder' in item_tags) and os.path.isdir(item_id):
+            # Navegar dentro de la carpeta del caso; los listados ya visitados salen de la caché
+            self.load_case_documents(item_id)
+            return
         self.app_controller.on_document_double_click_from_tab(event, self.document_tree, self.case_id, self.case_data)
\ No newline at end of file
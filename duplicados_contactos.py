@@ -0,0 +1,300 @@
+"""
+Duplicados de Contactos - Detección en lote de contactos repetidos en `contactos`
+
+La misma persona suele cargarse varias veces con el nombre escrito distinto
+("Pérez, Juan Carlos" / "Juan C. Perez"). Comparar todos contra todos es
+cuadrático; acá cada contacto sólo se compara con los que comparten alguna
+clave de bloqueo:
+
+- identificadores normalizados: DNI, CUIT (y el DNI contenido en el CUIT/CUIL),
+  email y teléfono;
+- clave fonética (español) de cada par de palabras del nombre;
+- los dos trigramas menos frecuentes del nombre en todo el directorio.
+
+Los bloques demasiado grandes (p. ej. un trigrama común) se descartan, así
+que la cantidad de comparaciones crece casi linealmente con los contactos.
+Los pares con puntaje suficiente se agrupan con union-find sin unir grupos que
+tengan DNI o CUIT distintos, y cada grupo es una propuesta de fusión.
+Un grupo sólo es "seguro" (fusionable sin revisión) si todos sus pares
+coinciden en DNI o CUIT; email o teléfono compartidos sólo lo proponen.
+La fusión en sí está en `crm_database.fusionar_contactos`.
+"""
+
+import csv
+import itertools
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Puntaje mínimo de un par para proponer la fusión, y a partir del cual se considera segura
+# (además de tener el mismo DNI o CUIT)
+UMBRAL_PROPUESTA = 0.75
+UMBRAL_SEGURO = 0.95
+
+# Los bloques más grandes que esto no aportan (claves demasiado comunes) y se omiten
+MAX_BLOQUE = 50
+
+_PALABRAS_IGNORADAS = {'de', 'del', 'la', 'las', 'los', 'y', 'e', 'sa', 'srl', 'sas', 'sociedad',
+                       'anonima', 'responsabilidad', 'limitada', 'dr', 'dra', 'sr', 'sra'}
+
+CAMPOS_FUSIONABLES = ('es_persona_juridica', 'dni', 'cuit', 'domicilio_real', 'domicilio_legal',
+                      'email', 'telefono')
+
+
+# ========================================
+# NORMALIZACIÓN Y CLAVES
+# ========================================
+
+def normalizar_nombre(nombre: Optional[str]) -> str:
+    """Minúsculas, sin acentos ni signos y sin palabras de relleno ('de', 'S.A.', 'Dr.')."""
+    texto = unicodedata.normalize('NFKD', (nombre or '').lower()).encode('ascii', 'ignore').decode('ascii')
+    texto = re.sub(r'\b([a-z])\.(?=[a-z]\.)', r'\1', texto)  # s.a. / s.r.l. -> sa / srl
+    palabras = re.sub(r'[^a-z0-9]+', ' ', texto.replace('.', '')).split()
+    return ' '.join(p for p in palabras if p not in _PALABRAS_IGNORADAS)
+
+
+def clave_fonetica(palabra: str) -> str:
+    """
+    Clave fonética simplificada para el español rioplatense (b/v, c/s/z, ll/y, h muda...).
+    Conserva las vocales: sin ellas Juan/Juana o Mario/María tendrían la misma clave.
+    """
+    p = palabra
+    # '1' y '2' marcan ch y la g suave de gue/gui mientras se reescriben las demás
+    for origen, destino in (('ch', '1'), ('qu', 'k'), ('gue', '2e'), ('gui', '2i'), ('ll', 'y'),
+                            ('ce', 'se'), ('ci', 'si'), ('ge', 'je'), ('gi', 'ji')):
+        p = p.replace(origen, destino)
+    p = p.translate(str.maketrans({'v': 'b', 'z': 's', 'c': 'k', 'q': 'k', 'w': 'u', 'x': 's', 'h': '',
+                                   '2': 'g'}))
+    return re.sub(r'(.)\1+', r'\1', p)     # letras repetidas
+
+
+def solo_digitos(valor) -> str:
+    return re.sub(r'\D', '', str(valor or ''))
+
+
+def trigramas(nombre_normalizado: str) -> Set[str]:
+    texto = f"  {nombre_normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class ContactoNormalizado:
+    """Valores de un contacto ya normalizados para comparar."""
+
+    __slots__ = ('id', 'nombre', 'palabras', 'foneticas', 'trigramas', 'dni', 'cuit', 'email',
+                 'telefono', 'juridica')
+
+    def __init__(self, contacto: Dict):
+        self.id = contacto['id']
+        self.nombre = normalizar_nombre(contacto.get('nombre_completo'))
+        self.palabras = self.nombre.split()
+        self.foneticas = frozenset(clave_fonetica(p) for p in self.palabras if len(p) > 1)
+        self.trigramas = trigramas(self.nombre)
+        dni = solo_digitos(contacto.get('dni'))
+        cuit = solo_digitos(contacto.get('cuit'))
+        self.cuit = cuit if len(cuit) == 11 else ''
+        # El CUIL/CUIT de una persona contiene su DNI
+        if not 7 <= len(dni) <= 8 and self.cuit and self.cuit[:2] in ('20', '23', '24', '27'):
+            dni = self.cuit[2:10]
+        self.dni = dni.lstrip('0') if 7 <= len(dni) <= 8 else ''
+        self.email = (contacto.get('email') or '').strip().lower()
+        telefono = solo_digitos(contacto.get('telefono'))
+        self.telefono = telefono[-8:] if len(telefono) >= 8 else ''
+        self.juridica = bool(contacto.get('es_persona_juridica'))
+
+    def claves_identificacion(self) -> List[str]:
+        claves = []
+        if self.dni:
+            claves.append(f"dni:{self.dni}")
+        if self.cuit:
+            claves.append(f"cuit:{self.cuit}")
+        if self.email:
+            claves.append(f"email:{self.email}")
+        if self.telefono:
+            claves.append(f"tel:{self.telefono}")
+        return claves
+
+    def claves_foneticas(self) -> List[str]:
+        codigos = sorted(self.foneticas)
+        if len(codigos) == 1:
+            return [f"fon:{codigos[0]}"]
+        return [f"fon:{a}|{b}" for a, b in itertools.combinations(codigos, 2)]
+
+
+# ========================================
+# PUNTAJE DE UN PAR
+# ========================================
+
+def puntuar_par(a: ContactoNormalizado, b: ContactoNormalizado) -> Tuple[float, List[str]]:
+    """
+    Puntaje entre 0 y 1 de que `a` y `b` sean la misma persona, con los motivos.
+    Un DNI o CUIT distinto entre ambos descarta el par.
+    """
+    if (a.dni and b.dni and a.dni != b.dni) or (a.cuit and b.cuit and a.cuit != b.cuit):
+        return 0.0, ['identificación distinta']
+
+    motivos = []
+    union = len(a.trigramas | b.trigramas)
+    similitud = len(a.trigramas & b.trigramas) / union if union else 0.0
+    if a.foneticas and b.foneticas:
+        comunes = len(a.foneticas & b.foneticas)
+        menor, mayor = sorted((len(a.foneticas), len(b.foneticas)))
+        if comunes == mayor and mayor >= 2:
+            similitud = max(similitud, 0.95)   # mismas palabras en otro orden o con otra ortografía
+        elif comunes == menor and menor >= 2:
+            similitud = max(similitud, 0.85)   # "Juan Pérez" contra "Juan Carlos Pérez"
+        else:
+            similitud = max(similitud, 0.9 * comunes / mayor)
+    # Sólo con el nombre se llega a proponer, pero no a una fusión "segura"
+    puntaje = 0.8 * similitud
+    if similitud >= 0.5:
+        motivos.append(f"nombre similar ({similitud:.0%})")
+
+    if a.dni and a.dni == b.dni:
+        puntaje += 0.5
+        motivos.append('mismo DNI')
+    if a.cuit and a.cuit == b.cuit:
+        puntaje += 0.5
+        motivos.append('mismo CUIT')
+    if a.email and a.email == b.email:
+        puntaje += 0.3
+        motivos.append('mismo email')
+    if a.telefono and a.telefono == b.telefono:
+        puntaje += 0.2
+        motivos.append('mismo teléfono')
+    if a.juridica != b.juridica:
+        puntaje -= 0.2
+    # Sólo coincide un dato de contacto y el nombre no se parece: oficina o familiar compartido
+    if similitud < 0.3 and not (a.dni and a.dni == b.dni) and not (a.cuit and a.cuit == b.cuit):
+        puntaje = min(puntaje, 0.5)
+    return max(0.0, min(1.0, puntaje)), motivos
+
+
+# ========================================
+# DETECCIÓN
+# ========================================
+
+def construir_bloques(contactos: List[ContactoNormalizado], max_bloque: int = MAX_BLOQUE) -> Dict[str, List[int]]:
+    """Clave de bloqueo -> índices de los contactos que la comparten (sólo bloques de 2 a `max_bloque`)."""
+    frecuencia = Counter(t for c in contactos for t in c.trigramas if t.strip())
+    bloques: Dict[str, List[int]] = defaultdict(list)
+    for indice, contacto in enumerate(contactos):
+        claves = contacto.claves_identificacion() + contacto.claves_foneticas()
+        raros = sorted((t for t in contacto.trigramas if t.strip()), key=lambda t: (frecuencia[t], t))[:2]
+        claves += [f"tri:{t}" for t in raros]
+        for clave in claves:
+            bloques[clave].append(indice)
+    return {clave: indices for clave, indices in bloques.items() if 2 <= len(indices) <= max_bloque}
+
+
+def pares_candidatos(bloques: Dict[str, List[int]]) -> Set[Tuple[int, int]]:
+    pares = set()
+    for indices in bloques.values():
+        pares.update(itertools.combinations(sorted(indices), 2))
+    return pares
+
+
+class _UnionFind:
+    def __init__(self, contactos: List[ContactoNormalizado]):
+        self.padre = list(range(len(contactos)))
+        self.identificaciones = [
+            ({c.dni} if c.dni else set(), {c.cuit} if c.cuit else set()) for c in contactos
+        ]
+
+    def raiz(self, i: int) -> int:
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+
+    def unir(self, a: int, b: int) -> bool:
+        ra, rb = self.raiz(a), self.raiz(b)
+        if ra == rb:
+            return True
+        (dni_a, cuit_a), (dni_b, cuit_b) = self.identificaciones[ra], self.identificaciones[rb]
+        # No encadenar personas distintas a través de un tercero parecido a ambas
+        if (dni_a and dni_b and dni_a != dni_b) or (cuit_a and cuit_b and cuit_a != cuit_b):
+            return False
+        self.padre[rb] = ra
+        self.identificaciones[ra] = (dni_a | dni_b, cuit_a | cuit_b)
+        return True
+
+
+def detectar_duplicados(contactos: Iterable[Dict], umbral: float = UMBRAL_PROPUESTA,
+                        max_bloque: int = MAX_BLOQUE) -> List[Dict]:
+    """
+    Propuestas de fusión para una lista de contactos (dicts con las columnas de
+    `contactos` y, opcionalmente, `cantidad_roles`).
+
+    Returns:
+        list: Una propuesta por grupo, ordenadas de la más segura a la menos:
+            {'conservar_id', 'contacto_ids', 'contactos', 'puntaje', 'segura', 'pares'}.
+            'segura' exige además que todos los pares del grupo compartan DNI o CUIT.
+    """
+    originales = list(contactos)
+    normalizados = [ContactoNormalizado(c) for c in originales]
+    pares = []
+    for i, j in pares_candidatos(construir_bloques(normalizados, max_bloque)):
+        puntaje, motivos = puntuar_par(normalizados[i], normalizados[j])
+        if puntaje >= umbral:
+            pares.append((puntaje, i, j, motivos, _mismo_documento(normalizados[i], normalizados[j])))
+    pares.sort(key=lambda par: (-par[0], par[1], par[2]))
+
+    grupos = _UnionFind(normalizados)
+    aceptados = [par for par in pares if grupos.unir(par[1], par[2])]
+    miembros: Dict[int, List[int]] = defaultdict(list)
+    pares_por_grupo: Dict[int, List[Tuple]] = defaultdict(list)
+    for indice in range(len(normalizados)):
+        miembros[grupos.raiz(indice)].append(indice)
+    for par in aceptados:
+        pares_por_grupo[grupos.raiz(par[1])].append(par)
+
+    propuestas = []
+    for raiz, indices in miembros.items():
+        if len(indices) < 2:
+            continue
+        grupo = [originales[i] for i in indices]
+        conservar = max(grupo, key=_prioridad_conservar)
+        pares_grupo = pares_por_grupo[raiz]
+        puntaje = min(par[0] for par in pares_grupo)
+        propuestas.append({
+            'conservar_id': conservar['id'],
+            'contacto_ids': sorted(c['id'] for c in grupo),
+            'contactos': sorted(grupo, key=lambda c: c['id']),
+            'puntaje': round(puntaje, 3),
+            # Email o teléfono compartidos no bastan: puede ser un familiar o la misma oficina
+            'segura': puntaje >= UMBRAL_SEGURO and all(par[4] for par in pares_grupo),
+            'pares': [
+                {'a': originales[i]['id'], 'b': originales[j]['id'], 'puntaje': round(p, 3), 'motivos': m}
+                for p, i, j, m, _ in pares_grupo
+            ],
+        })
+    propuestas.sort(key=lambda p: (-p['puntaje'], p['conservar_id']))
+    return propuestas
+
+
+def _mismo_documento(a: ContactoNormalizado, b: ContactoNormalizado) -> bool:
+    return bool((a.dni and a.dni == b.dni) or (a.cuit and a.cuit == b.cuit))
+
+
+def _prioridad_conservar(contacto: Dict):
+    """Se conserva el contacto usado en más casos; luego el más completo y el más antiguo."""
+    completos = sum(1 for campo in CAMPOS_FUSIONABLES if contacto.get(campo))
+    return (contacto.get('cantidad_roles') or 0, completos, -(contacto.get('created_at') or 0), -contacto['id'])
+
+
+def exportar_reporte_csv(propuestas: List[Dict], ruta: str) -> int:
+    """Escribe una fila por contacto de cada propuesta; devuelve la cantidad de propuestas."""
+    with open(ruta, 'w', newline='', encoding='utf-8-sig') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(['grupo', 'accion', 'contacto_id', 'nombre_completo', 'dni', 'cuit', 'email',
+                           'telefono', 'cantidad_roles', 'puntaje', 'segura', 'motivos'])
+        for numero, propuesta in enumerate(propuestas, start=1):
+            motivos = '; '.join(sorted({m for par in propuesta['pares'] for m in par['motivos']}))
+            for contacto in propuesta['contactos']:
+                accion = 'conservar' if contacto['id'] == propuesta['conservar_id'] else 'fusionar'
+                escritor.writerow([numero, accion, contacto['id'], contacto.get('nombre_completo'),
+                                   contacto.get('dni'), contacto.get('cuit'), contacto.get('email'),
+                                   contacto.get('telefono'), contacto.get('cantidad_roles') or 0,
+                                   propuesta['puntaje'], 'sí' if propuesta['segura'] else 'no', motivos])
+    return len(propuestas)
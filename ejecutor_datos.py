@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Ejecutor de Datos - Pool de hilos compartido para sacar las consultas a la base
+del hilo de Tk.
+
+Las ventanas envían la consulta con `enviar()` y reciben el resultado en el hilo
+principal (vía `root.after`) a través de `al_completar` / `al_fallar`. Cada envío
+puede llevar una `clave` (p. ej. ('partes', ventana_id)): un envío nuevo con la
+misma clave deja obsoleto al anterior, cuyo resultado se descarta sin tocar la
+interfaz. Los indicadores de carga se encienden mientras haya futuros pendientes
+para su clave.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger('ejecutor_datos')
+
+
+class EjecutorDatos:
+    """Pool de hilos con entrega de resultados en el hilo de Tk y cancelación por clave."""
+
+    MAX_HILOS = 4
+
+    def __init__(self, max_hilos: int = MAX_HILOS, root=None):
+        self._max_hilos = max_hilos
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._root = root
+        self._lock = threading.Lock()
+        # clave -> futuro vigente; los demás futuros con esa clave son obsoletos
+        self._vigentes: Dict[Hashable, Future] = {}
+        # clave -> (cantidad de futuros pendientes, indicador)
+        self._pendientes: Dict[Hashable, list] = {}
+        self.descartados = 0
+
+    def configurar(self, root):
+        """Fija la raíz de Tk por la que se entregan los resultados."""
+        self._root = root
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._max_hilos, thread_name_prefix="EjecutorDatos")
+            return self._pool
+
+    def enviar(self, funcion: Callable, *args,
+               clave: Optional[Hashable] = None,
+               al_completar: Optional[Callable[[Any], None]] = None,
+               al_fallar: Optional[Callable[[Exception], None]] = None,
+               indicador: Optional[Callable[[bool], None]] = None,
+               **kwargs) -> Future:
+        """
+        Ejecuta `funcion(*args, **kwargs)` en el pool. Debe llamarse desde el hilo de Tk.
+
+        `al_completar(resultado)` o `al_fallar(excepcion)` se invocan en el hilo de Tk
+        sólo si el envío sigue vigente para su clave. `indicador(True)` se invoca al
+        pasar la clave a tener trabajo pendiente e `indicador(False)` al quedar libre.
+        """
+        if clave is not None:
+            self._reemplazar_vigente(clave)
+            self._incrementar_pendientes(clave, indicador)
+
+        futuro = self._obtener_pool().submit(funcion, *args, **kwargs)
+        if clave is not None:
+            self._vigentes[clave] = futuro
+        futuro.add_done_callback(
+            lambda f: self._programar_entrega(f, clave, al_completar, al_fallar)
+        )
+        return futuro
+
+    def cancelar(self, clave: Hashable):
+        """Deja obsoleto el envío vigente de `clave` (si aún no empezó, ni se ejecuta)."""
+        self._reemplazar_vigente(clave)
+
+    def pendientes(self, clave: Optional[Hashable] = None) -> int:
+        """Cantidad de futuros sin entregar, para una clave o en total."""
+        if clave is not None:
+            return self._pendientes.get(clave, [0])[0]
+        return sum(cantidad for cantidad, _ in self._pendientes.values())
+
+    def apagar(self, esperar: bool = False):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        self._vigentes.clear()
+        if pool:
+            pool.shutdown(wait=esperar, cancel_futures=True)
+
+    # --- Internos ---
+
+    def _reemplazar_vigente(self, clave):
+        anterior = self._vigentes.pop(clave, None)
+        if anterior is not None:
+            anterior.cancel()
+
+    def _incrementar_pendientes(self, clave, indicador):
+        estado = self._pendientes.setdefault(clave, [0, None])
+        if indicador is not None:
+            estado[1] = indicador
+        estado[0] += 1
+        if estado[0] == 1:
+            self._invocar_indicador(estado[1], True)
+
+    def _decrementar_pendientes(self, clave):
+        estado = self._pendientes.get(clave)
+        if not estado:
+            return
+        estado[0] -= 1
+        if estado[0] <= 0:
+            del self._pendientes[clave]
+            self._invocar_indicador(estado[1], False)
+
+    @staticmethod
+    def _invocar_indicador(indicador, activo):
+        if indicador is None:
+            return
+        try:
+            indicador(activo)
+        except Exception as e:
+            # La ventana pudo cerrarse mientras la consulta estaba en curso
+            logger.debug(f"Indicador de carga no disponible: {e}")
+
+    def _programar_entrega(self, futuro, clave, al_completar, al_fallar):
+        """Corre en el hilo que completó el futuro; pasa la entrega al hilo de Tk."""
+        if self._root is None:
+            self._entregar(futuro, clave, al_completar, al_fallar)
+            return
+        try:
+            self._root.after(0, self._entregar, futuro, clave, al_completar, al_fallar)
+        except Exception as e:
+            # La raíz ya fue destruida (cierre de la aplicación)
+            logger.debug(f"No se pudo entregar el resultado: {e}")
+
+    def _entregar(self, futuro, clave, al_completar, al_fallar):
+        if clave is not None:
+            self._decrementar_pendientes(clave)
+            if self._vigentes.get(clave) is not futuro:
+                self.descartados += 1
+                return
+            del self._vigentes[clave]
+        if futuro.cancelled():
+            return
+
+        excepcion = futuro.exception()
+        try:
+            if excepcion is not None:
+                if al_fallar:
+                    al_fallar(excepcion)
+                else:
+                    logger.error(f"Error en consulta en segundo plano: {excepcion}", exc_info=excepcion)
+            elif al_completar:
+                al_completar(futuro.result())
+        except Exception as e:
+            # Típicamente TclError: el widget destino se cerró antes de recibir los datos
+            logger.warning(f"Error entregando resultado de consulta (clave={clave}): {e}")
+
+
+def indicador_cursor(widget, cursor_ocupado: str = "watch") -> Callable[[bool], None]:
+    """Indicador de carga que pone el cursor de espera sobre `widget` mientras haya consultas pendientes."""
+    def indicador(activo: bool):
+        widget.config(cursor=cursor_ocupado if activo else "")
+    return indicador
+
+
+# Instancia compartida por todas las ventanas; main_app la configura con su root
+ejecutor_datos = EjecutorDatos()
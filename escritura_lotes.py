@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Escritura por Lotes - Utilidades de la capa de datos para escribir muchas filas
+en un solo viaje al servidor.
+
+Las operaciones que antes insertaban, actualizaban o borraban fila por fila
+(y a veces abrían una conexión por fila) usan estas funciones sobre un cursor
+de una única transacción:
+
+    with transaccion() as cur:
+        ids = insertar_lote(cur, 'roles_en_caso', columnas, filas, retorno='id')
+        eliminar_lote(cur, 'caso_etiquetas', 'etiqueta_id', ids_a_quitar, filtro=('caso_id', caso_id))
+
+- `insertar_lote` arma un INSERT multi-fila con execute_values (admite ON
+  CONFLICT y RETURNING) y pasa a COPY cuando el lote es grande y no hace falta
+  ninguna de las dos cosas.
+- `actualizar_lote` hace un UPDATE ... FROM (VALUES ...) con todas las filas.
+- `eliminar_lote` borra con `= ANY(array)`.
+- `copiar_lote` carga filas con COPY FROM STDIN (formato CSV);
+  `copiar_dataframe` hace lo mismo con un DataFrame de pandas.
+"""
+
+import csv
+import io
+import re
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence
+
+import psycopg2
+import psycopg2.extras
+
+# Filas por sentencia en execute_values (psycopg2 parte el lote en páginas de este tamaño)
+TAMANO_PAGINA = 500
+
+# A partir de cuántas filas un INSERT sin ON CONFLICT ni RETURNING se hace con COPY
+UMBRAL_COPY = 5000
+
+
+@contextmanager
+def transaccion(conectar=None, cursor_factory=None):
+    """
+    Abre una conexión, entrega un cursor y confirma al salir (o deshace si hubo una excepción).
+    `conectar` por defecto es crm_database.connect_db. Lanza psycopg2.OperationalError
+    si no se pudo conectar.
+    """
+    if conectar is None:
+        from crm_database import connect_db as conectar
+    conn = conectar()
+    if not conn:
+        raise psycopg2.OperationalError("No se pudo conectar a la base de datos")
+    try:
+        with conn.cursor(cursor_factory=cursor_factory) as cur:
+            yield cur
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+_PATRON_IDENTIFICADOR = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def _identificador(nombre: str) -> str:
+    # Tablas y columnas vienen del código, nunca del usuario: basta con rechazar lo raro
+    if not _PATRON_IDENTIFICADOR.match(nombre):
+        raise ValueError(f"Identificador SQL no válido: {nombre!r}")
+    return nombre
+
+
+def _identificadores(columnas: Sequence[str]) -> str:
+    return ', '.join(_identificador(c) for c in columnas)
+
+
+def insertar_lote(cur, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence],
+                  conflicto: Optional[str] = None, retorno: Optional[str] = None,
+                  plantilla: Optional[str] = None, tamano_pagina: int = TAMANO_PAGINA):
+    """
+    Inserta `filas` en `tabla` con un INSERT multi-fila.
+
+    Args:
+        conflicto: Cláusula a continuación de ON CONFLICT, p. ej.
+            "(caso_id, etiqueta_id) DO NOTHING"
+        retorno: Columnas de RETURNING, p. ej. "id, representa_a_id"
+        plantilla: Plantilla de cada fila para execute_values, p. ej. "(%s, %s::int)"
+
+    Returns:
+        Las filas devueltas por RETURNING si se pidió `retorno` (no se garantiza
+        el orden: mapearlas por alguna columna); si no, la cantidad de filas insertadas.
+    """
+    filas = list(filas)
+    if not filas:
+        return [] if retorno else 0
+    if conflicto is None and retorno is None and len(filas) >= UMBRAL_COPY:
+        return copiar_lote(cur, tabla, columnas, filas)
+
+    consulta = f"INSERT INTO {_identificador(tabla)} ({_identificadores(columnas)}) VALUES %s"
+    if conflicto:
+        consulta += f" ON CONFLICT {conflicto}"
+    if retorno:
+        consulta += f" RETURNING {retorno}"
+        return psycopg2.extras.execute_values(cur, consulta, filas, template=plantilla,
+                                              page_size=tamano_pagina, fetch=True)
+    if conflicto:
+        # rowcount sólo refleja la última página: se cuentan las filas que sí entraron
+        consulta += " RETURNING 1"
+        return len(psycopg2.extras.execute_values(cur, consulta, filas, template=plantilla,
+                                                  page_size=tamano_pagina, fetch=True))
+    psycopg2.extras.execute_values(cur, consulta, filas, template=plantilla, page_size=tamano_pagina)
+    return len(filas)
+
+
+def actualizar_lote(cur, tabla: str, clave: str, columnas: Sequence[str], filas: Iterable[Sequence],
+                    plantilla: Optional[str] = None, tamano_pagina: int = TAMANO_PAGINA) -> int:
+    """
+    Actualiza varias filas en una sentencia: cada fila es (clave, valor_col1, valor_col2, ...).
+    Usar `plantilla` con casts cuando el tipo no se deduce, p. ej. "(%s::int, %s::text)".
+    Devuelve la cantidad de filas del lote.
+    """
+    filas = list(filas)
+    if not filas:
+        return 0
+    asignaciones = ', '.join(f"{c} = v.{c}" for c in map(_identificador, columnas))
+    clave = _identificador(clave)
+    consulta = (f"UPDATE {_identificador(tabla)} AS t SET {asignaciones} "
+                f"FROM (VALUES %s) AS v ({_identificadores([clave, *columnas])}) "
+                f"WHERE t.{clave} = v.{clave}")
+    psycopg2.extras.execute_values(cur, consulta, filas, template=plantilla, page_size=tamano_pagina)
+    return len(filas)
+
+
+def eliminar_lote(cur, tabla: str, columna: str, valores: Iterable, filtro: Optional[tuple] = None) -> int:
+    """
+    DELETE de todas las filas cuya `columna` esté en `valores`, en una sentencia.
+    `filtro` opcional (columna, valor) acota el borrado, p. ej. ('caso_id', 12).
+    """
+    valores = list(valores)
+    if not valores:
+        return 0
+    consulta = f"DELETE FROM {_identificador(tabla)} WHERE {_identificador(columna)} = ANY(%s)"
+    parametros = [valores]
+    if filtro:
+        consulta += f" AND {_identificador(filtro[0])} = %s"
+        parametros.append(filtro[1])
+    cur.execute(consulta, parametros)
+    return cur.rowcount
+
+
+def copiar_lote(cur, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence]) -> int:
+    """
+    Carga `filas` con COPY ... FROM STDIN en formato CSV. None se envía como NULL.
+    No admite ON CONFLICT: para tablas con restricciones que puedan chocar, copiar
+    a una tabla temporal y pasar desde ahí con INSERT ... SELECT.
+    COPY dispara los triggers FOR EACH ROW igual que un INSERT: en cargas grandes
+    sobre tablas indexadas o notificadas, apagar los de crm_database.triggers_por_fila
+    y reindexar después con sql_reindexar_filas (ver importador_masivo).
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    cantidad = 0
+    for fila in filas:
+        escritor.writerow([_valor_csv(v) for v in fila])
+        cantidad += 1
+    if not cantidad:
+        return 0
+    buffer.seek(0)
+    consulta = f"COPY {_identificador(tabla)} ({_identificadores(columnas)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    cur.copy_expert(consulta, buffer)
+    return cantidad
+
+
+def copiar_dataframe(cur, tabla: str, df) -> int:
+    """
+    COPY de un DataFrame de pandas completo: las columnas de `df` deben llamarse
+    como las de la tabla. Los valores nulos (NaN, None, pd.NA) se envían como NULL.
+    """
+    if df.empty:
+        return 0
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    consulta = f"COPY {_identificador(tabla)} ({_identificadores(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    cur.copy_expert(consulta, buffer)
+    return len(df)
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    return valor
+
+
+def lotes(filas: Iterable, tamano: int) -> Iterable[List]:
+    """Parte un iterable en listas de `tamano` elementos (la última puede ser menor)."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
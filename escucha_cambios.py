@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Escucha de Cambios - Recibe por LISTEN/NOTIFY los cambios que hacen otras
+instancias de la aplicación sobre la misma base y los reenvía a los listeners
+de crm_database como eventos remotos.
+"""
+
+import json
+import logging
+import select
+import socket
+import threading
+from typing import Optional
+
+import psycopg2
+import psycopg2.extensions
+
+import crm_database as db
+
+logger = logging.getLogger('escucha_cambios')
+
+
+class EscuchaCambios:
+    """
+    Hilo con una conexión dedicada en LISTEN sobre `crm_database.CANAL_CAMBIOS`.
+
+    Duerme en `select()` hasta que llega una notificación, por lo que no consulta
+    la base mientras no haya cambios. Los eventos originados en esta misma
+    instancia (mismo application_name) se descartan: ya se notificaron en proceso.
+    """
+
+    ESPERA_RECONEXION_MAX = 60
+
+    def __init__(self, db_module=db):
+        self.db = db_module
+        self._hilo: Optional[threading.Thread] = None
+        self._detenido = threading.Event()
+        # Par de sockets para despertar al select() al detener
+        self._despertar_lectura, self._despertar_escritura = socket.socketpair()
+        self.eventos_recibidos = 0
+        self.eventos_propios_descartados = 0
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._ejecutar, name="EscuchaCambios", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0):
+        self._detenido.set()
+        try:
+            self._despertar_escritura.send(b'x')
+        except OSError:
+            pass
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    def _conectar(self):
+        conn = self.db.connect_db()
+        if not conn:
+            return None
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {self.db.CANAL_CAMBIOS};")
+        logger.info(f"Escuchando cambios en el canal '{self.db.CANAL_CAMBIOS}'")
+        return conn
+
+    def procesar_notificacion(self, payload: str):
+        """Interpreta el JSON publicado por fn_notificar_cambio y lo reenvía."""
+        try:
+            evento = json.loads(payload)
+        except (TypeError, ValueError):
+            logger.warning(f"Notificación de cambio inválida: {payload!r}")
+            return
+
+        if evento.get('origen') == self.db.ID_SESION_APP:
+            self.eventos_propios_descartados += 1
+            return
+
+        self.eventos_recibidos += 1
+        self.db.notificar_cambio(
+            evento.get('tabla'),
+            evento.get('op'),
+            evento.get('id'),
+            evento.get('caso_id'),
+            remoto=True,
+        )
+
+    def _ejecutar(self):
+        espera_reconexion = 1
+        while not self._detenido.is_set():
+            conn = None
+            try:
+                conn = self._conectar()
+                if conn is None:
+                    raise psycopg2.OperationalError("No se pudo conectar para escuchar cambios")
+                espera_reconexion = 1
+
+                while not self._detenido.is_set():
+                    listos, _, _ = select.select([conn, self._despertar_lectura], [], [])
+                    if self._despertar_lectura in listos:
+                        break
+                    conn.poll()
+                    while conn.notifies:
+                        notificacion = conn.notifies.pop(0)
+                        self.procesar_notificacion(notificacion.payload)
+            except (Exception, psycopg2.DatabaseError) as e:
+                if self._detenido.is_set():
+                    break
+                logger.warning(f"Escucha de cambios interrumpida: {e}. Reintentando en {espera_reconexion}s")
+                self._detenido.wait(espera_reconexion)
+                espera_reconexion = min(espera_reconexion * 2, self.ESPERA_RECONEXION_MAX)
+            finally:
+                if conn:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        logger.info("Escucha de cambios detenida")
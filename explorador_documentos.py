@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Explorador de Documentos - Listado de carpetas de casos con caché y vigilancia.
+
+Las carpetas de los casos suelen estar en un recurso de red con miles de PDFs,
+así que el listado (scandir + stat por entrada) se hace fuera del hilo de Tk y
+se guarda en una caché por carpeta validada con el mtime del directorio: volver
+a una carpeta que no cambió no toca el disco más que con un stat().
+
+Si está instalado `watchdog` (inotify en Linux, ReadDirectoryChangesW en Windows)
+las carpetas abiertas se vigilan y la caché se invalida cuando se agregan,
+borran o modifican archivos.
+"""
+
+import datetime
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger('explorador_documentos')
+
+
+class EntradaDocumento(NamedTuple):
+    nombre: str
+    ruta: str
+    es_carpeta: bool
+    tamano: int
+    mtime: float
+
+
+def formatear_tamano(size_bytes: int) -> str:
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    if size_bytes < 1024 ** 2:
+        return f"{size_bytes / 1024:.1f} KB"
+    if size_bytes < 1024 ** 3:
+        return f"{size_bytes / 1024 ** 2:.1f} MB"
+    return f"{size_bytes / 1024 ** 3:.1f} GB"
+
+
+def formatear_fecha(mtime: float) -> str:
+    return datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+
+
+def valores_fila(entrada: EntradaDocumento) -> tuple:
+    """Valores de la fila del Treeview de documentos para una entrada."""
+    if entrada.es_carpeta:
+        return (f"[CARPETA] {entrada.nombre}", "Carpeta", formatear_fecha(entrada.mtime))
+    return (entrada.nombre, formatear_tamano(entrada.tamano), formatear_fecha(entrada.mtime))
+
+
+def escanear_carpeta(ruta: str) -> List[EntradaDocumento]:
+    """Lista una carpeta: primero subcarpetas, luego archivos, cada grupo por nombre."""
+    entradas = []
+    with os.scandir(ruta) as it:
+        for entry in it:
+            try:
+                es_carpeta = entry.is_dir()
+                if not es_carpeta and not entry.is_file():
+                    continue
+                stat_info = entry.stat()
+            except OSError as e:
+                logger.warning(f"No se pudo leer info de {entry.path}: {e}")
+                continue
+            entradas.append(EntradaDocumento(
+                entry.name, entry.path, es_carpeta,
+                0 if es_carpeta else stat_info.st_size, stat_info.st_mtime,
+            ))
+    entradas.sort(key=lambda e: (not e.es_carpeta, e.nombre.lower()))
+    return entradas
+
+
+class CacheCarpetas:
+    """Caché LRU de listados de carpetas, válida mientras no cambie el mtime del directorio."""
+
+    MAX_CARPETAS = 64
+
+    def __init__(self, max_carpetas: int = MAX_CARPETAS, escanear: Callable = escanear_carpeta):
+        self._max_carpetas = max_carpetas
+        self._escanear = escanear
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, ruta: str) -> List[EntradaDocumento]:
+        """Listado de `ruta`; sólo re-escanea si el directorio cambió desde la última vez."""
+        ruta = os.path.normpath(ruta)
+        mtime_dir = os.stat(ruta).st_mtime_ns
+        with self._lock:
+            cacheado = self._entradas.get(ruta)
+            if cacheado and cacheado[0] == mtime_dir:
+                self._entradas.move_to_end(ruta)
+                self.aciertos += 1
+                return cacheado[1]
+
+        entradas = self._escanear(ruta)
+        with self._lock:
+            self.fallos += 1
+            self._entradas[ruta] = (mtime_dir, entradas)
+            self._entradas.move_to_end(ruta)
+            while len(self._entradas) > self._max_carpetas:
+                self._entradas.popitem(last=False)
+        return entradas
+
+    def invalidar(self, ruta: str):
+        with self._lock:
+            self._entradas.pop(os.path.normpath(ruta), None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class _ManejadorCambios(FileSystemEventHandler):
+    def __init__(self, vigilante):
+        super().__init__()
+        self._vigilante = vigilante
+
+    def on_any_event(self, event):
+        # Un cambio en una entrada altera el listado de la carpeta que la contiene
+        rutas = {os.path.dirname(event.src_path)}
+        if event.is_directory:
+            rutas.add(event.src_path)
+        if getattr(event, 'dest_path', None):
+            rutas.add(os.path.dirname(event.dest_path))
+        for ruta in rutas:
+            self._vigilante._notificar(ruta)
+
+
+class VigilanteCarpetas:
+    """
+    Vigila carpetas (no recursivo) e invalida su entrada en la caché al cambiar.
+
+    `vigilar(ruta, callback)` devuelve un identificador para `dejar_de_vigilar`;
+    el callback recibe la ruta de la carpeta cambiada y corre en el hilo del
+    observador, así que la interfaz debe pasarlo a Tk con `after`.
+    """
+
+    def __init__(self, cache: CacheCarpetas):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._observer = None
+        # ruta -> (watch de watchdog, {id_suscripcion: callback})
+        self._vigiladas: Dict[str, tuple] = {}
+        self._proximo_id = 0
+
+    @property
+    def disponible(self) -> bool:
+        return WATCHDOG_AVAILABLE
+
+    def vigilar(self, ruta: str, callback: Callable[[str], None]) -> Optional[int]:
+        if not WATCHDOG_AVAILABLE:
+            return None
+        ruta = os.path.normpath(ruta)
+        with self._lock:
+            try:
+                if self._observer is None:
+                    self._observer = Observer()
+                    self._observer.daemon = True
+                    self._observer.start()
+                if ruta not in self._vigiladas:
+                    watch = self._observer.schedule(_ManejadorCambios(self), ruta, recursive=False)
+                    self._vigiladas[ruta] = (watch, {})
+            except Exception as e:
+                # p. ej. límite de inotify alcanzado o recurso de red que no admite notificaciones
+                logger.warning(f"No se puede vigilar {ruta}: {e}")
+                return None
+            self._proximo_id += 1
+            self._vigiladas[ruta][1][self._proximo_id] = callback
+            return self._proximo_id
+
+    def dejar_de_vigilar(self, ruta: str, id_suscripcion: Optional[int]):
+        if id_suscripcion is None:
+            return
+        ruta = os.path.normpath(ruta)
+        with self._lock:
+            vigilada = self._vigiladas.get(ruta)
+            if not vigilada:
+                return
+            vigilada[1].pop(id_suscripcion, None)
+            if not vigilada[1]:
+                del self._vigiladas[ruta]
+                try:
+                    self._observer.unschedule(vigilada[0])
+                except Exception as e:
+                    logger.debug(f"Error dejando de vigilar {ruta}: {e}")
+
+    def detener(self):
+        with self._lock:
+            observer, self._observer = self._observer, None
+            self._vigiladas.clear()
+        if observer:
+            observer.stop()
+            observer.join(timeout=2)
+
+    def _notificar(self, ruta: str):
+        ruta = os.path.normpath(ruta)
+        self._cache.invalidar(ruta)
+        with self._lock:
+            vigilada = self._vigiladas.get(ruta)
+            callbacks = list(vigilada[1].values()) if vigilada else []
+        for callback in callbacks:
+            try:
+                callback(ruta)
+            except Exception as e:
+                logger.debug(f"Error notificando cambio en {ruta}: {e}")
+
+
+# Instancias compartidas por todas las ventanas de casos
+cache_carpetas = CacheCarpetas()
+vigilante_carpetas = VigilanteCarpetas(cache_carpetas)
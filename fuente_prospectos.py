@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Fuente de Prospectos - Lista de prospectos paginada por clave para la ventana
+de prospectos.
+
+La ventana traía la tabla completa y volvía a llenar el TreeView en cada
+cambio de filtro o de estado. `FuentePaginasProspectos` pide a la base páginas
+de (fecha_primera_consulta, id) ya filtradas por estado, nombre y fechas
+(crm_database.get_pagina_prospectos): la primera al abrir o filtrar, y las
+siguientes a medida que el usuario se acerca al final de la lista. Los cambios
+de un prospecto se aplican sobre la fila cargada, sin volver a consultar la
+lista.
+
+Las lecturas corren en segundo plano: `tarea_siguiente_pagina()` devuelve la
+función a ejecutar y `recibir()` incorpora su resultado en el hilo de Tk,
+descartándolo si mientras tanto cambiaron los filtros.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import crm_database as db
+
+
+class FuentePaginasProspectos:
+    """Prospectos cargados hasta ahora, con los filtros vigentes y la clave de la próxima página."""
+
+    def __init__(self, tamano_pagina: int = 100,
+                 leer_pagina: Callable[..., List[dict]] = None,
+                 contar: Callable[..., Optional[int]] = None):
+        self.tamano_pagina = tamano_pagina
+        self._leer_pagina = leer_pagina or db.get_pagina_prospectos
+        self._contar = contar or db.contar_prospectos
+        self.filtros: Dict[str, Any] = {}
+        self._generacion = 0
+        self.reiniciar()
+
+    def reiniciar(self, filtros: Optional[Dict[str, Any]] = None):
+        """Olvida las filas cargadas (y cambia los filtros, si se indican)."""
+        if filtros is not None:
+            self.filtros = {clave: valor for clave, valor in filtros.items() if valor}
+        self._generacion += 1
+        self.filas: List[dict] = []
+        self._por_id: Dict[int, dict] = {}
+        self.total: Optional[int] = None
+        self.hay_mas = True
+        self.cargando = False
+
+    def tarea_siguiente_pagina(self, hasta_id: Optional[int] = None) -> Optional[Callable[[], tuple]]:
+        """
+        Función sin argumentos que lee la próxima página, para ejecutar en segundo
+        plano; None si no quedan filas o ya hay una lectura en curso. Con `hasta_id`
+        la página llega hasta ese prospecto inclusive.
+        """
+        if self.cargando or not self.hay_mas:
+            return None
+        self.cargando = True
+        generacion, filtros = self._generacion, dict(self.filtros)
+        ultima = self.filas[-1] if self.filas else None
+        despues_de = (ultima['fecha_primera_consulta'], ultima['id']) if ultima else None
+        primera = ultima is None
+        tamano = self.tamano_pagina
+
+        def tarea():
+            filas = []
+            if hasta_id is not None:
+                filas = self._leer_pagina(despues_de=despues_de, hasta_id=hasta_id, **filtros)
+            if filas:
+                hay_mas = True
+            else:
+                # Una fila de más indica si queda otra página
+                filas = self._leer_pagina(despues_de=despues_de, limite=tamano + 1, **filtros)
+                hay_mas = len(filas) > tamano
+                filas = filas[:tamano]
+            total = self._contar(**filtros) if primera else None
+            return generacion, filas, hay_mas, total
+
+        return tarea
+
+    def recibir(self, resultado: tuple) -> Optional[List[dict]]:
+        """Incorpora una página leída; devuelve sus filas o None si quedó obsoleta."""
+        generacion, filas, hay_mas, total = resultado
+        if generacion != self._generacion:
+            return None
+        self.cargando = False
+        self.hay_mas = hay_mas
+        if total is not None:
+            self.total = total
+        nuevas = [fila for fila in filas if fila['id'] not in self._por_id]
+        for fila in nuevas:
+            self._por_id[fila['id']] = fila
+        self.filas.extend(nuevas)
+        return nuevas
+
+    def lectura_fallida(self):
+        """Permite reintentar la página después de un error."""
+        self.cargando = False
+
+    def contiene(self, prospecto_id: int) -> bool:
+        return prospecto_id in self._por_id
+
+    def cumple_filtros(self, prospecto: dict) -> bool:
+        """Misma condición que aplica la base de datos, evaluada sobre una fila."""
+        estados = self.filtros.get('estados')
+        if estados and prospecto.get('estado') not in estados:
+            return False
+        nombre = (self.filtros.get('nombre') or '').strip().casefold()
+        if nombre and nombre not in (prospecto.get('nombre') or '').casefold():
+            return False
+        fecha = prospecto.get('fecha_primera_consulta')
+        if self.filtros.get('fecha_desde') and (fecha is None or fecha < self.filtros['fecha_desde']):
+            return False
+        if self.filtros.get('fecha_hasta') and (fecha is None or fecha > self.filtros['fecha_hasta']):
+            return False
+        return True
+
+    def actualizar(self, prospecto: dict) -> Optional[bool]:
+        """
+        Reemplaza la fila cargada del prospecto. Devuelve True si sigue en la lista,
+        False si con los datos nuevos ya no cumple los filtros (y se quitó) y None
+        si el prospecto no estaba cargado.
+        """
+        actual = self._por_id.get(prospecto['id'])
+        if actual is None:
+            return None
+        if not self.cumple_filtros(prospecto):
+            self.quitar(prospecto['id'])
+            return False
+        actual.update(prospecto)
+        return True
+
+    def quitar(self, prospecto_id: int) -> bool:
+        """Quita la fila del prospecto (p. ej. al eliminarlo)."""
+        fila = self._por_id.pop(prospecto_id, None)
+        if fila is None:
+            return False
+        self.filas.remove(fila)
+        if self.total:
+            self.total -= 1
+        return True
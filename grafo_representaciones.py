@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Grafo de Representaciones - Relaciones `representa_a_id` de los roles de un caso
+resueltas en memoria.
+
+Antes cada validación de ciclos recorría la cadena de representación con una
+consulta por nivel, la carga jerárquica de partes repetía un CTE recursivo y la
+detección/validación de representaciones múltiples volvía a leer las mismas
+filas. `GrafoRepresentaciones` se construye con los roles del caso y sus filas
+de la tabla `representaciones` y responde todo eso sin volver a la base;
+`CacheGrafos` lo conserva por caso hasta que cambian los roles (o vence, como
+red de seguridad ante cambios de otras instancias que no llegaron por
+LISTEN/NOTIFY).
+
+Las representaciones múltiples viven en la tabla `representaciones` (grupo,
+rol del abogado, rol representado y rol "sombra" que mantiene representa_a_id).
+Las marcas `[REPRESENTACION_MULTIPLE:...]` de las notas sólo se interpretan al
+migrar datos antiguos: ver `filas_representacion_desde_notas()`.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional
+
+# Mismo orden que el CASE de get_roles_by_caso_id
+ORDEN_ROL = {'Actor': 1, 'Demandado': 2, 'Tercero': 3, 'Abogado': 4, 'Apoderado': 5, 'Perito': 6}
+
+_PATRON_PRIMARY = re.compile(r'REPRESENTACION_MULTIPLE:PRIMARY:([^]]+)')
+_PATRON_SECONDARY = re.compile(r'REPRESENTACION_MULTIPLE:SECONDARY:([^]]+)')
+_PATRON_REPRESENTADO_EN_NOTAS = re.compile(r'-\s*(.+?)\s*\((.+?)\)\s*\[ID:(\d+)\]')
+
+
+def orden_rol(rol_principal) -> int:
+    return ORDEN_ROL.get(rol_principal, 7)
+
+
+class GrafoRepresentaciones:
+    """
+    Roles de un caso indexados por id, con las aristas rol -> rol representado.
+
+    `roles` son filas con al menos rol_id, contacto_id, rol_principal,
+    representa_a_id y nombre_completo (las columnas de get_roles_by_caso_id);
+    `representaciones` son las filas de la tabla del mismo nombre (grupo_id,
+    rol_abogado_id, rol_representado_id, rol_sombra_id). Las cadenas de
+    ancestros se calculan una vez por rol y quedan memorizadas; el grafo es
+    inmutable una vez construido.
+    """
+
+    def __init__(self, roles: List[dict], representaciones: List[dict] = ()):
+        self.roles: Dict[int, dict] = {rol['rol_id']: rol for rol in roles}
+        self._representantes: Dict[int, List[int]] = defaultdict(list)
+        for rol in roles:
+            if rol.get('representa_a_id') in self.roles:
+                self._representantes[rol['representa_a_id']].append(rol['rol_id'])
+        self._cadenas: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+        # Índices de grupos: búsqueda por grupo o por cualquiera de sus roles en O(1)
+        self._grupos: Dict[str, List[dict]] = {}
+        self._grupo_por_rol: Dict[int, str] = {}
+        for fila in representaciones:
+            self._grupos.setdefault(fila['grupo_id'], []).append(fila)
+            self._grupo_por_rol[fila['rol_abogado_id']] = fila['grupo_id']
+            if fila.get('rol_sombra_id') is not None:
+                self._grupo_por_rol[fila['rol_sombra_id']] = fila['grupo_id']
+
+    def __len__(self):
+        return len(self.roles)
+
+    def __contains__(self, rol_id):
+        return rol_id in self.roles
+
+    # --- Cadenas de representación ---
+
+    def _cadena(self, rol_id) -> tuple:
+        """
+        (ancestros, en_ciclo, sale_del_caso): los roles que `rol_id` representa
+        directa o indirectamente, del más cercano al más lejano.
+        """
+        with self._lock:
+            if rol_id in self._cadenas:
+                return self._cadenas[rol_id]
+        ancestros = []
+        vistos = {rol_id}
+        actual = self.roles[rol_id].get('representa_a_id') if rol_id in self.roles else None
+        en_ciclo = False
+        while actual is not None:
+            if actual not in self.roles:
+                break
+            if actual in vistos:
+                en_ciclo = True
+                break
+            vistos.add(actual)
+            ancestros.append(actual)
+            actual = self.roles[actual].get('representa_a_id')
+        resultado = (tuple(ancestros), en_ciclo, actual is not None and not en_ciclo)
+        with self._lock:
+            self._cadenas[rol_id] = resultado
+        return resultado
+
+    def representado(self, rol_id) -> Optional[int]:
+        """Rol al que representa directamente `rol_id` (si está en el caso)."""
+        representa_a_id = self.roles.get(rol_id, {}).get('representa_a_id')
+        return representa_a_id if representa_a_id in self.roles else None
+
+    def representantes(self, rol_id) -> List[int]:
+        """Roles que representan directamente a `rol_id`."""
+        return list(self._representantes.get(rol_id, ()))
+
+    def ancestros(self, rol_id) -> List[int]:
+        """Cadena de representados de `rol_id`, del más cercano al más lejano (se corta en un ciclo)."""
+        return list(self._cadena(rol_id)[0])
+
+    def profundidad(self, rol_id) -> Optional[int]:
+        """
+        Nivel en la jerarquía (0 para quien no representa a nadie). None si la
+        cadena entra en un ciclo o apunta a un rol que no está en el caso.
+        """
+        if rol_id not in self.roles:
+            return None
+        ancestros, en_ciclo, sale_del_caso = self._cadena(rol_id)
+        return None if en_ciclo or sale_del_caso else len(ancestros)
+
+    def crearia_ciclo(self, representa_a_id, rol_id=None) -> bool:
+        """
+        True si hacer que `rol_id` (None para un rol nuevo) represente a
+        `representa_a_id` cerraría un ciclo, o si la cadena de `representa_a_id`
+        ya contiene uno.
+        """
+        if rol_id is not None and representa_a_id == rol_id:
+            return True
+        if representa_a_id not in self.roles:
+            return False
+        ancestros, en_ciclo, _ = self._cadena(representa_a_id)
+        return en_ciclo or (rol_id is not None and rol_id in ancestros)
+
+    # --- Vistas del caso ---
+
+    def roles_jerarquicos(self) -> List[dict]:
+        """
+        Lo que devolvía el CTE recursivo de get_roles_by_caso_id: cada rol alcanzable
+        desde una parte que no representa a nadie, con nivel_jerarquia,
+        ruta_jerarquia, representado_nombre y orden_rol.
+        """
+        filas = []
+        for rol_id, rol in self.roles.items():
+            nivel = self.profundidad(rol_id)
+            if nivel is None:
+                continue
+            ancestros = self.ancestros(rol_id)
+            filas.append(dict(
+                rol,
+                nivel_jerarquia=nivel,
+                ruta_jerarquia=list(reversed(ancestros)) + [rol_id],
+                representado_nombre=self.roles[ancestros[0]].get('nombre_completo') if ancestros else None,
+                orden_rol=orden_rol(rol.get('rol_principal')),
+            ))
+        filas.sort(key=lambda f: (f['orden_rol'], f['nivel_jerarquia'], (f.get('nombre_completo') or '').casefold()))
+        return filas
+
+    def grupo(self, grupo_id) -> List[dict]:
+        """Filas de `representaciones` del grupo."""
+        return list(self._grupos.get(grupo_id, ()))
+
+    def grupo_de_rol(self, rol_id) -> Optional[str]:
+        """Grupo de representación múltiple del rol (como abogado principal o como rol sombra)."""
+        return self._grupo_por_rol.get(rol_id)
+
+    def es_rol_sombra(self, rol_id) -> bool:
+        grupo_id = self._grupo_por_rol.get(rol_id)
+        return grupo_id is not None and self._grupos[grupo_id][0]['rol_abogado_id'] != rol_id
+
+    def grupos_multiples(self) -> Dict[str, dict]:
+        """Grupos de representación múltiple por group_id: rol PRIMARY, roles SECONDARY y abogado."""
+        grupos = {}
+        for group_id, filas in self._grupos.items():
+            primary = filas[0]['rol_abogado_id']
+            grupos[group_id] = {
+                'primary': primary if primary in self.roles else None,
+                'secondary': [f['rol_sombra_id'] for f in filas if f.get('rol_sombra_id') in self.roles],
+                'represented': [f['rol_representado_id'] for f in filas],
+                'lawyer_name': self.roles.get(primary, {}).get('nombre_completo'),
+            }
+        return grupos
+
+    def representaciones_multiples(self) -> Dict[int, dict]:
+        """Mismo formato que detect_multiple_representations_in_case: por contacto_id del abogado."""
+        multiples = {}
+        for group_id, filas in self._grupos.items():
+            rol = self.roles.get(filas[0]['rol_abogado_id'])
+            if not rol or rol.get('rol_principal') not in ('Abogado', 'Apoderado'):
+                continue
+            representations = []
+            for fila in filas:
+                representado = self.roles.get(fila['rol_representado_id'])
+                if not representado or not representado.get('nombre_completo'):
+                    continue
+                # Los grupos migrados de notas antiguas pueden no tener rol sombra
+                sombra_id = fila.get('rol_sombra_id') if fila.get('rol_sombra_id') in self.roles else None
+                representations.append({
+                    'rol_id': sombra_id if sombra_id is not None else rol['rol_id'],
+                    'represented_role': representado.get('rol_principal'),
+                    'represented_name': representado['nombre_completo'],
+                    'represents_id': fila['rol_representado_id'],
+                    'is_secondary': sombra_id is not None,
+                })
+            if representations:
+                multiples[rol['contacto_id']] = {
+                    'lawyer_name': rol.get('nombre_completo'),
+                    'representations': representations,
+                    'is_multiple': True,
+                    'primary_role_id': rol['rol_id'],
+                    'group_id': group_id,
+                }
+        return multiples
+
+    def validar_consistencia(self) -> dict:
+        """Mismo formato que validate_multiple_representation_consistency."""
+        resultado = {
+            'errors': [],
+            'warnings': [],
+            'orphaned_representations': [],
+            'inconsistent_groups': [],
+            'suggestions': [],
+        }
+        for group_id, grupo in self.grupos_multiples().items():
+            if grupo['primary'] is None:
+                resultado['errors'].append(f"Grupo {group_id}: No se encontró rol PRIMARY")
+            if not grupo['secondary']:
+                resultado['warnings'].append(
+                    f"Grupo {group_id}: No hay roles SECONDARY (representación múltiple sin representados)"
+                )
+            # Cada rol sombra debe seguir apuntando a la parte que el grupo dice representar
+            for fila in self._grupos[group_id]:
+                sombra = self.roles.get(fila.get('rol_sombra_id'))
+                if sombra and sombra.get('representa_a_id') != fila['rol_representado_id']:
+                    resultado['inconsistent_groups'].append({
+                        'group_id': group_id,
+                        'rol_sombra_id': sombra['rol_id'],
+                        'representa_a_id': sombra.get('representa_a_id'),
+                        'rol_representado_id': fila['rol_representado_id'],
+                    })
+        for inconsistencia in resultado['inconsistent_groups']:
+            resultado['errors'].append(
+                f"Grupo {inconsistencia['group_id']}: el rol {inconsistencia['rol_sombra_id']} no representa "
+                f"a la parte {inconsistencia['rol_representado_id']}"
+            )
+
+        resultado['orphaned_representations'] = [
+            {
+                'rol_id': rol_id,
+                'nombre': rol.get('nombre_completo'),
+                'representa_a_id_inexistente': rol['representa_a_id'],
+            }
+            for rol_id, rol in self.roles.items()
+            if rol.get('representa_a_id') and rol['representa_a_id'] not in self.roles
+        ]
+
+        if resultado['orphaned_representations']:
+            resultado['suggestions'].append(
+                "Ejecutar limpieza de representaciones huérfanas con clean_orphaned_representations()"
+            )
+        if resultado['errors']:
+            resultado['suggestions'].append(
+                "Revisar y corregir manualmente los grupos de representación múltiple inconsistentes"
+            )
+        return resultado
+
+
+def filas_representacion_desde_notas(roles: List[dict]) -> List[tuple]:
+    """
+    Migración de las representaciones múltiples guardadas como marcas en
+    `notas_del_rol` a filas (grupo_id, caso_id, rol_abogado_id, rol_representado_id,
+    rol_sombra_id) de la tabla `representaciones`.
+
+    `roles` son los roles con marcas (id, caso_id, contacto_id, representa_a_id,
+    notas_del_rol). Si un grupo no tiene roles sombra se recuperan los
+    representados de las líneas "- Nombre (Rol) [ID:n]" del rol principal.
+    """
+    primarios = {}
+    sombras = defaultdict(list)
+    for rol in sorted(roles, key=lambda r: r['id']):
+        notas = rol.get('notas_del_rol') or ''
+        principal = _PATRON_PRIMARY.search(notas)
+        if principal:
+            primarios.setdefault(principal.group(1), rol)
+            continue
+        secundario = _PATRON_SECONDARY.search(notas)
+        if secundario and rol.get('representa_a_id'):
+            sombras[(secundario.group(1), rol['caso_id'], rol['contacto_id'])].append(rol)
+
+    filas = []
+    for grupo_id, principal in primarios.items():
+        del_grupo = sombras.get((grupo_id, principal['caso_id'], principal['contacto_id']), [])
+        vistos = set()
+        for sombra in del_grupo:
+            if sombra['representa_a_id'] not in vistos:
+                vistos.add(sombra['representa_a_id'])
+                filas.append((grupo_id, principal['caso_id'], principal['id'], sombra['representa_a_id'], sombra['id']))
+        if del_grupo:
+            continue
+        for linea in (principal.get('notas_del_rol') or '').split('\n'):
+            partes = _PATRON_REPRESENTADO_EN_NOTAS.search(linea)
+            if partes and int(partes.group(3)) not in vistos:
+                vistos.add(int(partes.group(3)))
+                filas.append((grupo_id, principal['caso_id'], principal['id'], int(partes.group(3)), None))
+    return filas
+
+
+class CacheGrafos:
+    """
+    Grafos por caso. `cargar(caso_id)` hace las consultas y devuelve el
+    GrafoRepresentaciones (o None si falló). Es seguro entre hilos: si una invalidación llega
+    mientras otra consulta está en curso, el resultado de esa consulta no se guarda.
+    """
+
+    VIGENCIA_SEGUNDOS = 300
+    MAX_CASOS = 64
+
+    def __init__(self, cargar: Callable[[int], Optional[GrafoRepresentaciones]], reloj: Callable[[], float] = time.monotonic):
+        self._cargar = cargar
+        self._reloj = reloj
+        self._grafos: "OrderedDict[int, tuple]" = OrderedDict()
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def generacion(self) -> int:
+        with self._lock:
+            return self._generacion
+
+    def obtener(self, caso_id) -> Optional[GrafoRepresentaciones]:
+        with self._lock:
+            entrada = self._grafos.get(caso_id)
+            if entrada and self._reloj() - entrada[1] < self.VIGENCIA_SEGUNDOS:
+                self._grafos.move_to_end(caso_id)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+            generacion = self._generacion
+        grafo = self._cargar(caso_id)
+        if grafo is None:
+            return None
+        self.guardar(caso_id, grafo, generacion)
+        return grafo
+
+    def guardar(self, caso_id, grafo: GrafoRepresentaciones, generacion: Optional[int] = None):
+        """Guarda un grafo construido fuera de obtener(); se descarta si hubo invalidaciones desde `generacion`."""
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._grafos[caso_id] = (grafo, self._reloj())
+            self._grafos.move_to_end(caso_id)
+            while len(self._grafos) > self.MAX_CASOS:
+                self._grafos.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._grafos)
+
+    def estadisticas(self) -> Dict[str, object]:
+        """Contadores con las mismas claves que cache_lecturas.CacheLectura.estadisticas()."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'nombre': 'grafos_representacion',
+                'entradas': len(self._grafos),
+                'max_entradas': self.MAX_CASOS,
+                'vigencia_segundos': self.VIGENCIA_SEGUNDOS,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': None,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0.0,
+            }
+
+    def invalidar(self, caso_id=None):
+        """Olvida el grafo de `caso_id`, o todos si no se indica caso."""
+        with self._lock:
+            self._generacion += 1
+            if caso_id is None:
+                self._grafos.clear()
+            else:
+                self._grafos.pop(caso_id, None)
+
+    def on_cambio_datos(self, tabla, operacion, registro_id, caso_id, remoto=False):
+        """Listener de crm_database.registrar_listener_cambios."""
+        if tabla in ('roles_en_caso', 'representaciones'):
+            self.invalidar(caso_id)
+        elif tabla == 'casos' and operacion == 'DELETE':
+            self.invalidar(registro_id)
+        elif tabla == 'contactos':
+            # Los nombres de los contactos viajan en las filas de todos sus roles
+            self.invalidar()
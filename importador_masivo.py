@@ -0,0 +1,506 @@
+"""
+Importador Masivo - Alta en bloque de contactos, clientes y casos desde CSV o XLSX
+
+El archivo se lee en bloques (pandas para CSV, openpyxl en modo sólo lectura
+para XLSX) y cada bloque se normaliza y valida con operaciones vectorizadas
+(DNI, CUIT con dígito verificador, email, teléfono). Las filas válidas se
+cargan con COPY en una tabla temporal; desde ahí, con SQL de conjunto, se
+marcan las que ya existen en la base y el resto pasa a la tabla real con un
+único INSERT ... SELECT, con los triggers por fila apagados (el índice de
+búsqueda y el aviso de cambios se actualizan después, una sola vez). Todo ocurre en una transacción: si algo falla no queda
+nada a medias.
+
+Las filas rechazadas se escriben, con su número de fila y el motivo, en un
+archivo `<archivo>_errores.csv` junto al original.
+"""
+
+import csv
+import datetime
+import logging
+import os
+import re
+import time
+import unicodedata
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import crm_database as db
+from escritura_lotes import copiar_dataframe, transaccion
+
+logger = logging.getLogger('importador_masivo')
+
+# Filas por bloque de lectura, validación y COPY
+TAMANO_BLOQUE = 20000
+
+TABLA_STAGING = 'importacion_staging'
+
+_PATRON_EMAIL = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+_PESOS_CUIT = np.array([5, 4, 3, 2, 7, 6, 5, 4, 3, 2])
+_VERDADEROS = ['1', 'si', 'sí', 's', 'x', 'true', 'verdadero', 'juridica', 'jurídica']
+
+
+class EspecificacionImportacion(NamedTuple):
+    tabla: str
+    columnas: Tuple[str, ...]             # columnas que se insertan en `tabla`
+    referencias: Tuple[str, ...]          # columnas auxiliares que sólo viven en la staging
+    obligatorias: Tuple[str, ...]
+    alias: Dict[str, str]                 # encabezado normalizado -> columna
+    sql_existentes: Tuple[str, ...]       # UPDATEs que completan existente_id en la staging
+
+
+ESPECIFICACIONES = {
+    'contactos': EspecificacionImportacion(
+        tabla='contactos',
+        columnas=('nombre_completo', 'es_persona_juridica', 'dni', 'cuit', 'domicilio_real',
+                  'domicilio_legal', 'email', 'telefono', 'notas_generales'),
+        referencias=(),
+        obligatorias=('nombre_completo',),
+        alias={'nombre': 'nombre_completo', 'nombre_y_apellido': 'nombre_completo',
+               'apellido_y_nombre': 'nombre_completo', 'razon_social': 'nombre_completo',
+               'persona_juridica': 'es_persona_juridica', 'juridica': 'es_persona_juridica',
+               'documento': 'dni', 'domicilio': 'domicilio_real', 'direccion': 'domicilio_real',
+               'mail': 'email', 'correo': 'email', 'e_mail': 'email',
+               'celular': 'telefono', 'whatsapp': 'telefono', 'tel': 'telefono',
+               'notas': 'notas_generales', 'observaciones': 'notas_generales'},
+        sql_existentes=(
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM contactos c
+                WHERE s.existente_id IS NULL AND s.dni IS NOT NULL
+                  AND regexp_replace(c.dni, '\\D', '', 'g') = s.dni""",
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM contactos c
+                WHERE s.existente_id IS NULL AND s.cuit IS NOT NULL
+                  AND regexp_replace(c.cuit, '\\D', '', 'g') = regexp_replace(s.cuit, '\\D', '', 'g')""",
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM contactos c
+                WHERE s.existente_id IS NULL AND s.email IS NOT NULL
+                  AND lower(trim(c.email)) = s.email""",
+        ),
+    ),
+    'clientes': EspecificacionImportacion(
+        tabla='clientes',
+        columnas=('nombre', 'direccion', 'email', 'whatsapp'),
+        referencias=(),
+        obligatorias=('nombre',),
+        alias={'nombre_completo': 'nombre', 'razon_social': 'nombre', 'cliente': 'nombre',
+               'domicilio': 'direccion', 'mail': 'email', 'correo': 'email', 'e_mail': 'email',
+               'telefono': 'whatsapp', 'celular': 'whatsapp', 'tel': 'whatsapp'},
+        sql_existentes=(
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM clientes c
+                WHERE s.existente_id IS NULL AND s.email IS NOT NULL
+                  AND lower(trim(c.email)) = s.email""",
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM clientes c
+                WHERE s.existente_id IS NULL AND s.whatsapp IS NOT NULL
+                  AND regexp_replace(c.whatsapp, '\\D', '', 'g') = regexp_replace(s.whatsapp, '\\D', '', 'g')""",
+            # Sin email ni teléfono sólo queda el nombre
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM clientes c
+                WHERE s.existente_id IS NULL AND s.email IS NULL AND s.whatsapp IS NULL
+                  AND lower(trim(c.nombre)) = lower(s.nombre)""",
+        ),
+    ),
+    'casos': EspecificacionImportacion(
+        tabla='casos',
+        columnas=('cliente_id', 'caratula', 'numero_expediente', 'anio_caratula', 'juzgado',
+                  'jurisdiccion', 'etapa_procesal', 'notas'),
+        referencias=('cliente_nombre', 'cliente_email'),
+        obligatorias=('caratula',),
+        alias={'expediente': 'numero_expediente', 'nro_expediente': 'numero_expediente',
+               'numero': 'numero_expediente', 'anio': 'anio_caratula', 'ano': 'anio_caratula',
+               'etapa': 'etapa_procesal', 'cliente': 'cliente_nombre',
+               'email_cliente': 'cliente_email', 'id_cliente': 'cliente_id',
+               'observaciones': 'notas'},
+        sql_existentes=(
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM casos c
+                WHERE s.existente_id IS NULL AND s.numero_expediente IS NOT NULL
+                  AND lower(trim(c.numero_expediente)) = lower(s.numero_expediente)
+                  AND COALESCE(trim(c.anio_caratula), '') = COALESCE(s.anio_caratula, '')""",
+            f"""UPDATE {TABLA_STAGING} s SET existente_id = c.id FROM casos c
+                WHERE s.existente_id IS NULL AND s.numero_expediente IS NULL
+                  AND c.cliente_id = s.cliente_id AND lower(trim(c.caratula)) = lower(s.caratula)""",
+        ),
+    ),
+}
+
+# Los casos se vinculan a un cliente por id, por email o por nombre
+_SQL_RESOLVER_CLIENTES = (
+    f"""UPDATE {TABLA_STAGING} s SET cliente_id = NULL
+        WHERE s.cliente_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM clientes c WHERE c.id = s.cliente_id)""",
+    f"""UPDATE {TABLA_STAGING} s SET cliente_id = c.id FROM clientes c
+        WHERE s.cliente_id IS NULL AND s.cliente_email IS NOT NULL AND lower(trim(c.email)) = s.cliente_email""",
+    f"""UPDATE {TABLA_STAGING} s SET cliente_id = c.id FROM clientes c
+        WHERE s.cliente_id IS NULL AND s.cliente_nombre IS NOT NULL AND lower(trim(c.nombre)) = lower(s.cliente_nombre)""",
+)
+
+
+# ========================================
+# NORMALIZACIÓN Y VALIDACIÓN VECTORIZADAS
+# ========================================
+
+def normalizar_encabezado(nombre) -> str:
+    """'Año Carátula' -> 'anio_caratula'; 'E-mail' -> 'e_mail'."""
+    texto = str(nombre or '').strip().lower().replace('ñ', 'ni')
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', texto).strip('_')
+
+
+def mapear_columnas(encabezados, especificacion: EspecificacionImportacion) -> Dict[str, str]:
+    """Encabezado original -> columna de la especificación (los desconocidos se ignoran)."""
+    conocidas = set(especificacion.columnas) | set(especificacion.referencias)
+    mapeo = {}
+    for encabezado in encabezados:
+        normalizado = normalizar_encabezado(encabezado)
+        columna = normalizado if normalizado in conocidas else especificacion.alias.get(normalizado)
+        if columna and columna not in mapeo.values():
+            mapeo[encabezado] = columna
+    return mapeo
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    serie = serie.astype('string').str.strip()
+    return serie.mask(serie == '')
+
+
+def _coincide(serie: pd.Series, patron: str) -> pd.Series:
+    return serie.str.fullmatch(patron).fillna(False).astype(bool)
+
+
+def normalizar_dni(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """DNI sólo con dígitos (7 u 8) y máscara de valores inválidos."""
+    limpio = _texto(serie).str.replace(r'[\s.\-]', '', regex=True)
+    valido = _coincide(limpio, r'\d{7,8}')
+    return limpio.where(valido), limpio.notna() & ~valido
+
+
+def normalizar_cuit(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """CUIT/CUIL con formato XX-XXXXXXXX-X y dígito verificador correcto; máscara de inválidos."""
+    limpio = _texto(serie).str.replace(r'[\s.\-/]', '', regex=True)
+    valido = _coincide(limpio, r'\d{11}')
+    if valido.any():
+        digitos = (np.frombuffer(''.join(limpio[valido]).encode('ascii'), dtype=np.uint8)
+                   .reshape(-1, 11).astype(np.int64) - ord('0'))
+        resto = 11 - (digitos[:, :10] @ _PESOS_CUIT) % 11
+        verificador = np.where(resto == 11, 0, np.where(resto == 10, 9, resto))
+        valido.loc[valido] = verificador == digitos[:, 10]
+    formateado = limpio.str.slice(0, 2) + '-' + limpio.str.slice(2, 10) + '-' + limpio.str.slice(10)
+    return formateado.where(valido), limpio.notna() & ~valido
+
+
+def normalizar_email(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    limpio = _texto(serie).str.lower()
+    valido = _coincide(limpio, _PATRON_EMAIL)
+    return limpio.where(valido), limpio.notna() & ~valido
+
+
+def normalizar_telefono(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Sólo dígitos y un '+' inicial; entre 6 y 15 dígitos."""
+    limpio = _texto(serie).str.replace(r'[^\d+]', '', regex=True).str.replace(r'(?!^)\+', '', regex=True)
+    valido = limpio.str.count(r'\d').between(6, 15).fillna(False).astype(bool)
+    return limpio.where(valido), limpio.notna() & ~valido
+
+
+def normalizar_booleano(serie: pd.Series) -> pd.Series:
+    return _texto(serie).str.lower().isin(_VERDADEROS).astype(bool)
+
+
+def preparar_bloque(df: pd.DataFrame, especificacion: EspecificacionImportacion) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Normaliza y valida un bloque ya renombrado a las columnas de la especificación.
+
+    Args:
+        df: Bloque leído, con la columna `fila` (número de fila en el archivo)
+
+    Returns:
+        (validas, rechazadas): `validas` con `fila` y las columnas de la staging;
+        `rechazadas` con `fila`, `motivo` y los valores originales.
+    """
+    columnas = especificacion.columnas + especificacion.referencias
+    original = df.reindex(columns=['fila', *columnas])
+    datos = pd.DataFrame({'fila': original['fila']})
+    motivos = pd.Series('', index=df.index, dtype='string')
+
+    def rechazar(mascara, motivo):
+        nonlocal motivos
+        motivos = motivos.mask(mascara, motivos + motivo + '; ')
+
+    validadores = {'dni': normalizar_dni, 'cuit': normalizar_cuit, 'email': normalizar_email,
+                   'cliente_email': normalizar_email, 'telefono': normalizar_telefono,
+                   'whatsapp': normalizar_telefono}
+    for columna in columnas:
+        if columna in validadores:
+            datos[columna], invalidos = validadores[columna](original[columna])
+            rechazar(invalidos, f"{columna} inválido")
+        elif columna == 'es_persona_juridica':
+            datos[columna] = normalizar_booleano(original[columna])
+        elif columna == 'cliente_id':
+            texto = _texto(original[columna])
+            valido = _coincide(texto, r'\d+')
+            rechazar(texto.notna() & ~valido, "cliente_id inválido")
+            datos[columna] = pd.to_numeric(texto.where(valido)).astype('Int64')
+        else:
+            datos[columna] = _texto(original[columna])
+
+    for columna in especificacion.obligatorias:
+        rechazar(datos[columna].isna(), f"falta {columna}")
+    if 'nombre_completo' in datos:
+        rechazar(datos['nombre_completo'].str.len().gt(255).fillna(False).astype(bool), "nombre demasiado largo")
+    if especificacion.tabla == 'casos':
+        sin_cliente = datos[['cliente_id', 'cliente_nombre', 'cliente_email']].isna().all(axis=1)
+        rechazar(sin_cliente, "falta el cliente (cliente_id, cliente_nombre o cliente_email)")
+
+    es_rechazada = motivos != ''
+    rechazadas = original[es_rechazada].assign(motivo=motivos[es_rechazada].str.rstrip('; '))
+    return datos[~es_rechazada], rechazadas
+
+
+def claves_duplicado(datos: pd.DataFrame, especificacion: EspecificacionImportacion) -> Dict[str, pd.Series]:
+    """Identificadores por los que dos filas del archivo se consideran la misma entidad."""
+    if especificacion.tabla == 'contactos':
+        return {columna: datos[columna] for columna in ('dni', 'cuit', 'email')}
+    if especificacion.tabla == 'clientes':
+        return {'email': datos['email'], 'whatsapp': datos['whatsapp']}
+    expediente = (datos['numero_expediente'].str.lower() + '/' + datos['anio_caratula'].fillna(''))
+    return {'expediente': expediente}
+
+
+# ========================================
+# LECTURA EN STREAMING
+# ========================================
+
+def _texto_celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.strftime('%d-%m-%Y')
+    return str(valor)
+
+
+def _detectar_csv(ruta: str) -> Tuple[str, str]:
+    """(codificación, separador) a partir del comienzo del archivo."""
+    with open(ruta, 'rb') as archivo:
+        muestra = archivo.read(65536)
+    try:
+        texto, codificacion = muestra.decode('utf-8-sig'), 'utf-8-sig'
+    except UnicodeDecodeError:
+        texto, codificacion = muestra.decode('latin-1'), 'latin-1'
+    try:
+        separador = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=',;\t|').delimiter
+    except csv.Error:
+        separador = ','
+    return codificacion, separador
+
+
+def contar_filas(ruta: str) -> Optional[int]:
+    """Cantidad aproximada de filas de datos, para la barra de progreso."""
+    if os.path.splitext(ruta)[1].lower() in ('.xlsx', '.xlsm'):
+        return None
+    lineas = 0
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            lineas += bloque.count(b'\n')
+    return max(lineas - 1, 0)
+
+
+def leer_bloques(ruta: str, tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[pd.DataFrame]:
+    """
+    Lee un CSV o XLSX en DataFrames de a `tamano_bloque` filas, todo como texto,
+    con la columna `fila` (número de fila en el archivo, contando el encabezado).
+    """
+    if os.path.splitext(ruta)[1].lower() in ('.xlsx', '.xlsm'):
+        yield from _leer_bloques_xlsx(ruta, tamano_bloque)
+        return
+    codificacion, separador = _detectar_csv(ruta)
+    # Las líneas en blanco se leen y se descartan después de numerar, para que `fila`
+    # siga siendo la línea del archivo
+    lector = pd.read_csv(ruta, sep=separador, dtype=str, keep_default_na=False, encoding=codificacion,
+                         chunksize=tamano_bloque, skip_blank_lines=False)
+    for bloque in lector:
+        vacia = bloque.fillna('').apply(lambda columna: columna.str.strip()).eq('').all(axis=1)
+        bloque = bloque.assign(fila=bloque.index + 2)[~vacia]
+        if not bloque.empty:
+            yield bloque
+
+
+def _leer_bloques_xlsx(ruta: str, tamano_bloque: int) -> Iterator[pd.DataFrame]:
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezados = [_texto_celda(valor) for valor in next(filas, ())]
+        lote, numeros, numero = [], [], 1
+        for valores in filas:
+            numero += 1
+            if not any(valor not in (None, '') for valor in valores):
+                continue
+            lote.append([_texto_celda(valor) for valor in valores[:len(encabezados)]])
+            numeros.append(numero)
+            if len(lote) >= tamano_bloque:
+                yield pd.DataFrame(lote, columns=encabezados).assign(fila=numeros)
+                lote, numeros = [], []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezados).assign(fila=numeros)
+    finally:
+        libro.close()
+
+
+# ========================================
+# IMPORTACIÓN
+# ========================================
+
+class ImportadorMasivo:
+    """
+    Importa un archivo de contactos, clientes o casos en una sola transacción.
+
+    Uso:
+        resumen = ImportadorMasivo('contactos').importar('contactos.csv', progreso=callback)
+
+    `progreso(fase, procesadas, total)` se llama desde el hilo que importa con
+    fase 'lectura', 'comparacion', 'insercion' o 'fin'; `total` puede ser None.
+    """
+
+    def __init__(self, entidad: str, db_module=db):
+        if entidad not in ESPECIFICACIONES:
+            raise ValueError(f"Entidad no importable: {entidad}")
+        self.especificacion = ESPECIFICACIONES[entidad]
+        self.db = db_module
+
+    def _crear_staging(self, cur):
+        tipos = {'es_persona_juridica': 'BOOLEAN', 'cliente_id': 'INTEGER'}
+        columnas = ', '.join(f"{columna} {tipos.get(columna, 'TEXT')}"
+                             for columna in self.especificacion.columnas + self.especificacion.referencias)
+        cur.execute(f"""
+            CREATE TEMP TABLE {TABLA_STAGING} (
+                fila INTEGER PRIMARY KEY, {columnas}, existente_id INTEGER
+            ) ON COMMIT DROP
+        """)
+
+    def importar(self, ruta: str, progreso: Optional[Callable] = None, ruta_errores: Optional[str] = None,
+                 tamano_bloque: int = TAMANO_BLOQUE) -> Dict:
+        """
+        Returns:
+            dict con leidas, insertadas, existentes, rechazadas, ruta_errores
+            (None si no hubo rechazos) y segundos.
+
+        Lanza ValueError si al archivo le falta una columna obligatoria y
+        psycopg2.Error si falla la base (en ese caso no se importa nada).
+        """
+        inicio = time.perf_counter()
+        especificacion = self.especificacion
+        avisar = progreso or (lambda fase, procesadas, total: None)
+        ruta_errores = ruta_errores or f"{os.path.splitext(ruta)[0]}_errores.csv"
+        if os.path.exists(ruta_errores):
+            os.remove(ruta_errores)
+        errores = _ArchivoErrores(ruta_errores, ('fila', 'motivo', *especificacion.columnas, *especificacion.referencias))
+        total = contar_filas(ruta)
+        resumen = {'leidas': 0, 'insertadas': 0, 'existentes': 0, 'rechazadas': 0}
+        vistas: Dict[str, set] = {}
+
+        try:
+            with transaccion(self.db.connect_db) as cur:
+                self._crear_staging(cur)
+                for bloque in leer_bloques(ruta, tamano_bloque):
+                    mapeo = mapear_columnas(bloque.columns.drop('fila'), especificacion)
+                    faltantes = [c for c in especificacion.obligatorias if c not in mapeo.values()]
+                    if faltantes:
+                        raise ValueError(f"Al archivo le faltan las columnas: {', '.join(faltantes)}")
+                    bloque = bloque.rename(columns=mapeo)
+                    validas, rechazadas = preparar_bloque(bloque, especificacion)
+                    validas, repetidas = self._descartar_repetidas(validas, vistas)
+                    errores.agregar(rechazadas)
+                    errores.agregar(bloque.loc[repetidas.index].reindex(columns=['fila', *especificacion.columnas,
+                                                                                  *especificacion.referencias])
+                                    .assign(motivo=repetidas))
+                    copiar_dataframe(cur, TABLA_STAGING, validas)
+                    resumen['leidas'] += len(bloque)
+                    avisar('lectura', resumen['leidas'], total)
+
+                avisar('comparacion', resumen['leidas'], total)
+                cur.execute(f"ANALYZE {TABLA_STAGING}")
+                if especificacion.tabla == 'casos':
+                    for sentencia in _SQL_RESOLVER_CLIENTES:
+                        cur.execute(sentencia)
+                    cur.execute(f"DELETE FROM {TABLA_STAGING} WHERE cliente_id IS NULL RETURNING *")
+                    sin_cliente = pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+                    errores.agregar(sin_cliente.assign(motivo="no se encontró el cliente"))
+                for sentencia in especificacion.sql_existentes:
+                    cur.execute(sentencia)
+
+                avisar('insercion', resumen['leidas'], total)
+                columnas = ', '.join(especificacion.columnas)
+                ahora = int(time.time())
+                extra_columnas, extra_valores = ('created_at', '%(ahora)s')
+                if especificacion.tabla == 'casos':
+                    extra_columnas += ', last_activity_timestamp'
+                    extra_valores += ', %(ahora)s'
+                # Los triggers por fila (tsvector, omnibox, NOTIFY) se apagan durante el
+                # INSERT masivo y su trabajo se hace después en una pasada de conjunto.
+                # ALTER TABLE es transaccional: si algo falla, el ROLLBACK los deja activos.
+                triggers = self.db.triggers_por_fila(especificacion.tabla)
+                for trigger in triggers:
+                    cur.execute(f"ALTER TABLE {especificacion.tabla} DISABLE TRIGGER {trigger}")
+                cur.execute(f"""
+                    INSERT INTO {especificacion.tabla} ({columnas}, {extra_columnas})
+                    SELECT {columnas}, {extra_valores} FROM {TABLA_STAGING}
+                    WHERE existente_id IS NULL
+                    ORDER BY fila
+                    RETURNING id
+                """, {'ahora': ahora})
+                ids = [fila[0] for fila in cur.fetchall()]
+                resumen['insertadas'] = len(ids)
+                for trigger in triggers:
+                    cur.execute(f"ALTER TABLE {especificacion.tabla} ENABLE TRIGGER {trigger}")
+                if ids:
+                    for sentencia in self.db.sql_reindexar_filas(especificacion.tabla):
+                        cur.execute(sentencia, {'ids': ids})
+                cur.execute(f"SELECT COUNT(*) FROM {TABLA_STAGING} WHERE existente_id IS NOT NULL")
+                resumen['existentes'] = cur.fetchone()[0]
+        except Exception:
+            # Nada se importó: un archivo de errores a medias sólo confundiría
+            if os.path.exists(ruta_errores):
+                os.remove(ruta_errores)
+            raise
+
+        resumen['rechazadas'] = errores.cantidad
+        resumen['ruta_errores'] = ruta_errores if errores.cantidad else None
+        resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+        if resumen['insertadas']:
+            self.db.notificar_cambio(especificacion.tabla, 'INSERT', None, None)
+        avisar('fin', resumen['leidas'], resumen['leidas'])
+        logger.info(f"Importación de {especificacion.tabla} desde {ruta}: {resumen}")
+        return resumen
+
+    def _descartar_repetidas(self, validas: pd.DataFrame, vistas: Dict[str, set]) -> Tuple[pd.DataFrame, pd.Series]:
+        """Quita las filas que repiten un identificador ya visto en el archivo; devuelve el motivo de cada una."""
+        motivos = pd.Series(pd.NA, index=validas.index, dtype='string')
+        for nombre, claves in claves_duplicado(validas, self.especificacion).items():
+            vistas_clave = vistas.setdefault(nombre, set())
+            repetida = claves.notna() & motivos.isna() & (claves.duplicated() | claves.isin(vistas_clave))
+            motivos = motivos.mask(repetida, f"{nombre} repetido en el archivo")
+            vistas_clave.update(claves[claves.notna() & motivos.isna()])
+        repetidas = motivos.notna()
+        return validas[~repetidas], motivos[repetidas]
+
+
+class _ArchivoErrores:
+    """CSV de filas rechazadas, que se crea recién con el primer rechazo."""
+
+    def __init__(self, ruta: str, columnas: Tuple[str, ...]):
+        self.ruta = ruta
+        self.columnas = list(columnas)
+        self.cantidad = 0
+
+    def agregar(self, filas: pd.DataFrame):
+        if filas.empty:
+            return
+        # BOM sólo al comienzo, para que Excel lo abra como UTF-8
+        codificacion = 'utf-8' if self.cantidad else 'utf-8-sig'
+        filas.reindex(columns=self.columnas).sort_values('fila').to_csv(
+            self.ruta, mode='a', header=not self.cantidad, index=False, encoding=codificacion)
+        self.cantidad += len(filas)
+
+
+def importar_archivo(entidad: str, ruta: str, progreso: Optional[Callable] = None) -> Dict:
+    """Atajo para `ImportadorMasivo(entidad).importar(ruta, progreso)`."""
+    return ImportadorMasivo(entidad).importar(ruta, progreso=progreso)
+
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Índice de Documentos - Búsqueda de texto completo sobre los archivos de las
+carpetas de los casos (DOCX, PDF y TXT).
+
+El índice vive en un archivo SQLite local con una tabla FTS5, así que las
+consultas no dependen del recurso de red donde están los documentos. Se
+actualiza de forma incremental: sólo se vuelve a extraer el texto de los
+archivos cuya ruta, fecha de modificación o tamaño cambiaron.
+"""
+
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import docx  # python-docx
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+logger = logging.getLogger('indice_documentos')
+
+RUTA_INDICE_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indice_documentos.db')
+
+# Límite de texto indexado por archivo: evita que un PDF de miles de páginas infle el índice
+MAX_CARACTERES_POR_ARCHIVO = 2_000_000
+
+
+# --- Extracción de texto ---
+
+def extraer_texto_docx(ruta: str) -> str:
+    documento = docx.Document(ruta)
+    partes = [p.text for p in documento.paragraphs if p.text]
+    for tabla in documento.tables:
+        for fila in tabla.rows:
+            for celda in fila.cells:
+                if celda.text:
+                    partes.append(celda.text)
+    return "\n".join(partes)
+
+
+def extraer_texto_pdf(ruta: str) -> str:
+    partes = []
+    total = 0
+    with fitz.open(ruta) as documento:
+        for pagina in documento:
+            texto = pagina.get_text()
+            partes.append(texto)
+            total += len(texto)
+            if total >= MAX_CARACTERES_POR_ARCHIVO:
+                break
+    return "\n".join(partes)
+
+
+def extraer_texto_txt(ruta: str) -> str:
+    with open(ruta, 'rb') as f:
+        datos = f.read(MAX_CARACTERES_POR_ARCHIVO * 2)
+    try:
+        return datos.decode('utf-8')
+    except UnicodeDecodeError:
+        return datos.decode('latin-1')
+
+
+def extractores_disponibles() -> Dict[str, Callable[[str], str]]:
+    """Extensión -> función de extracción, según las librerías instaladas."""
+    extractores = {'.txt': extraer_texto_txt}
+    if DOCX_AVAILABLE:
+        extractores['.docx'] = extraer_texto_docx
+    if PYMUPDF_AVAILABLE:
+        extractores['.pdf'] = extraer_texto_pdf
+    return extractores
+
+
+# --- Consultas ---
+
+_RE_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def construir_consulta_fts(texto: str) -> Optional[str]:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura: todos los
+    términos deben aparecer y el último se busca como prefijo (búsqueda mientras
+    se escribe). Devuelve None si no hay términos.
+    """
+    terminos = _RE_TERMINO.findall(texto or "")
+    if not terminos:
+        return None
+    partes = [f'"{t}"' for t in terminos[:-1]]
+    partes.append(f'"{terminos[-1]}"*')
+    return " ".join(partes)
+
+
+class IndiceDocumentos:
+    """Índice FTS5 de los documentos de las carpetas de casos."""
+
+    LOTE_COMMIT = 50
+
+    def __init__(self, ruta_db: str = RUTA_INDICE_DEFAULT, extractores: Optional[Dict[str, Callable]] = None):
+        self.ruta_db = ruta_db
+        self.extractores = extractores if extractores is not None else extractores_disponibles()
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.ruta_db, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS archivos (
+                    id INTEGER PRIMARY KEY,
+                    ruta TEXT NOT NULL UNIQUE,
+                    caso_id INTEGER,
+                    nombre TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    indexado_en REAL NOT NULL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_archivos_caso ON archivos (caso_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS contenido USING fts5(
+                    nombre, texto, tokenize = 'unicode61 remove_diacritics 2'
+                );
+            ''')
+            self._conn = conn
+        return self._conn
+
+    def cerrar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Actualización ---
+
+    def _archivos_en_carpeta(self, carpeta: str) -> Iterable[tuple]:
+        for raiz, _, nombres in os.walk(carpeta):
+            for nombre in nombres:
+                if os.path.splitext(nombre)[1].lower() not in self.extractores or nombre.startswith('~$'):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    st = os.stat(ruta)
+                except OSError:
+                    continue
+                yield ruta, nombre, st.st_mtime, st.st_size
+
+    def _extraer(self, ruta: str):
+        extractor = self.extractores[os.path.splitext(ruta)[1].lower()]
+        try:
+            return extractor(ruta)[:MAX_CARACTERES_POR_ARCHIVO], None
+        except Exception as e:
+            logger.warning(f"No se pudo extraer texto de {ruta}: {e}")
+            return "", str(e)[:500]
+
+    def sincronizar_caso(self, caso_id: int, carpeta: str,
+                         cancelado: Optional[threading.Event] = None) -> Dict[str, int]:
+        """
+        Pone al día el índice de la carpeta de un caso. Sólo extrae el texto de
+        archivos nuevos o cuya fecha de modificación o tamaño cambiaron, y quita
+        del índice los que ya no existen.
+        """
+        estadisticas = {'nuevos': 0, 'actualizados': 0, 'eliminados': 0, 'sin_cambios': 0, 'errores': 0}
+        if not carpeta or not os.path.isdir(carpeta):
+            return estadisticas
+
+        with self._lock:
+            conn = self._conectar()
+            indexados = {
+                fila['ruta']: (fila['id'], fila['mtime'], fila['tamano'])
+                for fila in conn.execute("SELECT id, ruta, mtime, tamano FROM archivos WHERE caso_id = ?", (caso_id,))
+            }
+
+        vistos = set()
+        pendientes = 0
+        for ruta, nombre, mtime, tamano in self._archivos_en_carpeta(carpeta):
+            if cancelado is not None and cancelado.is_set():
+                break
+            vistos.add(ruta)
+            previo = indexados.get(ruta)
+            if previo and previo[1] == mtime and previo[2] == tamano:
+                estadisticas['sin_cambios'] += 1
+                continue
+
+            # La extracción (lenta, sobre la red) se hace fuera del lock
+            texto, error = self._extraer(ruta)
+            if error:
+                estadisticas['errores'] += 1
+            with self._lock:
+                conn = self._conectar()
+                conn.execute('''
+                    INSERT INTO archivos (ruta, caso_id, nombre, mtime, tamano, indexado_en, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (ruta) DO UPDATE SET caso_id = excluded.caso_id, nombre = excluded.nombre,
+                        mtime = excluded.mtime, tamano = excluded.tamano,
+                        indexado_en = excluded.indexado_en, error = excluded.error
+                ''', (ruta, caso_id, nombre, mtime, tamano, time.time(), error))
+                archivo_id = conn.execute("SELECT id FROM archivos WHERE ruta = ?", (ruta,)).fetchone()[0]
+                conn.execute("DELETE FROM contenido WHERE rowid = ?", (archivo_id,))
+                conn.execute("INSERT INTO contenido (rowid, nombre, texto) VALUES (?, ?, ?)",
+                             (archivo_id, nombre, texto))
+                pendientes += 1
+                if pendientes >= self.LOTE_COMMIT:
+                    conn.commit()
+                    pendientes = 0
+            estadisticas['actualizados' if previo else 'nuevos'] += 1
+
+        with self._lock:
+            conn = self._conectar()
+            if cancelado is None or not cancelado.is_set():
+                eliminados = [(archivo_id,) for ruta, (archivo_id, _, _) in indexados.items() if ruta not in vistos]
+                if eliminados:
+                    conn.executemany("DELETE FROM contenido WHERE rowid = ?", eliminados)
+                    conn.executemany("DELETE FROM archivos WHERE id = ?", eliminados)
+                    estadisticas['eliminados'] = len(eliminados)
+            conn.commit()
+        return estadisticas
+
+    def olvidar_caso(self, caso_id: int):
+        """Quita del índice todos los archivos de un caso."""
+        with self._lock:
+            conn = self._conectar()
+            conn.execute("DELETE FROM contenido WHERE rowid IN (SELECT id FROM archivos WHERE caso_id = ?)", (caso_id,))
+            conn.execute("DELETE FROM archivos WHERE caso_id = ?", (caso_id,))
+            conn.commit()
+
+    # --- Búsqueda ---
+
+    def buscar(self, texto: str, caso_id: Optional[int] = None, limite: int = 50) -> List[dict]:
+        """
+        Documentos que contienen todos los términos de `texto`, ordenados por
+        relevancia (BM25, con más peso para coincidencias en el nombre).
+        Cada resultado trae un fragmento con los términos entre [ ].
+        """
+        consulta = construir_consulta_fts(texto)
+        if not consulta:
+            return []
+        sql = '''
+            SELECT a.ruta, a.nombre, a.caso_id, a.mtime,
+                   bm25(contenido, 5.0, 1.0) AS rango,
+                   snippet(contenido, 1, '[', ']', '…', 12) AS fragmento
+            FROM contenido
+            JOIN archivos a ON a.id = contenido.rowid
+            WHERE contenido MATCH ?
+        '''
+        parametros = [consulta]
+        if caso_id is not None:
+            sql += " AND a.caso_id = ?"
+            parametros.append(caso_id)
+        sql += " ORDER BY rango LIMIT ?"
+        parametros.append(limite)
+        with self._lock:
+            try:
+                return [dict(fila) for fila in self._conectar().execute(sql, parametros)]
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Consulta de texto completo inválida ({consulta!r}): {e}")
+                return []
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._conectar()
+            fila = conn.execute('''
+                SELECT COUNT(*) AS archivos, COUNT(DISTINCT caso_id) AS casos,
+                       SUM(CASE WHEN error IS NOT NULL THEN 1 ELSE 0 END) AS con_error
+                FROM archivos
+            ''').fetchone()
+            return {'archivos': fila['archivos'], 'casos': fila['casos'], 'con_error': fila['con_error'] or 0}
+
+
+class IndexadorDocumentos:
+    """
+    Hilo de fondo que mantiene el índice al día. Los casos se encolan al abrir
+    su pestaña de documentos o cuando cambia su carpeta; `encolar_todos` recorre
+    todos los casos con carpeta asignada.
+    """
+
+    def __init__(self, indice: IndiceDocumentos, db_module=None):
+        self.indice = indice
+        self.db = db_module
+        self._cola: "queue.Queue" = queue.Queue()
+        self._encolados = set()
+        self._lock = threading.Lock()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detenido.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="IndexadorDocumentos", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0):
+        self._detenido.set()
+        self._cola.put(None)
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    def encolar_caso(self, caso_id: int, carpeta: str):
+        if not carpeta:
+            return
+        with self._lock:
+            if caso_id in self._encolados:
+                return
+            self._encolados.add(caso_id)
+        self._cola.put((caso_id, carpeta))
+
+    def encolar_todos(self):
+        if self.db is None:
+            return
+        for caso in self.db.get_casos_con_carpeta():
+            self.encolar_caso(caso['id'], caso['ruta_carpeta'])
+
+    def _ejecutar(self):
+        while not self._detenido.is_set():
+            tarea = self._cola.get()
+            if tarea is None:
+                break
+            caso_id, carpeta = tarea
+            with self._lock:
+                self._encolados.discard(caso_id)
+            try:
+                inicio = time.perf_counter()
+                estadisticas = self.indice.sincronizar_caso(caso_id, carpeta, cancelado=self._detenido)
+                if estadisticas['nuevos'] or estadisticas['actualizados'] or estadisticas['eliminados']:
+                    logger.info(f"Índice del caso {caso_id} actualizado en "
+                                f"{time.perf_counter() - inicio:.1f}s: {estadisticas}")
+            except Exception as e:
+                logger.error(f"Error indexando documentos del caso {caso_id}: {e}")
+
+
+# Instancia compartida; main_app arranca el indexador
+indice_documentos = IndiceDocumentos()
@@ -4,9 +4,11 @@ Lazy Loader Module - Sistema de carga diferida para optimizar el arranque del CR
 """
 
 import importlib
+import json
+import os
 import time
 import threading
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Set
 
 
 class LazyLoader:
@@ -17,6 +19,9 @@ class LazyLoader:
     def __init__(self):
         self._loaded_modules: Dict[str, Any] = {}
         self._loading_locks: Dict[str, threading.Lock] = {}
+        self._load_times: Dict[str, float] = {}
+        # Módulos pedidos por la aplicación en esta sesión (no por la pre-carga)
+        self._used_modules: Set[str] = set()
         self._startup_time = time.time()
         
     def register_module(self, name: str, module_path: str, init_func: Optional[Callable] = None):
@@ -31,7 +36,8 @@ class LazyLoader:
         if name not in self._loading_locks:
             self._loading_locks[name] = threading.Lock()
             
-    def get_module(self, name: str, module_path: str, init_func: Optional[Callable] = None) -> Any:
+    def get_module(self, name: str, module_path: str, init_func: Optional[Callable] = None,
+                   precarga: bool = False) -> Any:
         """
         Obtiene un módulo, cargándolo si es necesario
         
@@ -39,10 +45,13 @@ class LazyLoader:
             name: Nombre del módulo
             module_path: Ruta del módulo
             init_func: Función de inicialización opcional
+            precarga: True cuando lo carga el planificador de pre-carga y no un uso real
             
         Returns:
             El módulo cargado
         """
+        if not precarga:
+            self._used_modules.add(name)
         if name in self._loaded_modules:
             return self._loaded_modules[name]
             
@@ -69,6 +78,7 @@ class LazyLoader:
                 self._loaded_modules[name] = module
                 
                 load_time = time.time() - start_time
+                self._load_times[name] = load_time
                 total_time = time.time() - self._startup_time
                 print(f"[LazyLoader] ✓ {name} cargado en {load_time:.2f}s (total: {total_time:.2f}s)")
                 
@@ -85,6 +95,14 @@ class LazyLoader:
     def get_loaded_modules(self) -> Dict[str, Any]:
         """Obtiene todos los módulos cargados"""
         return self._loaded_modules.copy()
+
+    def get_load_times(self) -> Dict[str, float]:
+        """Segundos que tardó la carga de cada módulo ya cargado"""
+        return self._load_times.copy()
+
+    def get_used_modules(self) -> Set[str]:
+        """Módulos que la aplicación pidió en esta sesión"""
+        return set(self._used_modules)
         
     def clear_module(self, name: str):
         """Limpia un módulo de la caché (para testing)"""
@@ -140,18 +158,172 @@ def create_lazy_module(name: str, module_path: str, init_func: Optional[Callable
     return LazyModule(name, module_path, init_func)
 
 
-def preload_module(name: str, module_path: str, init_func: Optional[Callable] = None):
+class PlanificadorPrecarga:
     """
-    Pre-carga un módulo en background (para módulos que sabemos que se usarán pronto)
+    Pre-carga módulos en segundo plano, de a uno por vez y sólo mientras el
+    usuario no está tecleando ni haciendo clic, para que el primer uso de
+    "Analizar con IA" o "Generar reporte" no se congele importando torch,
+    chromadb u openpyxl.
+
+    El orden combina la prioridad fija de cada módulo con un puntaje de uso
+    que se guarda entre sesiones (con decaimiento): lo que el usuario suele
+    abrir se calienta primero. A igualdad, primero el que más tarda en cargar.
     """
-    def preload():
+
+    MAX_CONCURRENTES = 1
+    # Segundos sin teclas ni clics para considerar que la interfaz está ociosa
+    INACTIVIDAD_MINIMA_S = 1.0
+    # Margen tras la primera ventana antes de empezar a pre-cargar
+    DEMORA_INICIAL_MS = 2000
+    INTERVALO_SONDEO_MS = 250
+    # Peso de las sesiones anteriores en el puntaje de uso
+    DECAIMIENTO_USO = 0.8
+    RUTA_HISTORIAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lazy_loader_historial.json")
+
+    def __init__(self, loader: LazyLoader, ruta_historial: str = RUTA_HISTORIAL,
+                 max_concurrentes: int = MAX_CONCURRENTES, reloj: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self._ruta_historial = ruta_historial
+        self._max_concurrentes = max_concurrentes
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # nombre -> (prioridad, module_path, init_func)
+        self._pendientes: Dict[str, tuple] = {}
+        self._en_curso: Set[str] = set()
+        self._root = None
+        self._sondeo_programado = None
+        self._ultima_actividad = reloj()
+        self.iniciado = False
+        self.historial: Dict[str, dict] = self._leer_historial()
+
+    def programar(self, name: str, module_path: str, prioridad: int = 0, init_func: Optional[Callable] = None):
+        """Agrega un módulo a la cola de pre-carga (si todavía no está cargado). Llamar desde el hilo de Tk."""
+        if self._loader.is_loaded(name):
+            return
+        with self._lock:
+            self._pendientes[name] = (prioridad, module_path, init_func)
+        self._programar_sondeo()
+
+    def puntaje(self, name: str) -> float:
+        prioridad = self._pendientes.get(name, (0,))[0]
+        return prioridad + self.historial.get(name, {}).get('uso', 0.0)
+
+    def orden(self) -> List[str]:
+        """Módulos pendientes en el orden en que se van a pre-cargar."""
+        with self._lock:
+            return sorted(
+                self._pendientes,
+                key=lambda name: (self.puntaje(name), self.historial.get(name, {}).get('carga_s', 0.0)),
+                reverse=True,
+            )
+
+    # --- Integración con el bucle de Tk ---
+
+    def iniciar(self, root):
+        """Empieza a pre-cargar en los ratos libres del bucle de Tk de `root`."""
+        self._root = root
+        self.iniciado = True
+        for secuencia in ('<KeyPress>', '<ButtonPress>', '<MouseWheel>'):
+            root.bind_all(secuencia, self.registrar_actividad, add='+')
+        self._ultima_actividad = self._reloj()
+        self._sondeo_programado = root.after(self.DEMORA_INICIAL_MS, self._sondear)
+
+    def detener(self):
+        with self._lock:
+            self._pendientes.clear()
+        root, self._root = self._root, None
+        if root is not None and self._sondeo_programado is not None:
+            try:
+                root.after_cancel(self._sondeo_programado)
+            except Exception:
+                pass
+        self._sondeo_programado = None
+
+    def registrar_actividad(self, event=None):
+        self._ultima_actividad = self._reloj()
+
+    def esta_ocioso(self) -> bool:
+        return self._reloj() - self._ultima_actividad >= self.INACTIVIDAD_MINIMA_S
+
+    def _programar_sondeo(self):
+        if self._root is not None and self._sondeo_programado is None:
+            self._sondeo_programado = self._root.after(self.INTERVALO_SONDEO_MS, self._sondear)
+
+    def _sondear(self):
+        self._sondeo_programado = None
+        if self._root is None:
+            return
+        if self.esta_ocioso():
+            self.lanzar_siguientes()
+        with self._lock:
+            quedan = bool(self._pendientes or self._en_curso)
+        if quedan:
+            self._programar_sondeo()
+
+    def lanzar_siguientes(self):
+        """Arranca pre-cargas hasta llenar el cupo de concurrencia."""
+        for name in self.orden():
+            with self._lock:
+                if len(self._en_curso) >= self._max_concurrentes:
+                    return
+                pendiente = self._pendientes.pop(name, None)
+                if pendiente is None or self._loader.is_loaded(name):
+                    continue
+                prioridad, module_path, init_func = pendiente
+                self._en_curso.add(name)
+            threading.Thread(
+                target=self._precargar, args=(name, module_path, init_func),
+                daemon=True, name=f"Precarga-{name}",
+            ).start()
+
+    def _precargar(self, name, module_path, init_func):
         try:
-            lazy_loader.get_module(name, module_path, init_func)
+            self._loader.get_module(name, module_path, init_func, precarga=True)
         except Exception as e:
             print(f"[LazyLoader] Error en pre-carga de {name}: {e}")
-    
-    thread = threading.Thread(target=preload, daemon=True)
-    thread.start()
+        finally:
+            with self._lock:
+                self._en_curso.discard(name)
+
+    # --- Historial entre sesiones ---
+
+    def _leer_historial(self) -> Dict[str, dict]:
+        try:
+            with open(self._ruta_historial, encoding="utf-8") as f:
+                historial = json.load(f)
+            return historial if isinstance(historial, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def guardar_historial(self):
+        """Suma el uso de esta sesión al puntaje de cada módulo y lo guarda (llamar al cerrar)."""
+        usados = self._loader.get_used_modules()
+        tiempos = self._loader.get_load_times()
+        for name in set(self.historial) | usados | set(tiempos):
+            entrada = self.historial.setdefault(name, {})
+            uso = entrada.get('uso', 0.0) * self.DECAIMIENTO_USO + (1.0 if name in usados else 0.0)
+            entrada['uso'] = round(uso, 4)
+            if name in tiempos:
+                entrada['carga_s'] = round(tiempos[name], 3)
+        temporal = self._ruta_historial + ".tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.historial, f, indent=2, sort_keys=True)
+            os.replace(temporal, self._ruta_historial)
+        except OSError as e:
+            print(f"[LazyLoader] No se pudo guardar el historial de cargas: {e}")
+
+
+# Planificador global; main_app lo inicia cuando se muestra la primera ventana
+planificador_precarga = PlanificadorPrecarga(lazy_loader)
+
+
+def preload_module(name: str, module_path: str, init_func: Optional[Callable] = None, prioridad: int = 0):
+    """
+    Pre-carga un módulo en background (para módulos que sabemos que se usarán pronto).
+    Se encola en el planificador, que lo carga cuando la interfaz esté ociosa.
+    """
+    planificador_precarga.programar(name, module_path, prioridad, init_func)
 
 
 def get_startup_stats() -> Dict[str, Any]:
@@ -164,5 +336,6 @@ def get_startup_stats() -> Dict[str, Any]:
     return {
         'startup_time': startup_time,
         'loaded_modules': list(lazy_loader._loaded_modules.keys()),
-        'total_modules_loaded': len(lazy_loader._loaded_modules)
+        'total_modules_loaded': len(lazy_loader._loaded_modules),
+        'load_times': lazy_loader.get_load_times()
     }
\ No newline at end of file
@@ -2,15 +2,16 @@
 # Versión Refactorizada con Sistema de Partes Intervinientes
 # main_app.py
 
+import time
+_INICIO_ARRANQUE = time.perf_counter()  # Referencia para medir el tiempo hasta la primera ventana
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog, Toplevel
 import crm_database as db
 import os
 import datetime
-import time
 import sys
 import subprocess
-import sqlite3
 import json
 import logging
 from tkcalendar import Calendar, DateEntry
@@ -22,10 +23,11 @@ import shutil
 import configparser
 from typing import Optional, Dict, Any
 import date_utils  # Utilidades de fecha para formato argentino
-from lazy_loader import create_lazy_module, preload_module
-from report_generator_window import ReportGeneratorWindow
-from client_dialog_manager import ClientManager
-from case_dialog_manager import CaseManager
+from ejecutor_datos import ejecutor_datos, indicador_cursor
+from calendario_audiencias import calendario_audiencias
+from servicio_backups import servicio_backups
+from omnibox_ui import Omnibox
+from lazy_loader import create_lazy_module, lazy_loader, planificador_precarga
 # --- LAZY LOADING: Módulos pesados se cargan solo cuando se necesitan ---
 # Módulos de exportación y documentos
 docx_module = create_lazy_module("docx", "docx")
@@ -50,12 +52,22 @@ ia_analyzer = create_lazy_module("ia_analyzer", "ia_analyzer")
 # ChromaDB - Solo se carga cuando se usa vectorización
 chromadb = create_lazy_module("chromadb", "chromadb")
 
+# Módulos a pre-cargar en segundo plano tras la primera ventana: (nombre, módulo, prioridad).
+# El planificador suma a la prioridad el historial de uso de sesiones anteriores.
+MODULOS_PRECARGA = (
+    ("case_detail_window", "case_detail_window", 3),
+    ("ia_analyzer", "ia_analyzer", 2),
+    ("chromadb", "chromadb", 2),
+    ("report_generator_ui", "report_generator_ui", 1),
+    ("openpyxl", "openpyxl", 1),
+    ("docxtpl", "docxtpl", 1),
+)
+
 # --- Imports diferidos para ventanas y diálogos ---
 # Estos se importan cuando se necesitan para evitar carga inicial pesada
 def get_case_detail_window():
     """Importa CaseDetailWindow solo cuando se necesita"""
-    from case_detail_window import CaseDetailWindow
-    return CaseDetailWindow
+    return lazy_loader.get_module("case_detail_window", "case_detail_window").CaseDetailWindow
 
 def get_scba_scraper_window():
     """Importa SCBAScraperWindow solo cuando se necesita"""
@@ -84,8 +96,7 @@ def get_prospect_manager():
 
 def get_report_generator_window():
     """Importa ReportGeneratorWindow solo cuando se necesita"""
-    from report_generator_ui import ReportGeneratorWindow
-    return ReportGeneratorWindow
+    return lazy_loader.get_module("report_generator_ui", "report_generator_ui").ReportGeneratorWindow
 def get_contactos_manager():
     """Importa ContactosManagerWindow solo cuando se necesita"""
     from contactos_manager_ui import open_contactos_manager
@@ -101,10 +112,15 @@ def resource_path(relative_path):
 
 
 class CRMLegalApp:
+    # Espera tras el arranque antes de revisar el índice de documentos de todos los casos
+    INDEXADO_INICIAL_DEMORA_MS = 60000
+
     # En main_app.py, dentro de la clase CRMLegalApp
 
     def __init__(self, root):
         self.root = root
+        # Las consultas en segundo plano entregan sus resultados por este root
+        ejecutor_datos.configurar(self.root)
         
         # 1. CONFIGURACIÓN INICIAL
         self._load_configuration()
@@ -174,12 +190,19 @@ class CRMLegalApp:
         prospects_menu.add_command(label="Gestión de Prospectos...", command=self.open_prospects_window)
         menubar.add_cascade(label="Prospectos", menu=prospects_menu)
 
+        buscar_menu = tk.Menu(menubar, tearoff=0)
+        buscar_menu.add_command(label="Buscar en Documentos de Casos...", command=self._abrir_busqueda_documentos)
+        buscar_menu.add_command(label="Buscar en Notas, Actividades y Consultas...", command=self._abrir_busqueda_global)
+        menubar.add_cascade(label="Buscar", menu=buscar_menu)
+
         contactos_menu = tk.Menu(menubar, tearoff=0)
         contactos_menu.add_command(label="Gestionar Contactos...", command=self._abrir_gestor_de_contactos)
+        contactos_menu.add_command(label="Detectar Contactos Duplicados...", command=self._detectar_contactos_duplicados)
         menubar.add_cascade(label="Contactos", menu=contactos_menu)
 
         reports_menu = tk.Menu(menubar, tearoff=0)
         reports_menu.add_command(label="Listado de Casos...", command=self._abrir_generador_reportes)
+        reports_menu.add_command(label="Análisis Financiero del Estudio (XLSX)...", command=self._exportar_analisis_financiero)
         menubar.add_cascade(label="Reportes", menu=reports_menu)
 
         modelos_menu = tk.Menu(menubar, tearoff=0)
@@ -190,6 +213,11 @@ class CRMLegalApp:
 
         adminmenu = tk.Menu(menubar, tearoff=0)
         adminmenu.add_command(label="Crear Copia de Seguridad...", command=self.crear_copia_de_seguridad)
+        adminmenu.add_command(label="Verificar Copia de Seguridad...", command=self.verificar_copia_de_seguridad)
+        adminmenu.add_separator()
+        adminmenu.add_command(label="Importar Clientes (CSV/XLSX)...", command=lambda: self._importar_datos('clientes'))
+        adminmenu.add_command(label="Importar Contactos (CSV/XLSX)...", command=lambda: self._importar_datos('contactos'))
+        adminmenu.add_command(label="Importar Casos (CSV/XLSX)...", command=lambda: self._importar_datos('casos'))
         menubar.add_cascade(label="Administración", menu=adminmenu)
     
         self.root.config(menu=menubar)
@@ -230,8 +258,8 @@ class CRMLegalApp:
 
     def _initialize_managers(self):
         """Inicializa los managers de la aplicación."""
-        self.client_manager = ClientManager(self)
-        self.case_manager = CaseManager(self)
+        self.client_manager = get_client_manager()(self)
+        self.case_manager = get_case_manager()(self)
 
     def _load_initial_data(self):
         """Carga los datos iniciales de la aplicación."""
@@ -243,24 +271,35 @@ class CRMLegalApp:
         """Inicia todos los hilos de fondo como último paso."""
         print("Iniciando hilos de fondo...")
         
-        # Recordatorios
-        self.stop_event_recordatorios = threading.Event()
-        self.thread_recordatorios = threading.Thread(
-            target=self.verificar_recordatorios_periodicamente,
-            args=(self.stop_event_recordatorios,),
-            daemon=True
+        # Recordatorios de audiencias/tareas y alertas de inactividad: un único
+        # planificador que duerme hasta el próximo aviso
+        from planificador_recordatorios import PlanificadorRecordatorios
+        self.planificador_recordatorios = PlanificadorRecordatorios(
+            al_vencer_audiencia=self._on_recordatorio_audiencia,
+            al_vencer_tarea=lambda tarea: self.root.after(0, self.mostrar_recordatorio_tarea, tarea),
+            al_vencer_inactividad=lambda caso: self.root.after(0, self.mostrar_alerta_inactividad, caso),
         )
-        self.thread_recordatorios.start()
+        self.planificador_recordatorios.iniciar()
+        
+        # Cambios hechos por otras instancias sobre la misma base (LISTEN/NOTIFY)
+        from escucha_cambios import EscuchaCambios
+        self._refrescos_remotos_pendientes = set()
+        self.db_crm.registrar_listener_cambios(self._on_cambio_datos)
+        self.escucha_cambios = EscuchaCambios()
+        self.escucha_cambios.iniciar()
         
-        # Inactividad
-        self.stop_event_inactividad = threading.Event()
-        self.thread_inactividad = threading.Thread(
-            target=self.verificar_inactividad_casos_periodicamente,
-            args=(self.stop_event_inactividad,),
-            daemon=True
+        # Índice de texto completo de las carpetas de casos: se pone al día en segundo plano
+        from indice_documentos import IndexadorDocumentos, indice_documentos
+        self.indexador_documentos = IndexadorDocumentos(indice_documentos, db_module=self.db_crm)
+        self.indexador_documentos.iniciar()
+        self.root.after(
+            self.INDEXADO_INICIAL_DEMORA_MS,
+            lambda: ejecutor_datos.enviar(self.indexador_documentos.encolar_todos),
         )
-        self.thread_inactividad.start()
         
+        # Copia de seguridad nocturna, si hay hora_nocturna en la sección [backup]
+        servicio_backups.iniciar_programacion(al_terminar=self._on_backup_nocturno)
+
         # Bandeja del sistema
         self._setup_system_tray()
 
@@ -605,13 +644,15 @@ class CRMLegalApp:
 
         threading.Thread(target=thread_target, args=(db_client,), daemon=True).start()
 
-    def _refresh_open_case_window(self, case_id):
-        """Si una ventana de detalles para un caso está abierta, le pide que refresque su pestaña activa."""
+    def _refresh_open_case_window(self, case_id, pestanas=None):
+        """
+        Si una ventana de detalles para un caso está abierta, marca como desactualizadas
+        las pestañas indicadas (todas si pestanas es None) para que se recarguen.
+        """
         if case_id in self.open_case_windows:
             print(f"Notificando a la ventana del caso {case_id} para que se refresque.")
             window = self.open_case_windows[case_id]
-            # window.refresh_active_tab()
-            self.root.after(50, window.refresh_active_tab)
+            self.root.after(50, window.refresh_active_tab, pestanas)
 
     def update_case_field(self, case_id, field_name, value):
         """Método de ayuda para actualizar un solo campo de un caso en la BD."""
@@ -719,107 +760,44 @@ class CRMLegalApp:
             )
             print(f"Error al lanzar scraper PJN: {e}")
 
-    def verificar_inactividad_casos_periodicamente(self, stop_event):
-        print("[Inactividad Casos] Hilo iniciado.")
-        while not stop_event.is_set():
-            current_processing_start_time = time.monotonic()
-            try:
-                casos_a_notificar = self.db_crm.get_cases_for_inactivity_check()
-                for caso in casos_a_notificar:
-                    if stop_event.is_set():
-                        break
-
-                    print(
-                        f"[Inactividad Casos] ¡Alerta! Caso ID: {caso['id']} ('{caso['caratula']}') ha superado el umbral de inactividad de {caso['inactivity_threshold_days']} días."
-                    )
-
-                    # Preparar notificación
-                    titulo = f"Alerta de Inactividad: Caso {caso['id']}"
-                    mensaje = f"El caso '{caso['caratula']}' no ha tenido actividad en más de {caso['inactivity_threshold_days']} días."
-                    app_nombre = "CRM Legal"
-                    icon_path_notif = ""
-                    try:
-                        icon_path_notif = resource_path("assets/icono.ico")
-                        if not os.path.exists(icon_path_notif):
-                            print(
-                                f"Advertencia: Icono notificación no encontrado: {icon_path_notif}"
-                            )
-                            icon_path_notif = ""
-                    except Exception as e:
-                        print(f"Error obteniendo ruta de icono para notificación: {e}")
-                        icon_path_notif = ""
-
-                    # Mostrar notificación
-                    try:
-                        print(
-                            f"[Inactividad Casos] Enviando notificación: T='{titulo}', M='{mensaje}'"
-                        )
-                        plyer_module.notification.notify(
-                            title=titulo,
-                            message=mensaje,
-                            app_name=app_nombre,
-                            app_icon=icon_path_notif,
-                            timeout=20,  # Segundos que la notificación es visible (puede variar por OS)
-                        )
-                        print(
-                            "[Inactividad Casos] Notificación plyer.notify() llamada."
-                        )
-                        # Actualizar timestamp de última notificación de inactividad
-                        self.db_crm.update_case_inactivity_notified(caso["id"])
-                    except NotImplementedError:
-                        print(
-                            "[Inactividad Casos] Notificación Plyer no soportada en esta plataforma. Usando fallback messagebox."
-                        )
-                        # Este fallback es problemático para un hilo en segundo plano,
-                        # pero es mejor que nada si plyer no está disponible.
-                        # Idealmente, se registraría el error y se continuaría.
-                        self.root.after(
-                            0,
-                            messagebox.showwarning,
-                            titulo,
-                            mensaje,
-                            {"parent": self.root},
-                        )
-                        self.db_crm.update_case_inactivity_notified(
-                            caso["id"]
-                        )  # Intentar actualizar incluso con fallback
-                    except Exception as e_notify:
-                        print(
-                            f"[Inactividad Casos] Error durante notificación Plyer: {e_notify}. Usando fallback messagebox."
-                        )
-                        self.root.after(
-                            0,
-                            messagebox.showwarning,
-                            titulo,
-                            mensaje,
-                            {"parent": self.root},
-                        )
-                        self.db_crm.update_case_inactivity_notified(
-                            caso["id"]
-                        )  # Intentar actualizar
-
-            except sqlite3.Error as dbe:
-                print(f"[Inactividad Casos] Error de Base de Datos en hilo: {dbe}")
-                # Esperar más tiempo si hay error de BD antes de reintentar
-                stop_event.wait(300)  # Esperar 5 minutos
-            except Exception as ex_thread:
-                print(
-                    f"[Inactividad Casos] Error inesperado en hilo: {type(ex_thread).__name__}: {ex_thread}"
-                )
-                import traceback
-
-                traceback.print_exc()
-                stop_event.wait(120)  # Esperar 2 minutos
+    def mostrar_alerta_inactividad(self, caso):
+        if not caso:
+            return
+        print(
+            f"[Inactividad Casos] ¡Alerta! Caso ID: {caso['id']} ('{caso['caratula']}') ha superado el umbral de inactividad de {caso['inactivity_threshold_days']} días."
+        )
+        titulo = f"Alerta de Inactividad: Caso {caso['id']}"
+        mensaje = f"El caso '{caso['caratula']}' no ha tenido actividad en más de {caso['inactivity_threshold_days']} días."
+        app_nombre = "CRM Legal"
+        icon_path_notif = ""
+        try:
+            icon_path_notif = resource_path("assets/icono.ico")
+            if not os.path.exists(icon_path_notif):
+                print(f"Advertencia: Icono notificación no encontrado: {icon_path_notif}")
+                icon_path_notif = ""
+        except Exception as e:
+            print(f"Error obteniendo ruta de icono para notificación: {e}")
+            icon_path_notif = ""
 
-            # Calcular tiempo de espera para el próximo chequeo (ej. cada hora)
-            processing_duration = time.monotonic() - current_processing_start_time
-            # Chequear cada 1 hora (3600 segundos). Ajustar según necesidad.
-            sleep_interval = max(1.0, 3600.0 - processing_duration)
+        try:
+            plyer_module.notification.notify(
+                title=titulo,
+                message=mensaje,
+                app_name=app_nombre,
+                app_icon=icon_path_notif,
+                timeout=20,  # Segundos que la notificación es visible (puede variar por OS)
+            )
+            print("[Inactividad Casos] Notificación plyer.notify() llamada.")
+        except NotImplementedError:
+            print(
+                "[Inactividad Casos] Notificación Plyer no soportada en esta plataforma. Usando fallback messagebox."
+            )
+            messagebox.showwarning(titulo, mensaje, parent=self.root)
+        except Exception as e_notify:
             print(
-                f"[Inactividad Casos] Ciclo completado en {processing_duration:.2f}s. Durmiendo por {sleep_interval:.2f}s."
+                f"[Inactividad Casos] Error durante notificación Plyer: {e_notify}. Usando fallback messagebox."
             )
-            stop_event.wait(sleep_interval)
-        print("[Inactividad Casos] Hilo detenido.")
+            messagebox.showwarning(titulo, mensaje, parent=self.root)
 
     # Esta es la definición CORRECTA de create_widgets que queremos conservar y usar.
     # La segunda definición duplicada será eliminada.
@@ -836,6 +814,22 @@ class CRMLegalApp:
         new_window = CaseDetailWindow(self.root, self, case_id)
         self.open_case_windows[case_id] = new_window
 
+    def abrir_caso_por_id(self, case_id, pestana=None):
+        """Abre (o trae al frente) la ventana de un caso, opcionalmente en una pestaña dada."""
+        window = self.open_case_windows.get(case_id)
+        if window is None or not window.winfo_exists():
+            CaseDetailWindow = get_case_detail_window()
+            window = CaseDetailWindow(self.root, self, case_id)
+            if not window.winfo_exists():
+                return None
+            self.open_case_windows[case_id] = window
+        else:
+            window.lift()
+            window.focus_force()
+        if pestana:
+            window.seleccionar_pestana(pestana)
+        return window
+
     def on_case_window_close(self, case_id):
         if case_id in self.open_case_windows:
             del self.open_case_windows[case_id]
@@ -845,6 +839,10 @@ class CRMLegalApp:
             "--- EJECUTANDO create_widgets VERSIÓN FINAL (LOGO EN COL 2, CASOS EN COL 3) ---"
         )
 
+        # Búsqueda global sobre clientes, casos, contactos y prospectos
+        self.omnibox = Omnibox(self.root, al_elegir=self._abrir_resultado_omnibox)
+        self.omnibox.pack(fill=tk.X, padx=10, pady=(10, 0))
+
         # ESTRUCTURA DE 3 COLUMNAS REVISADA SEGÚN TU PROPUESTA
         crm_main_frame = ttk.Frame(self.root, padding="10")
         crm_main_frame.pack(fill=tk.BOTH, expand=True)
@@ -1019,6 +1017,9 @@ class CRMLegalApp:
         )
         self.agenda_cal.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
         self.agenda_cal.bind("<<CalendarSelected>>", self.actualizar_lista_audiencias)
+        self.agenda_cal.bind(
+            "<<CalendarMonthChanged>>", lambda event: self.marcar_dias_audiencias_calendario()
+        )
         self.agenda_cal.tag_config(
             "audiencia_marcador", background="lightblue", foreground="black"
         )
@@ -1549,108 +1550,120 @@ class CRMLegalApp:
         print(f"Interacción con IA guardada como actividad en caso ID {caso_id}")
 
     def crear_copia_de_seguridad(self):
-        """
-        Realiza un backup de la base de datos PostgreSQL usando la herramienta pg_dump.
-        """
-        print("Iniciando proceso de backup de la base de datos PostgreSQL...")
-
-        # --- 1. Definir la ruta a pg_dump ---
-        # Idealmente, esta ruta debería estar en una configuración, pero por ahora la ponemos aquí.
-        # ¡¡¡IMPORTANTE!!! Revisa si esta es la ruta correcta en tu sistema.
-        pg_dump_path = r"C:\Program Files\PostgreSQL\17\bin\pg_dump.exe"  # Usa 16, 17 o la que tengas
-
-        if not os.path.exists(pg_dump_path):
-            messagebox.showerror(
-                "Error de Backup",
-                f"No se encontró la herramienta 'pg_dump.exe' en la ruta:\n{pg_dump_path}\n\n"
-                "Por favor, verifica la ruta en el código de main_app.py.",
-            )
+        """Crea una copia de la base con pg_dump en segundo plano, mostrando el progreso."""
+        if servicio_backups.en_curso():
+            messagebox.showinfo("Copia de Seguridad", "Ya hay una copia de seguridad en curso.", parent=self.root)
             return
 
-        # --- 2. Leer la configuración de la base de datos desde config.ini ---
-        try:
-            config = configparser.ConfigParser()
-            config.read("config.ini")
-            db_config = config["postgresql"]
-            db_name = db_config["database"]
-            db_user = db_config["user"]
-            db_pass = db_config["password"]
-            db_host = db_config["host"]
-        except Exception as e:
-            messagebox.showerror(
-                "Error de Configuración",
-                f"No se pudo leer la configuración de la base de datos desde config.ini: {e}",
-            )
-            return
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Copia de Seguridad")
+        ventana.transient(self.root)
+        ventana.protocol("WM_DELETE_WINDOW", lambda: None)
+        frame = ttk.Frame(ventana, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+        estado = ttk.Label(frame, text="Iniciando pg_dump...", width=45)
+        estado.pack(pady=10)
+        barra = ttk.Progressbar(frame, mode='determinate', length=300)
+        barra.pack(fill=tk.X, pady=5)
+        ttk.Button(frame, text="Cancelar", command=servicio_backups.cancelar).pack(pady=(10, 0))
 
-        # --- 3. Definir el nombre y la ruta del archivo de backup ---
-        backup_folder = "backups"
-        if not os.path.exists(backup_folder):
-            os.makedirs(backup_folder)
-
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        backup_filename = f"backup_{db_name}_{timestamp}.sql"
-        backup_filepath = os.path.join(backup_folder, backup_filename)
-
-        # --- 4. Construir y ejecutar el comando pg_dump ---
-        # (Esto requiere que la contraseña se pase a través de una variable de entorno por seguridad)
-        command = [
-            pg_dump_path,
-            "--host",
-            db_host,
-            "--username",
-            db_user,
-            "--dbname",
-            db_name,
-            "--file",
-            backup_filepath,
-            "--format",
-            "c",  # Formato custom, comprimido y robusto
-            "--blobs",
-            "--verbose",
-        ]
+        fases = {'volcado': "Copiando tablas", 'verificacion': "Verificando la copia", 'fin': "Listo"}
 
-        try:
-            # Establecer la variable de entorno para la contraseña
-            env = os.environ.copy()
-            env["PGPASSWORD"] = db_pass
-
-            print(f"Ejecutando comando de backup: {' '.join(command)}")
-            # Usamos subprocess.run para ejecutar el comando externo
-            result = subprocess.run(
-                command, capture_output=True, text=True, check=True, env=env
-            )
+        def mostrar_progreso(fase, hechas, total):
+            if not ventana.winfo_exists():
+                return
+            estado.config(text=f"{fases.get(fase, fase)}: {hechas}" + (f" de {total}" if total else ""))
+            if total:
+                barra.config(mode='determinate', maximum=total, value=min(hechas, total))
 
-            print("Salida de pg_dump:", result.stdout)
-            print("Errores de pg_dump:", result.stderr)
+        def copiar_en_segundo_plano():
+            try:
+                resultado, error = servicio_backups.crear_backup(
+                    al_progreso=lambda *args: self.root.after(0, mostrar_progreso, *args),
+                ), None
+            except Exception as e:
+                resultado, error = None, e
+
+            def mostrar_resultado():
+                ventana.destroy()
+                if error is not None:
+                    print(f"Error de backup: {error}")
+                    messagebox.showerror("Error de Backup", f"No se pudo crear la copia de seguridad:\n{error}",
+                                         parent=self.root)
+                    return
+                verificacion = resultado.get('verificacion')
+                if verificacion and not verificacion['ok']:
+                    messagebox.showerror("Copia de Seguridad No Válida", self._resumen_backup(resultado),
+                                         parent=self.root)
+                    return
+                messagebox.showinfo("Backup Exitoso", self._resumen_backup(resultado), parent=self.root)
+
+            self.root.after(0, mostrar_resultado)
+
+        threading.Thread(target=copiar_en_segundo_plano, daemon=True).start()
+
+    @staticmethod
+    def _resumen_backup(resultado):
+        mensaje = (f"Copia guardada en:\n{resultado['ruta']}\n\n"
+                   f"Tablas: {resultado['tablas']}\n"
+                   f"Tamaño: {resultado['bytes'] / (1024 * 1024):.1f} MB\n"
+                   f"Duración: {resultado['segundos']:.1f} s ({resultado['jobs']} procesos)")
+        verificacion = resultado.get('verificacion')
+        if verificacion:
+            mensaje += ("\nVerificación: correcta" if verificacion['ok']
+                        else f"\nVerificación FALLIDA: {verificacion['error']}\n"
+                             "La copia quedó apartada y no se eliminó ninguna copia anterior.")
+        if resultado.get('eliminados'):
+            mensaje += f"\nCopias antiguas eliminadas: {len(resultado['eliminados'])}"
+        return mensaje
+
+    def verificar_copia_de_seguridad(self):
+        """Comprueba con pg_restore --list que una copia se puede leer y restaurar."""
+        archivo = filedialog.askopenfilename(
+            title="Seleccionar copia (toc.dat de la carpeta, o archivo .backup)",
+            initialdir=os.path.abspath(servicio_backups.carpeta),
+            filetypes=[("Copias de seguridad", "toc.dat *.backup *.sql"), ("Todos los archivos", "*.*")],
+            parent=self.root,
+        )
+        if not archivo:
+            return
+        # El formato directorio se elige por su índice toc.dat
+        ruta = os.path.dirname(archivo) if os.path.basename(archivo) == 'toc.dat' else archivo
 
-            messagebox.showinfo(
-                "Backup Exitoso",
-                f"El backup de la base de datos se ha guardado exitosamente en:\n{backup_filepath}",
-            )
+        def mostrar(verificacion):
+            if verificacion['ok']:
+                messagebox.showinfo(
+                    "Verificación de Copia",
+                    f"La copia es válida.\n\nEntradas: {verificacion['entradas']}\n"
+                    f"Tablas con datos: {verificacion['tablas_con_datos']}",
+                    parent=self.root,
+                )
+            else:
+                messagebox.showerror("Verificación de Copia", f"La copia no es válida:\n{verificacion['error']}",
+                                     parent=self.root)
+
+        ejecutor_datos.enviar(
+            servicio_backups.verificar_backup, ruta,
+            clave='verificar_backup',
+            al_completar=mostrar,
+            indicador=indicador_cursor(self.root),
+        )
 
-        except subprocess.CalledProcessError as e:
-            print("--- ERROR DURANTE EL BACKUP ---")
-            print("Comando:", e.cmd)
-            print("Código de Salida:", e.returncode)
-            print("Salida (stdout):", e.stdout)
-            print("Error (stderr):", e.stderr)
-            messagebox.showerror(
-                "Error de Backup",
-                f"Falló la ejecución de pg_dump. Revisa la consola para más detalles.\n\nError: {e.stderr}",
-            )
-        except Exception as e:
-            messagebox.showerror(
-                "Error Inesperado",
-                f"Ocurrió un error inesperado durante el backup: {e}",
-            )
+    def _on_backup_nocturno(self, resultado, error):
+        """Llamado desde el hilo del modo nocturno al terminar cada copia."""
+        if error is not None:
+            self.root.after(0, lambda: messagebox.showerror(
+                "Copia Nocturna", f"Falló la copia de seguridad nocturna:\n{error}", parent=self.root))
+        elif resultado.get('verificacion') and not resultado['verificacion']['ok']:
+            self.root.after(0, lambda: messagebox.showerror(
+                "Copia Nocturna No Válida", self._resumen_backup(resultado), parent=self.root))
 
-    def open_prospects_window(self):
+    def open_prospects_window(self, prospecto_id=None):
         """Abre la ventana de gestión de prospectos"""
         try:
             from prospects_window import ProspectsWindow
 
-            ProspectsWindow(self)
+            ProspectsWindow(self, prospecto_id)
         except Exception as e:
             messagebox.showerror(
                 "Error", f"No se pudo abrir la ventana de prospectos:\n{str(e)}"
@@ -1672,11 +1685,191 @@ class CRMLegalApp:
             import traceback
             traceback.print_exc()
 
-    def _abrir_gestor_de_contactos(self):
+    def _exportar_analisis_financiero(self):
+        """Exporta la analítica de cuenta corriente de todo el estudio a XLSX."""
+        archivo_xlsx = filedialog.asksaveasfilename(
+            title="Guardar análisis financiero como...",
+            defaultextension=".xlsx",
+            initialfile=f"analisis_financiero_{datetime.date.today().strftime('%Y-%m-%d')}.xlsx",
+            filetypes=[("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")],
+            parent=self.root,
+        )
+        if not archivo_xlsx:
+            return
+
+        def exportar_en_segundo_plano():
+            try:
+                from analisis_financiero import analisis_financiero
+                exito = analisis_financiero.exportar_xlsx(archivo_xlsx)
+                error = None
+            except Exception as e:
+                exito, error = False, e
+
+            def mostrar_resultado():
+                if exito:
+                    messagebox.showinfo(
+                        "Éxito",
+                        f"Análisis financiero generado.\nArchivo guardado en: {archivo_xlsx}",
+                        parent=self.root,
+                    )
+                else:
+                    messagebox.showerror(
+                        "Error",
+                        f"No se pudo generar el análisis financiero:\n{error or 'Revise la consola para más detalles.'}",
+                        parent=self.root,
+                    )
+
+            self.root.after(0, mostrar_resultado)
+
+        threading.Thread(target=exportar_en_segundo_plano, daemon=True).start()
+
+    def _importar_datos(self, entidad):
+        """Importa clientes, contactos o casos en bloque desde un CSV o XLSX."""
+        archivo = filedialog.askopenfilename(
+            title=f"Importar {entidad} desde...",
+            filetypes=[("CSV o Excel", "*.csv *.xlsx"), ("Todos los archivos", "*.*")],
+            parent=self.root,
+        )
+        if not archivo:
+            return
+
+        ventana = tk.Toplevel(self.root)
+        ventana.title(f"Importando {entidad}")
+        ventana.transient(self.root)
+        ventana.grab_set()
+        ventana.protocol("WM_DELETE_WINDOW", lambda: None)
+        frame = ttk.Frame(ventana, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+        estado = ttk.Label(frame, text="Leyendo archivo...", width=45)
+        estado.pack(pady=10)
+        barra = ttk.Progressbar(frame, mode='determinate', length=300)
+        barra.pack(fill=tk.X, pady=5)
+
+        fases = {'lectura': "Leyendo y validando", 'comparacion': "Buscando registros existentes",
+                 'insercion': "Guardando", 'fin': "Listo"}
+
+        def mostrar_progreso(fase, procesadas, total):
+            if not ventana.winfo_exists():
+                return
+            estado.config(text=f"{fases.get(fase, fase)}: {procesadas:,} filas".replace(',', '.'))
+            if total:
+                barra.config(mode='determinate', maximum=total, value=min(procesadas, total))
+            elif str(barra.cget('mode')) != 'indeterminate':
+                barra.config(mode='indeterminate')
+                barra.start()
+
+        def importar_en_segundo_plano():
+            try:
+                from importador_masivo import importar_archivo
+                resumen = importar_archivo(
+                    entidad, archivo,
+                    progreso=lambda *args: self.root.after(0, mostrar_progreso, *args),
+                )
+                error = None
+            except Exception as e:
+                resumen, error = None, e
+
+            def mostrar_resultado():
+                ventana.destroy()
+                if error is not None:
+                    messagebox.showerror("Error", f"No se pudo importar el archivo:\n{error}", parent=self.root)
+                    return
+                mensaje = (f"Filas leídas: {resumen['leidas']}\n"
+                           f"Agregados: {resumen['insertadas']}\n"
+                           f"Ya existentes (omitidos): {resumen['existentes']}\n"
+                           f"Rechazados: {resumen['rechazadas']}")
+                if resumen['ruta_errores']:
+                    mensaje += f"\n\nDetalle de rechazos en:\n{resumen['ruta_errores']}"
+                messagebox.showinfo("Importación finalizada", mensaje, parent=self.root)
+                if entidad == 'clientes':
+                    self.client_manager.load_clients()
+
+            self.root.after(0, mostrar_resultado)
+
+        threading.Thread(target=importar_en_segundo_plano, daemon=True).start()
+
+    def _detectar_contactos_duplicados(self):
+        """Genera el reporte CSV de contactos duplicados y ofrece fusionar los grupos seguros."""
+        archivo_csv = filedialog.asksaveasfilename(
+            title="Guardar reporte de duplicados como...",
+            defaultextension=".csv",
+            initialfile=f"contactos_duplicados_{datetime.date.today().strftime('%Y-%m-%d')}.csv",
+            filetypes=[("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*")],
+            parent=self.root,
+        )
+        if not archivo_csv:
+            return
+
+        def detectar_en_segundo_plano():
+            try:
+                from duplicados_contactos import exportar_reporte_csv
+                propuestas = db.detectar_contactos_duplicados()
+                exportar_reporte_csv(propuestas, archivo_csv)
+                error = None
+            except Exception as e:
+                propuestas, error = [], e
+            self.root.after(0, mostrar_resultado, propuestas, error)
+
+        def mostrar_resultado(propuestas, error):
+            if error is not None:
+                messagebox.showerror("Error", f"No se pudo detectar duplicados:\n{error}", parent=self.root)
+                return
+            seguras = [p for p in propuestas if p['segura']]
+            mensaje = (f"Grupos de posibles duplicados: {len(propuestas)}\n"
+                       f"Reporte guardado en: {archivo_csv}")
+            if not seguras:
+                messagebox.showinfo("Contactos duplicados", mensaje, parent=self.root)
+                return
+            if messagebox.askyesno(
+                "Contactos duplicados",
+                f"{mensaje}\n\n{len(seguras)} grupo(s) tienen nombres casi iguales y el mismo DNI o CUIT.\n"
+                "Los demás grupos (coincidencias por email, teléfono o sólo nombre) quedan en el reporte para revisarlos.\n"
+                "¿Fusionar ahora los grupos con el mismo DNI o CUIT? Sus roles en los casos pasarán al contacto conservado.",
+                parent=self.root,
+            ):
+                ejecutor_datos.enviar(
+                    lambda: [db.fusionar_contactos(p['conservar_id'], p['contacto_ids']) for p in seguras],
+                    clave=('fusion_contactos',),
+                    al_completar=lambda resultados: messagebox.showinfo(
+                        "Contactos duplicados",
+                        f"Fusionados {sum(1 for r in resultados if r)} de {len(seguras)} grupo(s).",
+                        parent=self.root,
+                    ),
+                    indicador=indicador_cursor(self.root),
+                )
+
+        threading.Thread(target=detectar_en_segundo_plano, daemon=True).start()
+
+    def _abrir_busqueda_documentos(self, caso_id=None, caso_caratula=None):
+        """Abre la búsqueda en el contenido de los documentos de los casos"""
+        from busqueda_documentos_ui import open_busqueda_documentos
+        open_busqueda_documentos(self.root, self, caso_id, caso_caratula)
+
+    def _abrir_busqueda_global(self):
+        """Abre la búsqueda de texto completo en notas, actividades, tareas y consultas"""
+        from busqueda_global_ui import open_busqueda_global
+        open_busqueda_global(self.root, self)
+
+    def _abrir_resultado_omnibox(self, resultado):
+        """Lleva a la entidad elegida en la búsqueda global"""
+        tipo, entidad_id = resultado['tipo'], resultado['entidad_id']
+        if tipo == 'cliente':
+            iid = str(entidad_id)
+            if self.client_tree.exists(iid):
+                self.client_tree.selection_set(iid)
+                self.client_tree.see(iid)
+        elif tipo == 'caso':
+            self.abrir_caso_por_id(entidad_id)
+        elif tipo == 'contacto':
+            self._abrir_gestor_de_contactos(entidad_id)
+        elif tipo == 'prospecto':
+            self.open_prospects_window(entidad_id)
+
+    def _abrir_gestor_de_contactos(self, contacto_id=None):
         """Abre la ventana del gestor de contactos"""
         try:
             open_contactos_manager = get_contactos_manager()
-            open_contactos_manager(self.root)
+            open_contactos_manager(self.root, contacto_id)
         except Exception as e:
             messagebox.showerror(
                 "Error",
@@ -1761,13 +1954,28 @@ class CRMLegalApp:
                 print(f"Error al detener icono de bandeja: {e}")
 
         # Detener hilos de fondo
-        if hasattr(self, 'stop_event_recordatorios'):
-            print("Deteniendo hilo de recordatorios...")
-            self.stop_event_recordatorios.set()
+        if hasattr(self, 'planificador_recordatorios'):
+            print("Deteniendo planificador de recordatorios...")
+            self.planificador_recordatorios.detener()
+
+        if hasattr(self, 'escucha_cambios'):
+            print("Deteniendo escucha de cambios...")
+            self.db_crm.quitar_listener_cambios(self._on_cambio_datos)
+            self.escucha_cambios.detener()
+
+        if hasattr(self, 'indexador_documentos'):
+            self.indexador_documentos.detener()
+
+        servicio_backups.detener()
 
-        if hasattr(self, 'stop_event_inactividad'):
-            print("Deteniendo hilo de inactividad...")
-            self.stop_event_inactividad.set()
+        ejecutor_datos.apagar()
+
+        from explorador_documentos import vigilante_carpetas
+        vigilante_carpetas.detener()
+
+        if planificador_precarga.iniciado:
+            planificador_precarga.detener()
+            planificador_precarga.guardar_historial()
 
         # Cerrar la aplicación
         self.root.quit()
@@ -2777,7 +2985,7 @@ class CRMLegalApp:
                 )
                 # Refrescar la ventana del caso si está abierta
                 if caso_id in self.open_case_windows:
-                    self.open_case_windows[caso_id].refresh_active_tab()
+                    self.open_case_windows[caso_id].refresh_active_tab(["seguimiento"])
             else:
                 messagebox.showerror("Error", "No se pudo eliminar la actividad.")
 
@@ -2803,7 +3011,7 @@ class CRMLegalApp:
                 print(f"Actividad guardada exitosamente con ID: {actividad_id}")
                 # Refrescar la ventana del caso si está abierta
                 if caso_id in self.open_case_windows:
-                    self.open_case_windows[caso_id].refresh_active_tab()
+                    self.open_case_windows[caso_id].refresh_active_tab(["seguimiento"])
                 return actividad_id
             else:
                 print("Error al guardar la actividad")
@@ -2852,7 +3060,7 @@ class CRMLegalApp:
                     f"El rol de '{nombre}' ha sido eliminado del caso.",
                     parent=self.root,
                 )
-                self.refresh_current_case_view()
+                self.refresh_current_case_view(rol_id=rol_id, eliminado=True)
                 return True
             else:
                 messagebox.showerror(
@@ -2870,9 +3078,9 @@ class CRMLegalApp:
             )
             return False
 
-    def refresh_case_window(self, case_id):
+    def refresh_case_window(self, case_id, pestanas=None):
         """Refresca una ventana de caso específica."""
-        self._refresh_open_case_window(case_id)
+        self._refresh_open_case_window(case_id, pestanas)
 
     # --- MÉTODOS PARA DIÁLOGOS DE MOVIMIENTOS FINANCIEROS ---
 
@@ -2895,7 +3103,7 @@ class CRMLegalApp:
             
             if result:
                 # Refrescar ventana del caso si está abierta
-                self.refresh_case_window(caso_id)
+                self.refresh_case_window(caso_id, ["cuenta_corriente"])
                 return True
             return False
 
@@ -2929,7 +3137,7 @@ class CRMLegalApp:
 
             if result:
                 # Refrescar ventana del caso si está abierta
-                self.refresh_case_window(caso_id)
+                self.refresh_case_window(caso_id, ["cuenta_corriente"])
                 return True
             return False
 
@@ -2967,7 +3175,7 @@ class CRMLegalApp:
 
             if result:
                 # Refrescar ventana del caso si está abierta
-                self.refresh_case_window(movimiento_data["caso_id"])
+                self.refresh_case_window(movimiento_data["caso_id"], ["cuenta_corriente"])
                 return True
             return False
 
@@ -3001,8 +3209,11 @@ class CRMLegalApp:
                 parent=self.root,
             )
 
-    def refresh_current_case_view(self):
-        """Refresca la pestaña de partes en la ventana de detalles del caso con manejo de errores."""
+    def refresh_current_case_view(self, rol_id=None, eliminado=False):
+        """
+        Refresca la pestaña de partes en la ventana de detalles del caso con manejo de errores.
+        Si se indica el rol que cambió y la pestaña ya está cargada, se aplica sólo ese cambio.
+        """
         try:
             if not self.selected_case:
                 return
@@ -3022,12 +3233,10 @@ class CRMLegalApp:
                 return
 
             # Refrescar la pestaña de partes
-            if hasattr(case_window, "partes_tab"):
-                case_window.partes_tab.load_partes(case_id)
-            
-            # Also refresh the active tab to update any changes
-            if hasattr(case_window, "refresh_active_tab"):
-                case_window.refresh_active_tab()
+            if rol_id is not None and "partes" not in getattr(case_window, "pestanas_sucias", {"partes"}):
+                case_window.partes_tab.aplicar_cambio_rol(case_id, rol_id, eliminado)
+            elif hasattr(case_window, "refresh_active_tab"):
+                case_window.refresh_active_tab(["partes"])
 
         except tk.TclError:
             # La ventana fue cerrada, limpiar referencia
@@ -3039,54 +3248,131 @@ class CRMLegalApp:
             print(f"Error al refrescar vista del caso: {e}")
             # No mostrar messagebox aquí para evitar spam de errores
 
+    # --- Refresco por cambios de otras instancias (LISTEN/NOTIFY) ---
+
+    # Pestaña de CaseDetailWindow que muestra las filas de cada tabla
+    PESTANA_POR_TABLA = {
+        'casos': 'detalles',
+        'tareas': 'tareas',
+        'roles_en_caso': 'partes',
+        'representaciones': 'partes',
+        'actividades_caso': 'seguimiento',
+        'movimientos_cuenta': 'cuenta_corriente',
+    }
+
+    def _on_cambio_datos(self, tabla, operacion, registro_id, caso_id, remoto=False):
+        """Listener de crm_database. Los cambios locales ya refrescan su propia vista."""
+        if not remoto:
+            return
+        self.root.after(0, self._encolar_refresco_remoto, tabla, operacion, registro_id, caso_id)
+
+    def _encolar_refresco_remoto(self, tabla, operacion, registro_id, caso_id):
+        # Agrupar ráfagas de eventos (p. ej. varias filas en una transacción) en un solo refresco
+        if not self._refrescos_remotos_pendientes:
+            self.root.after(250, self._aplicar_refrescos_remotos)
+        self._refrescos_remotos_pendientes.add((tabla, operacion, registro_id, caso_id))
+
+    def _aplicar_refrescos_remotos(self):
+        pendientes, self._refrescos_remotos_pendientes = self._refrescos_remotos_pendientes, set()
+
+        pestanas_a_refrescar = set()
+        casos_en_lista = {}
+        refrescar_agenda = False
+        for tabla, operacion, registro_id, caso_id in pendientes:
+            if tabla == 'audiencias':
+                refrescar_agenda = True
+            if tabla == 'casos':
+                casos_en_lista[registro_id] = operacion
+            pestana = self.PESTANA_POR_TABLA.get(tabla)
+            if pestana and caso_id in self.open_case_windows:
+                pestanas_a_refrescar.add((caso_id, pestana))
+
+        for caso_id, pestana in pestanas_a_refrescar:
+            case_window = self.open_case_windows.get(caso_id)
+            try:
+                if case_window and case_window.winfo_exists():
+                    case_window.refresh_tab(pestana)
+            except tk.TclError:
+                self.open_case_windows.pop(caso_id, None)
+            except Exception as e:
+                print(f"[Cambios Remotos] Error refrescando pestaña '{pestana}' del caso {caso_id}: {e}")
+
+        for caso_id, operacion in casos_en_lista.items():
+            self._refrescar_caso_en_lista(caso_id, operacion)
+
+        if refrescar_agenda:
+            self.marcar_dias_audiencias_calendario()
+            self.actualizar_lista_audiencias()
+
+    def _refrescar_caso_en_lista(self, caso_id, operacion):
+        """Actualiza en su lugar la fila de un caso en la lista principal, sin recargarla."""
+        iid = str(caso_id)
+        if operacion == 'DELETE':
+            try:
+                if self.case_tree.exists(iid):
+                    self.case_tree.delete(iid)
+            except tk.TclError as e:
+                print(f"[Cambios Remotos] Error quitando caso {caso_id} de la lista: {e}")
+            return
+
+        def aplicar(caso):
+            if not caso:
+                return
+            num_exp = caso.get("numero_expediente") or ""
+            anio_car = caso.get("anio_caratula") or ""
+            nro_anio = f"{num_exp}/{anio_car}" if num_exp and anio_car else (num_exp or (f"/{anio_car}" if anio_car else ""))
+            valores = (caso_id, nro_anio, caso.get("caratula", "Sin carátula"))
+            try:
+                if self.case_tree.exists(iid):
+                    self.case_tree.item(iid, values=valores)
+                elif self.selected_client and self.selected_client["id"] == caso.get("cliente_id"):
+                    self.case_tree.insert("", tk.END, values=valores, iid=iid)
+            except tk.TclError as e:
+                print(f"[Cambios Remotos] Error actualizando caso {caso_id} en la lista: {e}")
+
+        def leer_en_segundo_plano():
+            try:
+                caso = self.db_crm.get_case_by_id(caso_id)
+            except Exception as e:
+                print(f"[Cambios Remotos] Error leyendo caso {caso_id}: {e}")
+                return
+            self.root.after(0, aplicar, caso)
+
+        threading.Thread(target=leer_en_segundo_plano, daemon=True).start()
+
     # --- Métodos de Lógica para la Agenda Global ---
     def marcar_dias_audiencias_calendario(self):
         """
-        Marca los días que tienen audiencias en el calendario.
-        Corregido para manejar fechas de PostgreSQL correctamente.
+        Marca los días con audiencias del mes visible del calendario (y de los
+        días de los meses vecinos que muestra). Los meses salen de la caché de
+        la agenda; la lectura corre en segundo plano.
         """
+        mes, anio = self.agenda_cal.get_displayed_month()
+        # Al cambiar de mes rápidamente sólo se marca el último mostrado
+        ejecutor_datos.enviar(
+            calendario_audiencias.fechas_con_audiencias, anio, mes,
+            clave="calendario_audiencias",
+            al_completar=lambda fechas: self._marcar_fechas_audiencias(anio, mes, fechas),
+            al_fallar=lambda error: print(f"[Calendar] [ERROR] Error obteniendo fechas con audiencias: {error}"),
+        )
+
+    def _marcar_fechas_audiencias(self, anio, mes, fechas):
+        """Vuelca en el calendario las fechas obtenidas por marcar_dias_audiencias_calendario."""
         try:
             # Clear existing markers
             self.agenda_cal.calevent_remove(tag="audiencia_marcador")
-            
-            # Get dates with audiencias
-            fechas = db.get_fechas_con_audiencias()
-            
-            if not fechas:
-                print("[Calendar] No se encontraron fechas con audiencias para marcar")
-                return
-            
-            marked_count = 0
-            error_count = 0
-            
-            for fecha_str in fechas:
-                try:
-                    # Parse date string (should be in YYYY-MM-DD format from database)
-                    fecha_dt = datetime.datetime.strptime(fecha_str, "%Y-%m-%d").date()
-                    
-                    # Create calendar event marker
-                    self.agenda_cal.calevent_create(
-                        fecha_dt, "Audiencia", tags="audiencia_marcador"
-                    )
-                    marked_count += 1
-                    
-                except ValueError as ve:
-                    print(f"[Calendar] [WARN] Formato fecha inválido en BD: {fecha_str} - {ve}")
-                    error_count += 1
-                except Exception as e:
-                    print(f"[Calendar] [ERROR] Error marcando fecha {fecha_str}: {e}")
-                    error_count += 1
-            
-            # Log results
-            if marked_count > 0:
-                print(f"[Calendar] [OK] Marcados {marked_count} días con audiencias en el calendario")
-            if error_count > 0:
-                print(f"[Calendar] [WARN] {error_count} errores al marcar fechas")
+            for fecha in fechas:
+                self.agenda_cal.calevent_create(fecha, "Audiencia", tags="audiencia_marcador")
+        except tk.TclError as e:
+            print(f"[Calendar] [ERROR] Error marcando fechas con audiencias: {e}")
+            return
 
-        except Exception as e:
-            print(f"[Calendar] [ERROR] Error general en marcar_dias_audiencias_calendario: {e}")
-            import traceback
-            traceback.print_exc()
+        # Dejar leídos los meses a los que se puede navegar desde el actual
+        ejecutor_datos.enviar(
+            calendario_audiencias.precargar_vecinos, anio, mes,
+            clave="calendario_precarga",
+            al_fallar=lambda error: print(f"[Calendar] [WARN] Error precargando meses vecinos: {error}"),
+        )
 
     def actualizar_lista_audiencias(self, event=None):
         """
@@ -3096,15 +3382,25 @@ class CRMLegalApp:
         if event:
             self.fecha_seleccionada_agenda = self.agenda_cal.get_date()
         
+        # Get audiencias for selected date (from the month cache); a newer date selection supersedes this query
+        fecha = self.fecha_seleccionada_agenda
+        ejecutor_datos.enviar(
+            calendario_audiencias.audiencias_del_dia, fecha,
+            clave="audiencias_por_fecha",
+            al_completar=lambda audiencias: self._mostrar_audiencias_fecha(fecha, audiencias),
+            al_fallar=lambda error: print(f"[Audiencias] Error obteniendo audiencias de {fecha}: {error}"),
+            indicador=indicador_cursor(self.audiencia_tree),
+        )
+
+    def _mostrar_audiencias_fecha(self, fecha, audiencias):
+        """Vuelca en la lista las audiencias obtenidas por actualizar_lista_audiencias."""
         # Clear existing items
         for i in self.audiencia_tree.get_children():
             self.audiencia_tree.delete(i)
         
-        # Get audiencias for selected date
-        audiencias = db.get_audiencias_by_fecha(self.fecha_seleccionada_agenda)
-        
+        audiencias = audiencias or []
         if not audiencias:
-            print(f"[Audiencias] No hay audiencias para la fecha {self.fecha_seleccionada_agenda}")
+            print(f"[Audiencias] No hay audiencias para la fecha {fecha}")
         
         expired_count = 0
         valid_count = 0
@@ -3161,7 +3457,7 @@ class CRMLegalApp:
         # Log results
         total_audiencias = len(audiencias)
         if total_audiencias > 0:
-            fecha_display = date_utils.DateFormatter.to_display_format(self.fecha_seleccionada_agenda)
+            fecha_display = date_utils.DateFormatter.to_display_format(fecha)
             print(f"[Audiencias] {fecha_display}: {valid_count} válidas, {expired_count} vencidas")
         
         self.deshabilitar_botones_audiencia()
@@ -3735,155 +4031,15 @@ class CRMLegalApp:
                 )
 
     # --- Funciones de Recordatorios y Bandeja del Sistema ---
-    def verificar_recordatorios_periodicamente(self, stop_event):
-        print("[Recordatorios] Hilo iniciado.")
-        while not stop_event.is_set():
-            current_processing_start_time = time.monotonic()
-            try:
-                ahora = datetime.datetime.now()
-                hoy_str = ahora.strftime("%Y-%m-%d")
-                if (
-                    not hasattr(self, "_dia_verificacion_recordatorios")
-                    or self._dia_verificacion_recordatorios != hoy_str
-                ):
-                    print(
-                        f"[Recordatorios] Nuevo día ({hoy_str}), reseteando mostrados."
-                    )
-                    self.recordatorios_mostrados_hoy = set()  # Para audiencias
-                    # Para tareas, la lógica de "ya notificado hoy" está en get_tareas_para_notificacion
-                    self._dia_verificacion_recordatorios = hoy_str
-
-                # --- Procesamiento de Recordatorios de Audiencias ---
-                # The get_audiencias_con_recordatorio_activo() function already filters expired audiencias
-                audiencias_a_revisar = db.get_audiencias_con_recordatorio_activo()
-                
-                if not audiencias_a_revisar:
-                    # No need to log every time, just on first check of the day
-                    if not hasattr(self, '_logged_no_audiencias_today'):
-                        print(f"[Recordatorios] No hay audiencias con recordatorio activo para procesar")
-                        self._logged_no_audiencias_today = True
-                else:
-                    # Reset the flag if we have audiencias
-                    if hasattr(self, '_logged_no_audiencias_today'):
-                        delattr(self, '_logged_no_audiencias_today')
-                
-                processed_count = 0
-                skipped_count = 0
-                
-                for aud in audiencias_a_revisar:
-                    if stop_event.is_set():
-                        break
-                        
-                    aud_id = aud["id"]
-                    
-                    # Skip if already notified today or missing required data
-                    if (
-                        not aud.get("fecha")
-                        or not aud.get("hora")
-                        or aud_id in self.recordatorios_mostrados_hoy
-                    ):
-                        skipped_count += 1
-                        continue
-                    
-                    try:
-                        # Double-check that audiencia is not expired (additional safety)
-                        if date_utils.DateFormatter.is_date_expired(aud.get("fecha"), aud.get("hora")):
-                            print(f"[Recordatorios] [WARN] Audiencia {aud_id} está vencida, saltando")
-                            skipped_count += 1
-                            continue
-                        
-                        # Use improved date/time handling
-                        fecha_aud = aud["fecha"]
-                        hora_aud = aud["hora"]
-
-                        # Convert to database format for consistent parsing
-                        fecha_str = date_utils.DateFormatter.to_database_format(fecha_aud)
-                        if not fecha_str:
-                            print(f"[Recordatorios] [WARN] No se pudo convertir fecha para audiencia {aud_id}")
-                            skipped_count += 1
-                            continue
-
-                        # Handle time conversion
-                        if hasattr(hora_aud, "strftime"):
-                            hora_str = hora_aud.strftime("%H:%M")
-                        else:
-                            hora_str = str(hora_aud)
-                            # Remove microseconds if present
-                            if ":" in hora_str and len(hora_str.split(":")) > 2:
-                                hora_str = ":".join(hora_str.split(":")[:2])
-
-                        # Parse audiencia datetime
-                        tiempo_audiencia = datetime.datetime.strptime(
-                            f"{fecha_str} {hora_str}", "%Y-%m-%d %H:%M"
-                        )
-                        
-                        # Calculate reminder time
-                        minutos_antes = aud.get("recordatorio_minutos", 15)
-                        tiempo_recordatorio = tiempo_audiencia - datetime.timedelta(
-                            minutes=minutos_antes
-                        )
-                        
-                        # Check if it's time to show reminder
-                        if tiempo_recordatorio <= ahora < tiempo_audiencia:
-                            fecha_display = date_utils.DateFormatter.to_display_format(fecha_aud)
-                            print(
-                                f"[Recordatorios AUD] ¡Alerta! Audiencia ID: {aud_id} ({hora_str}) el {fecha_display}"
-                            )
-                            self.root.after(
-                                0, self.mostrar_recordatorio_audiencia, aud.copy()
-                            )
-                            self.recordatorios_mostrados_hoy.add(aud_id)
-                            processed_count += 1
-                        else:
-                            # Not yet time for reminder
-                            pass
-                            
-                    except ValueError as ve:
-                        print(
-                            f"[Recordatorios AUD] [ERROR] Error parseando fecha/hora ID {aud_id}: {ve}"
-                        )
-                        skipped_count += 1
-                    except Exception as e:
-                        print(
-                            f"[Recordatorios AUD] [ERROR] Error procesando recordatorio ID {aud_id}: {e}"
-                        )
-                        skipped_count += 1
-                
-                # Log processing summary (only if there was activity)
-                if processed_count > 0 or skipped_count > 0:
-                    total_checked = len(audiencias_a_revisar)
-                    print(f"[Recordatorios AUD] Procesadas: {processed_count}, Saltadas: {skipped_count}, Total: {total_checked}")
-
-                # --- Procesamiento de Recordatorios de Tareas ---
-                tareas_a_notificar = self.db_crm.get_tareas_para_notificacion()
-                for tarea in tareas_a_notificar:
-                    if stop_event.is_set():
-                        break
-                    tarea_id = tarea["id"]
-                    print(
-                        f"[Recordatorios TAREA] ¡Alerta! Tarea ID: {tarea_id} ('{tarea['descripcion'][:50]}...') vence el {tarea['fecha_vencimiento']}."
-                    )
-                    self.root.after(0, self.mostrar_recordatorio_tarea, tarea.copy())
-                    self.db_crm.update_fecha_ultima_notificacion_tarea(tarea_id)
-
-            except sqlite3.Error as dbe:
-                print(f"[Recordatorios] Error BD en hilo: {dbe}")
-                stop_event.wait(300)
-            except Exception as ex:
-                print(
-                    f"[Recordatorios] Error inesperado en hilo: {type(ex).__name__}: {ex}"
-                )
-                import traceback
-
-                traceback.print_exc()
-                stop_event.wait(120)
-
-            processing_duration = time.monotonic() - current_processing_start_time
-            sleep_interval = max(
-                1.0, 60.0 - processing_duration
-            )  # Verificar cada minuto
-            stop_event.wait(sleep_interval)
-        print("[Recordatorios] Hilo detenido.")
+    def _on_recordatorio_audiencia(self, audiencia):
+        """Llamado desde el planificador de recordatorios (hilo de fondo)."""
+        aud_id = audiencia.get("id")
+        self.recordatorios_mostrados_hoy.add(aud_id)
+        print(
+            f"[Recordatorios AUD] ¡Alerta! Audiencia ID: {aud_id} ({audiencia.get('hora')}) el "
+            f"{date_utils.DateFormatter.to_display_format(audiencia.get('fecha'))}"
+        )
+        self.root.after(0, self.mostrar_recordatorio_audiencia, audiencia)
 
     def mostrar_recordatorio_audiencia(self, audiencia):
         if not audiencia:
@@ -4149,11 +4305,27 @@ def validate_major_update():
     print("="*60 + "\n")
     return success_count == total_count
 
+def _al_mostrar_primera_ventana(root, app):
+    """Registra el tiempo hasta la primera ventana y lanza lo que no hace falta para mostrarla."""
+    root.update_idletasks()
+    segundos = time.perf_counter() - _INICIO_ARRANQUE
+    print(f"[Rendimiento] Primera ventana en {segundos:.2f}s")
+    if os.environ.get("LPMS_MEDIR_ARRANQUE"):
+        # Ejecutado por perfil_arranque.py --benchmark
+        from perfil_arranque import informar_arranque
+        informar_arranque(segundos)
+        app.cerrar_aplicacion()
+        return
+    # La validación importa ia_analyzer, langchain y docxtpl sólo para informar por consola
+    threading.Thread(target=validate_major_update, daemon=True).start()
+
+    # Calentar en los ratos libres los módulos que el usuario suele abrir
+    for nombre, modulo, prioridad in MODULOS_PRECARGA:
+        planificador_precarga.programar(nombre, modulo, prioridad)
+    planificador_precarga.iniciar(root)
+
 # --- Punto de entrada principal ---
 if __name__ == "__main__":
-    # Ejecutar validación de la actualización mayor
-    validate_major_update()
-    
     root = tk.Tk()
     style = ttk.Style(root)
     available_themes = style.theme_names()
@@ -4175,5 +4347,6 @@ if __name__ == "__main__":
         )
 
     app = CRMLegalApp(root)
+    root.after_idle(_al_mostrar_primera_ventana, root, app)
     root.mainloop()
     print("Aplicación CRM Legal cerrada.")
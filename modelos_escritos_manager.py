@@ -129,15 +129,14 @@ El sistema reemplazará automáticamente estas variables con los datos reales de
     def get_case_data(self, case_id):
         """Obtiene los datos del caso para completar el modelo"""
         try:
-            case_data = db.get_case_by_id(case_id)
-            if not case_data:
+            # Caso, cliente y abogado salen del contexto del caso (una consulta, en caché)
+            contexto = db.get_contexto_caso(case_id)
+            if not contexto:
                 return None
             
-            # Obtener datos del cliente
-            client_data = db.get_client_by_id(case_data['cliente_id'])
-            
-            # Obtener datos del usuario/abogado
-            user_data = db.get_datos_usuario()
+            case_data = contexto.caso
+            client_data = contexto.cliente
+            user_data = contexto.abogado
             
             # Preparar variables para el template
             template_vars = {
@@ -156,6 +155,10 @@ El sistema reemplazará automáticamente estas variables con los datos reales de
                 'cliente_email': client_data.get('email', '') if client_data else '',
                 'cliente_whatsapp': client_data.get('whatsapp', '') if client_data else '',
                 
+                # Partes del caso con sus representantes (para bucles en la plantilla)
+                'actores': [dict(parte, representantes=contexto.representantes_de(parte['rol_id'])) for parte in contexto.actores],
+                'demandados': [dict(parte, representantes=contexto.representantes_de(parte['rol_id'])) for parte in contexto.demandados],
+                
                 # Datos de fecha
                 'fecha_hoy': datetime.now().strftime('%d-%m-%Y'),
                 'fecha_hoy_largo': datetime.now().strftime('%d de %B de %Y'),
@@ -0,0 +1,146 @@
+import tkinter as tk
+from tkinter import ttk
+
+from busqueda_omnibox import servicio_omnibox
+from ejecutor_datos import ejecutor_datos
+
+
+class Omnibox(ttk.Frame):
+    """
+    Cuadro de búsqueda global de la ventana principal: muestra bajo el campo una
+    lista desplegable con clientes, casos, contactos y prospectos que coinciden.
+    Flechas para moverse, Enter para abrir, Escape para cerrar.
+    """
+
+    DEMORA_BUSQUEDA_MS = 120
+    FILAS_VISIBLES = 10
+
+    ETIQUETAS_TIPO = {
+        'cliente': "Cliente",
+        'caso': "Caso",
+        'contacto': "Contacto",
+        'prospecto': "Prospecto",
+    }
+
+    def __init__(self, parent, al_elegir):
+        super().__init__(parent)
+        self.al_elegir = al_elegir
+        self._resultados = {}
+        self._busqueda_programada = None
+        self._popup = None
+
+        ttk.Label(self, text="Buscar:").pack(side=tk.LEFT, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(self, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_entry.bind('<KeyRelease>', self._on_key_release)
+        self.search_entry.bind('<Down>', self._enfocar_resultados)
+        self.search_entry.bind('<Return>', lambda e: self._elegir_primero())
+        self.search_entry.bind('<Escape>', lambda e: self._cerrar_popup())
+        # Cada vez que se vuelve al cuadro se parte de datos frescos
+        self.search_entry.bind('<FocusIn>', lambda e: servicio_omnibox.invalidar())
+        self.bind('<Destroy>', lambda e: ejecutor_datos.cancelar(('omnibox', id(self))) if e.widget is self else None)
+
+    def _on_key_release(self, event):
+        if event.keysym in ('Down', 'Up', 'Return', 'Escape', 'Tab'):
+            return
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.after(self.DEMORA_BUSQUEDA_MS, self._buscar)
+
+    def _buscar(self):
+        self._busqueda_programada = None
+        texto = self.search_var.get()
+        if len(texto.strip()) < servicio_omnibox.MIN_CARACTERES:
+            ejecutor_datos.cancelar(('omnibox', id(self)))
+            self._cerrar_popup()
+            return
+        ejecutor_datos.enviar(
+            servicio_omnibox.buscar, texto,
+            clave=('omnibox', id(self)),
+            al_completar=self._mostrar_resultados,
+            al_fallar=lambda error: print(f"Error en la búsqueda global: {error}"),
+        )
+
+    # --- Lista desplegable ---
+
+    def _crear_popup(self):
+        self._popup = tk.Toplevel(self)
+        self._popup.overrideredirect(True)
+        self._popup.transient(self.winfo_toplevel())
+        self.results_tree = ttk.Treeview(
+            self._popup, columns=('Tipo', 'Título', 'Detalle'), show='headings',
+            selectmode='browse', height=self.FILAS_VISIBLES,
+        )
+        self.results_tree.heading('Tipo', text='Tipo')
+        self.results_tree.heading('Título', text='Título')
+        self.results_tree.heading('Detalle', text='Detalle')
+        self.results_tree.column('Tipo', width=80, stretch=tk.NO)
+        self.results_tree.column('Título', width=300, stretch=True)
+        self.results_tree.column('Detalle', width=260, stretch=True)
+        self.results_tree.pack(fill=tk.BOTH, expand=True)
+        self.results_tree.bind('<Double-1>', lambda e: self._elegir_seleccionado())
+        self.results_tree.bind('<Return>', lambda e: self._elegir_seleccionado())
+        self.results_tree.bind('<Escape>', lambda e: self._cerrar_popup(volver_al_cuadro=True))
+        self.results_tree.bind('<Up>', self._on_up_en_resultados)
+
+    def _mostrar_resultados(self, resultados):
+        if not resultados:
+            self._cerrar_popup()
+            return
+        if self._popup is None:
+            self._crear_popup()
+        self.results_tree.delete(*self.results_tree.get_children())
+        self._resultados = {}
+        for resultado in resultados:
+            iid = f"{resultado['tipo']}-{resultado['entidad_id']}"
+            valores = (self.ETIQUETAS_TIPO.get(resultado['tipo'], resultado['tipo']),
+                       resultado['titulo'], resultado['detalle'] or "")
+            self.results_tree.insert('', tk.END, iid=iid, values=valores)
+            self._resultados[iid] = resultado
+        self.results_tree.configure(height=min(len(resultados), self.FILAS_VISIBLES))
+
+        ancho = max(self.search_entry.winfo_width(), 640)
+        x = self.search_entry.winfo_rootx()
+        y = self.search_entry.winfo_rooty() + self.search_entry.winfo_height()
+        self._popup.geometry(f"{ancho}x{self.results_tree.winfo_reqheight()}+{x}+{y}")
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def _cerrar_popup(self, volver_al_cuadro=False):
+        if self._popup is not None:
+            self._popup.destroy()
+            self._popup = None
+            self._resultados = {}
+        if volver_al_cuadro:
+            self.search_entry.focus_set()
+
+    def _enfocar_resultados(self, event=None):
+        if self._popup is None:
+            return
+        primero = self.results_tree.get_children()[0]
+        self.results_tree.focus_set()
+        self.results_tree.selection_set(primero)
+        self.results_tree.focus(primero)
+        return "break"
+
+    def _on_up_en_resultados(self, event):
+        if self.results_tree.index(self.results_tree.focus()) == 0:
+            self.search_entry.focus_set()
+            return "break"
+
+    # --- Elección ---
+
+    def _elegir_primero(self):
+        if self._popup is not None:
+            self._elegir(self._resultados[self.results_tree.get_children()[0]])
+
+    def _elegir_seleccionado(self):
+        seleccion = self.results_tree.selection()
+        if seleccion:
+            self._elegir(self._resultados[seleccion[0]])
+
+    def _elegir(self, resultado):
+        self._cerrar_popup()
+        self.search_var.set("")
+        self.al_elegir(resultado)
@@ -900,6 +900,7 @@ class PartesDialogManager(tk.Toplevel):
                 datos_rol['representa_a_id'] = None
 
             # Guardar el rol (crear o actualizar)
+            rol_cambiado = None
             if self.rol_id:
                 print(f"[DEBUG] Modo edición - verificando tipo de representación actual")
                 # En modo edición, verificar si era representación múltiple
@@ -921,10 +922,12 @@ class PartesDialogManager(tk.Toplevel):
                     print("[DEBUG] Era representación simple, actualizando normalmente")
                     # Era representación simple, actualizar normalmente
                     success_rol = self.db_crm.update_rol(self.rol_id, datos_rol)
+                    rol_cambiado = self.rol_id
                 action_rol = "actualizado"
             else:
                 print("[DEBUG] Modo creación - creando nuevo rol")
                 success_rol = self.db_crm.add_rol_a_caso(datos_rol)
+                rol_cambiado = success_rol
                 action_rol = "creado"
             
             print(f"[DEBUG] Resultado del guardado: {success_rol}")
@@ -944,9 +947,9 @@ class PartesDialogManager(tk.Toplevel):
                 
                 messagebox.showinfo("Éxito", mensaje, parent=self)
                 
-                # Refrescar vista y cerrar diálogo
+                # Refrescar vista (sólo el rol afectado si se puede) y cerrar diálogo
                 if hasattr(self.app_controller, 'refresh_current_case_view'):
-                    self.app_controller.refresh_current_case_view()
+                    self.app_controller.refresh_current_case_view(rol_id=rol_cambiado)
                 self._on_close()
                 return True
             
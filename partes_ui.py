@@ -1,7 +1,11 @@
 # partes_ui.py
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from arbol_partes import COLUMNAS_CONTACTO, aplicar_diferencias, construir_nodos, ordenar_roles
+from ejecutor_datos import ejecutor_datos, indicador_cursor
+
 class PartesTab(ttk.Frame):
     def __init__(self, parent, app_controller, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
@@ -9,6 +13,7 @@ class PartesTab(ttk.Frame):
         self.db_crm = self.app_controller.db_crm
         self.selected_rol_id = None
         self.roles_data_cache = {}
+        self._multiple_representations = {}
         self._create_widgets()
 
     def _create_widgets(self):
@@ -103,38 +108,6 @@ class PartesTab(ttk.Frame):
                                      foreground='#4682B4',
                                      font=('TkDefaultFont', 8))
 
-    def _get_role_icon(self, role):
-        """Retorna el icono apropiado para cada tipo de rol."""
-        role_icons = {
-            'Actor': '⚖️',
-            'Demandado': '🛡️',
-            'Tercero': '👥',
-            'Abogado': '👨‍💼',
-            'Apoderado': '📋',
-            'Perito': '🔬',
-            'Testigo': '👁️',
-            'Juez': '⚖️',
-            'Secretario': '📝',
-            'Oficial': '👮',
-        }
-        return role_icons.get(role, '👤')
-
-    def _get_group_icon(self, role_type):
-        """Retorna el icono apropiado para cada grupo de roles."""
-        group_icons = {
-            'Actor': '📁⚖️',
-            'Demandado': '📁🛡️',
-            'Tercero': '📁👥',
-            'Abogado': '📁👨‍💼',
-            'Apoderado': '📁📋',
-            'Perito': '📁🔬',
-            'Testigo': '📁👁️',
-            'Juez': '📁⚖️',
-            'Secretario': '📁📝',
-            'Oficial': '📁👮',
-        }
-        return group_icons.get(role_type, '📁👤')
-
     def _open_add_rol_dialog(self):
         if self.app_controller.selected_case:
             self.app_controller.open_rol_dialog(caso_id=self.app_controller.selected_case['id'])
@@ -227,50 +200,84 @@ class PartesTab(ttk.Frame):
                  self._open_edit_rol_dialog()
 
     def load_partes(self, caso_id):
-        """Carga las partes del caso en una vista jerárquica mejorada con manejo de errores robusto."""
-        import logging
-        
-        # Configurar logger específico para partes
+        """Carga las partes del caso en segundo plano y las muestra en la vista jerárquica."""
         partes_logger = logging.getLogger('crm.partes')
-        
-        # Limpiar vista anterior
-        for i in self.partes_tree.get_children():
-            self.partes_tree.delete(i)
-
-        self.selected_rol_id = None
-        self.limpiar_detalle_completo_rol()
-        self.roles_data_cache.clear()
 
         if not caso_id:
             partes_logger.warning("load_partes llamado sin caso_id")
+            self._limpiar_vista_partes()
+            self._update_action_buttons_state()
+            return
+
+        # Validar que el caso existe
+        if not self.app_controller.selected_case:
+            error_msg = "No hay un caso seleccionado"
+            partes_logger.warning(error_msg)
+            self._limpiar_vista_partes()
+            self._show_error_in_tree(error_msg)
             self._update_action_buttons_state()
             return
 
         partes_logger.info(f"Cargando partes para caso ID: {caso_id}")
+        ejecutor_datos.enviar(
+            self._obtener_datos_partes, caso_id,
+            clave=('partes', id(self)),
+            al_completar=lambda datos: self._mostrar_partes(caso_id, datos),
+            al_fallar=lambda error: self._on_error_datos_partes(caso_id, error),
+            indicador=indicador_cursor(self.partes_tree),
+        )
 
+    def _obtener_datos_partes(self, caso_id):
+        """Corre en el pool del ejecutor: sólo consultas, nada de Tk."""
+        from crm_database import detect_multiple_representations_in_case, validate_multiple_representation_consistency
+
+        roles = self.db_crm.get_roles_by_caso_id(caso_id)
         try:
-            # Validar que el caso existe
-            if not self.app_controller.selected_case:
-                error_msg = "No hay un caso seleccionado"
-                partes_logger.warning(error_msg)
-                self._show_error_in_tree(error_msg)
-                self._update_action_buttons_state()
-                return
+            multiple_representations = detect_multiple_representations_in_case(caso_id)
+        except Exception as e:
+            print(f"Error al detectar representaciones múltiples: {e}")
+            multiple_representations = {}
+        try:
+            validation_results = validate_multiple_representation_consistency(caso_id)
+        except Exception as e:
+            validation_results = {'error': str(e)}
+        return {
+            'roles': roles,
+            'multiple_representations': multiple_representations,
+            'validation_results': validation_results,
+        }
 
-            # Obtener roles del caso con manejo de errores específicos
-            try:
-                roles = self.db_crm.get_roles_by_caso_id(caso_id)
-                partes_logger.debug(f"Obtenidos {len(roles) if roles else 0} roles de la BD")
-            except Exception as db_error:
-                error_msg = f"Error de base de datos: {str(db_error)}"
-                partes_logger.error(error_msg)
-                self._show_error_in_tree("Error al conectar con la base de datos")
-                self._update_action_buttons_state()
-                return
+    def _on_error_datos_partes(self, caso_id, error):
+        partes_logger = logging.getLogger('crm.partes')
+        partes_logger.error(f"Error de base de datos: {str(error)}")
+        self._limpiar_vista_partes()
+        self._show_error_in_tree("Error al conectar con la base de datos")
+        self._update_action_buttons_state()
+
+    def _limpiar_vista_partes(self):
+        for i in self.partes_tree.get_children():
+            self.partes_tree.delete(i)
+
+        self.selected_rol_id = None
+        self.limpiar_detalle_completo_rol()
+        self.roles_data_cache.clear()
+
+    def _mostrar_partes(self, caso_id, datos):
+        """Vuelca en la vista jerárquica los datos traídos por _obtener_datos_partes."""
+        # Configurar logger específico para partes
+        partes_logger = logging.getLogger('crm.partes')
+
+        # El árbol no se vacía: _build_hierarchical_tree aplica sólo las diferencias
+        cache_anterior = self.roles_data_cache
+
+        try:
+            roles = datos['roles']
+            partes_logger.debug(f"Obtenidos {len(roles) if roles else 0} roles de la BD")
             
             if roles is None:
                 error_msg = "La consulta de roles retornó None"
                 partes_logger.error(error_msg)
+                self._limpiar_vista_partes()
                 self._show_error_in_tree("Error al obtener datos de la base de datos")
                 self._update_action_buttons_state()
                 return
@@ -278,6 +285,7 @@ class PartesTab(ttk.Frame):
             if not roles:
                 info_msg = f"No hay partes asignadas al caso {caso_id}"
                 partes_logger.info(info_msg)
+                self._limpiar_vista_partes()
                 self._show_info_in_tree("No hay partes asignadas a este caso")
                 self._update_action_buttons_state()
                 return
@@ -305,6 +313,7 @@ class PartesTab(ttk.Frame):
             if not roles_validos:
                 error_msg = f"Todos los roles ({len(roles)}) tienen datos corruptos"
                 partes_logger.error(error_msg)
+                self._limpiar_vista_partes()
                 self._show_error_in_tree("Los datos de las partes están corruptos")
                 self._update_action_buttons_state()
                 return
@@ -315,24 +324,35 @@ class PartesTab(ttk.Frame):
             
             # Construir vista jerárquica mejorada
             try:
-                self._build_hierarchical_tree(roles_validos)
+                self._build_hierarchical_tree(roles_validos, datos['multiple_representations'])
                 partes_logger.debug("Vista jerárquica construida exitosamente")
             except Exception as tree_error:
                 partes_logger.error(f"Error construyendo vista jerárquica: {str(tree_error)}")
+                self._limpiar_vista_partes()
                 self._show_error_in_tree("Error al mostrar las partes")
                 self._update_action_buttons_state()
                 return
+
+            # La selección sobrevive a la actualización si el rol sigue en el caso
+            if self.selected_rol_id is not None:
+                if self.selected_rol_id not in self.roles_data_cache:
+                    self.selected_rol_id = None
+                    self.limpiar_detalle_completo_rol()
+                elif cache_anterior.get(self.selected_rol_id) != self.roles_data_cache[self.selected_rol_id]:
+                    self.mostrar_detalle_completo_rol(self.selected_rol_id)
                 
             self._update_action_buttons_state()
             
-            # Validar consistencia de representaciones múltiples
-            self._validate_representation_consistency(caso_id)
+            # Validar consistencia de representaciones múltiples (no hace falta en cambios locales)
+            if datos['validation_results'] is not None:
+                self._validate_representation_consistency(caso_id, datos['validation_results'])
             
             partes_logger.info(f"Carga de partes completada exitosamente para caso {caso_id}")
             
         except Exception as e:
             error_msg = f"Error inesperado al cargar partes del caso {caso_id}: {str(e)}"
             partes_logger.error(error_msg, exc_info=True)
+            self._limpiar_vista_partes()
             self._show_error_in_tree("Error inesperado al cargar las partes del caso")
             self._update_action_buttons_state()
             
@@ -351,152 +371,21 @@ class PartesTab(ttk.Frame):
         self.partes_tree.insert('', tk.END, values=('', f'ℹ️ {mensaje}', '', ''), tags=('info',))
         self.partes_tree.tag_configure('info', foreground='blue', font=('TkDefaultFont', 9, 'italic'))
 
-    def _build_hierarchical_tree(self, roles):
-        """Construye la vista jerárquica de roles con agrupación mejorada para abogados múltiples."""
-        tree_items = {}  # {rol_id: iid}
-        
-        # 1. Agrupar roles por contacto para detectar abogados con múltiples roles
-        roles_by_contact = {}
-        for rol in roles:
-            contacto_id = rol.get('contacto_id')
-            if contacto_id not in roles_by_contact:
-                roles_by_contact[contacto_id] = []
-            roles_by_contact[contacto_id].append(rol)
-        
-        # 2. Detectar representaciones múltiples usando las nuevas funciones
-        try:
-            from crm_database import detect_multiple_representations_in_case
-            multiple_representations = detect_multiple_representations_in_case(self.app_controller.selected_case['id'])
-        except Exception as e:
-            print(f"Error al detectar representaciones múltiples: {e}")
-            multiple_representations = {}
-        
-        # 3. Crear grupos de roles principales con lógica mejorada para representaciones múltiples
-        roles_by_type = {}
-        abogados_multiples = {}  # {contacto_id: info}
-        processed_lawyers = set()  # Para evitar duplicados
-        shadow_roles = set()  # Para identificar roles shadow que no deben mostrarse
-        
-        # Primero, identificar todos los roles shadow para excluirlos
-        for rol in roles:
-            notas = rol.get('notas_del_rol', '') or ''
-            if 'REPRESENTACION_MULTIPLE:SECONDARY:' in notas:
-                shadow_roles.add(rol.get('rol_id'))
-        
-        for rol in roles:
-            rol_principal = rol.get('rol_principal', 'Sin Rol')
-            contacto_id = rol.get('contacto_id')
-            rol_id = rol.get('rol_id')
-            notas = rol.get('notas_del_rol', '') or ''
-            
-            # Saltar roles shadow
-            if rol_id in shadow_roles:
-                continue
-            
-            # Verificar si este abogado tiene representaciones múltiples
-            if (rol_principal in ['Abogado', 'Apoderado'] and 
-                contacto_id and 
-                contacto_id in multiple_representations and
-                contacto_id not in processed_lawyers):
-                
-                # Verificar si este es el rol principal (no shadow)
-                if 'REPRESENTACION_MULTIPLE:PRIMARY:' in notas:
-                    # Este abogado tiene representaciones múltiples
-                    rep_info = multiple_representations[contacto_id]
-                    abogados_multiples[contacto_id] = {
-                        'lawyer_name': rep_info['lawyer_name'],
-                        'representations': rep_info['representations'],
-                        'main_role': rol,  # Guardar el rol principal para referencia
-                        'primary_role_id': rep_info.get('primary_role_id', rol_id)
-                    }
-                    processed_lawyers.add(contacto_id)
-                    continue  # No lo agregamos al grupo normal
-            
-            # Agregar al grupo normal (solo si no es shadow y no es representación múltiple ya procesada)
-            if contacto_id not in processed_lawyers:
-                if rol_principal not in roles_by_type:
-                    roles_by_type[rol_principal] = []
-                roles_by_type[rol_principal].append(rol)
-        
-        role_order = ['Actor', 'Demandado', 'Tercero', 'Abogado', 'Apoderado', 'Perito', 'Testigo']
-        sorted_roles = sorted(roles_by_type.keys(), key=lambda r: role_order.index(r) if r in role_order else len(role_order))
+    def _build_hierarchical_tree(self, roles, multiple_representations=None):
+        """Actualiza la vista jerárquica de roles tocando sólo los nodos que cambiaron."""
+        # load_partes ya trae las representaciones múltiples en segundo plano
+        if multiple_representations is None:
+            try:
+                from crm_database import detect_multiple_representations_in_case
+                multiple_representations = detect_multiple_representations_in_case(self.app_controller.selected_case['id'])
+            except Exception as e:
+                print(f"Error al detectar representaciones múltiples: {e}")
+                multiple_representations = {}
+        self._multiple_representations = multiple_representations
 
-        # 3. Crear grupos normales con iconos
-        for rol_principal in sorted_roles:
-            roles_list = roles_by_type[rol_principal]
-            group_iid = f"group_{rol_principal}"
-            
-            # Obtener icono para el grupo
-            group_icon = self._get_group_icon(rol_principal)
-            group_text = f"{group_icon} {rol_principal}s ({len(roles_list)})"
-            
-            parent_node = self.partes_tree.insert('', tk.END, iid=group_iid, 
-                                                values=('', group_text, '', ''), 
-                                                open=True, tags=('group',))
+        cambios = aplicar_diferencias(self.partes_tree, construir_nodos(roles, multiple_representations))
+        logging.getLogger('crm.partes').debug(f"Árbol de partes actualizado: {cambios}")
 
-            for rol in roles_list:
-                rol_id = rol['rol_id']
-                self._insert_role_item(rol, parent_node, tree_items)
-        
-        # 4. Crear grupos especiales para abogados con representaciones múltiples
-        if abogados_multiples:
-            # Crear o encontrar el grupo de Abogados
-            abogados_group_iid = "group_Abogado"
-            existing_children = [item for item in self.partes_tree.get_children()]
-            
-            if abogados_group_iid not in existing_children:
-                # Crear el grupo de abogados con icono
-                group_icon = self._get_group_icon('Abogado')
-                abogados_parent = self.partes_tree.insert('', tk.END, iid=abogados_group_iid, 
-                                                        values=('', f'{group_icon} Abogados (0)', '', ''), 
-                                                        open=True, tags=('group',))
-            else:
-                abogados_parent = abogados_group_iid
-            
-            for contacto_id, rep_info in abogados_multiples.items():
-                # Crear un nodo padre para este abogado con representaciones múltiples
-                lawyer_name = rep_info['lawyer_name']
-                main_role = rep_info['main_role']
-                representations = rep_info['representations']
-                
-                # Determinar icono principal basado en el tipo de persona y rol
-                main_icon = "👤"  # Persona física por defecto
-                if main_role.get('es_persona_juridica'):
-                    main_icon = "🏢"  # Empresa/persona jurídica
-                
-                # Icono especial para representaciones múltiples
-                multi_icon = "🔗"
-                
-                # Crear descripción de representaciones múltiples con iconos mejorados
-                rep_count = len(representations)
-                multi_role_text = f"{multi_icon} {main_icon} {lawyer_name} - Representaciones Múltiples ({rep_count})"
-                
-                # Insertar el nodo agrupado con iconos especiales
-                multi_iid = f"multi_rep_{contacto_id}"
-                multi_node = self.partes_tree.insert(abogados_parent, tk.END, iid=multi_iid,
-                                                   values=('', multi_role_text, 'Múltiples Representaciones', ''),
-                                                   open=True, tags=('multi_representation',))
-                
-                # Insertar cada representación como hijo con iconos específicos
-                for i, rep in enumerate(representations):
-                    # Determinar icono según el rol de la parte representada
-                    role_icon = self._get_role_icon(rep['represented_role'])
-                    rep_text = f"  ↳ {role_icon} Representa a: {rep['represented_name']} ({rep['represented_role']})"
-                    rep_iid = f"rep_{contacto_id}_{i}"
-                    
-                    self.partes_tree.insert(multi_node, tk.END, iid=rep_iid,
-                                          values=('', rep_text, '', ''),
-                                          tags=('representation_item',))
-                
-                # Agregar el rol principal al tree_items para permitir selección
-                primary_role_id = rep_info.get('primary_role_id', main_role['rol_id'])
-                tree_items[primary_role_id] = multi_node
-            
-            # Actualizar el contador del grupo de abogados con icono
-            abogados_count = len(roles_by_type.get('Abogado', [])) + len(abogados_multiples)
-            group_icon = self._get_group_icon('Abogado')
-            self.partes_tree.item(abogados_group_iid, values=('', f'{group_icon} Abogados ({abogados_count})', '', ''))
-        
         # Configurar estilos mejorados para representaciones múltiples
         self.partes_tree.tag_configure('multi_representation', 
                                      background='#E8F4FD', 
@@ -507,75 +396,60 @@ class PartesTab(ttk.Frame):
                                      background='#F0F8FF', 
                                      foreground='#4682B4',
                                      font=('TkDefaultFont', 8))
-        
-        # Estilo para elementos de representación seleccionables
-        self.partes_tree.tag_configure('representation_selectable', 
-                                     background='#F5F5FF', 
-                                     foreground='#2E4B8B',
-                                     font=('TkDefaultFont', 8))
-        
-        # Mantener estilo para roles múltiples (compatibilidad)
-        self.partes_tree.tag_configure('multi_role', 
-                                     background='#E8F8E8', 
-                                     foreground='#2E7D2E',
-                                     font=('TkDefaultFont', 9, 'bold'))
 
-        # 5. Establecer la jerarquía de representación.
-        for rol in roles:
-            representante_id = rol.get('rol_id')
-            representado_id = rol.get('representa_a_id')
-
-            if representado_id and representante_id in tree_items and representado_id in tree_items:
-                parent_iid = tree_items[representado_id]
-                child_iid = tree_items[representante_id]
-                
-                self.partes_tree.move(child_iid, parent_iid, tk.END)
-                
-                self.partes_tree.item(child_iid, tags=('representative',))
-                values = list(self.partes_tree.item(child_iid, 'values'))
-                nombre_original = rol.get('nombre_completo', 'N/A')
-                if rol.get('es_persona_juridica'):
-                    nombre_original += " 📄"
-                
-                if not values[1].startswith('↳'):
-                    values[1] = f"↳ {nombre_original}"
-                    self.partes_tree.item(child_iid, values=values)
-
-    def _insert_role_item(self, rol, parent, tree_items):
-        """Inserta un elemento de rol en el árbol con iconos mejorados."""
-        item_iid = f"rol_{rol['rol_id']}"
-        
-        # Preparar valores para mostrar
-        nombre_display = rol.get('nombre_completo', 'N/A')
-        rol_principal = rol.get('rol_principal', 'N/A')
-        rol_secundario = rol.get('rol_secundario', '') or ''
-        
-        # Obtener icono para el rol
-        role_icon = self._get_role_icon(rol_principal)
-        
-        # Determinar icono de persona
-        person_icon = "🏢" if rol.get('es_persona_juridica') else "👤"
-        
-        # Combinar iconos con el nombre
-        nombre_display = f"{role_icon} {person_icon} {nombre_display}"
-        
-        values = (
-            rol['rol_id'],
-            nombre_display,
-            rol_principal,
-            rol_secundario
+    def aplicar_cambio_rol(self, caso_id, rol_id, eliminado=False):
+        """
+        Refleja el alta, edición o baja de un único rol sin volver a consultar todo el caso.
+        Si el cambio toca una representación múltiple se recarga la pestaña completa:
+        esa agrupación depende de las notas de todos los roles del abogado.
+        """
+        if self._afecta_representacion_multiple(rol_id, self.roles_data_cache.get(rol_id)):
+            self.load_partes(caso_id)
+            return
+        if eliminado:
+            self._aplicar_rol_local(caso_id, rol_id, None)
+            return
+        ejecutor_datos.enviar(
+            self.db_crm.get_rol_en_caso, rol_id,
+            clave=('partes', id(self)),
+            al_completar=lambda rol: self._aplicar_rol_local(caso_id, rol_id, rol) if rol else self.load_partes(caso_id),
+            al_fallar=lambda error: self.load_partes(caso_id),
+            indicador=indicador_cursor(self.partes_tree),
         )
-        
-        tree_item = self.partes_tree.insert(
-            parent, tk.END, 
-            iid=item_iid,
-            values=values, 
-            open=True,
-            tags=('role',)
+
+    def _afecta_representacion_multiple(self, rol_id, rol):
+        if rol and 'REPRESENTACION_MULTIPLE' in (rol.get('notas_del_rol') or ''):
+            return True
+        return any(
+            rol_id in (info.get('primary_role_id'), rep.get('rol_id'), rep.get('represents_id'))
+            for info in self._multiple_representations.values()
+            for rep in info.get('representations', [])
         )
-        
-        tree_items[rol['rol_id']] = tree_item
-        return tree_item
+
+    def _aplicar_rol_local(self, caso_id, rol_id, rol):
+        """Aplica sobre la caché de roles el rol consultado (o su baja si `rol` es None) y redibuja por diferencias."""
+        if rol is not None and (rol.get('caso_id') != caso_id or self._afecta_representacion_multiple(rol_id, rol)):
+            self.load_partes(caso_id)
+            return
+        roles = dict(self.roles_data_cache)
+        if rol is None:
+            roles.pop(rol_id, None)
+            # roles_en_caso.representa_a_id es ON DELETE SET NULL
+            for otro_id, otro in roles.items():
+                if otro.get('representa_a_id') == rol_id:
+                    roles[otro_id] = dict(otro, representa_a_id=None)
+        else:
+            roles[rol_id] = rol
+            # El diálogo también guarda el contacto, que puede figurar en otros roles del caso
+            datos_contacto = {campo: rol.get(campo) for campo in COLUMNAS_CONTACTO}
+            for otro_id, otro in roles.items():
+                if otro_id != rol_id and otro.get('contacto_id') == rol.get('contacto_id'):
+                    roles[otro_id] = dict(otro, **datos_contacto)
+        self._mostrar_partes(caso_id, {
+            'roles': ordenar_roles(roles.values()),
+            'multiple_representations': self._multiple_representations,
+            'validation_results': None,
+        })
 
     def on_rol_select_treeview(self, event=None):
         """Maneja la selección de elementos en la vista jerárquica con soporte para representaciones múltiples."""
@@ -774,12 +648,13 @@ class PartesTab(ttk.Frame):
             if self.selected_rol_id:
                 self.mostrar_detalle_completo_rol(self.selected_rol_id)
 
-    def _validate_representation_consistency(self, caso_id):
+    def _validate_representation_consistency(self, caso_id, validation_results=None):
         """Valida la consistencia de las representaciones múltiples y muestra advertencias si es necesario."""
         try:
             from crm_database import validate_multiple_representation_consistency, clean_orphaned_representations
             
-            validation_results = validate_multiple_representation_consistency(caso_id)
+            if validation_results is None:
+                validation_results = validate_multiple_representation_consistency(caso_id)
             
             if 'error' in validation_results:
                 print(f"Error en validación de representaciones: {validation_results['error']}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Perfil de Arranque - Mide cuánto cuesta en frío cada módulo y cuánto tarda en
+aparecer la primera ventana.
+
+Dos modos:
+
+  python perfil_arranque.py                 # importa main_app con -X importtime y
+                                            # lista los paquetes más caros
+  python perfil_arranque.py --benchmark     # abre la aplicación, espera la primera
+                                            # ventana y falla (código 1) si supera
+                                            # el presupuesto
+
+En modo benchmark main_app se lanza con LPMS_MEDIR_ARRANQUE=1: al mostrarse la
+primera ventana publica por stdout una línea con el tiempo y las cargas hechas
+por LazyLoader hasta ese momento, y se cierra sola.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+# Segundos hasta la primera ventana (medidos desde que se lanza el intérprete)
+PRESUPUESTO_PRIMERA_VENTANA_S = 4.0
+
+VARIABLE_MEDICION = "LPMS_MEDIR_ARRANQUE"
+PREFIJO_INFORME = "[Arranque] "
+
+_DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+_LINEA_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+class ImportacionMedida(NamedTuple):
+    modulo: str
+    propio_ms: float
+    acumulado_ms: float
+    nivel: int
+
+
+def parsear_importtime(salida: str) -> List[ImportacionMedida]:
+    """Interpreta la salida de `python -X importtime` (stderr), en el orden en que se imprimió."""
+    medidas = []
+    for linea in salida.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if not coincidencia:
+            continue
+        propio_us, acumulado_us, sangria, modulo = coincidencia.groups()
+        # CPython sangra dos espacios por nivel, a partir de uno para las importaciones de primer nivel
+        medidas.append(ImportacionMedida(modulo, int(propio_us) / 1000, int(acumulado_us) / 1000, (len(sangria) - 1) // 2))
+    return medidas
+
+
+def costo_por_paquete(medidas: List[ImportacionMedida]) -> Dict[str, float]:
+    """Milisegundos propios sumados por paquete de primer nivel (docx.*, num2words.*, ...), de mayor a menor."""
+    costos = defaultdict(float)
+    for medida in medidas:
+        costos[medida.modulo.split('.')[0]] += medida.propio_ms
+    return dict(sorted(costos.items(), key=lambda item: item[1], reverse=True))
+
+
+def perfilar_importaciones(modulo: str = "main_app", python: str = sys.executable) -> List[ImportacionMedida]:
+    """Importa `modulo` en un intérprete nuevo con -X importtime y devuelve las medidas."""
+    proceso = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=_DIRECTORIO, capture_output=True, text=True,
+    )
+    medidas = parsear_importtime(proceso.stderr)
+    if proceso.returncode != 0:
+        errores = [linea for linea in proceso.stderr.splitlines() if not linea.startswith("import time:")]
+        raise RuntimeError(f"No se pudo importar {modulo}:\n" + "\n".join(errores[-5:]))
+    return medidas
+
+
+# --- Benchmark de la primera ventana ---
+
+def informar_arranque(segundos: float):
+    """Lo llama main_app al mostrar la primera ventana cuando corre en modo medición."""
+    from lazy_loader import get_startup_stats
+    informe = {
+        'primera_ventana_s': round(segundos, 3),
+        'lazy': {nombre: round(t, 3) for nombre, t in get_startup_stats()['load_times'].items()},
+    }
+    print(PREFIJO_INFORME + json.dumps(informe), flush=True)
+
+
+def leer_informe(salida: str) -> Optional[dict]:
+    """Extrae el informe publicado por informar_arranque() de la salida de la aplicación."""
+    for linea in salida.splitlines():
+        if linea.startswith(PREFIJO_INFORME):
+            return json.loads(linea[len(PREFIJO_INFORME):])
+    return None
+
+
+def medir_arranque(python: str = sys.executable, timeout: float = 120) -> dict:
+    """
+    Lanza main_app en modo medición y devuelve el informe con, además,
+    'total_s': el tiempo de reloj desde el lanzamiento (incluye el intérprete).
+    """
+    entorno = dict(os.environ, **{VARIABLE_MEDICION: "1"})
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [python, "main_app.py"], cwd=_DIRECTORIO, env=entorno,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    salida = []
+    informe = None
+    for linea in proceso.stdout:
+        salida.append(linea)
+        if linea.startswith(PREFIJO_INFORME):
+            informe = leer_informe(linea)
+            informe['total_s'] = round(time.perf_counter() - inicio, 3)
+            break
+        if time.perf_counter() - inicio > timeout:
+            break
+    try:
+        proceso.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+    if informe is None:
+        raise RuntimeError("La aplicación no llegó a mostrar la primera ventana:\n" + "".join(salida[-10:]))
+    return informe
+
+
+def _imprimir_perfil(modulo: str, top: int):
+    medidas = perfilar_importaciones(modulo)
+    total_ms = max((m.acumulado_ms for m in medidas if m.modulo == modulo), default=0)
+    print(f"Importar {modulo}: {total_ms:.0f} ms en frío ({len(medidas)} módulos)\n")
+    print(f"{'Paquete':<40}{'ms propios':>12}")
+    for paquete, ms in list(costo_por_paquete(medidas).items())[:top]:
+        print(f"{paquete:<40}{ms:>12.1f}")
+
+
+def _ejecutar_benchmark(presupuesto: float) -> int:
+    informe = medir_arranque()
+    print(f"Primera ventana: {informe['total_s']:.2f}s desde el lanzamiento "
+          f"({informe['primera_ventana_s']:.2f}s dentro de main_app); presupuesto {presupuesto:.2f}s")
+    for nombre, segundos in sorted(informe['lazy'].items(), key=lambda item: item[1], reverse=True):
+        print(f"  LazyLoader cargó {nombre} durante el arranque: {segundos:.2f}s")
+    if informe['total_s'] > presupuesto:
+        print("FALLA: el arranque supera el presupuesto")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil del arranque de LPMS")
+    parser.add_argument("--modulo", default="main_app", help="Módulo a importar en el perfil de importaciones")
+    parser.add_argument("--top", type=int, default=25, help="Cantidad de paquetes a listar")
+    parser.add_argument("--benchmark", action="store_true", help="Medir el tiempo hasta la primera ventana")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_PRIMERA_VENTANA_S,
+                        help="Segundos permitidos hasta la primera ventana")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        sys.exit(_ejecutar_benchmark(args.presupuesto))
+    _imprimir_perfil(args.modulo, args.top)
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Planificador de Recordatorios - Servicio dirigido por eventos para avisos de
+audiencias, tareas e inactividad de casos.
+
+Reemplaza a los hilos que consultaban la base cada minuto/hora: los instantes
+de aviso se cargan una vez en un heap y se actualizan de forma incremental
+cuando crm_database notifica altas, ediciones o bajas. El hilo duerme hasta el
+próximo aviso, por lo que sin recordatorios próximos no hay consultas ni
+despertares innecesarios.
+"""
+
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import crm_database as db
+import date_utils
+
+logger = logging.getLogger('planificador_recordatorios')
+
+TIPO_AUDIENCIA = 'audiencia'
+TIPO_TAREA = 'tarea'
+TIPO_INACTIVIDAD = 'inactividad'
+
+
+# ========================================
+# CÁLCULO DE INSTANTES DE AVISO
+# ========================================
+
+def _a_fecha(valor) -> Optional[datetime.date]:
+    if valor is None:
+        return None
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    texto = str(valor).strip()
+    if 'T' in texto or ' ' in texto:
+        texto = texto.replace('T', ' ').split(' ')[0]
+    fecha_iso = date_utils.DateFormatter.to_database_format(texto)
+    if not fecha_iso:
+        return None
+    return datetime.datetime.strptime(fecha_iso, date_utils.DateFormatter.ISO_FORMAT).date()
+
+
+def _a_hora(valor) -> Optional[datetime.time]:
+    if valor is None:
+        return None
+    if isinstance(valor, datetime.time):
+        return valor.replace(second=0, microsecond=0)
+    partes = str(valor).strip().split(':')
+    if len(partes) < 2:
+        return None
+    return datetime.time(int(partes[0]), int(partes[1]))
+
+
+def calcular_instante_audiencia(audiencia: Dict[str, Any], ahora: datetime.datetime) -> Optional[datetime.datetime]:
+    """
+    Devuelve el instante en que debe mostrarse el recordatorio de una audiencia,
+    o None si no corresponde avisar (sin fecha/hora o la audiencia ya comenzó).
+    """
+    if not audiencia.get('recordatorio_activo'):
+        return None
+    try:
+        fecha = _a_fecha(audiencia.get('fecha'))
+        hora = _a_hora(audiencia.get('hora'))
+    except (ValueError, TypeError):
+        return None
+    if not fecha or not hora:
+        return None
+
+    inicio = datetime.datetime.combine(fecha, hora)
+    if ahora >= inicio:
+        return None
+    minutos_antes = audiencia.get('recordatorio_minutos') or 15
+    return inicio - datetime.timedelta(minutes=minutos_antes)
+
+
+def calcular_instante_tarea(tarea: Dict[str, Any], ahora: datetime.datetime) -> Optional[datetime.datetime]:
+    """
+    Devuelve el próximo instante de aviso de una tarea. Las tareas se recuerdan
+    una vez por día desde `recordatorio_dias_antes` días antes del vencimiento
+    hasta el día del vencimiento inclusive.
+    """
+    if not tarea.get('recordatorio_activo') or tarea.get('estado') in ('Completada', 'Cancelada'):
+        return None
+    try:
+        vencimiento = _a_fecha(tarea.get('fecha_vencimiento'))
+    except (ValueError, TypeError):
+        return None
+    hoy = ahora.date()
+    if not vencimiento or vencimiento < hoy:
+        return None
+
+    dias_antes = tarea.get('recordatorio_dias_antes') or 1
+    dia_aviso = max(vencimiento - datetime.timedelta(days=dias_antes), hoy)
+
+    ultima = tarea.get('fecha_ultima_notificacion')
+    if ultima:
+        ultima_fecha = _a_fecha(ultima)
+        if ultima_fecha and ultima_fecha >= dia_aviso:
+            dia_aviso = ultima_fecha + datetime.timedelta(days=1)
+
+    if dia_aviso > vencimiento:
+        return None
+    return datetime.datetime.combine(dia_aviso, datetime.time.min)
+
+
+def calcular_instante_inactividad(caso: Dict[str, Any], ahora: datetime.datetime) -> Optional[datetime.datetime]:
+    """
+    Devuelve el instante en que un caso supera su umbral de inactividad. Si ya
+    se notificó ese día, el próximo aviso se programa para el día siguiente.
+    """
+    ultima_actividad = caso.get('last_activity_timestamp')
+    if not ultima_actividad:
+        return None
+    umbral_dias = caso.get('inactivity_threshold_days') or 30
+    instante = datetime.datetime.fromtimestamp(ultima_actividad) + datetime.timedelta(days=umbral_dias)
+
+    ultima_notificacion = caso.get('last_inactivity_notification_timestamp')
+    if ultima_notificacion:
+        dia_siguiente = datetime.datetime.fromtimestamp(ultima_notificacion).date() + datetime.timedelta(days=1)
+        instante = max(instante, datetime.datetime.combine(dia_siguiente, datetime.time.min))
+    return instante
+
+
+# ========================================
+# PLANIFICADOR
+# ========================================
+
+class PlanificadorRecordatorios:
+    """
+    Mantiene un heap de (instante, versión, tipo, id) con los próximos avisos.
+
+    Las reprogramaciones no buscan la entrada vieja en el heap: se incrementa la
+    versión en `_programados` y las entradas obsoletas se descartan al salir.
+    Los callbacks se invocan desde el hilo del planificador; quien los registre
+    debe derivar el trabajo de interfaz al hilo de Tk (p. ej. con `root.after`).
+    """
+
+    # Tope de espera: protege de suspensiones del equipo y cambios de reloj.
+    # Un despertar sin avisos vencidos no consulta la base.
+    MAX_ESPERA_SEGUNDOS = 1800
+
+    def __init__(self,
+                 al_vencer_audiencia: Callable[[Dict[str, Any]], None],
+                 al_vencer_tarea: Callable[[Dict[str, Any]], None],
+                 al_vencer_inactividad: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 db_module=db,
+                 reloj: Callable[[], datetime.datetime] = datetime.datetime.now):
+        self.db = db_module
+        self._callbacks = {
+            TIPO_AUDIENCIA: al_vencer_audiencia,
+            TIPO_TAREA: al_vencer_tarea,
+            TIPO_INACTIVIDAD: al_vencer_inactividad,
+        }
+        self._reloj = reloj
+        self._heap = []
+        self._programados: Dict[Tuple[str, int], Tuple[int, Dict[str, Any]]] = {}
+        self._versiones = itertools.count()
+        self._cond = threading.Condition()
+        self._cambios_pendientes = []
+        self._detenido = False
+        self._hilo: Optional[threading.Thread] = None
+        self._dia_carga: Optional[datetime.date] = None
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        """Registra el listener de cambios y arranca el hilo del planificador."""
+        self.db.registrar_listener_cambios(self._on_cambio_datos)
+        self._hilo = threading.Thread(target=self._ejecutar, name="PlanificadorRecordatorios", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0):
+        """Detiene el hilo y deja de escuchar cambios."""
+        self.db.quitar_listener_cambios(self._on_cambio_datos)
+        with self._cond:
+            self._detenido = True
+            self._cond.notify_all()
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    # --- Programación ---
+
+    def programar(self, tipo: str, registro_id: int, instante: Optional[datetime.datetime], datos: Dict[str, Any]):
+        """Programa (o reprograma) el aviso de un registro. instante=None lo cancela."""
+        with self._cond:
+            if instante is None:
+                self._programados.pop((tipo, registro_id), None)
+                return
+            version = next(self._versiones)
+            self._programados[(tipo, registro_id)] = (version, datos)
+            heapq.heappush(self._heap, (instante, version, tipo, registro_id))
+            self._cond.notify_all()
+
+    def cancelar(self, tipo: str, registro_id: int):
+        """Cancela el aviso pendiente de un registro, si existe."""
+        self.programar(tipo, registro_id, None, {})
+
+    def proximo_instante(self) -> Optional[datetime.datetime]:
+        """Instante del próximo aviso vigente (None si no hay ninguno)."""
+        with self._cond:
+            self._descartar_obsoletos()
+            return self._heap[0][0] if self._heap else None
+
+    def cantidad_programados(self) -> int:
+        with self._cond:
+            return len(self._programados)
+
+    def _descartar_obsoletos(self):
+        while self._heap:
+            _, version, tipo, registro_id = self._heap[0]
+            actual = self._programados.get((tipo, registro_id))
+            if actual and actual[0] == version:
+                return
+            heapq.heappop(self._heap)
+
+    # --- Carga y cambios incrementales ---
+
+    def cargar_todo(self):
+        """
+        Carga desde la base los avisos del día (al iniciar y al cambiar de día).
+        La base filtra por notify_at: sólo llegan los recordatorios que vencen
+        antes de la próxima recarga, no todos los activos.
+        """
+        ahora = self._reloj()
+        hasta = self._fin_de_ventana(ahora)
+        with self._cond:
+            self._heap = []
+            self._programados = {}
+
+        audiencias = self.db.get_audiencias_con_recordatorio_activo(ahora=ahora, hasta=hasta) or []
+        for audiencia in audiencias:
+            self.programar(TIPO_AUDIENCIA, audiencia['id'], calcular_instante_audiencia(audiencia, ahora), audiencia)
+
+        tareas = self.db.get_tareas_con_recordatorio_activo(hasta=hasta) or []
+        for tarea in tareas:
+            self.programar(TIPO_TAREA, tarea['id'], calcular_instante_tarea(tarea, ahora), tarea)
+
+        casos = []
+        if self._callbacks[TIPO_INACTIVIDAD]:
+            casos = self.db.get_casos_con_control_inactividad() or []
+            for caso in casos:
+                self.programar(TIPO_INACTIVIDAD, caso['id'], calcular_instante_inactividad(caso, ahora), caso)
+
+        self._dia_carga = ahora.date()
+        logger.info(
+            f"Recordatorios cargados: {len(audiencias)} audiencias, {len(tareas)} tareas, "
+            f"{len(casos)} casos con control de inactividad"
+        )
+
+    @staticmethod
+    def _fin_de_ventana(ahora) -> datetime.datetime:
+        # cargar_todo se repite al cambiar de día: lo que vence después lo trae esa recarga
+        return datetime.datetime.combine(ahora.date() + datetime.timedelta(days=1), datetime.time.min)
+
+    def _on_cambio_datos(self, tabla, operacion, registro_id, caso_id, remoto=False):
+        # Se ejecuta en el hilo que escribió en la base (normalmente Tk): sólo encola.
+        if tabla not in ('audiencias', 'tareas'):
+            return
+        with self._cond:
+            self._cambios_pendientes.append((tabla, operacion, registro_id))
+            self._cond.notify_all()
+
+    def _aplicar_cambio(self, tabla, operacion, registro_id):
+        ahora = self._reloj()
+        if tabla == 'audiencias':
+            if operacion == 'DELETE':
+                self.cancelar(TIPO_AUDIENCIA, registro_id)
+                return
+            audiencia = self.db.get_audiencia_by_id(registro_id)
+            instante = calcular_instante_audiencia(audiencia, ahora) if audiencia else None
+            self.programar(TIPO_AUDIENCIA, registro_id, instante, audiencia or {})
+        elif tabla == 'tareas':
+            if operacion == 'DELETE':
+                self.cancelar(TIPO_TAREA, registro_id)
+                return
+            tarea = self.db.get_tarea_by_id(registro_id)
+            instante = calcular_instante_tarea(tarea, ahora) if tarea else None
+            self.programar(TIPO_TAREA, registro_id, instante, tarea or {})
+
+    # --- Disparo de avisos ---
+
+    def _disparar(self, tipo, registro_id, datos):
+        ahora = self._reloj()
+        callback = self._callbacks.get(tipo)
+        if not callback:
+            return
+
+        if tipo == TIPO_AUDIENCIA:
+            # Puede haberse despertado tarde (suspensión): no avisar si ya empezó
+            if calcular_instante_audiencia(datos, ahora) is not None:
+                callback(dict(datos))
+
+        elif tipo == TIPO_TAREA:
+            callback(dict(datos))
+            self.db.update_fecha_ultima_notificacion_tarea(registro_id)
+            datos = dict(datos, fecha_ultima_notificacion=ahora)
+            self.programar(TIPO_TAREA, registro_id, calcular_instante_tarea(datos, ahora), datos)
+
+        elif tipo == TIPO_INACTIVIDAD:
+            # La última actividad cambia desde muchos caminos: confirmar antes de avisar
+            caso = self.db.get_case_by_id(registro_id)
+            if not caso or not caso.get('inactivity_enabled'):
+                return
+            instante = calcular_instante_inactividad(caso, ahora)
+            if instante is not None and instante <= ahora:
+                callback(dict(caso))
+                self.db.update_case_inactivity_notified(registro_id)
+                caso['last_inactivity_notification_timestamp'] = int(ahora.timestamp())
+                instante = calcular_instante_inactividad(caso, ahora)
+            self.programar(TIPO_INACTIVIDAD, registro_id, instante, caso)
+
+    def _extraer_vencidos(self, ahora):
+        vencidos = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= ahora:
+                _, version, tipo, registro_id = heapq.heappop(self._heap)
+                actual = self._programados.get((tipo, registro_id))
+                if actual and actual[0] == version:
+                    del self._programados[(tipo, registro_id)]
+                    vencidos.append((tipo, registro_id, actual[1]))
+        return vencidos
+
+    def _segundos_hasta_proximo(self, ahora) -> float:
+        self._descartar_obsoletos()
+        manana = datetime.datetime.combine(ahora.date() + datetime.timedelta(days=1), datetime.time.min)
+        limite = min(manana, ahora + datetime.timedelta(seconds=self.MAX_ESPERA_SEGUNDOS))
+        if self._heap:
+            limite = min(limite, self._heap[0][0])
+        return max(0.0, (limite - ahora).total_seconds())
+
+    def _ejecutar(self):
+        print("[Recordatorios] Planificador iniciado.")
+        try:
+            self.cargar_todo()
+        except Exception as e:
+            logger.error(f"Error en la carga inicial de recordatorios: {e}")
+
+        while True:
+            with self._cond:
+                if self._detenido:
+                    break
+                cambios, self._cambios_pendientes = self._cambios_pendientes, []
+
+            try:
+                for tabla, operacion, registro_id in cambios:
+                    self._aplicar_cambio(tabla, operacion, registro_id)
+
+                ahora = self._reloj()
+                if self._dia_carga != ahora.date():
+                    self.cargar_todo()
+
+                for tipo, registro_id, datos in self._extraer_vencidos(ahora):
+                    try:
+                        self._disparar(tipo, registro_id, datos)
+                    except Exception as e:
+                        logger.error(f"Error disparando recordatorio {tipo} {registro_id}: {e}")
+            except Exception as e:
+                logger.error(f"Error en el planificador de recordatorios: {e}")
+
+            with self._cond:
+                if self._detenido:
+                    break
+                if self._cambios_pendientes:
+                    continue
+                self._cond.wait(self._segundos_hasta_proximo(self._reloj()))
+
+        print("[Recordatorios] Planificador detenido.")
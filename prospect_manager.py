@@ -9,15 +9,25 @@ import crm_database as db
 import datetime
 import date_utils
 from prospect_service import ProspectService
+from fuente_prospectos import FuentePaginasProspectos
+from ejecutor_datos import ejecutor_datos, indicador_cursor
 
 
 class ProspectManager:
     """Clase que maneja toda la lógica de prospectos"""
 
+    # Prospectos por página: el filtrado y la paginación se hacen en la base de datos
+    TAMANO_PAGINA = 100
+    # Fracción de la lista visible a partir de la cual se pide la página siguiente
+    UMBRAL_SIGUIENTE_PAGINA = 0.9
+
     def __init__(self, app_controller):
         self.app_controller = app_controller
         self.db = db
         self.selected_prospect = None
+
+        # Filas cargadas, filtros vigentes y clave de la próxima página
+        self.fuente = FuentePaginasProspectos(self.TAMANO_PAGINA)
         
         # Crear servicio de prospectos para lógica de negocio
         self.prospect_service = ProspectService()
@@ -64,34 +74,92 @@ class ProspectManager:
     # ========================================
 
     def cargar_prospectos(self):
-        """Carga la lista de prospectos en el TreeView"""
-        # Limpiar lista actual
-        for i in self.app_controller.prospect_tree.get_children():
-            self.app_controller.prospect_tree.delete(i)
+        """Carga la primera página de prospectos con los filtros vigentes (en segundo plano)"""
+        self.fuente.reiniciar()
+        self._pedir_pagina()
+
+    def ir_a_prospecto(self, prospecto_id):
+        """Carga la lista hasta el prospecto indicado (p. ej. al abrirlo desde la búsqueda)"""
+        self.fuente.reiniciar()
+        self._pedir_pagina(hasta_id=prospecto_id)
+
+    def aplicar_filtros(self, **filtros):
+        """Cambia filtros (estados, nombre, fecha_desde, fecha_hasta) y recarga desde la primera página"""
+        self.fuente.reiniciar(dict(self.fuente.filtros, **filtros))
+        self._pedir_pagina()
+
+    def al_desplazar_lista(self, fraccion_visible_final):
+        """Pide la página siguiente cuando el final visible de la lista se acerca al de lo cargado"""
+        if float(fraccion_visible_final) >= self.UMBRAL_SIGUIENTE_PAGINA:
+            self._pedir_pagina()
+
+    def _pedir_pagina(self, hasta_id=None):
+        tarea = self.fuente.tarea_siguiente_pagina(hasta_id=hasta_id)
+        if tarea is None:
+            return
+        # Una recarga nueva deja obsoleta a la anterior
+        ejecutor_datos.enviar(
+            tarea,
+            clave=("prospectos", id(self)),
+            al_completar=self._recibir_pagina,
+            al_fallar=self._pagina_fallida,
+            indicador=indicador_cursor(self.app_controller.prospect_tree),
+        )
 
-        # Usar el servicio para obtener prospectos
-        prospects = self.prospect_service.obtener_todos_los_prospectos()
-        for prospect in prospects:
-            # Formatear fecha para mostrar usando utilidades argentinas
-            fecha_str = self.prospect_service.formatear_fecha_para_mostrar(
-                prospect.get("fecha_primera_consulta")
-            )
+    def _pagina_fallida(self, error):
+        print(f"Error obteniendo prospectos: {error}")
+        self.fuente.lectura_fallida()
 
-            # Insertar en el TreeView (adaptado para la nueva ventana con 4 columnas)
-            if hasattr(self.app_controller, "window"):  # Es la ventana de prospectos
-                values = (
-                    prospect["id"],
-                    prospect["nombre"],
-                    prospect["estado"],
-                    fecha_str,
-                )
-            else:  # Es la ventana principal (compatibilidad)
-                values = (prospect["id"], prospect["nombre"], prospect["estado"])
+    def _recibir_pagina(self, resultado):
+        nuevas = self.fuente.recibir(resultado)
+        if nuevas is None:
+            return
+        if len(nuevas) == len(self.fuente.filas):
+            self._mostrar_prospectos(nuevas)
+        else:
+            self._insertar_prospectos(nuevas)
+            if hasattr(self.app_controller, "aplicar_seleccion_pendiente"):
+                self.app_controller.aplicar_seleccion_pendiente()
+        self._actualizar_contador()
+        if not hasattr(self.app_controller, "window"):
+            # La ventana principal (compatibilidad) no pide páginas al desplazarse: cargar el resto
+            self._pedir_pagina()
+
+    def _valores_fila(self, prospect):
+        # Formatear fecha para mostrar usando utilidades argentinas
+        fecha_str = self.prospect_service.formatear_fecha_para_mostrar(
+            prospect.get("fecha_primera_consulta")
+        )
+
+        # Adaptado para la nueva ventana con 4 columnas
+        if hasattr(self.app_controller, "window"):  # Es la ventana de prospectos
+            return (
+                prospect["id"],
+                prospect["nombre"],
+                prospect["estado"],
+                fecha_str,
+            )
+        # Es la ventana principal (compatibilidad)
+        return (prospect["id"], prospect["nombre"], prospect["estado"])
 
+    def _insertar_prospectos(self, prospects):
+        for prospect in prospects:
             self.app_controller.prospect_tree.insert(
-                "", tk.END, values=values, iid=str(prospect["id"])
+                "", tk.END, values=self._valores_fila(prospect), iid=str(prospect["id"])
             )
 
+    def _actualizar_contador(self):
+        if hasattr(self.app_controller, "actualizar_contador_prospectos"):
+            self.app_controller.actualizar_contador_prospectos(len(self.fuente.filas), self.fuente.total)
+
+    def _mostrar_prospectos(self, prospects):
+        """Vuelca en el TreeView la primera página obtenida por cargar_prospectos"""
+        # Limpiar lista actual
+        for i in self.app_controller.prospect_tree.get_children():
+            self.app_controller.prospect_tree.delete(i)
+
+        self._insertar_prospectos(prospects or [])
+
         # Limpiar selección y detalles
         self.selected_prospect = None
         if hasattr(self.app_controller, "clear_selection"):
@@ -100,6 +168,36 @@ class ProspectManager:
             self.limpiar_detalles_prospecto()
             self.deshabilitar_botones_prospecto()
 
+        # La ventana pudo abrirse para mostrar un prospecto concreto (p. ej. desde la búsqueda)
+        if hasattr(self.app_controller, "aplicar_seleccion_pendiente"):
+            self.app_controller.aplicar_seleccion_pendiente()
+
+    def actualizar_fila_prospecto(self, prospect_id, prospect=None):
+        """
+        Refleja en la lista los cambios de un prospecto sin recargarla: actualiza su
+        fila, o la quita si con los datos nuevos ya no cumple los filtros.
+        """
+        if prospect is None:
+            prospect = self.prospect_service.obtener_prospecto(prospect_id)
+            if prospect is None:
+                self.quitar_fila_prospecto(prospect_id)
+                return
+        sigue = self.fuente.actualizar(prospect)
+        tree = self.app_controller.prospect_tree
+        iid = str(prospect_id)
+        if sigue and tree.exists(iid):
+            tree.item(iid, values=self._valores_fila(prospect))
+        elif sigue is False and tree.exists(iid):
+            tree.delete(iid)
+        self._actualizar_contador()
+
+    def quitar_fila_prospecto(self, prospect_id):
+        """Quita de la lista un prospecto eliminado sin recargarla"""
+        self.fuente.quitar(prospect_id)
+        if self.app_controller.prospect_tree.exists(str(prospect_id)):
+            self.app_controller.prospect_tree.delete(str(prospect_id))
+        self._actualizar_contador()
+
     def al_seleccionar_prospecto(self, event):
         """Maneja la selección de un prospecto en el TreeView"""
         selected_items = self.app_controller.prospect_tree.selection()
@@ -526,16 +624,16 @@ class ProspectManager:
         )
 
     def update_prospect_status(self, prospect_id, new_status):
-        """Actualiza el estado de un prospecto y refresca la lista"""
+        """Actualiza el estado de un prospecto y su fila en la lista"""
         success, mensaje = self.prospect_service.cambiar_estado_prospecto(prospect_id, new_status)
         if success:
-            self.cargar_prospectos()
+            updated_prospect = self.prospect_service.obtener_prospecto(prospect_id)
+            # Actualizar sólo la fila del prospecto (o quitarla si el filtro de estado la excluye)
+            self.actualizar_fila_prospecto(prospect_id, updated_prospect)
             # Si el prospecto actualizado es el seleccionado, actualizar detalles
-            if self.selected_prospect and self.selected_prospect["id"] == prospect_id:
-                updated_prospect = self.prospect_service.obtener_prospecto(prospect_id)
-                if updated_prospect:
-                    self.selected_prospect = updated_prospect
-                    self.mostrar_detalles_prospecto(updated_prospect)
+            if updated_prospect and self.selected_prospect and self.selected_prospect["id"] == prospect_id:
+                self.selected_prospect = updated_prospect
+                self.mostrar_detalles_prospecto(updated_prospect)
         return success
 
     def get_prospect_statistics(self):
@@ -628,9 +726,9 @@ class ProspectManager:
                 )
 
     def open_status_filter_dialog(self):
-        """Abre diálogo para filtrar prospectos por estado"""
+        """Abre diálogo para filtrar prospectos por estado y fecha de primera consulta"""
         dialog = tk.Toplevel(self.app_controller.root)
-        dialog.title("Filtrar Prospectos por Estado")
+        dialog.title("Filtrar Prospectos")
         dialog.transient(self.app_controller.root)
         dialog.grab_set()
         dialog.resizable(False, False)
@@ -652,10 +750,25 @@ class ProspectManager:
         ]
 
         for estado in estados_disponibles:
-            var = tk.BooleanVar(value=True)  # Por defecto todos seleccionados
+            # Por defecto todos seleccionados, o los del filtro vigente
+            var = tk.BooleanVar(value=estado in self.fuente.filtros.get('estados', estados_disponibles))
             estados_vars[estado] = var
             ttk.Checkbutton(frame, text=estado, variable=var).pack(anchor=tk.W, pady=2)
 
+        # Rango de fecha de primera consulta (DD/MM/AAAA, opcional)
+        fechas_frame = ttk.Frame(frame)
+        fechas_frame.pack(fill=tk.X, pady=(10, 0))
+        fechas_vars = {}
+        for columna, (clave, etiqueta) in enumerate((("fecha_desde", "Desde:"), ("fecha_hasta", "Hasta:"))):
+            fecha = self.fuente.filtros.get(clave)
+            fechas_vars[clave] = tk.StringVar(
+                value=self.prospect_service.formatear_fecha_para_mostrar(fecha) if fecha else ""
+            )
+            ttk.Label(fechas_frame, text=etiqueta).grid(row=0, column=columna * 2, sticky=tk.W, padx=(0, 5))
+            ttk.Entry(fechas_frame, textvariable=fechas_vars[clave], width=12).grid(
+                row=0, column=columna * 2 + 1, sticky=tk.W, padx=(0, 10)
+            )
+
         # Botones
         button_frame = ttk.Frame(frame)
         button_frame.pack(fill=tk.X, pady=(15, 0))
@@ -670,7 +783,17 @@ class ProspectManager:
                 )
                 return
 
-            self.apply_status_filter(selected_states)
+            fechas = {}
+            for clave, var in fechas_vars.items():
+                texto = var.get().strip()
+                fechas[clave] = date_utils.DateFormatter.parse_date_input(texto) if texto else None
+                if texto and fechas[clave] is None:
+                    messagebox.showwarning(
+                        "Advertencia", f"Fecha inválida: '{texto}'. Use el formato DD/MM/AAAA.", parent=dialog
+                    )
+                    return
+
+            self.aplicar_filtros(estados=selected_states, **fechas)
             dialog.destroy()
 
         def select_all():
@@ -697,43 +820,8 @@ class ProspectManager:
         self.app_controller.root.wait_window(dialog)
 
     def apply_status_filter(self, selected_states):
-        """Aplica filtro de estados a la lista de prospectos"""
-        # Limpiar lista actual
-        for i in self.app_controller.prospect_tree.get_children():
-            self.app_controller.prospect_tree.delete(i)
-
-        # Cargar prospectos filtrados usando el servicio
-        filtros = {'estados': selected_states}
-        prospects = self.prospect_service.buscar_prospectos(filtros)
-        
-        for prospect in prospects:
-            # Formatear fecha para mostrar usando utilidades argentinas
-            fecha_str = self.prospect_service.formatear_fecha_para_mostrar(
-                prospect.get("fecha_primera_consulta")
-            )
-
-            # Insertar en el TreeView
-            if hasattr(self.app_controller, "window"):  # Es la ventana de prospectos
-                values = (
-                    prospect["id"],
-                    prospect["nombre"],
-                    prospect["estado"],
-                    fecha_str,
-                )
-            else:  # Es la ventana principal (compatibilidad)
-                values = (prospect["id"], prospect["nombre"], prospect["estado"])
-
-            self.app_controller.prospect_tree.insert(
-                "", tk.END, values=values, iid=str(prospect["id"])
-            )
-
-        # Limpiar selección
-        self.selected_prospect = None
-        if hasattr(self.app_controller, "clear_selection"):
-            self.app_controller.clear_selection()
-        else:
-            self.limpiar_detalles_prospecto()
-            self.deshabilitar_botones_prospecto()
+        """Aplica filtro de estados a la lista de prospectos (filtrado en la base de datos)"""
+        self.aplicar_filtros(estados=list(selected_states))
 
     def show_prospect_statistics(self):
         """Muestra estadísticas de prospectos"""
@@ -834,11 +922,12 @@ class ProspectManager:
             return
         
         # Usar el servicio para eliminar
-        success, mensaje = self.prospect_service.eliminar_prospecto(self.selected_prospect["id"])
+        prospect_id = self.selected_prospect["id"]
+        success, mensaje = self.prospect_service.eliminar_prospecto(prospect_id)
         
         if success:
             messagebox.showinfo("Éxito", mensaje, parent=self.app_controller.root)
-            self.cargar_prospectos()  # Recargar lista
+            self.quitar_fila_prospecto(prospect_id)  # Quitar de la lista sin recargarla
         else:
             messagebox.showerror("Error", mensaje, parent=self.app_controller.root)
 
@@ -915,7 +1004,7 @@ class ProspectManager:
             if success:
                 messagebox.showinfo("Éxito", mensaje, parent=self.app_controller.root)
                 dialog.destroy()
-                self.cargar_prospectos()  # Recargar lista
+                self.actualizar_fila_prospecto(self.selected_prospect["id"])  # Actualizar su fila
             else:
                 messagebox.showerror("Error", mensaje, parent=dialog)
 
@@ -1214,11 +1303,11 @@ class ProspectManager:
                     parent=self.app_controller.root,
                 )
                 dialog.destroy()
-                self.cargar_prospectos()
-                # Actualizar datos del prospecto seleccionado
+                # Actualizar datos del prospecto seleccionado y su fila en la lista
                 updated_prospect = self.db.get_prospecto_by_id(
                     self.selected_prospect["id"]
                 )
+                self.actualizar_fila_prospecto(self.selected_prospect["id"], updated_prospect)
                 if updated_prospect:
                     self.selected_prospect = updated_prospect
                     self.mostrar_detalles_prospecto(updated_prospect)
@@ -1272,7 +1361,7 @@ class ProspectManager:
                     f"Prospecto '{prospect_name}' eliminado correctamente.",
                     parent=self.app_controller.root,
                 )
-                self.cargar_prospectos()
+                self.quitar_fila_prospecto(prospect_id)
                 self.selected_prospect = None
                 self.limpiar_detalles_prospecto()
                 self.deshabilitar_botones_prospecto()
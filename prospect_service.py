@@ -209,49 +209,33 @@ class ProspectService:
         Returns:
             List[Dict[str, Any]]: Lista de prospectos que cumplen los filtros
         """
-        try:
-            # Obtener todos los prospectos
-            prospectos = self.db.get_todos_los_prospectos()
-            
-            # Aplicar filtros
-            if filtros.get('estados'):
-                prospectos = [p for p in prospectos if p.get('estado') in filtros['estados']]
-            
-            if filtros.get('nombre'):
-                nombre_filtro = filtros['nombre'].lower()
-                prospectos = [p for p in prospectos if nombre_filtro in p.get('nombre', '').lower()]
-            
-            if filtros.get('fecha_desde') or filtros.get('fecha_hasta'):
-                prospectos_filtrados = []
-                for p in prospectos:
-                    fecha_consulta = p.get('fecha_primera_consulta')
-                    if fecha_consulta:
-                        # Convertir fecha a objeto date si es string
-                        if isinstance(fecha_consulta, str):
-                            fecha_consulta = date_utils.DateFormatter.parse_date_input(fecha_consulta)
-                        
-                        if fecha_consulta:
-                            # Aplicar filtro de fecha desde
-                            if filtros.get('fecha_desde') and fecha_consulta < filtros['fecha_desde']:
-                                continue
-                            
-                            # Aplicar filtro de fecha hasta
-                            if filtros.get('fecha_hasta') and fecha_consulta > filtros['fecha_hasta']:
-                                continue
-                            
-                            prospectos_filtrados.append(p)
-                    else:
-                        # Si no tiene fecha, incluir solo si no hay filtros de fecha
-                        if not filtros.get('fecha_desde') and not filtros.get('fecha_hasta'):
-                            prospectos_filtrados.append(p)
-                
-                prospectos = prospectos_filtrados
-            
-            return prospectos
+        return self.buscar_prospectos_paginado(filtros)[0]
+    
+    def buscar_prospectos_paginado(self, filtros: Dict[str, Any], limite: Optional[int] = None,
+                                   desplazamiento: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Busca prospectos según filtros, filtrando y paginando en la base de datos.
+        
+        Args:
+            filtros (dict): Mismos filtros que buscar_prospectos
+            limite (int, optional): Tamaño de la página (None = todos)
+            desplazamiento (int): Prospectos a saltear
             
+        Returns:
+            tuple[List[Dict[str, Any]], int]: (prospectos de la página, total que cumple los filtros)
+        """
+        try:
+            return self.db.buscar_prospectos(
+                estados=filtros.get('estados'),
+                nombre=filtros.get('nombre'),
+                fecha_desde=filtros.get('fecha_desde'),
+                fecha_hasta=filtros.get('fecha_hasta'),
+                limite=limite,
+                desplazamiento=desplazamiento,
+            )
         except Exception as e:
             print(f"Error al buscar prospectos: {e}")
-            return []
+            return [], 0
     
     def obtener_prospectos_por_estado(self, estado: str) -> List[Dict[str, Any]]:
         """
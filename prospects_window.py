@@ -9,15 +9,20 @@ import datetime
 import os
 from prospect_manager import ProspectManager
 from prospect_service import ProspectService
+from ejecutor_datos import ejecutor_datos, indicador_cursor
 import date_utils
 
 
 class ProspectsWindow:
     """Ventana principal para la gestión de prospectos"""
     
-    def __init__(self, parent_app):
+    def __init__(self, parent_app, prospecto_id=None):
         self.parent_app = parent_app
         self.selected_prospect = None
+        # Prospecto a seleccionar cuando termine de cargarse la lista
+        self._seleccion_pendiente = prospecto_id
+        # Prospecto pendiente cuya página ya se pidió (si no estaba en la página cargada)
+        self._pendiente_ubicado = None
         
         # Crear servicio de prospectos (capa de lógica de negocio)
         self.prospect_service = ProspectService()
@@ -39,7 +44,12 @@ class ProspectsWindow:
         self.prospect_manager = ProspectManager(self)
         
         self.create_widgets()
-        self.prospect_manager.cargar_prospectos()
+        if prospecto_id is not None:
+            # Cargar la lista hasta el prospecto pedido para poder seleccionarlo
+            self._pendiente_ubicado = prospecto_id
+            self.prospect_manager.ir_a_prospecto(prospecto_id)
+        else:
+            self.prospect_manager.cargar_prospectos()
         
         # Centrar la ventana
         self.center_window()
@@ -103,6 +113,13 @@ class ProspectsWindow:
         filter_frame = ttk.Frame(title_frame)
         filter_frame.grid(row=0, column=1, sticky="e")
         
+        # Búsqueda por nombre (filtrada en la base de datos mientras se escribe)
+        ttk.Label(filter_frame, text="Buscar:").pack(side=tk.LEFT, padx=(0, 2))
+        self.search_var = tk.StringVar()
+        self._busqueda_programada = None
+        self.search_var.trace_add("write", self._on_search_change)
+        ttk.Entry(filter_frame, textvariable=self.search_var, width=22).pack(side=tk.LEFT, padx=(0, 6))
+        
         ttk.Button(filter_frame, text="Filtrar", 
                   command=self.prospect_manager.open_status_filter_dialog).pack(side=tk.LEFT, padx=2)
         ttk.Button(filter_frame, text="Estadísticas", 
@@ -138,13 +155,18 @@ class ProspectsWindow:
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.prospect_tree.yview)
         h_scrollbar = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=self.prospect_tree.xview)
-        self.prospect_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self._v_scrollbar = v_scrollbar
+        self.prospect_tree.configure(yscrollcommand=self._on_tree_yscroll, xscrollcommand=h_scrollbar.set)
         
         # Grid del TreeView y scrollbars
         self.prospect_tree.grid(row=0, column=0, sticky="nsew")
         v_scrollbar.grid(row=0, column=1, sticky="ns")
         h_scrollbar.grid(row=1, column=0, sticky="ew")
         
+        # Cantidad cargada / total (las páginas siguientes se piden al desplazarse)
+        self.count_lbl = ttk.Label(list_frame, text="")
+        self.count_lbl.grid(row=2, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        
         # Eventos
         self.prospect_tree.bind("<<TreeviewSelect>>", self.on_prospect_select)
         self.prospect_tree.bind("<Button-3>", self.show_context_menu)
@@ -294,16 +316,67 @@ class ProspectsWindow:
         if selected_items:
             try:
                 prospect_id = int(selected_items[0])
-                prospect_data = self.prospect_service.obtener_prospecto(prospect_id)
-                if prospect_data:
-                    self.selected_prospect = prospect_data
-                    self.prospect_manager.selected_prospect = prospect_data
-                    self.display_prospect_details(prospect_data)
-                    self.enable_buttons()
-                else:
-                    self.clear_selection()
             except (ValueError, IndexError):
                 self.clear_selection()
+                return
+            # Al recorrer la lista con el teclado sólo se muestra el último prospecto seleccionado
+            ejecutor_datos.enviar(
+                self.prospect_service.obtener_prospecto, prospect_id,
+                clave=("detalle_prospecto", id(self)),
+                al_completar=self._on_prospect_loaded,
+                al_fallar=lambda error: self.clear_selection(),
+                indicador=indicador_cursor(self.window),
+            )
+        else:
+            ejecutor_datos.cancelar(("detalle_prospecto", id(self)))
+            self.clear_selection()
+
+    def seleccionar_prospecto(self, prospecto_id):
+        """Selecciona un prospecto de la lista (o lo deja pendiente si la lista aún se está cargando)."""
+        self._seleccion_pendiente = prospecto_id
+        self.aplicar_seleccion_pendiente()
+
+    def aplicar_seleccion_pendiente(self):
+        if self._seleccion_pendiente is None:
+            return
+        iid = str(self._seleccion_pendiente)
+        if self.prospect_tree.exists(iid):
+            self._seleccion_pendiente = None
+            self.prospect_tree.selection_set(iid)
+            self.prospect_tree.see(iid)
+        elif self._pendiente_ubicado != self._seleccion_pendiente:
+            # No está entre las filas cargadas: cargar la lista hasta él (una sola vez)
+            self._pendiente_ubicado = self._seleccion_pendiente
+            self.prospect_manager.ir_a_prospecto(self._seleccion_pendiente)
+
+    def actualizar_contador_prospectos(self, cargados, total):
+        """Muestra cuántos prospectos hay cargados en la lista y cuántos cumplen los filtros"""
+        if total is None or cargados >= total:
+            self.count_lbl.config(text=f"{cargados} prospectos")
+        else:
+            self.count_lbl.config(text=f"Mostrando {cargados} de {total} prospectos")
+
+    def _on_tree_yscroll(self, first, last):
+        """Mueve la barra y pide la página siguiente al acercarse al final de lo cargado"""
+        self._v_scrollbar.set(first, last)
+        self.prospect_manager.al_desplazar_lista(last)
+
+    def _on_search_change(self, *args):
+        # Esperar a que el usuario deje de escribir antes de consultar
+        if self._busqueda_programada is not None:
+            self.window.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.window.after(300, self._aplicar_busqueda)
+
+    def _aplicar_busqueda(self):
+        self._busqueda_programada = None
+        self.prospect_manager.aplicar_filtros(nombre=self.search_var.get().strip())
+
+    def _on_prospect_loaded(self, prospect_data):
+        if prospect_data:
+            self.selected_prospect = prospect_data
+            self.prospect_manager.selected_prospect = prospect_data
+            self.display_prospect_details(prospect_data)
+            self.enable_buttons()
         else:
             self.clear_selection()
     
@@ -396,7 +469,7 @@ class ProspectsWindow:
                     self.selected_prospect["id"], new_status
                 )
                 if success:
-                    if self.selected_prospect:  # Verificar que no sea None
+                    if self.selected_prospect:  # Verificar que no sea None (la fila puede haber salido del filtro)
                         self.selected_prospect["estado"] = new_status
                         self.prospect_detail_status_lbl.config(text=new_status)
                     messagebox.showinfo("Éxito", f"Estado cambiado a '{new_status}'", 
@@ -477,8 +550,8 @@ class ProspectsWindow:
         if success:
             messagebox.showinfo("Conversión Exitosa", mensaje, parent=self.window)
             
-            # Actualizar la lista de prospectos
-            self.prospect_manager.cargar_prospectos()
+            # Actualizar la fila del prospecto y sus detalles
+            self._refrescar_prospecto(self.selected_prospect["id"])
             
             # Preguntar si quiere abrir la ficha del cliente
             if cliente_id and messagebox.askyesno(
@@ -541,11 +614,18 @@ class ProspectsWindow:
         if success:
             messagebox.showinfo("Reversión Exitosa", mensaje, parent=self.window)
             
-            # Actualizar la lista de prospectos
-            self.prospect_manager.cargar_prospectos()
+            # Actualizar la fila del prospecto y sus detalles
+            self._refrescar_prospecto(self.selected_prospect["id"])
         else:
             messagebox.showerror("Error de Reversión", mensaje, parent=self.window)
     
+    def _refrescar_prospecto(self, prospect_id):
+        """Actualiza la fila del prospecto en la lista y, si sigue seleccionado, sus detalles"""
+        prospect_data = self.prospect_service.obtener_prospecto(prospect_id)
+        self.prospect_manager.actualizar_fila_prospecto(prospect_id, prospect_data)
+        if self.prospect_tree.exists(str(prospect_id)):
+            self._on_prospect_loaded(prospect_data)
+    
     def _abrir_ficha_cliente(self, cliente_id: int):
         """Abre la ficha del cliente en el módulo de clientes"""
         try:
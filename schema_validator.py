@@ -412,34 +412,8 @@ class SchemaValidator:
             
     def find_pg_dump(self) -> str:
         """Encuentra la ubicación de pg_dump en el sistema."""
-        import os
-        import subprocess
-        
-        # Ubicaciones comunes de PostgreSQL en Windows
-        common_paths = [
-            r"C:\Program Files\PostgreSQL\17\bin\pg_dump.exe",
-            r"C:\Program Files\PostgreSQL\16\bin\pg_dump.exe",
-            r"C:\Program Files\PostgreSQL\15\bin\pg_dump.exe",
-            r"C:\Program Files\PostgreSQL\14\bin\pg_dump.exe",
-            r"C:\Program Files\PostgreSQL\13\bin\pg_dump.exe",
-        ]
-        
-        # Primero intentar desde PATH
-        try:
-            result = subprocess.run(['where', 'pg_dump'], capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                pg_dump_path = result.stdout.strip().split('\n')[0]
-                if os.path.exists(pg_dump_path):
-                    return pg_dump_path
-        except:
-            pass
-            
-        # Buscar en ubicaciones comunes
-        for path in common_paths:
-            if os.path.exists(path):
-                return path
-                
-        return None
+        from servicio_backups import encontrar_herramienta, leer_configuracion
+        return encontrar_herramienta('pg_dump', leer_configuracion()['directorio_bin'])
         
     def fix_schema_differences(self) -> bool:
         """Corrige automáticamente las diferencias de esquema reparables."""
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Servicio de Backups - Copias de seguridad de la base PostgreSQL con pg_dump.
+
+La copia del menú Administración corría pg_dump desde una ruta fija de Windows,
+en el hilo de Tk y en formato custom (un solo proceso), con la aplicación
+congelada hasta el final. `ServicioBackups` busca pg_dump/pg_restore en la
+configuración, en el PATH o en las instalaciones habituales de Windows, y
+ejecuta la copia en segundo plano:
+
+- Formato directorio con `--jobs N`: pg_dump vuelca varias tablas a la vez.
+- Nivel de compresión configurable (`--compress`).
+- Progreso por tabla volcada (leído de la salida de `--verbose`), duración,
+  tamaño y verificación de cada copia con `pg_restore --list`; los resultados
+  se agregan a `historial_backups.jsonl` en la carpeta de copias.
+- Rotación: se conservan las N copias más recientes y/o las de los últimos días.
+- Modo nocturno: un hilo que duerme hasta la hora programada.
+- Restauración en paralelo con `pg_restore --jobs N`, previa verificación.
+
+Configuración opcional en config.ini (todas las claves tienen valor por defecto):
+
+    [backup]
+    carpeta = backups
+    directorio_bin = C:\\Program Files\\PostgreSQL\\17\\bin
+    formato = directory
+    jobs = 4
+    compresion = 6
+    conservar = 10
+    dias_retencion = 30
+    hora_nocturna = 02:30
+    verificar = si
+
+Uso desde la línea de comandos:
+
+    python servicio_backups.py backup
+    python servicio_backups.py verificar backups/backup_crm_legal_2025-06-01_02-30-00
+    python servicio_backups.py restaurar RUTA --base crm_legal_prueba --jobs 4
+"""
+
+import argparse
+import collections
+import configparser
+import datetime
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import crm_database as db
+
+logger = logging.getLogger('servicio_backups')
+
+FORMATO_DIRECTORIO = 'directory'
+FORMATO_CUSTOM = 'custom'
+
+ARCHIVO_HISTORIAL = 'historial_backups.jsonl'
+PREFIJO_BACKUP = 'backup_'
+# Copias que no pasaron la verificación: quedan para revisarlas, fuera de la rotación
+PREFIJO_INVALIDA = 'invalida_'
+FORMATO_FECHA_NOMBRE = '%Y-%m-%d_%H-%M-%S'
+
+# Instalaciones habituales de PostgreSQL en Windows (se prefiere la versión más nueva)
+_PATRON_BIN_WINDOWS = r"C:\Program Files\PostgreSQL\*\bin\{}.exe"
+
+# pg_dump/pg_restore --verbose: una línea por tabla al volcar o restaurar sus datos
+_PATRON_TABLA = re.compile(r'(?:dumping contents of table|processing data for table) "([^"]+)"')
+
+CONFIGURACION_POR_DEFECTO = {
+    'carpeta': 'backups',
+    'directorio_bin': '',
+    'formato': FORMATO_DIRECTORIO,
+    'jobs': min(4, os.cpu_count() or 1),
+    'compresion': 6,
+    'conservar': 10,
+    'dias_retencion': 30,
+    'hora_nocturna': '',
+    'verificar': True,
+}
+
+
+def leer_configuracion(archivo: str = 'config.ini') -> Dict[str, Any]:
+    """Sección [backup] de config.ini con los valores por defecto para las claves ausentes."""
+    configuracion = dict(CONFIGURACION_POR_DEFECTO)
+    parser = configparser.ConfigParser()
+    parser.read(archivo, encoding='utf-8')
+    if 'backup' not in parser:
+        return configuracion
+    seccion = parser['backup']
+    for clave in ('carpeta', 'directorio_bin', 'formato', 'hora_nocturna'):
+        configuracion[clave] = seccion.get(clave, configuracion[clave]).strip()
+    for clave in ('jobs', 'compresion', 'conservar', 'dias_retencion'):
+        try:
+            configuracion[clave] = seccion.getint(clave, configuracion[clave])
+        except ValueError:
+            logger.warning(f"Valor inválido para '{clave}' en [backup]; se usa {configuracion[clave]}")
+    try:
+        configuracion['verificar'] = seccion.getboolean('verificar', configuracion['verificar'])
+    except ValueError:
+        pass
+    return configuracion
+
+
+def _version_instalacion(ruta: str):
+    carpeta_version = os.path.basename(os.path.dirname(os.path.dirname(ruta)))
+    return tuple(int(numero) for numero in re.findall(r'\d+', carpeta_version))
+
+
+def encontrar_herramienta(nombre: str, directorio_bin: Optional[str] = None) -> Optional[str]:
+    """
+    Ruta de una herramienta cliente de PostgreSQL (pg_dump, pg_restore): primero
+    en el directorio configurado, después en el PATH y por último en las
+    instalaciones habituales de Windows. None si no se encuentra.
+    """
+    if directorio_bin:
+        for candidato in (nombre, nombre + '.exe'):
+            ruta = os.path.join(directorio_bin, candidato)
+            if os.path.isfile(ruta):
+                return ruta
+        logger.warning(f"No se encontró {nombre} en {directorio_bin}; se busca en el PATH")
+
+    ruta = shutil.which(nombre)
+    if ruta:
+        return ruta
+
+    instalaciones = glob.glob(_PATRON_BIN_WINDOWS.format(nombre))
+    if instalaciones:
+        return max(instalaciones, key=_version_instalacion)
+    return None
+
+
+def tamano_en_disco(ruta: str) -> int:
+    """Bytes ocupados por un archivo o por todos los archivos de una carpeta."""
+    if os.path.isfile(ruta):
+        return os.path.getsize(ruta)
+    total = 0
+    for raiz, _carpetas, archivos in os.walk(ruta):
+        for archivo in archivos:
+            total += os.path.getsize(os.path.join(raiz, archivo))
+    return total
+
+
+def _borrar(ruta: str):
+    if os.path.isdir(ruta):
+        shutil.rmtree(ruta, ignore_errors=True)
+    elif os.path.exists(ruta):
+        os.remove(ruta)
+
+
+class ServicioBackups:
+    """Copias de seguridad, verificación, rotación, restauración y modo nocturno."""
+
+    # Tope de espera del modo nocturno: protege de suspensiones del equipo y cambios de reloj
+    MAX_ESPERA_SEGUNDOS = 1800
+
+    def __init__(self, configuracion: Optional[Dict[str, Any]] = None,
+                 db_config: Optional[Dict[str, Any]] = None,
+                 reloj: Callable[[], datetime.datetime] = datetime.datetime.now):
+        self._configuracion = configuracion
+        self._db_config = db_config
+        self._reloj = reloj
+        self._en_curso = threading.Lock()
+        self._proceso: Optional[subprocess.Popen] = None
+        self._cancelado = False
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._al_terminar_programado: Optional[Callable] = None
+
+    # --- Configuración ---
+
+    @property
+    def configuracion(self) -> Dict[str, Any]:
+        if self._configuracion is None:
+            self._configuracion = leer_configuracion()
+        return self._configuracion
+
+    @property
+    def db_config(self) -> Dict[str, Any]:
+        if self._db_config is None:
+            self._db_config = dict(db.get_db_config())
+        return self._db_config
+
+    @property
+    def carpeta(self) -> str:
+        return self.configuracion['carpeta'] or 'backups'
+
+    def herramienta(self, nombre: str) -> str:
+        ruta = encontrar_herramienta(nombre, self.configuracion.get('directorio_bin'))
+        if not ruta:
+            raise FileNotFoundError(
+                f"No se encontró '{nombre}'. Agregue la carpeta bin de PostgreSQL al PATH "
+                f"o indíquela en config.ini, sección [backup], clave 'directorio_bin'."
+            )
+        return ruta
+
+    def _nombre_base(self) -> str:
+        return self.db_config.get('database') or self.db_config.get('dbname') or ''
+
+    def _argumentos_conexion(self, base: Optional[str] = None) -> List[str]:
+        argumentos = ['--host', self.db_config.get('host', 'localhost'),
+                      '--username', self.db_config.get('user', ''),
+                      '--dbname', base or self._nombre_base()]
+        if self.db_config.get('port'):
+            argumentos += ['--port', str(self.db_config['port'])]
+        return argumentos
+
+    def _entorno(self) -> Dict[str, str]:
+        entorno = os.environ.copy()
+        if self.db_config.get('password'):
+            entorno['PGPASSWORD'] = self.db_config['password']
+        return entorno
+
+    # --- Copia ---
+
+    def comando_backup(self, pg_dump: str, destino: str, formato: str, jobs: int, compresion: int) -> List[str]:
+        comando = [pg_dump] + self._argumentos_conexion() + [
+            '--file', destino,
+            '--format', formato,
+            '--compress', str(max(0, min(9, compresion))),
+            '--blobs',
+            '--verbose',
+        ]
+        # Sólo el formato directorio admite volcado en paralelo
+        if formato == FORMATO_DIRECTORIO and jobs > 1:
+            comando += ['--jobs', str(jobs)]
+        return comando
+
+    def ruta_nueva(self, formato: str, momento: Optional[datetime.datetime] = None) -> str:
+        marca = (momento or self._reloj()).strftime(FORMATO_FECHA_NOMBRE)
+        nombre = f"{PREFIJO_BACKUP}{self._nombre_base()}_{marca}"
+        if formato != FORMATO_DIRECTORIO:
+            nombre += '.backup'
+        return os.path.join(self.carpeta, nombre)
+
+    def _ejecutar_con_progreso(self, comando: List[str], fase: str, total: Optional[int],
+                               al_progreso: Optional[Callable[[str, int, Optional[int]], None]]):
+        """Ejecuta pg_dump/pg_restore leyendo --verbose; devuelve (código, tablas, últimas líneas)."""
+        tablas = set()
+        ultimas = collections.deque(maxlen=20)
+        proceso = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   text=True, errors='replace', env=self._entorno())
+        self._proceso = proceso
+        try:
+            for linea in proceso.stderr:
+                ultimas.append(linea.rstrip())
+                coincidencia = _PATRON_TABLA.search(linea)
+                if coincidencia and coincidencia.group(1) not in tablas:
+                    tablas.add(coincidencia.group(1))
+                    if al_progreso:
+                        al_progreso(fase, len(tablas), total)
+            codigo = proceso.wait()
+        finally:
+            self._proceso = None
+        return codigo, len(tablas), list(ultimas)
+
+    def crear_backup(self, al_progreso: Optional[Callable[[str, int, Optional[int]], None]] = None,
+                     formato: Optional[str] = None, jobs: Optional[int] = None,
+                     compresion: Optional[int] = None, verificar: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Crea una copia de la base, la verifica y aplica la rotación. Bloquea hasta
+        terminar: debe llamarse fuera del hilo de Tk. `al_progreso(fase, hechas, total)`
+        recibe las fases 'volcado', 'verificacion' y 'fin'. Devuelve las métricas de
+        la copia; lanza RuntimeError si pg_dump falla o ya hay otra copia en curso.
+        Una copia que no pasa la verificación se renombra con PREFIJO_INVALIDA y no
+        se rota nada: una racha de copias corruptas no debe borrar las buenas.
+        """
+        if not self._en_curso.acquire(blocking=False):
+            raise RuntimeError("Ya hay una copia de seguridad en curso.")
+        try:
+            configuracion = self.configuracion
+            formato = formato or configuracion['formato']
+            jobs = jobs if jobs is not None else configuracion['jobs']
+            compresion = compresion if compresion is not None else configuracion['compresion']
+            verificar = configuracion['verificar'] if verificar is None else verificar
+
+            pg_dump = self.herramienta('pg_dump')
+            os.makedirs(self.carpeta, exist_ok=True)
+            momento = self._reloj()
+            destino = self.ruta_nueva(formato, momento)
+            total = db.contar_tablas_usuario()
+            comando = self.comando_backup(pg_dump, destino, formato, jobs, compresion)
+
+            print(f"[Backup] Ejecutando: {' '.join(comando)}")
+            self._cancelado = False
+            inicio = time.monotonic()
+            codigo, tablas, ultimas = self._ejecutar_con_progreso(comando, 'volcado', total, al_progreso)
+            segundos = time.monotonic() - inicio
+            if codigo != 0 or self._cancelado:
+                _borrar(destino)
+                motivo = "cancelada" if self._cancelado else f"pg_dump terminó con código {codigo}"
+                raise RuntimeError(f"Copia de seguridad {motivo}.\n" + '\n'.join(ultimas[-5:]))
+
+            resultado = {
+                'ruta': destino,
+                'fecha': momento.isoformat(timespec='seconds'),
+                'formato': formato,
+                'jobs': jobs if formato == FORMATO_DIRECTORIO else 1,
+                'compresion': compresion,
+                'segundos': round(segundos, 2),
+                'bytes': tamano_en_disco(destino),
+                'tablas': tablas,
+            }
+            if verificar:
+                if al_progreso:
+                    al_progreso('verificacion', tablas, total)
+                resultado['verificacion'] = self.verificar_backup(destino)
+            if verificar and not resultado['verificacion']['ok']:
+                logger.error(f"La copia {destino} no pasó la verificación: {resultado['verificacion']['error']}")
+                resultado['ruta'] = self._apartar_invalida(destino)
+                resultado['eliminados'] = []
+            else:
+                resultado['eliminados'] = self.aplicar_retencion(proteger=destino)
+            self._registrar(resultado)
+            if al_progreso:
+                al_progreso('fin', tablas, total)
+            print(f"[Backup] {destino}: {resultado['bytes']:,} bytes, {tablas} tablas "
+                  f"en {resultado['segundos']} s ({resultado['jobs']} procesos)")
+            return resultado
+        finally:
+            self._en_curso.release()
+
+    def _apartar_invalida(self, ruta: str) -> str:
+        """Renombra una copia inválida para que listar_backups (y la rotación) no la cuenten."""
+        nombre = os.path.basename(ruta)
+        destino = os.path.join(os.path.dirname(ruta), PREFIJO_INVALIDA + nombre[len(PREFIJO_BACKUP):])
+        try:
+            os.replace(ruta, destino)
+            return destino
+        except OSError as e:
+            logger.warning(f"No se pudo apartar la copia inválida {ruta}: {e}")
+            return ruta
+
+    def en_curso(self) -> bool:
+        return self._en_curso.locked()
+
+    def cancelar(self):
+        """Interrumpe el pg_dump/pg_restore en curso, si lo hay."""
+        proceso = self._proceso
+        if proceso and proceso.poll() is None:
+            self._cancelado = True
+            proceso.terminate()
+
+    # --- Verificación y restauración ---
+
+    def verificar_backup(self, ruta: str) -> Dict[str, Any]:
+        """
+        Lee el índice de la copia con `pg_restore --list` (no toca la base). La copia
+        es válida si pg_restore puede leerla y tiene al menos una entrada.
+        """
+        try:
+            resultado = subprocess.run([self.herramienta('pg_restore'), '--list', ruta],
+                                       capture_output=True, text=True, errors='replace')
+        except OSError as e:
+            return {'ok': False, 'entradas': 0, 'tablas_con_datos': 0, 'error': str(e)}
+        entradas = [linea for linea in resultado.stdout.splitlines()
+                    if linea.strip() and not linea.startswith(';')]
+        tablas_con_datos = sum(1 for linea in entradas if ' TABLE DATA ' in linea)
+        ok = resultado.returncode == 0 and bool(entradas)
+        return {
+            'ok': ok,
+            'entradas': len(entradas),
+            'tablas_con_datos': tablas_con_datos,
+            'error': None if ok else (resultado.stderr.strip() or "La copia no contiene entradas."),
+        }
+
+    def comando_restauracion(self, pg_restore: str, ruta: str, base: str, jobs: int, limpiar: bool) -> List[str]:
+        comando = [pg_restore] + self._argumentos_conexion(base) + ['--no-owner', '--verbose']
+        if limpiar:
+            comando += ['--clean', '--if-exists']
+        if jobs > 1:
+            comando += ['--jobs', str(jobs)]
+        return comando + [ruta]
+
+    def restaurar(self, ruta: str, base: Optional[str] = None, jobs: Optional[int] = None,
+                  limpiar: bool = True,
+                  al_progreso: Optional[Callable[[str, int, Optional[int]], None]] = None) -> Dict[str, Any]:
+        """
+        Restaura una copia (formato directorio o custom) en `base` (por defecto la
+        base configurada) con `pg_restore --jobs N`. Verifica la copia antes de
+        empezar; lanza RuntimeError si no es válida o si pg_restore falla.
+        """
+        verificacion = self.verificar_backup(ruta)
+        if not verificacion['ok']:
+            raise RuntimeError(f"La copia no es válida: {verificacion['error']}")
+        if not self._en_curso.acquire(blocking=False):
+            raise RuntimeError("Ya hay una copia o restauración en curso.")
+        try:
+            jobs = jobs if jobs is not None else self.configuracion['jobs']
+            base = base or self._nombre_base()
+            comando = self.comando_restauracion(self.herramienta('pg_restore'), ruta, base, jobs, limpiar)
+            print(f"[Backup] Restaurando: {' '.join(comando)}")
+            self._cancelado = False
+            inicio = time.monotonic()
+            codigo, tablas, ultimas = self._ejecutar_con_progreso(
+                comando, 'restauracion', verificacion['tablas_con_datos'], al_progreso)
+            if codigo != 0 or self._cancelado:
+                motivo = "cancelada" if self._cancelado else f"pg_restore terminó con código {codigo}"
+                raise RuntimeError(f"Restauración {motivo}.\n" + '\n'.join(ultimas[-5:]))
+            return {'ruta': ruta, 'base': base, 'jobs': jobs, 'tablas': tablas,
+                    'segundos': round(time.monotonic() - inicio, 2)}
+        finally:
+            self._en_curso.release()
+
+    # --- Rotación e historial ---
+
+    def listar_backups(self) -> List[str]:
+        """Copias de la carpeta (archivos o carpetas `backup_*`), de la más nueva a la más vieja."""
+        if not os.path.isdir(self.carpeta):
+            return []
+        rutas = [os.path.join(self.carpeta, nombre) for nombre in os.listdir(self.carpeta)
+                 if nombre.startswith(PREFIJO_BACKUP)]
+        return sorted(rutas, key=os.path.getmtime, reverse=True)
+
+    def aplicar_retencion(self, proteger: Optional[str] = None) -> List[str]:
+        """
+        Elimina las copias que exceden `conservar` (las más viejas) o que tienen más
+        de `dias_retencion` días; 0 desactiva cada criterio. La copia más reciente y
+        `proteger` nunca se eliminan. Devuelve las rutas eliminadas.
+        """
+        conservar = self.configuracion.get('conservar') or 0
+        dias = self.configuracion.get('dias_retencion') or 0
+        limite = self._reloj() - datetime.timedelta(days=dias) if dias else None
+        eliminadas = []
+        for posicion, ruta in enumerate(self.listar_backups()):
+            if posicion == 0 or (proteger and os.path.abspath(ruta) == os.path.abspath(proteger)):
+                continue
+            excede = conservar and posicion >= conservar
+            vencida = limite and datetime.datetime.fromtimestamp(os.path.getmtime(ruta)) < limite
+            if excede or vencida:
+                try:
+                    _borrar(ruta)
+                    eliminadas.append(ruta)
+                except OSError as e:
+                    logger.warning(f"No se pudo eliminar la copia {ruta}: {e}")
+        if eliminadas:
+            print(f"[Backup] Rotación: {len(eliminadas)} copias eliminadas")
+        return eliminadas
+
+    def _registrar(self, resultado: Dict[str, Any]):
+        try:
+            with open(os.path.join(self.carpeta, ARCHIVO_HISTORIAL), 'a', encoding='utf-8') as archivo:
+                archivo.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.warning(f"No se pudo registrar la copia en el historial: {e}")
+
+    def historial(self, limite: int = 20) -> List[Dict[str, Any]]:
+        """Últimas copias registradas (métricas de duración, tamaño y verificación)."""
+        ruta = os.path.join(self.carpeta, ARCHIVO_HISTORIAL)
+        if not os.path.exists(ruta):
+            return []
+        with open(ruta, encoding='utf-8') as archivo:
+            lineas = archivo.readlines()[-limite:]
+        registros = []
+        for linea in lineas:
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                continue
+        return registros
+
+    # --- Modo nocturno ---
+
+    def proxima_ejecucion(self, ahora: datetime.datetime) -> Optional[datetime.datetime]:
+        """Próximo instante de la hora nocturna configurada ('HH:MM'), o None si no hay."""
+        hora = self.configuracion.get('hora_nocturna')
+        if not hora:
+            return None
+        try:
+            horas, minutos = (int(parte) for parte in hora.split(':')[:2])
+            instante = datetime.datetime.combine(ahora.date(), datetime.time(horas, minutos))
+        except ValueError:
+            logger.warning(f"Hora nocturna inválida en [backup]: {hora!r}")
+            return None
+        if instante <= ahora:
+            instante += datetime.timedelta(days=1)
+        return instante
+
+    def iniciar_programacion(self, al_terminar: Optional[Callable[[Optional[Dict[str, Any]], Optional[Exception]], None]] = None) -> bool:
+        """
+        Arranca el hilo del modo nocturno si hay `hora_nocturna` configurada.
+        `al_terminar(resultado, error)` se invoca (desde ese hilo) tras cada copia.
+        """
+        if self._hilo and self._hilo.is_alive():
+            return True
+        if self.proxima_ejecucion(self._reloj()) is None:
+            return False
+        self._al_terminar_programado = al_terminar
+        self._detenido.clear()
+        self._hilo = threading.Thread(target=self._ejecutar_programacion, name="BackupNocturno", daemon=True)
+        self._hilo.start()
+        return True
+
+    def detener(self, timeout: float = 2.0):
+        """Detiene el modo nocturno e interrumpe una copia en curso."""
+        self._detenido.set()
+        self.cancelar()
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    def _ejecutar_programacion(self):
+        proxima = self.proxima_ejecucion(self._reloj())
+        print(f"[Backup] Modo nocturno activo; próxima copia: {proxima}")
+        while proxima and not self._detenido.is_set():
+            espera = (proxima - self._reloj()).total_seconds()
+            if espera > 0:
+                self._detenido.wait(min(espera, self.MAX_ESPERA_SEGUNDOS))
+                continue
+            resultado, error = None, None
+            try:
+                resultado = self.crear_backup()
+            except Exception as e:
+                error = e
+                logger.error(f"Error en la copia nocturna: {e}")
+            if self._al_terminar_programado and not self._detenido.is_set():
+                try:
+                    self._al_terminar_programado(resultado, error)
+                except Exception as e:
+                    logger.error(f"Error notificando la copia nocturna: {e}")
+            proxima = self.proxima_ejecucion(self._reloj())
+
+
+servicio_backups = ServicioBackups()
+
+
+def _imprimir_progreso(fase, hechas, total):
+    print(f"  {fase}: {hechas}/{total or '?'} tablas", end='\r', flush=True)
+
+
+def confirmar_restauracion(base: str, base_configurada: str, preguntar: Callable[[str], str] = input) -> bool:
+    """
+    La restauración borra los objetos existentes: sobre la base que usa la
+    aplicación hay que confirmarla escribiendo su nombre.
+    """
+    if base != base_configurada:
+        return True
+    respuesta = preguntar(f"'{base}' es la base configurada en config.ini y se van a reemplazar sus datos.\n"
+                          f"Escriba el nombre de la base para continuar: ")
+    return respuesta.strip() == base
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copias de seguridad de la base de LPMS")
+    subcomandos = parser.add_subparsers(dest="accion", required=True)
+    crear = subcomandos.add_parser("backup", help="Crear una copia ahora")
+    crear.add_argument("--formato", choices=[FORMATO_DIRECTORIO, FORMATO_CUSTOM])
+    crear.add_argument("--jobs", type=int, help="Procesos de pg_dump en paralelo (formato directorio)")
+    crear.add_argument("--compresion", type=int, help="Nivel de compresión 0-9")
+    verificar = subcomandos.add_parser("verificar", help="Listar el índice de una copia con pg_restore --list")
+    verificar.add_argument("ruta")
+    restaurar = subcomandos.add_parser("restaurar", help="Restaurar una copia con pg_restore --jobs")
+    restaurar.add_argument("ruta")
+    restaurar.add_argument("--base", required=True,
+                           help="Base de destino (si es la de config.ini se pide confirmación)")
+    restaurar.add_argument("--jobs", type=int)
+    restaurar.add_argument("--sin-limpiar", action="store_true", help="No borrar los objetos existentes antes")
+    subcomandos.add_parser("rotar", help="Aplicar la política de retención")
+    args = parser.parse_args()
+
+    try:
+        if args.accion == "backup":
+            salida = servicio_backups.crear_backup(_imprimir_progreso, formato=args.formato,
+                                                   jobs=args.jobs, compresion=args.compresion)
+        elif args.accion == "verificar":
+            salida = servicio_backups.verificar_backup(args.ruta)
+        elif args.accion == "restaurar":
+            if not confirmar_restauracion(args.base, servicio_backups._nombre_base()):
+                print("Restauración cancelada.")
+                sys.exit(1)
+            salida = servicio_backups.restaurar(args.ruta, base=args.base, jobs=args.jobs,
+                                                limpiar=not args.sin_limpiar, al_progreso=_imprimir_progreso)
+        else:
+            salida = servicio_backups.aplicar_retencion()
+    except (RuntimeError, FileNotFoundError) as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
+    print()
+    print(json.dumps(salida, ensure_ascii=False, indent=2))
+    if args.accion == "verificar" and not salida['ok']:
+        sys.exit(1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests para los agregados vectorizados de analisis_financiero
+"""
+
+import sys
+import os
+import datetime
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from analisis_financiero import (
+    TRAMOS_ANTIGUEDAD,
+    AnalisisFinanciero,
+    agregar_por,
+    calcular_antiguedad,
+    calcular_saldos_pendientes,
+    preparar_movimientos,
+)
+
+
+def _movimientos(filas):
+    df = pd.DataFrame(filas, columns=[
+        'id', 'caso_id', 'cliente_id', 'cliente_nombre', 'caratula',
+        'etapa_procesal', 'fecha', 'tipo_movimiento', 'monto'
+    ])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return preparar_movimientos(df)
+
+
+class TestAnalisisFinanciero(unittest.TestCase):
+    """Test cases for firm-wide financial aggregates"""
+
+    def setUp(self):
+        self.df = _movimientos([
+            (1, 10, 1, 'Cliente A', 'A c/ B', 'Mediación', '2025-01-05', 'Gasto', 100.0),
+            (2, 10, 1, 'Cliente A', 'A c/ B', 'Mediación', '2025-02-10', 'Gasto', 50.0),
+            (3, 10, 1, 'Cliente A', 'A c/ B', 'Mediación', '2025-03-01', 'Ingreso', 120.0),
+            (4, 20, 2, 'Cliente B', 'C c/ D', 'Alegatos', '2025-03-15', 'Ingreso', 300.0),
+            (5, 20, 2, 'Cliente B', 'C c/ D', 'Alegatos', '2025-03-20', 'Gasto', 80.0),
+        ])
+
+    def test_agregado_por_cliente(self):
+        """Test that totals per client are summed correctly"""
+        resultado = agregar_por(self.df, ['cliente_id', 'cliente_nombre']).set_index('cliente_id')
+        self.assertAlmostEqual(resultado.loc[1, 'ingreso'], 120.0)
+        self.assertAlmostEqual(resultado.loc[1, 'gasto'], 150.0)
+        self.assertAlmostEqual(resultado.loc[1, 'saldo'], -30.0)
+        self.assertEqual(resultado.loc[2, 'cantidad'], 2)
+
+    def test_agregado_por_mes(self):
+        """Test that movements are bucketed by month"""
+        resultado = agregar_por(self.df, 'mes').set_index('mes')
+        self.assertEqual(list(resultado.index), ['2025-01', '2025-02', '2025-03'])
+        self.assertAlmostEqual(resultado.loc['2025-03', 'ingreso'], 420.0)
+
+    def test_saldos_pendientes(self):
+        """Test that only cases with expenses above income are reported"""
+        pendientes = calcular_saldos_pendientes(self.df)
+        self.assertEqual(list(pendientes['caso_id']), [10])
+        self.assertAlmostEqual(pendientes.loc[0, 'pendiente'], 30.0)
+
+    def test_antiguedad_imputa_ingresos_fifo(self):
+        """Test that income covers the oldest expenses first"""
+        antiguedad = calcular_antiguedad(self.df, datetime.date(2025, 3, 31))
+        self.assertEqual(list(antiguedad['cliente_id']), [1])
+        fila = antiguedad.iloc[0]
+        # 120 cubre los 100 de enero y 20 de febrero: quedan 30 de febrero (49 días)
+        self.assertAlmostEqual(fila['31-60 días'], 30.0)
+        self.assertAlmostEqual(fila['Más de 90 días'], 0.0)
+        self.assertAlmostEqual(fila['total_pendiente'], 30.0)
+
+    def test_antiguedad_sin_gastos(self):
+        """Test that an empty aging table keeps the expected columns"""
+        solo_ingresos = self.df[self.df['tipo_movimiento'] == 'Ingreso'].copy()
+        antiguedad = calcular_antiguedad(solo_ingresos)
+        self.assertTrue(antiguedad.empty)
+        for tramo in TRAMOS_ANTIGUEDAD:
+            self.assertIn(tramo, antiguedad.columns)
+
+
+class TestCacheAnalisis(unittest.TestCase):
+    """Test cases for the invalidation key of the cached movements"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        base = MagicMock()
+        base.connect_db.return_value = conn
+        self.analisis = AnalisisFinanciero(db_module=base)
+
+    def test_cambio_de_etapa_o_cliente_recarga(self):
+        claves = [(5, 100, 5, 'hash-a'), (5, 100, 5, 'hash-a'), (5, 100, 5, 'hash-b')]
+        self.cur.fetchone.side_effect = claves
+        with patch.object(self.analisis, '_cargar_movimientos', return_value=pd.DataFrame()) as cargar:
+            for _ in claves:
+                self.analisis.obtener_movimientos()
+        # Mismos movimientos pero otro hash de carátula/etapa/cliente: se vuelve a leer
+        self.assertEqual(cargar.call_count, 2)
+        self.assertEqual(self.analisis.get_estadisticas()['clave_cache'], claves[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests para el modelo del árbol de partes y su actualización incremental
+"""
+
+import sys
+import os
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from arbol_partes import aplicar_diferencias, construir_nodos, ordenar_roles
+
+
+class ArbolFalso:
+    """Imitación mínima de ttk.Treeview que registra las operaciones"""
+
+    def __init__(self):
+        self.items = {}
+        self.hijos = {'': []}
+        self.operaciones = []
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def insert(self, padre, indice, iid, values, tags, open=True):
+        self.items[iid] = {'values': values, 'tags': tags, 'padre': padre}
+        self.hijos[padre].insert(indice, iid)
+        self.hijos[iid] = []
+        self.operaciones.append(('insert', iid))
+
+    def move(self, iid, padre, indice):
+        self.hijos[self.items[iid]['padre']].remove(iid)
+        self.hijos[padre].insert(indice, iid)
+        self.items[iid]['padre'] = padre
+        self.operaciones.append(('move', iid))
+
+    def item(self, iid, opcion=None, **cambios):
+        if opcion:
+            return self.items[iid][opcion]
+        self.items[iid].update(cambios)
+        self.operaciones.append(('item', iid))
+
+    def parent(self, iid):
+        return self.items[iid]['padre']
+
+    def index(self, iid):
+        return self.hijos[self.parent(iid)].index(iid)
+
+    def get_children(self, iid=''):
+        return tuple(self.hijos[iid])
+
+    def delete(self, iid):
+        for hijo in list(self.hijos[iid]):
+            self.delete(hijo)
+        self.hijos[self.parent(iid)].remove(iid)
+        del self.hijos[iid]
+        del self.items[iid]
+        self.operaciones.append(('delete', iid))
+
+
+def _rol(rol_id, nombre, rol_principal, representa_a_id=None, contacto_id=None):
+    return {'rol_id': rol_id, 'nombre_completo': nombre, 'rol_principal': rol_principal,
+            'representa_a_id': representa_a_id, 'contacto_id': contacto_id or rol_id + 100}
+
+
+class TestConstruirNodos(unittest.TestCase):
+    """Test cases for grouping and representative nesting"""
+
+    def test_grupos_y_representantes(self):
+        roles = [_rol(1, 'Ana', 'Actor'), _rol(2, 'Beto', 'Demandado'), _rol(3, 'Dra. Paz', 'Abogado', representa_a_id=1)]
+        nodos = construir_nodos(roles)
+        self.assertEqual([n.iid for n in nodos], ['group_Actor', 'rol_1', 'rol_3', 'group_Demandado', 'rol_2', 'group_Abogado'])
+        representante = nodos[2]
+        self.assertEqual(representante.padre, 'rol_1')
+        self.assertEqual(representante.valores[1], '↳ Dra. Paz')
+        self.assertEqual(representante.tags, ('representative',))
+
+    def test_representacion_multiple(self):
+        roles = [_rol(1, 'Ana', 'Actor'), _rol(2, 'Beto', 'Actor'),
+                 _rol(3, 'Dra. Paz', 'Abogado', contacto_id=50),
+                 _rol(4, 'Dra. Paz', 'Abogado', representa_a_id=1, contacto_id=50)]
+        multiples = {50: {'lawyer_name': 'Dra. Paz', 'primary_role_id': 3, 'representations': [
+            {'rol_id': 4, 'represented_name': 'Ana', 'represented_role': 'Actor', 'is_secondary': True},
+            {'rol_id': 3, 'represented_name': 'Beto', 'represented_role': 'Actor', 'is_secondary': False},
+        ]}}
+        nodos = {n.iid: n for n in construir_nodos(roles, multiples)}
+        self.assertEqual(nodos['multi_rep_50'].padre, 'group_Abogado')
+        self.assertEqual(nodos['rep_50_1'].padre, 'multi_rep_50')
+        self.assertNotIn('rol_4', nodos)
+
+    def test_ordenar_roles(self):
+        roles = [_rol(1, 'Zoe', 'Perito'), _rol(2, 'Beto', 'Actor'), _rol(3, 'Ana', 'Actor'), _rol(4, 'Eva', 'Juez')]
+        self.assertEqual([r['rol_id'] for r in ordenar_roles(roles)], [3, 2, 1, 4])
+
+
+class TestAplicarDiferencias(unittest.TestCase):
+    """Test cases for the incremental Treeview update"""
+
+    def setUp(self):
+        self.roles = [_rol(1, 'Ana', 'Actor'), _rol(2, 'Beto', 'Demandado')]
+        self.arbol = ArbolFalso()
+        aplicar_diferencias(self.arbol, construir_nodos(self.roles))
+        self.arbol.operaciones.clear()
+
+    def test_sin_cambios_no_toca_el_arbol(self):
+        cambios = aplicar_diferencias(self.arbol, construir_nodos(self.roles))
+        self.assertEqual(self.arbol.operaciones, [])
+        self.assertEqual(set(cambios.values()), {0})
+
+    def test_alta_de_representante(self):
+        roles = self.roles + [_rol(3, 'Dra. Paz', 'Abogado', representa_a_id=2)]
+        cambios = aplicar_diferencias(self.arbol, construir_nodos(roles))
+        self.assertEqual(cambios['insertados'], 2)  # group_Abogado y rol_3
+        self.assertEqual(self.arbol.parent('rol_3'), 'rol_2')
+        self.assertNotIn('move', [op for op, _ in self.arbol.operaciones])
+
+    def test_edicion_y_baja(self):
+        roles = [dict(self.roles[0], nombre_completo='Ana María')]
+        cambios = aplicar_diferencias(self.arbol, construir_nodos(roles))
+        self.assertEqual(cambios['actualizados'], 1)
+        self.assertEqual(cambios['eliminados'], 1)  # borrar group_Demandado arrastra a rol_2
+        self.assertEqual(self.arbol.get_children(), ('group_Actor',))
+        self.assertIn('Ana María', self.arbol.item('rol_1', 'values')[1])
+
+    def test_cambio_de_representado_mueve_el_nodo(self):
+        aplicar_diferencias(self.arbol, construir_nodos(self.roles + [_rol(3, 'Dra. Paz', 'Abogado', representa_a_id=1)]))
+        self.arbol.operaciones.clear()
+        cambios = aplicar_diferencias(self.arbol, construir_nodos(self.roles + [_rol(3, 'Dra. Paz', 'Abogado', representa_a_id=2)]))
+        self.assertEqual(self.arbol.parent('rol_3'), 'rol_2')
+        self.assertEqual((cambios['insertados'], cambios['movidos'], cambios['eliminados']), (0, 1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests para la búsqueda global (omnibox)
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import Mock
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from busqueda_omnibox import ServicioOmnibox, construir_tsquery, normalizar_busqueda
+
+
+class TestNormalizacion(unittest.TestCase):
+    """Test cases for query normalization"""
+
+    def test_acentos_y_signos(self):
+        self.assertEqual(normalizar_busqueda("  Pérez, MUÑOZ s/ Daños"), "perez munoz s danos")
+
+    def test_expediente(self):
+        self.assertEqual(normalizar_busqueda("1234/2023"), "1234 2023")
+
+    def test_tsquery_de_prefijos(self):
+        self.assertEqual(construir_tsquery("García Lóp"), ("garcia:* & lop:*", "garcia lop"))
+        # Caracteres especiales de tsquery no llegan a la consulta
+        self.assertEqual(construir_tsquery("a & b | !c"), ("a:* & b:* & c:*", "a b c"))
+        self.assertIsNone(construir_tsquery(" -- "))
+
+
+class TestServicioOmnibox(unittest.TestCase):
+    """Test cases for the cached search service"""
+
+    def setUp(self):
+        self.ahora = 1000.0
+        self.db = Mock()
+        self.db.buscar_omnibox.return_value = [{'tipo': 'cliente', 'entidad_id': 1, 'titulo': 'Ana', 'detalle': ''}]
+        self.servicio = ServicioOmnibox(db_module=self.db, reloj=lambda: self.ahora)
+
+    def test_texto_corto_no_consulta(self):
+        self.assertEqual(self.servicio.buscar("a"), [])
+        self.db.buscar_omnibox.assert_not_called()
+
+    def test_cache_por_texto_normalizado(self):
+        self.servicio.buscar("Ána")
+        self.servicio.buscar("ana ")
+        self.db.buscar_omnibox.assert_called_once_with("ana:*", "ana", ServicioOmnibox.LIMITE)
+        self.assertEqual((self.servicio.aciertos, self.servicio.fallos), (1, 1))
+
+    def test_cache_vence_e_invalida(self):
+        self.servicio.buscar("ana")
+        self.ahora += ServicioOmnibox.VIGENCIA_CACHE_SEGUNDOS + 1
+        self.servicio.buscar("ana")
+        self.servicio.invalidar()
+        self.servicio.buscar("ana")
+        self.assertEqual(self.db.buscar_omnibox.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
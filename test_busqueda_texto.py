@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests para la búsqueda de texto completo (tsvector) en notas, actividades, tareas y consultas
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+
+
+class TestEsquemaBusqueda(unittest.TestCase):
+    """Test cases for the generated tsvector schema commands"""
+
+    def test_expresion_ponderada(self):
+        expresion = db._expresion_tsv((('caratula', 'A'), ('notas', 'B')), 'NEW.')
+        self.assertEqual(
+            expresion,
+            "setweight(to_tsvector('spanish', coalesce(NEW.caratula, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(NEW.notas, '')), 'B')",
+        )
+
+    def test_comandos_por_tabla(self):
+        comandos = " ".join(db._comandos_busqueda_texto())
+        for tabla, columnas in db.COLUMNAS_BUSQUEDA.items():
+            self.assertIn(f"idx_{tabla}_busqueda_tsv ON {tabla} USING GIN (busqueda_tsv)", comandos)
+            # El trigger sólo se dispara si cambia alguna de las columnas indexadas
+            lista = ", ".join(columna for columna, _ in columnas)
+            self.assertIn(f"BEFORE INSERT OR UPDATE OF {lista} ON {tabla}", comandos)
+
+
+class TestBuscarTextoCompleto(unittest.TestCase):
+    """Test cases for the ranked search query"""
+
+    def _ejecutar(self, *args, **kwargs):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = []
+        with patch.object(db, 'connect_db', return_value=conn):
+            db.buscar_texto_completo(*args, **kwargs)
+        return cursor.execute.call_args[0]
+
+    def test_texto_vacio_no_consulta(self):
+        with patch.object(db, 'connect_db') as connect:
+            self.assertEqual(db.buscar_texto_completo("   "), [])
+            connect.assert_not_called()
+
+    def test_filtro_por_caso_excluye_consultas(self):
+        sql, parametros = self._ejecutar("embargo", caso_id=7, limite=20)
+        self.assertNotIn("consultas x", sql)
+        self.assertEqual(parametros, ["embargo", 7, 20, 7, 20, 7, 20, 20])
+
+    def test_tipos_seleccionados(self):
+        sql, parametros = self._ejecutar("desalojo", tipos=['consulta'], limite=10)
+        self.assertIn("consultas x JOIN prospectos", sql)
+        self.assertNotIn("actividades_caso", sql)
+        self.assertEqual(parametros, ["desalojo", 10, 10])
+
+
+class CursorEsquema:
+    """Cursor que acepta los comandos de create_tables y simula migraciones ya registradas"""
+
+    def __init__(self, migraciones_aplicadas):
+        self.migraciones_aplicadas = set(migraciones_aplicadas)
+        self.sentencias = []
+        self.rowcount = 0
+        self._ultima = ("", None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sentencias.append((sql, params))
+        self._ultima = (sql, params)
+
+    def fetchone(self):
+        sql, params = self._ultima
+        if "FROM migraciones_aplicadas" in sql:
+            return (1,) if params[0] in self.migraciones_aplicadas else None
+        return (1,)
+
+    def fetchall(self):
+        return []
+
+
+class TestRellenoInicialBusqueda(unittest.TestCase):
+    """Test cases for the one-time busqueda_tsv backfill in create_tables"""
+
+    def _crear_tablas(self, migraciones_aplicadas):
+        cursor = CursorEsquema(migraciones_aplicadas)
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch.object(db, 'connect_db', return_value=conn), \
+                patch.object(db, '_avisos_precalculados', None), \
+                patch.object(db, 'migrar_representaciones_desde_notas', return_value=0):
+            db.create_tables()
+        conn.commit.assert_called_once()
+        return [sql for sql, _ in cursor.sentencias], [params for sql, params in cursor.sentencias
+                                                      if sql.startswith("INSERT INTO migraciones_aplicadas")]
+
+    def test_primer_arranque_rellena_y_registra(self):
+        sentencias, marcadas = self._crear_tablas(set())
+        for tabla in db.COLUMNAS_BUSQUEDA:
+            self.assertTrue(any(sql.startswith(f"UPDATE {tabla} SET busqueda_tsv") for sql in sentencias))
+            self.assertIn((f"busqueda_tsv_{tabla}",), marcadas)
+
+    def test_arranques_siguientes_no_recorren_las_tablas(self):
+        aplicadas = {f"busqueda_tsv_{tabla}" for tabla in db.COLUMNAS_BUSQUEDA}
+        sentencias, _ = self._crear_tablas(aplicadas)
+        self.assertFalse(any("SET busqueda_tsv" in sql and "IS NULL" in sql for sql in sentencias))
+
+
+if __name__ == '__main__':
+    unittest.main()
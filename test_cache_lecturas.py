@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests para la caché de lecturas de datos de referencia y entidades por ID
+"""
+
+import sys
+import os
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache_lecturas import CacheLectura
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class TestCacheLectura(unittest.TestCase):
+    """Test cases for TTL, LRU bound, invalidation and counters"""
+
+    def setUp(self):
+        self.reloj = _Reloj()
+        self.cargas = []
+
+    def _cargar(self, valor):
+        def cargar():
+            self.cargas.append(valor)
+            return valor
+        return cargar
+
+    def test_acierto_devuelve_copia(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        primero = cache.obtener(1, self._cargar({'id': 1, 'nombre': 'Caso'}))
+        primero['nombre'] = 'modificado'
+        segundo = cache.obtener(1, self._cargar({'id': 1, 'nombre': 'otro'}))
+        self.assertEqual(segundo['nombre'], 'Caso')
+        self.assertEqual(len(self.cargas), 1)
+        self.assertEqual((cache.aciertos, cache.fallos), (1, 1))
+
+    def test_vigencia(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        cache.obtener('todas', self._cargar(['a']))
+        self.reloj.ahora = 61
+        cache.obtener('todas', self._cargar(['a', 'b']))
+        self.assertEqual(len(self.cargas), 2)
+
+    def test_none_no_se_guarda(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        self.assertIsNone(cache.obtener(1, self._cargar(None)))
+        cache.obtener(1, self._cargar(None))
+        self.assertEqual(len(self.cargas), 2)
+
+    def test_lru_con_tope(self):
+        cache = CacheLectura('prueba', 60, max_entradas=2, reloj=self.reloj, registrar=False)
+        cache.obtener(1, self._cargar('uno'))
+        cache.obtener(2, self._cargar('dos'))
+        cache.obtener(1, self._cargar('uno'))  # 1 pasa a ser el más reciente
+        cache.obtener(3, self._cargar('tres'))  # desaloja 2
+        cache.obtener(1, self._cargar('uno'))
+        cache.obtener(2, self._cargar('dos'))
+        self.assertEqual(self.cargas, ['uno', 'dos', 'tres', 'dos'])
+        self.assertEqual(cache.estadisticas()['desalojos'], 2)
+
+    def test_invalidar_clave_y_todo(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        cache.obtener(1, self._cargar('uno'))
+        cache.obtener(2, self._cargar('dos'))
+        cache.invalidar(1)
+        cache.obtener(2, self._cargar('dos'))
+        cache.obtener(1, self._cargar('uno'))
+        self.assertEqual(self.cargas, ['uno', 'dos', 'uno'])
+        cache.invalidar()
+        self.assertEqual(cache.estadisticas()['entradas'], 0)
+
+    def test_invalidacion_durante_la_carga_descarta_resultado(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+
+        def cargar_con_cambio():
+            cache.invalidar(1)  # otro hilo modifica el registro mientras se lee
+            return 'viejo'
+
+        self.assertEqual(cache.obtener(1, cargar_con_cambio), 'viejo')
+        self.assertEqual(cache.obtener(1, self._cargar('nuevo')), 'nuevo')
+
+    def test_obtener_varias_carga_solo_faltantes(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        cache.obtener('b', self._cargar(['B']))
+        pedidas = []
+
+        def cargar_varias(claves):
+            pedidas.append(claves)
+            return {clave: [clave.upper()] for clave in claves}
+
+        self.assertEqual(cache.obtener_varias(['a', 'b', 'c'], cargar_varias), {'a': ['A'], 'b': ['B'], 'c': ['C']})
+        self.assertEqual(pedidas, [['a', 'c']])
+        self.assertEqual(cache.obtener_varias(['c', 'a'], cargar_varias), {'c': ['C'], 'a': ['A']})
+        self.assertEqual(len(pedidas), 1)
+        self.assertIsNone(cache.obtener_varias(['d'], lambda claves: None))
+
+    def test_estadisticas(self):
+        cache = CacheLectura('prueba', 60, reloj=self.reloj, registrar=False)
+        for _ in range(4):
+            cache.obtener(1, self._cargar('uno'))
+        estadisticas = cache.estadisticas()
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos']), (3, 1))
+        self.assertEqual(estadisticas['tasa_aciertos'], 0.75)
+        cache.reiniciar_contadores()
+        self.assertEqual(cache.estadisticas()['aciertos'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
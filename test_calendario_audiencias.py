@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests para los datos por mes del calendario de audiencias de la agenda global
+"""
+
+import sys
+import os
+import unittest
+import datetime
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from calendario_audiencias import CalendarioAudiencias, mes_relativo
+
+
+def _audiencia(audiencia_id, fecha, hora='10:00'):
+    return {'id': audiencia_id, 'caso_id': 1, 'fecha': fecha, 'hora': hora,
+            'descripcion': 'Audiencia', 'caso_caratula': 'Pérez c/ ACME'}
+
+
+AUDIENCIAS = [
+    _audiencia(1, datetime.date(2025, 5, 30)),
+    _audiencia(2, datetime.date(2025, 6, 2), '09:00'),
+    _audiencia(3, datetime.date(2025, 6, 2), '11:30'),
+    _audiencia(4, datetime.date(2025, 7, 1)),
+    _audiencia(5, datetime.date(2025, 9, 15)),
+]
+
+
+class TestMeses(unittest.TestCase):
+    """Test cases for month arithmetic and range grouping"""
+
+    def test_mes_relativo(self):
+        self.assertEqual(mes_relativo(2025, 1, -1), (2024, 12))
+        self.assertEqual(mes_relativo(2025, 12, 2), (2026, 2))
+        self.assertEqual(CalendarioAudiencias.meses_visibles(2025, 6), [(2025, 5), (2025, 6), (2025, 7)])
+
+    def test_tramos_consecutivos(self):
+        self.assertEqual(db._tramos_de_meses([(2025, 12), (2025, 11), (2026, 2)]), [
+            (datetime.date(2025, 11, 1), datetime.date(2026, 1, 1)),
+            (datetime.date(2026, 2, 1), datetime.date(2026, 3, 1)),
+        ])
+
+
+class TestCalendarioAudiencias(unittest.TestCase):
+    """Test cases for month loading, caching, prefetch and invalidation"""
+
+    def setUp(self):
+        db.cache_audiencias_mes.invalidar()
+        self.cur = MagicMock()
+        self.cur.execute.side_effect = self._ejecutar
+        self.cur.fetchall.side_effect = lambda: self.filas
+        self.conn = MagicMock()
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+        parche = patch.object(db, 'connect_db', return_value=self.conn)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.addCleanup(db.cache_audiencias_mes.invalidar)
+        self.calendario = CalendarioAudiencias()
+        self.rangos = []
+
+    def _ejecutar(self, sql, params=None):
+        self.rangos.append(params)
+        if params and len(params) == 2 and isinstance(params[0], datetime.date):
+            desde, hasta = params
+            self.filas = [dict(a) for a in AUDIENCIAS if desde <= a['fecha'] < hasta]
+        else:
+            self.filas = [{'caso_id': 1, 'fecha': datetime.date(2025, 6, 2)}]
+            self.cur.fetchone.return_value = self.filas[0]
+            self.cur.rowcount = 1
+
+    def test_mes_visible_en_una_consulta_y_dia_desde_cache(self):
+        fechas = self.calendario.fechas_con_audiencias(2025, 6)
+        self.assertEqual(fechas, [datetime.date(2025, 5, 30), datetime.date(2025, 6, 2), datetime.date(2025, 7, 1)])
+        self.assertEqual(self.rangos, [(datetime.date(2025, 5, 1), datetime.date(2025, 8, 1))])
+        dia = self.calendario.audiencias_del_dia('2025-06-02')
+        self.assertEqual([a['id'] for a in dia], [2, 3])
+        self.assertEqual(len(self.rangos), 1)
+
+    def test_precarga_de_vecinos(self):
+        self.calendario.fechas_con_audiencias(2025, 6)
+        self.calendario.precargar_vecinos(2025, 6)
+        self.assertEqual(self.rangos[1:], [(datetime.date(2025, 4, 1), datetime.date(2025, 5, 1)),
+                                           (datetime.date(2025, 8, 1), datetime.date(2025, 9, 1))])
+        self.calendario.fechas_con_audiencias(2025, 7)
+        self.assertEqual(len(self.rangos), 3)
+
+    def test_borrar_audiencia_invalida_solo_su_mes(self):
+        self.calendario.fechas_con_audiencias(2025, 6)
+        with patch.object(db, 'update_last_activity'):
+            self.assertTrue(db.delete_audiencia(2))
+        del self.rangos[:]
+        self.calendario.fechas_con_audiencias(2025, 6)
+        self.assertEqual(self.rangos, [(datetime.date(2025, 6, 1), datetime.date(2025, 7, 1))])
+
+    def test_aviso_remoto_invalida_todo(self):
+        self.calendario.fechas_con_audiencias(2025, 6)
+        db.notificar_cambio('audiencias', 'UPDATE', 4, 1, remoto=True)
+        del self.rangos[:]
+        self.calendario.fechas_con_audiencias(2025, 6)
+        self.assertEqual(len(self.rangos), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
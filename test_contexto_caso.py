@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests para el contexto de caso compartido por documentos, modelos de escritos y el agente IA
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from contexto_caso import ContextoCaso
+
+
+def _rol(rol_id, contacto_id, rol_principal, nombre, representa_a_id=None):
+    return {'rol_id': rol_id, 'caso_id': 7, 'contacto_id': contacto_id, 'rol_principal': rol_principal,
+            'representa_a_id': representa_a_id, 'nombre_completo': nombre, 'datos_bancarios': None}
+
+
+ROLES = [
+    _rol(1, 10, 'Abogado', 'Dra. Ruiz', representa_a_id=3),
+    _rol(2, 11, 'Demandado', 'ACME S.A.'),
+    _rol(3, 12, 'Actor', 'Juan Pérez'),
+    _rol(4, 10, 'Abogado', 'Dra. Ruiz', representa_a_id=3),  # sombra de una representación múltiple
+    _rol(5, 13, 'Apoderado', 'Carlos Gómez', representa_a_id=2),
+]
+
+
+class TestContextoCaso(unittest.TestCase):
+    """Test cases for party selection and representative lookup"""
+
+    def setUp(self):
+        self.contexto = ContextoCaso({'id': 7, 'caratula': 'Pérez c/ ACME'}, {'nombre': 'Juan Pérez'}, ROLES)
+
+    def test_orden_y_partes(self):
+        self.assertEqual([rol['rol_id'] for rol in self.contexto.roles], [3, 2, 1, 4, 5])
+        self.assertEqual([rol['rol_id'] for rol in self.contexto.actores], [3])
+        self.assertEqual([rol['rol_id'] for rol in self.contexto.demandados], [2])
+
+    def test_representantes_un_rol_por_contacto(self):
+        self.assertEqual([rol['rol_id'] for rol in self.contexto.representantes_de(3)], [1])
+        self.assertEqual([rol['nombre_completo'] for rol in self.contexto.representantes_de(2)], ['Carlos Gómez'])
+        self.assertEqual(self.contexto.representantes_de(99), [])
+
+    def test_como_dict(self):
+        datos = self.contexto.como_dict()
+        self.assertEqual(datos['caso']['id'], 7)
+        self.assertEqual(datos['abogado'], {})
+        self.assertEqual(len(datos['partes'][0]['representantes']), 1)
+
+
+class TestGetContextoCaso(unittest.TestCase):
+    """Test cases for the single-query load, caching and invalidation"""
+
+    def setUp(self):
+        db.cache_contextos.invalidar()
+        self.cur = MagicMock()
+        self.cur.fetchone.side_effect = lambda: {
+            'id': 7, 'caratula': 'Pérez c/ ACME', 'nombre_cliente': 'Juan Pérez',
+            'contexto_cliente': {'id': 3, 'nombre': 'Juan Pérez'},
+            'contexto_abogado': {'nombre_abogado': 'Dra. Ruiz'},
+            'contexto_roles': [dict(rol) for rol in ROLES],
+        }
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        parche = patch.object(db, 'connect_db', return_value=conn)
+        self.connect_db = parche.start()
+        self.addCleanup(parche.stop)
+        self.addCleanup(db.cache_contextos.invalidar)
+
+    def test_una_consulta_y_luego_cache(self):
+        contexto = db.get_contexto_caso(7)
+        self.assertEqual(contexto.caso, {'id': 7, 'caratula': 'Pérez c/ ACME', 'nombre_cliente': 'Juan Pérez'})
+        self.assertEqual(contexto.abogado['nombre_abogado'], 'Dra. Ruiz')
+        contexto.caso['caratula'] = 'modificada'
+        self.assertEqual(db.get_contexto_caso(7).caso['caratula'], 'Pérez c/ ACME')
+        self.assertEqual(self.cur.execute.call_count, 1)
+
+    def test_cambio_de_roles_invalida(self):
+        db.get_contexto_caso(7)
+        db.notificar_cambio('roles_en_caso', 'UPDATE', 1, 7, remoto=True)
+        db.get_contexto_caso(7)
+        db.notificar_cambio('casos', 'UPDATE', 7)
+        db.get_contexto_caso(7)
+        self.assertEqual(self.cur.execute.call_count, 3)
+
+    def test_partes_legacy_desde_el_contexto(self):
+        partes = db.get_parties_by_case_id(7)
+        self.assertEqual([parte['rol'] for parte in partes], ['Abogado', 'Abogado', 'Actor', 'Apoderado', 'Demandado'])
+        self.assertEqual(partes[2]['id'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
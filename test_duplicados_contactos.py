@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Tests para la detección en lote de contactos duplicados
+"""
+
+import sys
+import os
+import csv
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import psycopg2
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from duplicados_contactos import (ContactoNormalizado, clave_fonetica, construir_bloques, detectar_duplicados,
+                                  exportar_reporte_csv, normalizar_nombre, puntuar_par)
+
+
+def _contacto(contacto_id, nombre, dni='', cuit='', email='', telefono='', roles=0):
+    return {'id': contacto_id, 'nombre_completo': nombre, 'dni': dni, 'cuit': cuit, 'email': email,
+            'telefono': telefono, 'cantidad_roles': roles, 'es_persona_juridica': False}
+
+
+class TestNormalizacion(unittest.TestCase):
+    """Test cases for name normalization and the phonetic key"""
+
+    def test_normalizar_nombre(self):
+        self.assertEqual(normalizar_nombre("Pérez, Juan Carlos"), 'perez juan carlos')
+        self.assertEqual(normalizar_nombre("ACME S.A."), 'acme')
+        self.assertEqual(normalizar_nombre("Dra. María de la Paz"), 'maria paz')
+
+    def test_clave_fonetica(self):
+        self.assertEqual(clave_fonetica('gimenez'), clave_fonetica('jimenez'))
+        self.assertEqual(clave_fonetica('villalba'), clave_fonetica('billalva'))
+        self.assertEqual(clave_fonetica('gonzalez'), clave_fonetica('gonzales'))
+        self.assertNotEqual(clave_fonetica('guerra'), clave_fonetica('jerra'))
+        # Las vocales distinguen el género y nombres distintos
+        self.assertNotEqual(clave_fonetica('juan'), clave_fonetica('juana'))
+        self.assertNotEqual(clave_fonetica('mario'), clave_fonetica('maria'))
+
+    def test_dni_desde_cuil(self):
+        contacto = ContactoNormalizado(_contacto(1, 'Ana', cuit='27-12345678-0'))
+        self.assertEqual(contacto.dni, '12345678')
+
+
+class TestPuntaje(unittest.TestCase):
+    """Test cases for pairwise scoring"""
+
+    def _puntaje(self, a, b):
+        return puntuar_par(ContactoNormalizado(a), ContactoNormalizado(b))[0]
+
+    def test_dni_distinto_descarta(self):
+        self.assertEqual(self._puntaje(_contacto(1, 'Juan Pérez', dni='1111111'),
+                                       _contacto(2, 'Juan Pérez', dni='2222222')), 0.0)
+
+    def test_mismo_dni_y_nombre_parecido_es_seguro(self):
+        self.assertGreaterEqual(self._puntaje(_contacto(1, 'Gimenez, Juan', dni='12.345.678'),
+                                              _contacto(2, 'Juan Jiménez', dni='12345678')), 0.95)
+
+    def test_solo_email_compartido_no_alcanza(self):
+        self.assertLess(self._puntaje(_contacto(1, 'Estudio Ruiz', email='info@ruiz.com'),
+                                      _contacto(2, 'Marta Gómez', email='info@ruiz.com')), 0.75)
+
+
+class TestDeteccion(unittest.TestCase):
+    """Test cases for blocking, clustering and the report"""
+
+    def setUp(self):
+        self.contactos = [
+            _contacto(1, 'Juan Carlos Pérez', dni='20111222', roles=1),
+            _contacto(2, 'PEREZ JUAN CARLOS', dni='20.111.222', roles=3),
+            _contacto(3, 'Juan C. Perez', cuit='20-20111222-3', email='jp@mail.com'),
+            _contacto(4, 'Juan Carlos Peres', dni='30999888'),  # otra persona, mismo nombre
+            _contacto(5, 'Lucía Fernández', email='lucia@mail.com'),
+            _contacto(6, 'Lucia Fernandez', email='LUCIA@mail.com '),
+            _contacto(7, 'Roberto Díaz'),
+        ]
+
+    def test_grupos_sin_encadenar_documentos_distintos(self):
+        propuestas = detectar_duplicados(self.contactos)
+        grupos = {tuple(p['contacto_ids']): p for p in propuestas}
+        self.assertIn((5, 6), grupos)
+        grupo_perez = next(p for p in propuestas if 1 in p['contacto_ids'])
+        self.assertNotIn(4, grupo_perez['contacto_ids'])
+        self.assertEqual(grupo_perez['conservar_id'], 2)  # el que más roles tiene
+        self.assertTrue(grupo_perez['segura'])
+        self.assertFalse(any(7 in p['contacto_ids'] for p in propuestas))
+
+    def test_sin_dni_ni_cuit_nunca_es_segura(self):
+        propuestas = detectar_duplicados([
+            _contacto(1, 'Juan Pérez', telefono='11 4444-5555'),
+            _contacto(2, 'Juana Pérez', telefono='1144445555'),
+            _contacto(3, 'Lucía Fernández', email='lucia@mail.com'),
+            _contacto(4, 'Lucia Fernandez', email='lucia@mail.com'),
+        ])
+        self.assertFalse(any(p['segura'] for p in propuestas))
+        self.assertFalse(any(1 in p['contacto_ids'] and 2 in p['contacto_ids'] and p['puntaje'] >= 0.95
+                             for p in propuestas))
+        self.assertIn([3, 4], [p['contacto_ids'] for p in propuestas])
+
+    def test_bloques_grandes_se_omiten(self):
+        contactos = [ContactoNormalizado(_contacto(i, 'Juan Pérez', email='mismo@mail.com')) for i in range(10)]
+        self.assertNotIn('email:mismo@mail.com', construir_bloques(contactos, max_bloque=5))
+
+    def test_reporte_csv(self):
+        propuestas = detectar_duplicados(self.contactos)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'duplicados.csv')
+            self.assertEqual(exportar_reporte_csv(propuestas, ruta), len(propuestas))
+            with open(ruta, encoding='utf-8-sig') as archivo:
+                filas = list(csv.DictReader(archivo))
+        self.assertEqual(len(filas), sum(len(p['contacto_ids']) for p in propuestas))
+        self.assertEqual({f['accion'] for f in filas}, {'conservar', 'fusionar'})
+
+
+# Tablas mínimas con las mismas restricciones que create_tables
+ESQUEMA_FUSION = """
+    CREATE TABLE contactos (
+        id SERIAL PRIMARY KEY, nombre_completo TEXT NOT NULL, dni TEXT, cuit TEXT,
+        domicilio_real TEXT, domicilio_legal TEXT, email TEXT, telefono TEXT, notas_generales TEXT
+    );
+    CREATE TABLE casos (id SERIAL PRIMARY KEY, caratula TEXT);
+    CREATE TABLE roles_en_caso (
+        id SERIAL PRIMARY KEY,
+        caso_id INTEGER NOT NULL REFERENCES casos(id) ON DELETE CASCADE,
+        contacto_id INTEGER NOT NULL REFERENCES contactos(id) ON DELETE CASCADE,
+        rol_principal TEXT NOT NULL, rol_secundario TEXT,
+        representa_a_id INTEGER REFERENCES roles_en_caso(id) ON DELETE SET NULL,
+        datos_bancarios TEXT, notas_del_rol TEXT, created_at BIGINT,
+        UNIQUE (caso_id, contacto_id, rol_principal)
+    );
+    CREATE TABLE representaciones (
+        id SERIAL PRIMARY KEY, grupo_id TEXT NOT NULL,
+        caso_id INTEGER NOT NULL REFERENCES casos(id) ON DELETE CASCADE,
+        rol_abogado_id INTEGER NOT NULL REFERENCES roles_en_caso(id) ON DELETE CASCADE,
+        rol_representado_id INTEGER NOT NULL REFERENCES roles_en_caso(id) ON DELETE CASCADE,
+        rol_sombra_id INTEGER REFERENCES roles_en_caso(id) ON DELETE SET NULL,
+        created_at BIGINT,
+        UNIQUE (grupo_id, rol_representado_id)
+    );
+"""
+
+
+@unittest.skipUnless(os.environ.get("LPMS_TEST_DSN"),
+                     "Requiere una base PostgreSQL de prueba; definir LPMS_TEST_DSN")
+class TestFusionarContactosEnBase(unittest.TestCase):
+    """Test cases for fusionar_contactos against a PostgreSQL schema created for the test"""
+
+    def setUp(self):
+        dsn = os.environ["LPMS_TEST_DSN"]
+        self.esquema = f"prueba_fusion_{os.getpid()}"
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        self.cur = self.conn.cursor()
+        self.cur.execute(f"CREATE SCHEMA {self.esquema}")
+        self.addCleanup(self.conn.close)
+        self.addCleanup(self.cur.execute, f"DROP SCHEMA {self.esquema} CASCADE")
+        self.cur.execute(f"SET search_path TO {self.esquema}")
+        self.cur.execute(ESQUEMA_FUSION)
+        conectar = lambda: psycopg2.connect(dsn, options=f"-c search_path={self.esquema}")
+        parche = patch.object(db, 'connect_db', side_effect=conectar)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _insertar(self, sql, params):
+        self.cur.execute(sql + " RETURNING id", params)
+        return self.cur.fetchone()[0]
+
+    def _contacto(self, nombre, **datos):
+        columnas = ['nombre_completo', *datos]
+        return self._insertar(f"INSERT INTO contactos ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})",
+                              [nombre, *datos.values()])
+
+    def _rol(self, caso_id, contacto_id, rol_principal, representa_a_id=None):
+        return self._insertar("INSERT INTO roles_en_caso (caso_id, contacto_id, rol_principal, representa_a_id) "
+                              "VALUES (%s, %s, %s, %s)", (caso_id, contacto_id, rol_principal, representa_a_id))
+
+    def _roles(self, contacto_id):
+        self.cur.execute("SELECT id, caso_id, rol_principal, representa_a_id FROM roles_en_caso "
+                         "WHERE contacto_id = %s ORDER BY id", (contacto_id,))
+        return self.cur.fetchall()
+
+    def test_reasigna_roles_y_completa_datos(self):
+        caso = self._insertar("INSERT INTO casos (caratula) VALUES (%s)", ('Pérez c/ Gómez',))
+        conservar = self._contacto('Juan Carlos Pérez', dni='20111222')
+        repetido = self._contacto('PEREZ JUAN CARLOS', email='jp@mail.com', notas_generales='Cargado dos veces')
+        actor = self._rol(caso, repetido, 'Actor')
+
+        resultado = db.fusionar_contactos(conservar, [repetido])
+
+        self.assertEqual(resultado['roles_reasignados'], 1)
+        self.assertEqual(resultado['contactos_eliminados'], 1)
+        self.assertEqual(self._roles(conservar), [(actor, caso, 'Actor', None)])
+        self.cur.execute("SELECT dni, email, notas_generales FROM contactos WHERE id = %s", (conservar,))
+        self.assertEqual(self.cur.fetchone(), ('20111222', 'jp@mail.com', 'Cargado dos veces'))
+
+    def test_mismo_rol_representando_a_partes_distintas(self):
+        caso = self._insertar("INSERT INTO casos (caratula) VALUES (%s)", ('Ruiz y otros c/ ACME',))
+        ana = self._rol(caso, self._contacto('Ana Ruiz'), 'Actor')
+        beto = self._rol(caso, self._contacto('Beto Ruiz'), 'Actor')
+        conservar = self._contacto('Dra. Paz', cuit='27-12345678-0')
+        repetido = self._contacto('Paz, María', cuit='27123456780')
+        abogado_ana = self._rol(caso, conservar, 'Abogado', ana)
+        abogado_beto = self._rol(caso, repetido, 'Abogado', beto)
+        # Un apoderado que dependía del rol que se va a eliminar
+        apoderado = self._rol(caso, self._contacto('Dr. Sosa'), 'Apoderado', abogado_beto)
+
+        resultado = db.fusionar_contactos(conservar, [repetido])
+
+        self.assertIsNotNone(resultado)
+        self.assertEqual(resultado['roles_unificados'], 1)
+        self.assertEqual(self._roles(conservar), [(abogado_ana, caso, 'Abogado', ana)])
+        self.cur.execute("SELECT representa_a_id FROM roles_en_caso WHERE id = %s", (apoderado,))
+        self.assertEqual(self.cur.fetchone()[0], abogado_ana)
+        self.cur.execute("SELECT rol_abogado_id, rol_representado_id FROM representaciones ORDER BY rol_representado_id")
+        self.assertEqual(self.cur.fetchall(), [(abogado_ana, ana), (abogado_ana, beto)])
+
+    def test_el_conservado_hereda_el_representado(self):
+        caso = self._insertar("INSERT INTO casos (caratula) VALUES (%s)", ('Díaz c/ Díaz',))
+        parte = self._rol(caso, self._contacto('Lucía Díaz'), 'Demandado')
+        conservar = self._contacto('Dr. Ruiz')
+        repetido = self._contacto('Ruiz, Dr.')
+        abogado = self._rol(caso, conservar, 'Abogado')
+        self._rol(caso, repetido, 'Abogado', parte)
+
+        self.assertIsNotNone(db.fusionar_contactos(conservar, [repetido]))
+        self.assertEqual(self._roles(conservar), [(abogado, caso, 'Abogado', parte)])
+        self.cur.execute("SELECT COUNT(*) FROM representaciones")
+        self.assertEqual(self.cur.fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
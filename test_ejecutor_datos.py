@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests para el ejecutor de consultas en segundo plano
+"""
+
+import sys
+import os
+import threading
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ejecutor_datos import EjecutorDatos
+
+
+class RootFalso:
+    """Simula root.after acumulando las llamadas para ejecutarlas en el hilo del test."""
+
+    def __init__(self):
+        self.cola = []
+        self.lock = threading.Lock()
+
+    def after(self, ms, funcion, *args):
+        with self.lock:
+            self.cola.append((funcion, args))
+
+    def procesar(self):
+        with self.lock:
+            cola, self.cola = self.cola, []
+        for funcion, args in cola:
+            funcion(*args)
+
+
+class TestEjecutorDatos(unittest.TestCase):
+    """Test cases for delivery, staleness and loading indicators"""
+
+    def setUp(self):
+        self.root = RootFalso()
+        self.ejecutor = EjecutorDatos(max_hilos=2, root=self.root)
+
+    def tearDown(self):
+        self.ejecutor.apagar(esperar=True)
+
+    def _esperar(self, *futuros):
+        for futuro in futuros:
+            try:
+                futuro.result(timeout=5)
+            except Exception:
+                pass
+        self.root.procesar()
+
+    def test_resultado_se_entrega_por_after(self):
+        resultados = []
+        futuro = self.ejecutor.enviar(lambda a, b: a + b, 2, 3, al_completar=resultados.append)
+        futuro.result(timeout=5)
+        self.assertEqual(resultados, [])  # todavía no pasó por el hilo de Tk
+        self.root.procesar()
+        self.assertEqual(resultados, [5])
+
+    def test_envio_obsoleto_se_descarta(self):
+        liberar = threading.Event()
+        resultados = []
+
+        def lento(valor):
+            liberar.wait(5)
+            return valor
+
+        primero = self.ejecutor.enviar(lento, 'caso 1', clave='partes', al_completar=resultados.append)
+        segundo = self.ejecutor.enviar(lento, 'caso 2', clave='partes', al_completar=resultados.append)
+        liberar.set()
+        self._esperar(primero, segundo)
+        self.assertEqual(resultados, ['caso 2'])
+        self.assertEqual(self.ejecutor.descartados, 1)
+
+    def test_error_va_a_al_fallar(self):
+        errores = []
+
+        def falla():
+            raise ValueError("sin conexión")
+
+        futuro = self.ejecutor.enviar(falla, clave='x', al_fallar=errores.append)
+        self._esperar(futuro)
+        self.assertEqual(len(errores), 1)
+        self.assertIsInstance(errores[0], ValueError)
+
+    def test_indicador_sigue_a_los_pendientes(self):
+        liberar = threading.Event()
+        estados = []
+        f1 = self.ejecutor.enviar(liberar.wait, 5, clave='agenda', indicador=estados.append)
+        f2 = self.ejecutor.enviar(liberar.wait, 5, clave='agenda', indicador=estados.append)
+        self.assertEqual(estados, [True])
+        self.assertEqual(self.ejecutor.pendientes('agenda'), 2)
+        liberar.set()
+        self._esperar(f1, f2)
+        self.assertEqual(estados, [True, False])
+        self.assertEqual(self.ejecutor.pendientes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests para las utilidades de escritura por lotes de la capa de datos
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escritura_lotes
+from escritura_lotes import actualizar_lote, copiar_lote, eliminar_lote, insertar_lote, lotes, transaccion
+
+
+class TestInsertarLote(unittest.TestCase):
+    """Test cases for multi-row INSERT and the COPY switch"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        parche = patch('escritura_lotes.psycopg2.extras.execute_values', return_value=[(1,), (2,)])
+        self.execute_values = parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_una_sentencia_con_conflicto_y_retorno(self):
+        filas = [(9, 'a'), (9, 'b')]
+        resultado = insertar_lote(self.cur, 'caso_etiquetas', ['caso_id', 'etiqueta_id'], filas,
+                                  conflicto='DO NOTHING', retorno='etiqueta_id')
+        self.assertEqual(resultado, [(1,), (2,)])
+        self.execute_values.assert_called_once()
+        consulta = self.execute_values.call_args[0][1]
+        self.assertEqual(consulta, "INSERT INTO caso_etiquetas (caso_id, etiqueta_id) VALUES %s "
+                                   "ON CONFLICT DO NOTHING RETURNING etiqueta_id")
+        self.assertTrue(self.execute_values.call_args[1]['fetch'])
+
+    def test_conflicto_sin_retorno_cuenta_filas_insertadas(self):
+        self.execute_values.return_value = [(1,)]
+        cantidad = insertar_lote(self.cur, 'etiquetas', ['nombre_etiqueta'], [('x',), ('y',)],
+                                 conflicto='(nombre_etiqueta) DO NOTHING')
+        self.assertEqual(cantidad, 1)
+        self.assertTrue(self.execute_values.call_args[0][1].endswith('RETURNING 1'))
+
+    def test_lote_grande_sin_conflicto_usa_copy(self):
+        filas = [(i, None, True) for i in range(escritura_lotes.UMBRAL_COPY)]
+        self.assertEqual(insertar_lote(self.cur, 'tabla', ['a', 'b', 'c'], filas), len(filas))
+        self.execute_values.assert_not_called()
+        self.cur.copy_expert.assert_called_once()
+
+    def test_vacio_no_va_al_servidor(self):
+        self.assertEqual(insertar_lote(self.cur, 'tabla', ['a'], []), 0)
+        self.assertEqual(insertar_lote(self.cur, 'tabla', ['a'], [], retorno='id'), [])
+        self.execute_values.assert_not_called()
+
+    def test_identificador_invalido(self):
+        with self.assertRaises(ValueError):
+            insertar_lote(self.cur, 'tabla; DROP TABLE casos', ['a'], [(1,)])
+
+
+class TestOtrasOperaciones(unittest.TestCase):
+    """Test cases for batch UPDATE, DELETE and COPY"""
+
+    def test_copiar_lote_envia_csv_con_nulos(self):
+        cur = MagicMock()
+        enviado = {}
+        cur.copy_expert.side_effect = lambda consulta, buffer: enviado.update(consulta=consulta, datos=buffer.read())
+        self.assertEqual(copiar_lote(cur, 'contactos', ['nombre_completo', 'dni'], [('Ana, María', None), ('Beto', '123')]), 2)
+        self.assertEqual(enviado['datos'], '"Ana, María",\\N\nBeto,123\n')
+        self.assertIn("COPY contactos (nombre_completo, dni) FROM STDIN", enviado['consulta'])
+
+    def test_actualizar_lote(self):
+        cur = MagicMock()
+        with patch('escritura_lotes.psycopg2.extras.execute_values') as execute_values:
+            actualizar_lote(cur, 'roles_en_caso', 'id', ['representa_a_id'], [(1, None), (2, 5)])
+        self.assertEqual(execute_values.call_args[0][1],
+                         "UPDATE roles_en_caso AS t SET representa_a_id = v.representa_a_id "
+                         "FROM (VALUES %s) AS v (id, representa_a_id) WHERE t.id = v.id")
+
+    def test_eliminar_lote_con_filtro(self):
+        cur = MagicMock()
+        eliminar_lote(cur, 'caso_etiquetas', 'etiqueta_id', [3, 4], filtro=('caso_id', 9))
+        cur.execute.assert_called_once_with(
+            "DELETE FROM caso_etiquetas WHERE etiqueta_id = ANY(%s) AND caso_id = %s", [[3, 4], 9])
+
+    def test_lotes(self):
+        self.assertEqual(list(lotes(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+class TestTransaccion(unittest.TestCase):
+    """Test cases for the single-transaction context manager"""
+
+    def test_confirma_o_deshace(self):
+        conn = MagicMock()
+        with transaccion(lambda: conn):
+            pass
+        conn.commit.assert_called_once()
+
+        conn = MagicMock()
+        with self.assertRaises(RuntimeError):
+            with transaccion(lambda: conn):
+                raise RuntimeError("falla")
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+        conn.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests para la escucha de cambios por LISTEN/NOTIFY
+"""
+
+import sys
+import os
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from escucha_cambios import EscuchaCambios
+
+
+class TestProcesarNotificacion(unittest.TestCase):
+    """Test cases for payload handling"""
+
+    def setUp(self):
+        self.db = Mock()
+        self.db.ID_SESION_APP = 'lpms-propia'
+        self.escucha = EscuchaCambios(db_module=self.db)
+
+    def test_evento_remoto_se_reenvia(self):
+        payload = json.dumps({'tabla': 'tareas', 'op': 'UPDATE', 'id': 5, 'caso_id': 2, 'origen': 'lpms-otra'})
+        self.escucha.procesar_notificacion(payload)
+        self.db.notificar_cambio.assert_called_once_with('tareas', 'UPDATE', 5, 2, remoto=True)
+        self.assertEqual(self.escucha.eventos_recibidos, 1)
+
+    def test_evento_propio_se_descarta(self):
+        payload = json.dumps({'tabla': 'tareas', 'op': 'INSERT', 'id': 5, 'caso_id': 2, 'origen': 'lpms-propia'})
+        self.escucha.procesar_notificacion(payload)
+        self.db.notificar_cambio.assert_not_called()
+        self.assertEqual(self.escucha.eventos_propios_descartados, 1)
+
+    def test_payload_invalido(self):
+        self.escucha.procesar_notificacion('no es json')
+        self.db.notificar_cambio.assert_not_called()
+
+
+class TestIdentificacionDeSesion(unittest.TestCase):
+    """Test cases for the application_name that tags this instance's notifications"""
+
+    def test_application_name_configurado_no_reemplaza_el_id_de_sesion(self):
+        config = {'host': 'localhost', 'database': 'crm', 'application_name': 'LPMS Estudio'}
+        with patch.object(db, 'get_db_config', return_value=config), \
+                patch.object(db.psycopg2, 'connect') as connect:
+            db.connect_db()
+        self.assertEqual(connect.call_args[1]['application_name'], db.ID_SESION_APP)
+
+
+class TestNotificarCambio(unittest.TestCase):
+    """Test cases for the change event delivered to in-process listeners"""
+
+    def setUp(self):
+        self.eventos = []
+        self.addCleanup(db.quitar_listener_cambios, self._escuchar)
+        db.registrar_listener_cambios(self._escuchar)
+
+    def _escuchar(self, tabla, operacion, registro_id, caso_id, remoto=False):
+        self.eventos.append((tabla, operacion, registro_id, caso_id, remoto))
+
+    def test_evento_local_y_remoto(self):
+        db.notificar_cambio('movimientos_cuenta', 'INSERT', 10, 2)
+        db.notificar_cambio('movimientos_cuenta', 'DELETE', 10, 2, remoto=True)
+        self.assertEqual(self.eventos, [('movimientos_cuenta', 'INSERT', 10, 2, False),
+                                        ('movimientos_cuenta', 'DELETE', 10, 2, True)])
+
+    def test_listener_con_error_no_corta_la_entrega(self):
+        def falla(*args, **kwargs):
+            raise RuntimeError("listener roto")
+        db.quitar_listener_cambios(self._escuchar)
+        db.registrar_listener_cambios(falla)
+        db.registrar_listener_cambios(self._escuchar)
+        self.addCleanup(db.quitar_listener_cambios, falla)
+        db.notificar_cambio('tareas', 'UPDATE', 5)
+        self.assertEqual(self.eventos, [('tareas', 'UPDATE', 5, None, False)])
+
+    def test_registrar_dos_veces_no_duplica(self):
+        db.registrar_listener_cambios(self._escuchar)
+        db.notificar_cambio('casos', 'UPDATE', 1, 1)
+        self.assertEqual(len(self.eventos), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests para el listado de carpetas con caché del explorador de documentos
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from explorador_documentos import CacheCarpetas, escanear_carpeta, formatear_tamano, valores_fila
+
+
+class TestExploradorDocumentos(unittest.TestCase):
+    """Test cases for folder scanning and the mtime-keyed cache"""
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.carpeta, 'Pruebas'))
+        for nombre in ('demanda.pdf', 'Anexo.docx'):
+            with open(os.path.join(self.carpeta, nombre), 'wb') as f:
+                f.write(b'x' * 2048)
+
+    def tearDown(self):
+        shutil.rmtree(self.carpeta)
+
+    def _tocar_directorio(self):
+        # Garantiza un mtime distinto aunque el sistema de archivos tenga baja resolución
+        st = os.stat(self.carpeta)
+        os.utime(self.carpeta, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_escaneo_carpetas_primero_y_orden_por_nombre(self):
+        nombres = [e.nombre for e in escanear_carpeta(self.carpeta)]
+        self.assertEqual(nombres, ['Pruebas', 'Anexo.docx', 'demanda.pdf'])
+
+    def test_valores_fila(self):
+        entradas = escanear_carpeta(self.carpeta)
+        self.assertEqual(valores_fila(entradas[0])[:2], ('[CARPETA] Pruebas', 'Carpeta'))
+        self.assertEqual(valores_fila(entradas[1])[1], '2.0 KB')
+        self.assertEqual(formatear_tamano(5 * 1024 ** 2), '5.0 MB')
+
+    def test_cache_valida_por_mtime_del_directorio(self):
+        escaneos = []
+
+        def escanear(ruta):
+            escaneos.append(ruta)
+            return escanear_carpeta(ruta)
+
+        cache = CacheCarpetas(escanear=escanear)
+        cache.obtener(self.carpeta)
+        cache.obtener(self.carpeta)
+        self.assertEqual(len(escaneos), 1)
+        self.assertEqual(cache.aciertos, 1)
+
+        with open(os.path.join(self.carpeta, 'nuevo.pdf'), 'wb') as f:
+            f.write(b'y')
+        self._tocar_directorio()
+        entradas = cache.obtener(self.carpeta)
+        self.assertEqual(len(escaneos), 2)
+        self.assertIn('nuevo.pdf', [e.nombre for e in entradas])
+
+    def test_invalidar_y_limite_lru(self):
+        cache = CacheCarpetas(max_carpetas=1)
+        subcarpeta = os.path.join(self.carpeta, 'Pruebas')
+        cache.obtener(self.carpeta)
+        cache.obtener(subcarpeta)
+        cache.obtener(self.carpeta)  # desalojada por el límite
+        self.assertEqual(cache.fallos, 3)
+        cache.invalidar(self.carpeta)
+        cache.obtener(self.carpeta)
+        self.assertEqual(cache.fallos, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests para la lista de prospectos paginada por clave de la ventana de prospectos
+"""
+
+import sys
+import os
+import unittest
+import datetime
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from fuente_prospectos import FuentePaginasProspectos
+
+
+def _prospecto(prospecto_id, estado='Consulta Inicial', nombre=None):
+    return {'id': prospecto_id, 'nombre': nombre or f'Prospecto {prospecto_id}', 'estado': estado,
+            'fecha_primera_consulta': datetime.date(2025, 1, 1) + datetime.timedelta(days=prospecto_id)}
+
+
+class BaseFalsa:
+    """Tabla de prospectos en memoria con la semántica de get_pagina_prospectos"""
+
+    def __init__(self, prospectos):
+        self.prospectos = sorted(prospectos, key=lambda p: (p['fecha_primera_consulta'], p['id']), reverse=True)
+        self.lecturas = []
+
+    def leer_pagina(self, estados=None, despues_de=None, hasta_id=None, limite=100, **filtros):
+        self.lecturas.append({'despues_de': despues_de, 'hasta_id': hasta_id, 'limite': limite})
+        filas = [p for p in self.prospectos if not estados or p['estado'] in estados]
+        if despues_de is not None:
+            filas = [p for p in filas if (p['fecha_primera_consulta'], p['id']) < despues_de]
+        if hasta_id is not None:
+            clave = next(((p['fecha_primera_consulta'], p['id']) for p in self.prospectos if p['id'] == hasta_id), None)
+            return [dict(p) for p in filas if clave and (p['fecha_primera_consulta'], p['id']) >= clave]
+        return [dict(p) for p in filas[:limite]]
+
+    def contar(self, estados=None, **filtros):
+        return len([p for p in self.prospectos if not estados or p['estado'] in estados])
+
+
+class TestFuentePaginasProspectos(unittest.TestCase):
+    """Test cases for keyset paging, stale results and in-place row updates"""
+
+    def setUp(self):
+        self.base = BaseFalsa([_prospecto(i, 'Convertido' if i % 3 == 0 else 'Consulta Inicial')
+                               for i in range(1, 26)])
+        self.fuente = FuentePaginasProspectos(10, leer_pagina=self.base.leer_pagina, contar=self.base.contar)
+
+    def _cargar(self, **kwargs):
+        tarea = self.fuente.tarea_siguiente_pagina(**kwargs)
+        return self.fuente.recibir(tarea()) if tarea else None
+
+    def test_paginas_por_clave(self):
+        self.assertEqual([p['id'] for p in self._cargar()], list(range(25, 15, -1)))
+        self.assertEqual(self.fuente.total, 25)
+        self._cargar()
+        self.assertEqual(len(self._cargar()), 5)
+        self.assertFalse(self.fuente.hay_mas)
+        self.assertIsNone(self.fuente.tarea_siguiente_pagina())
+        self.assertEqual(self.base.lecturas[1]['despues_de'], (datetime.date(2025, 1, 17), 16))
+
+    def test_una_lectura_a_la_vez_y_resultado_obsoleto(self):
+        tarea = self.fuente.tarea_siguiente_pagina()
+        self.assertIsNone(self.fuente.tarea_siguiente_pagina())
+        self.fuente.reiniciar({'estados': ['Convertido']})
+        self.assertIsNone(self.fuente.recibir(tarea()))
+        self.assertEqual([p['id'] for p in self._cargar()], [24, 21, 18, 15, 12, 9, 6, 3])
+        self.assertEqual(self.fuente.total, 8)
+
+    def test_cargar_hasta_un_prospecto(self):
+        self._cargar(hasta_id=4)
+        self.assertTrue(self.fuente.contiene(4))
+        self.assertEqual(len(self.fuente.filas), 22)
+        self.assertEqual([p['id'] for p in self._cargar()], [3, 2, 1])
+
+    def test_cambio_de_estado_en_el_lugar(self):
+        self.fuente.reiniciar({'estados': ['Consulta Inicial']})
+        self._cargar()
+        self.assertTrue(self.fuente.actualizar(dict(_prospecto(25), nombre='Renombrado')))
+        self.assertEqual(self.fuente.filas[0]['nombre'], 'Renombrado')
+        self.assertFalse(self.fuente.actualizar(_prospecto(25, 'Convertido')))
+        self.assertFalse(self.fuente.contiene(25))
+        self.assertEqual(self.fuente.total, 16)
+        self.assertIsNone(self.fuente.actualizar(_prospecto(2)))
+        self.assertEqual(len(self.base.lecturas), 1)
+
+
+class TestGetPaginaProspectos(unittest.TestCase):
+    """Test cases for the keyset query"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        self.cur.fetchall.return_value = []
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        parche = patch.object(db, 'connect_db', return_value=conn)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_clave_y_filtros(self):
+        fecha = datetime.date(2025, 3, 1)
+        db.get_pagina_prospectos(estados=['En Análisis'], nombre='gómez', despues_de=(fecha, 40), limite=51)
+        sql, params = self.cur.execute.call_args[0]
+        self.assertIn("WHERE p.estado = ANY(%s) AND p.nombre ILIKE %s AND (p.fecha_primera_consulta, p.id) < (%s, %s)", sql)
+        self.assertIn("ORDER BY p.fecha_primera_consulta DESC, p.id DESC", sql)
+        self.assertEqual(params, [['En Análisis'], '%gómez%', fecha, 40, 51])
+
+    def test_hasta_un_prospecto_sin_limite(self):
+        db.get_pagina_prospectos(hasta_id=7)
+        sql, params = self.cur.execute.call_args[0]
+        self.assertNotIn("LIMIT", sql)
+        self.assertEqual(params, [7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Tests para el grafo de representaciones en memoria y su caché por caso
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from grafo_representaciones import CacheGrafos, GrafoRepresentaciones, filas_representacion_desde_notas
+
+
+def _rol(rol_id, nombre, rol_principal, representa_a_id=None, contacto_id=None, notas=None):
+    return {'rol_id': rol_id, 'nombre_completo': nombre, 'rol_principal': rol_principal,
+            'representa_a_id': representa_a_id, 'contacto_id': contacto_id or rol_id + 100,
+            'notas_del_rol': notas}
+
+
+ROLES = [
+    _rol(1, 'Ana', 'Actor'),
+    _rol(2, 'Beto', 'Demandado'),
+    _rol(3, 'Dra. Paz', 'Abogado', representa_a_id=1),
+    _rol(4, 'Dr. Ruiz', 'Apoderado', representa_a_id=3),
+    _rol(5, 'Huérfano', 'Abogado', representa_a_id=99),
+]
+
+
+class TestGrafoRepresentaciones(unittest.TestCase):
+    """Test cases for hierarchy, cycle checks and multiple-representation groups"""
+
+    def setUp(self):
+        self.grafo = GrafoRepresentaciones(ROLES)
+
+    def test_ancestros_y_profundidad(self):
+        self.assertEqual(self.grafo.ancestros(4), [3, 1])
+        self.assertEqual(self.grafo.profundidad(4), 2)
+        self.assertEqual(self.grafo.profundidad(2), 0)
+        self.assertIsNone(self.grafo.profundidad(5))
+        self.assertEqual(self.grafo.representantes(1), [3])
+
+    def test_crearia_ciclo(self):
+        # Ana no puede pasar a representar a quien la representa (indirectamente)
+        self.assertTrue(self.grafo.crearia_ciclo(4, rol_id=1))
+        self.assertTrue(self.grafo.crearia_ciclo(2, rol_id=2))
+        self.assertFalse(self.grafo.crearia_ciclo(2, rol_id=4))
+        self.assertFalse(self.grafo.crearia_ciclo(4))
+        con_ciclo = GrafoRepresentaciones([_rol(1, 'A', 'Abogado', 2), _rol(2, 'B', 'Abogado', 1)])
+        self.assertTrue(con_ciclo.crearia_ciclo(1))
+        self.assertIsNone(con_ciclo.profundidad(1))
+
+    def test_roles_jerarquicos(self):
+        filas = self.grafo.roles_jerarquicos()
+        self.assertEqual([f['rol_id'] for f in filas], [1, 2, 3, 4])
+        apoderado = filas[3]
+        self.assertEqual(apoderado['ruta_jerarquia'], [1, 3, 4])
+        self.assertEqual(apoderado['representado_nombre'], 'Dra. Paz')
+        self.assertEqual(apoderado['orden_rol'], 5)
+
+    def test_representaciones_multiples_y_validacion(self):
+        roles = [
+            _rol(1, 'Ana', 'Actor'),
+            _rol(2, 'Beto', 'Actor'),
+            _rol(3, 'Dra. Paz', 'Abogado', contacto_id=50),
+            _rol(4, 'Dra. Paz', 'Abogado', 1, contacto_id=50),
+            _rol(5, 'Dra. Paz', 'Abogado', 1, contacto_id=50),
+            _rol(6, 'Dr. Sosa', 'Abogado', 7),
+        ]
+        representaciones = [
+            {'grupo_id': 'g1', 'rol_abogado_id': 3, 'rol_representado_id': 1, 'rol_sombra_id': 4},
+            # El rol sombra 5 dejó de apuntar a Beto
+            {'grupo_id': 'g1', 'rol_abogado_id': 3, 'rol_representado_id': 2, 'rol_sombra_id': 5},
+        ]
+        grafo = GrafoRepresentaciones(roles, representaciones)
+        self.assertEqual(grafo.grupo_de_rol(5), 'g1')
+        self.assertTrue(grafo.es_rol_sombra(4))
+        self.assertFalse(grafo.es_rol_sombra(3))
+        multiples = grafo.representaciones_multiples()
+        self.assertEqual(list(multiples), [50])
+        self.assertEqual(multiples[50]['primary_role_id'], 3)
+        self.assertEqual([r['represents_id'] for r in multiples[50]['representations']], [1, 2])
+
+        validacion = grafo.validar_consistencia()
+        self.assertEqual(validacion['inconsistent_groups'][0]['rol_sombra_id'], 5)
+        self.assertEqual(len(validacion['errors']), 1)
+        self.assertEqual(validacion['orphaned_representations'][0]['rol_id'], 6)
+        self.assertEqual(len(validacion['suggestions']), 2)
+
+
+class TestMigracionDesdeNotas(unittest.TestCase):
+    """Test cases for converting note markers into representaciones rows"""
+
+    def test_grupos_con_y_sin_roles_sombra(self):
+        roles = [
+            {'id': 3, 'caso_id': 9, 'contacto_id': 50, 'representa_a_id': None,
+             'notas_del_rol': 'Nota previa\n[REPRESENTACION_MULTIPLE:PRIMARY:g1]\nRepresenta a 2 parte(s):'},
+            {'id': 4, 'caso_id': 9, 'contacto_id': 50, 'representa_a_id': 1,
+             'notas_del_rol': '[REPRESENTACION_MULTIPLE:SECONDARY:g1] Shadow role for Ana'},
+            {'id': 5, 'caso_id': 9, 'contacto_id': 50, 'representa_a_id': 2,
+             'notas_del_rol': '[REPRESENTACION_MULTIPLE:SECONDARY:g1] Shadow role for Beto'},
+            # Grupo antiguo sin roles sombra: los representados sólo están en las notas
+            {'id': 8, 'caso_id': 9, 'contacto_id': 60, 'representa_a_id': None,
+             'notas_del_rol': '[REPRESENTACION_MULTIPLE:PRIMARY:g2]\n- Ana (Actor) [ID:1]\n- Beto (Actor) [ID:2]'},
+            # SECONDARY sin PRIMARY: no hay grupo que migrar
+            {'id': 9, 'caso_id': 9, 'contacto_id': 70, 'representa_a_id': 1,
+             'notas_del_rol': '[REPRESENTACION_MULTIPLE:SECONDARY:g3]'},
+        ]
+        self.assertEqual(filas_representacion_desde_notas(roles), [
+            ('g1', 9, 3, 1, 4),
+            ('g1', 9, 3, 2, 5),
+            ('g2', 9, 8, 1, None),
+            ('g2', 9, 8, 2, None),
+        ])
+
+
+class CursorCrearTablas:
+    """Cursor que acepta los comandos de create_tables, sin roles que migrar"""
+
+    def __init__(self, migraciones_aplicadas):
+        self.migraciones_aplicadas = set(migraciones_aplicadas)
+        self.sentencias = []
+        self.rowcount = 0
+        self.description = []
+        self._ultima = ("", None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sentencias.append((sql, params))
+        self._ultima = (sql, params)
+
+    def fetchone(self):
+        sql, params = self._ultima
+        if "FROM migraciones_aplicadas" in sql:
+            return (1,) if params[0] in self.migraciones_aplicadas else None
+        return (1,)
+
+    def fetchall(self):
+        return []
+
+
+class TestMigracionInicialRepresentaciones(unittest.TestCase):
+    """Test cases for the one-time notes-to-representaciones migration in create_tables"""
+
+    def _marcadas(self, migraciones_aplicadas):
+        cursor = CursorCrearTablas(migraciones_aplicadas)
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch.object(db, 'connect_db', return_value=conn), \
+                patch.object(db, '_avisos_precalculados', None):
+            db.create_tables()
+        conn.commit.assert_called_once()
+        return [params for sql, params in cursor.sentencias if sql.startswith("INSERT INTO migraciones_aplicadas")]
+
+    def test_se_migran_una_sola_vez(self):
+        self.assertIn(("representaciones_desde_notas",), self._marcadas(set()))
+        with patch.object(db, 'migrar_representaciones_desde_notas') as migrar:
+            marcadas = self._marcadas({"representaciones_desde_notas"})
+        migrar.assert_not_called()
+        self.assertNotIn(("representaciones_desde_notas",), marcadas)
+
+
+class TestCacheGrafos(unittest.TestCase):
+    """Test cases for the per-case graph cache"""
+
+    def setUp(self):
+        self.ahora = 0.0
+        self.cargas = []
+        self.cache = CacheGrafos(self._cargar, reloj=lambda: self.ahora)
+
+    def _cargar(self, caso_id):
+        self.cargas.append(caso_id)
+        return GrafoRepresentaciones(ROLES)
+
+    def test_acierto_vencimiento_e_invalidacion(self):
+        grafo = self.cache.obtener(7)
+        self.assertIs(self.cache.obtener(7), grafo)
+        self.cache.on_cambio_datos('roles_en_caso', 'UPDATE', 3, 7)
+        self.cache.obtener(7)
+        self.ahora += CacheGrafos.VIGENCIA_SEGUNDOS
+        self.cache.obtener(7)
+        self.assertEqual(self.cargas, [7, 7, 7])
+        self.assertEqual((self.cache.aciertos, self.cache.fallos), (1, 3))
+
+    def test_carga_vieja_no_se_guarda(self):
+        generacion = self.cache.generacion()
+        self.cache.invalidar(7)
+        self.cache.guardar(7, GrafoRepresentaciones(ROLES), generacion)
+        self.cache.obtener(7)
+        self.assertEqual(self.cargas, [7])
+
+    def test_estadisticas(self):
+        self.cache.obtener(1)
+        self.cache.obtener(1)
+        self.cache.obtener(2)
+        estadisticas = self.cache.estadisticas()
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(estadisticas['entradas'], 2)
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos']), (1, 2))
+        self.assertEqual(estadisticas['tasa_aciertos'], 0.333)
+
+    def test_contactos_invalidan_todo(self):
+        self.cache.obtener(1)
+        self.cache.obtener(2)
+        self.cache.on_cambio_datos('contactos', 'UPDATE', 101, None)
+        self.cache.obtener(1)
+        self.cache.obtener(2)
+        self.assertEqual(self.cargas, [1, 2, 1, 2])
+
+
+class TestCrearRepresentacionesMultiples(unittest.TestCase):
+    """Test cases for the validation done before the batched role inserts"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        self.cur.fetchone.side_effect = [(True, True), None]
+        self.cur.fetchall.return_value = [(1, 'Actor', 'Ana'), (2, 'Actor', 'Beto')]
+        parche = patch.object(db, 'insertar_lote', return_value=[(10, None), (11, 1), (12, 2)])
+        self.insertar_lote = parche.start()
+        self.addCleanup(parche.stop)
+
+    def _crear(self, roles, rol_principal='Abogado'):
+        with patch.object(db, '_grafo_en_transaccion', return_value=GrafoRepresentaciones(roles)), \
+                patch.object(db, '_registrar_representaciones'), \
+                patch.object(db, 'get_representation_group_id', return_value='g1'):
+            return db._crear_representaciones_multiples(self.cur, 50, 7, {'rol_principal': rol_principal}, [1, 2])
+
+    def test_crea_los_roles_cuando_no_hay_ciclos(self):
+        resultado = self._crear([_rol(1, 'Ana', 'Actor'), _rol(2, 'Beto', 'Actor')])
+        self.assertEqual(resultado['primary_role_id'], 10)
+        self.assertEqual([s['rol_id'] for s in resultado['shadow_roles']], [11, 12])
+
+    def test_referencia_circular_no_inserta_nada(self):
+        con_ciclo = [_rol(1, 'Ana', 'Tercero', 2), _rol(2, 'Beto', 'Tercero', 1)]
+        self.assertIsNone(self._crear(con_ciclo))
+        self.insertar_lote.assert_not_called()
+
+    def test_rol_duplicado_no_inserta_nada(self):
+        self.cur.fetchone.side_effect = [(True, True), (33,)]
+        self.assertIsNone(self._crear([_rol(1, 'Ana', 'Actor'), _rol(2, 'Beto', 'Actor')], 'Perito'))
+        self.insertar_lote.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests para el importador masivo de contactos, clientes y casos
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from importador_masivo import (ESPECIFICACIONES, ImportadorMasivo, leer_bloques, mapear_columnas,
+                               normalizar_cuit, normalizar_dni, normalizar_telefono, preparar_bloque)
+
+
+class TestNormalizacion(unittest.TestCase):
+    """Test cases for vectorized normalization and validation"""
+
+    def test_dni(self):
+        valores, invalidos = normalizar_dni(pd.Series(['12.345.678', ' 7654321 ', '12-34', '', None]))
+        self.assertEqual(valores.tolist()[:2], ['12345678', '7654321'])
+        self.assertEqual(invalidos.tolist(), [False, False, True, False, False])
+
+    def test_cuit_con_digito_verificador(self):
+        valores, invalidos = normalizar_cuit(pd.Series(['20123456786', '30-71234567-1', '20-12345678-0', 'abc']))
+        self.assertEqual(valores.tolist()[:2], ['20-12345678-6', '30-71234567-1'])
+        self.assertEqual(invalidos.tolist(), [False, False, True, True])
+
+    def test_telefono(self):
+        valores, invalidos = normalizar_telefono(pd.Series(['+54 (11) 4444-5555', '123', None]))
+        self.assertEqual(valores.iloc[0], '+541144445555')
+        self.assertEqual(invalidos.tolist(), [False, True, False])
+
+    def test_mapear_columnas_con_alias_y_acentos(self):
+        mapeo = mapear_columnas(['Nombre y Apellido', 'E-mail', 'Año Carátula', 'Otra'], ESPECIFICACIONES['contactos'])
+        self.assertEqual(mapeo, {'Nombre y Apellido': 'nombre_completo', 'E-mail': 'email'})
+        self.assertEqual(mapear_columnas(['Año'], ESPECIFICACIONES['casos']), {'Año': 'anio_caratula'})
+
+    def test_preparar_bloque_separa_rechazadas(self):
+        bloque = pd.DataFrame({
+            'fila': [2, 3, 4],
+            'nombre_completo': ['Ana Pérez', '', 'Beto SA'],
+            'email': ['ANA@MAIL.COM', 'x@y.com', 'sin-arroba'],
+            'es_persona_juridica': ['', '', 'Sí'],
+        })
+        validas, rechazadas = preparar_bloque(bloque, ESPECIFICACIONES['contactos'])
+        self.assertEqual(validas['fila'].tolist(), [2])
+        self.assertEqual(validas['email'].iloc[0], 'ana@mail.com')
+        self.assertEqual(rechazadas['fila'].tolist(), [3, 4])
+        self.assertEqual(rechazadas['motivo'].tolist(), ['falta nombre_completo', 'email inválido'])
+
+
+class TestImportador(unittest.TestCase):
+    """Test cases for the streaming read, staging COPY and error file"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.ruta = os.path.join(self.directorio.name, 'contactos.csv')
+        with open(self.ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write("Nombre;DNI;Email\n"
+                          "Ana Pérez;12.345.678;ana@mail.com\n"
+                          "Beto Gómez;1;beto@mail.com\n"
+                          "Ana P.;12345678;otra@mail.com\n"
+                          "Carla Ruiz;;carla@mail.com\n")
+
+    def test_leer_bloques_detecta_separador(self):
+        bloques = list(leer_bloques(self.ruta, tamano_bloque=3))
+        self.assertEqual([len(b) for b in bloques], [3, 1])
+        self.assertEqual(bloques[1]['fila'].tolist(), [5])
+        self.assertEqual(bloques[0]['DNI'].iloc[0], '12.345.678')
+
+    def test_leer_bloques_conserva_la_linea_del_archivo(self):
+        with open(self.ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write("Nombre;DNI\nAna;1\n\n;\nBeto;2\n")
+        bloques = list(leer_bloques(self.ruta, tamano_bloque=2))
+        self.assertEqual([b['fila'].tolist() for b in bloques], [[2], [5]])
+
+    def test_importar_copia_a_staging_y_escribe_errores(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [(10,), (11,)]
+        cur.fetchone.return_value = (0,)
+        copiados = []
+        cur.copy_expert.side_effect = lambda consulta, buffer: copiados.append(buffer.read())
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        base = MagicMock()
+        base.connect_db.return_value = conn
+        base.triggers_por_fila = db.triggers_por_fila
+        base.sql_reindexar_filas = db.sql_reindexar_filas
+        progreso = []
+
+        resumen = ImportadorMasivo('contactos', db_module=base).importar(
+            self.ruta, progreso=lambda fase, procesadas, total: progreso.append(fase), tamano_bloque=2)
+
+        conn.commit.assert_called_once()
+        self.assertEqual(len(copiados), 2)
+        self.assertEqual(''.join(copiados).count('\n'), 2)  # Ana y Carla
+        self.assertEqual((resumen['leidas'], resumen['insertadas'], resumen['rechazadas']), (4, 2, 2))
+        errores = pd.read_csv(resumen['ruta_errores'], encoding='utf-8-sig')
+        self.assertEqual(errores['fila'].tolist(), [3, 4])
+        self.assertEqual(errores['motivo'].tolist(), ['dni inválido', 'dni repetido en el archivo'])
+        self.assertEqual(progreso[-1], 'fin')
+        base.notificar_cambio.assert_called_once_with('contactos', 'INSERT', None, None)
+
+        sentencias = [llamada[0][0].strip() for llamada in cur.execute.call_args_list]
+        desactivar = sentencias.index("ALTER TABLE contactos DISABLE TRIGGER trg_omnibox_contactos")
+        activar = sentencias.index("ALTER TABLE contactos ENABLE TRIGGER trg_omnibox_contactos")
+        self.assertTrue(sentencias[desactivar + 1].startswith("INSERT INTO contactos"))
+        self.assertEqual(activar, desactivar + 2)
+        self.assertIn("INSERT INTO indice_omnibox", sentencias[activar + 1])
+        self.assertEqual(cur.execute.call_args_list[activar + 1][0][1], {'ids': [10, 11]})
+
+    def test_triggers_y_reindexacion_de_casos(self):
+        self.assertEqual(db.triggers_por_fila('casos'),
+                         ['trg_busqueda_tsv_casos', 'trg_omnibox_casos', 'trg_notificar_casos'])
+        tsv, omnibox, aviso = db.sql_reindexar_filas('casos')
+        self.assertTrue(tsv.startswith("UPDATE casos SET busqueda_tsv"))
+        self.assertIn("WHERE s.id = ANY(%(ids)s)", omnibox)
+        self.assertIn(f"pg_notify('{db.CANAL_CAMBIOS}'", aviso)
+        self.assertEqual(db.sql_reindexar_filas('clientes')[0].count("INSERT INTO indice_omnibox"), 1)
+
+    def test_falta_columna_obligatoria(self):
+        with open(self.ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write("dni,email\n12345678,a@b.com\n")
+        conn = MagicMock()
+        base = MagicMock()
+        base.connect_db.return_value = conn
+        with self.assertRaises(ValueError):
+            ImportadorMasivo('contactos', db_module=base).importar(self.ruta)
+        conn.rollback.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests para el índice de texto completo de documentos de casos
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indice_documentos import IndiceDocumentos, construir_consulta_fts, extraer_texto_txt
+
+
+class TestIndiceDocumentos(unittest.TestCase):
+    """Test cases for incremental indexing and ranked search"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.carpeta = os.path.join(self.dir, 'caso1')
+        os.makedirs(os.path.join(self.carpeta, 'Pruebas'))
+        self._escribir('demanda.txt', 'Se solicita el embargo preventivo sobre el inmueble.')
+        self._escribir(os.path.join('Pruebas', 'pericia.txt'), 'Informe pericial contable sobre la sucesión.')
+        self.extracciones = []
+
+        def extraer(ruta):
+            self.extracciones.append(os.path.basename(ruta))
+            return extraer_texto_txt(ruta)
+
+        self.indice = IndiceDocumentos(os.path.join(self.dir, 'indice.db'), extractores={'.txt': extraer})
+
+    def tearDown(self):
+        self.indice.cerrar()
+        shutil.rmtree(self.dir)
+
+    def _escribir(self, nombre, texto):
+        with open(os.path.join(self.carpeta, nombre), 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+    def test_construir_consulta(self):
+        self.assertEqual(construir_consulta_fts('embargo "inmue'), '"embargo" "inmue"*')
+        self.assertIsNone(construir_consulta_fts('  -- '))
+
+    def test_busqueda_con_fragmento_y_sin_acentos(self):
+        self.indice.sincronizar_caso(1, self.carpeta)
+        resultados = self.indice.buscar('embargo')
+        self.assertEqual([r['nombre'] for r in resultados], ['demanda.txt'])
+        self.assertIn('[embargo]', resultados[0]['fragmento'])
+        self.assertEqual(len(self.indice.buscar('sucesion')), 1)
+        self.assertEqual(self.indice.buscar('embargo', caso_id=2), [])
+
+    def test_sincronizacion_incremental(self):
+        estadisticas = self.indice.sincronizar_caso(1, self.carpeta)
+        self.assertEqual(estadisticas['nuevos'], 2)
+
+        self.extracciones.clear()
+        estadisticas = self.indice.sincronizar_caso(1, self.carpeta)
+        self.assertEqual(estadisticas['sin_cambios'], 2)
+        self.assertEqual(self.extracciones, [])
+
+        self._escribir('demanda.txt', 'Se desiste del embargo y se pide el desalojo del inmueble.')
+        os.remove(os.path.join(self.carpeta, 'Pruebas', 'pericia.txt'))
+        estadisticas = self.indice.sincronizar_caso(1, self.carpeta)
+        self.assertEqual((estadisticas['actualizados'], estadisticas['eliminados']), (1, 1))
+        self.assertEqual(self.extracciones, ['demanda.txt'])
+        self.assertEqual(len(self.indice.buscar('desalojo')), 1)
+        self.assertEqual(self.indice.buscar('pericial'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests para el planificador de pre-carga del LazyLoader
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lazy_loader import LazyLoader, PlanificadorPrecarga
+
+
+class CargadorBloqueado(LazyLoader):
+    """LazyLoader cuyas cargas esperan a que el test las libere"""
+
+    def __init__(self):
+        super().__init__()
+        self.liberar = threading.Event()
+        self.iniciadas = []
+
+    def get_module(self, name, module_path, init_func=None, precarga=False):
+        self.iniciadas.append(name)
+        self.liberar.wait(5)
+        return super().get_module(name, module_path, init_func, precarga)
+
+
+class TestPlanificadorPrecarga(unittest.TestCase):
+    """Test cases for preload ordering, idle detection and history"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.directorio, "historial.json")
+        self.ahora = 100.0
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio)
+
+    def _planificador(self, loader=None, **kwargs):
+        return PlanificadorPrecarga(loader or LazyLoader(), ruta_historial=self.ruta,
+                                    reloj=lambda: self.ahora, **kwargs)
+
+    def test_orden_por_prioridad_e_historial(self):
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            json.dump({'json': {'uso': 2.5}, 'csv': {'uso': 0.0, 'carga_s': 1.0}}, f)
+        planificador = self._planificador()
+        planificador.programar('csv', 'csv', prioridad=1)
+        planificador.programar('wave', 'wave', prioridad=1)
+        planificador.programar('json', 'json', prioridad=0)
+        # json: 0 + 2.5 de uso; csv y wave empatan en 1, csv tarda más en cargar
+        self.assertEqual(planificador.orden(), ['json', 'csv', 'wave'])
+
+    def test_ocioso_tras_inactividad(self):
+        planificador = self._planificador()
+        planificador.registrar_actividad()
+        self.assertFalse(planificador.esta_ocioso())
+        self.ahora += PlanificadorPrecarga.INACTIVIDAD_MINIMA_S
+        self.assertTrue(planificador.esta_ocioso())
+
+    def test_cupo_de_concurrencia(self):
+        loader = CargadorBloqueado()
+        planificador = self._planificador(loader, max_concurrentes=1)
+        planificador.programar('json', 'json')
+        planificador.programar('csv', 'csv')
+        planificador.lanzar_siguientes()
+        planificador.lanzar_siguientes()
+        self.assertEqual(len(planificador._en_curso), 1)
+        loader.liberar.set()
+        for hilo in threading.enumerate():
+            if hilo.name.startswith("Precarga-"):
+                hilo.join(5)
+        self.assertEqual(len(planificador.orden()), 1)
+
+    def test_historial_con_decaimiento(self):
+        loader = LazyLoader()
+        loader.get_module('json', 'json')
+        loader.get_module('csv', 'csv', precarga=True)
+        planificador = self._planificador(loader)
+        planificador.historial = {'wave': {'uso': 1.0}}
+        planificador.guardar_historial()
+
+        with open(self.ruta, encoding="utf-8") as f:
+            guardado = json.load(f)
+        self.assertEqual(guardado['json']['uso'], 1.0)
+        # Pre-cargado pero no usado: no suma uso
+        self.assertEqual(guardado['csv']['uso'], 0.0)
+        self.assertIn('carga_s', guardado['csv'])
+        self.assertAlmostEqual(guardado['wave']['uso'], PlanificadorPrecarga.DECAIMIENTO_USO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests para el perfil de arranque y el presupuesto de tiempo hasta la primera ventana
+"""
+
+import sys
+import os
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import perfil_arranque
+from perfil_arranque import costo_por_paquete, leer_informe, parsear_importtime
+
+SALIDA_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       245 |        245 |   _io
+import time:      1200 |       1200 |     docx.oxml
+import time:      3000 |       4200 |   docx
+import time:       500 |        500 |   num2words
+import time:       800 |       5500 | case_dialog_manager
+Traceback (most recent call last):
+"""
+
+
+class TestParsearImporttime(unittest.TestCase):
+    """Test cases for -X importtime parsing"""
+
+    def test_medidas(self):
+        medidas = parsear_importtime(SALIDA_IMPORTTIME)
+        self.assertEqual(len(medidas), 5)
+        self.assertEqual(medidas[1].modulo, "docx.oxml")
+        self.assertEqual(medidas[1].nivel, 2)
+        self.assertEqual(medidas[4].nivel, 0)
+        self.assertAlmostEqual(medidas[4].acumulado_ms, 5.5)
+
+    def test_costo_por_paquete(self):
+        costos = costo_por_paquete(parsear_importtime(SALIDA_IMPORTTIME))
+        self.assertEqual(list(costos)[0], "docx")
+        self.assertAlmostEqual(costos["docx"], 4.2)
+
+    def test_leer_informe(self):
+        salida = 'Iniciando...\n[Arranque] {"primera_ventana_s": 1.5, "lazy": {}}\n'
+        self.assertEqual(leer_informe(salida), {'primera_ventana_s': 1.5, 'lazy': {}})
+        self.assertIsNone(leer_informe("sin informe"))
+
+
+@unittest.skipUnless(os.environ.get("LPMS_BENCHMARK_ARRANQUE"),
+                     "Requiere base de datos y pantalla; definir LPMS_BENCHMARK_ARRANQUE=1")
+class TestPresupuestoArranque(unittest.TestCase):
+    """Test cases for the time-to-first-window budget"""
+
+    def test_primera_ventana_dentro_del_presupuesto(self):
+        informe = perfil_arranque.medir_arranque()
+        self.assertLessEqual(informe['total_s'], perfil_arranque.PRESUPUESTO_PRIMERA_VENTANA_S, informe)
+
+
+if __name__ == '__main__':
+    unittest.main()
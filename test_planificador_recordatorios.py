@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Tests para el planificador de recordatorios dirigido por eventos
+"""
+
+import sys
+import os
+import datetime
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from planificador_recordatorios import (
+    PlanificadorRecordatorios,
+    TIPO_AUDIENCIA,
+    TIPO_TAREA,
+    calcular_instante_audiencia,
+    calcular_instante_tarea,
+    calcular_instante_inactividad,
+)
+
+AHORA = datetime.datetime(2025, 6, 10, 9, 0)
+
+
+class TestCalculoInstantes(unittest.TestCase):
+    """Test cases for reminder instant computation"""
+
+    def test_audiencia_futura(self):
+        aud = {'id': 1, 'fecha': datetime.date(2025, 6, 10), 'hora': datetime.time(10, 0),
+               'recordatorio_activo': True, 'recordatorio_minutos': 30}
+        self.assertEqual(calcular_instante_audiencia(aud, AHORA), datetime.datetime(2025, 6, 10, 9, 30))
+
+    def test_audiencia_con_formato_texto(self):
+        aud = {'id': 1, 'fecha': '2025-06-11', 'hora': '14:15:00', 'recordatorio_activo': 1}
+        self.assertEqual(calcular_instante_audiencia(aud, AHORA), datetime.datetime(2025, 6, 11, 14, 0))
+
+    def test_audiencia_ya_comenzada(self):
+        aud = {'id': 1, 'fecha': datetime.date(2025, 6, 10), 'hora': datetime.time(8, 0),
+               'recordatorio_activo': True}
+        self.assertIsNone(calcular_instante_audiencia(aud, AHORA))
+
+    def test_tarea_dias_antes(self):
+        tarea = {'id': 1, 'fecha_vencimiento': datetime.date(2025, 6, 20),
+                 'recordatorio_activo': True, 'recordatorio_dias_antes': 3, 'estado': 'Pendiente'}
+        self.assertEqual(calcular_instante_tarea(tarea, AHORA), datetime.datetime(2025, 6, 17))
+
+    def test_tarea_notificada_hoy_pasa_a_manana(self):
+        tarea = {'id': 1, 'fecha_vencimiento': datetime.date(2025, 6, 12),
+                 'recordatorio_activo': True, 'recordatorio_dias_antes': 5, 'estado': 'Pendiente',
+                 'fecha_ultima_notificacion': datetime.datetime(2025, 6, 10, 8, 0)}
+        self.assertEqual(calcular_instante_tarea(tarea, AHORA), datetime.datetime(2025, 6, 11))
+
+    def test_tarea_completada_sin_aviso(self):
+        tarea = {'id': 1, 'fecha_vencimiento': datetime.date(2025, 6, 12),
+                 'recordatorio_activo': True, 'estado': 'Completada'}
+        self.assertIsNone(calcular_instante_tarea(tarea, AHORA))
+
+    def test_inactividad(self):
+        ultima = datetime.datetime(2025, 5, 1, 12, 0)
+        caso = {'id': 1, 'last_activity_timestamp': int(ultima.timestamp()), 'inactivity_threshold_days': 30}
+        self.assertEqual(calcular_instante_inactividad(caso, AHORA), ultima + datetime.timedelta(days=30))
+
+
+class TestPlanificador(unittest.TestCase):
+    """Test cases for heap maintenance and firing"""
+
+    def setUp(self):
+        self.ahora = AHORA
+        self.db = Mock()
+        self.db.get_audiencias_con_recordatorio_activo.return_value = []
+        self.db.get_tareas_con_recordatorio_activo.return_value = []
+        self.db.get_casos_con_control_inactividad.return_value = []
+        self.al_vencer_audiencia = Mock()
+        self.al_vencer_tarea = Mock()
+        self.planificador = PlanificadorRecordatorios(
+            self.al_vencer_audiencia, self.al_vencer_tarea,
+            db_module=self.db, reloj=lambda: self.ahora
+        )
+
+    def _audiencia(self, aud_id, hora):
+        return {'id': aud_id, 'fecha': datetime.date(2025, 6, 10), 'hora': hora,
+                'recordatorio_activo': True, 'recordatorio_minutos': 15}
+
+    def test_proximo_instante_ordenado(self):
+        self.db.get_audiencias_con_recordatorio_activo.return_value = [
+            self._audiencia(1, datetime.time(12, 0)),
+            self._audiencia(2, datetime.time(10, 0)),
+        ]
+        self.planificador.cargar_todo()
+        self.assertEqual(self.planificador.proximo_instante(), datetime.datetime(2025, 6, 10, 9, 45))
+        self.assertEqual(self.planificador.cantidad_programados(), 2)
+
+    def test_carga_solo_la_ventana_del_dia(self):
+        self.planificador.cargar_todo()
+        manana = datetime.datetime(2025, 6, 11)
+        self.db.get_audiencias_con_recordatorio_activo.assert_called_once_with(ahora=AHORA, hasta=manana)
+        self.db.get_tareas_con_recordatorio_activo.assert_called_once_with(hasta=manana)
+
+    def test_reprogramar_descarta_entrada_vieja(self):
+        aud = self._audiencia(1, datetime.time(10, 0))
+        self.db.get_audiencias_con_recordatorio_activo.return_value = [aud]
+        self.planificador.cargar_todo()
+
+        self.db.get_audiencia_by_id.return_value = self._audiencia(1, datetime.time(16, 0))
+        self.planificador._aplicar_cambio('audiencias', 'UPDATE', 1)
+        self.assertEqual(self.planificador.proximo_instante(), datetime.datetime(2025, 6, 10, 15, 45))
+
+        self.ahora = datetime.datetime(2025, 6, 10, 9, 50)
+        self.assertEqual(self.planificador._extraer_vencidos(self.ahora), [])
+
+    def test_baja_cancela_aviso(self):
+        self.db.get_audiencias_con_recordatorio_activo.return_value = [self._audiencia(1, datetime.time(10, 0))]
+        self.planificador.cargar_todo()
+        self.planificador._aplicar_cambio('audiencias', 'DELETE', 1)
+        self.assertIsNone(self.planificador.proximo_instante())
+
+    def test_disparo_audiencia(self):
+        self.db.get_audiencias_con_recordatorio_activo.return_value = [self._audiencia(1, datetime.time(10, 0))]
+        self.planificador.cargar_todo()
+        self.ahora = datetime.datetime(2025, 6, 10, 9, 46)
+        for tipo, registro_id, datos in self.planificador._extraer_vencidos(self.ahora):
+            self.planificador._disparar(tipo, registro_id, datos)
+        self.al_vencer_audiencia.assert_called_once()
+        self.assertEqual(self.planificador.cantidad_programados(), 0)
+
+    def test_disparo_tarea_reprograma_para_el_dia_siguiente(self):
+        tarea = {'id': 7, 'fecha_vencimiento': datetime.date(2025, 6, 12), 'recordatorio_activo': True,
+                 'recordatorio_dias_antes': 5, 'estado': 'Pendiente'}
+        self.db.get_tareas_con_recordatorio_activo.return_value = [tarea]
+        self.planificador.cargar_todo()
+        vencidos = self.planificador._extraer_vencidos(self.ahora)
+        self.assertEqual([(TIPO_TAREA, 7)], [(t, i) for t, i, _ in vencidos])
+        self.planificador._disparar(*vencidos[0])
+        self.al_vencer_tarea.assert_called_once()
+        self.db.update_fecha_ultima_notificacion_tarea.assert_called_once_with(7)
+        self.assertEqual(self.planificador.proximo_instante(), datetime.datetime(2025, 6, 11))
+
+    def test_listener_solo_encola_tablas_relevantes(self):
+        self.planificador._on_cambio_datos('movimientos_cuenta', 'INSERT', 1, 1)
+        self.planificador._on_cambio_datos('audiencias', 'INSERT', 2, 1)
+        self.assertEqual(self.planificador._cambios_pendientes, [('audiencias', 'INSERT', 2)])
+        self.db.get_audiencia_by_id.return_value = self._audiencia(2, datetime.time(11, 0))
+        self.planificador._aplicar_cambio('audiencias', 'INSERT', 2)
+        self.assertEqual(self.planificador.proximo_instante(), datetime.datetime(2025, 6, 10, 10, 45))
+        self.assertIn((TIPO_AUDIENCIA, 2), self.planificador._programados)
+        self.planificador._aplicar_cambio('audiencias', 'DELETE', 2)
+        self.assertEqual(self.planificador._extraer_vencidos(datetime.datetime(2025, 6, 10, 11, 0)), [])
+
+
+
+class TestConsultasRecordatorio(unittest.TestCase):
+    """Test cases for the notify_at window filters pushed down to SQL"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        self.cur.fetchall.return_value = []
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        for parche in (patch.object(db, 'connect_db', return_value=conn),
+                       patch.object(db, '_avisos_precalculados', True)):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_audiencias_en_la_ventana(self):
+        manana = datetime.datetime(2025, 6, 11)
+        db.get_audiencias_con_recordatorio_activo(ahora=AHORA, hasta=manana)
+        sql, params = self.cur.execute.call_args[0]
+        self.assertIn("a.recordatorio_activo::int = 1", sql)
+        self.assertIn("a.notify_at < %s", sql)
+        self.assertEqual(params, [AHORA.date(), AHORA, manana])
+
+    def test_tareas_sin_ventana_no_filtran_notify_at(self):
+        db.get_tareas_con_recordatorio_activo()
+        sql, params = self.cur.execute.call_args[0]
+        self.assertNotIn("notify_at", sql)
+        self.assertEqual(len(params), 1)
+
+    def test_sin_columnas_generadas_calcula_el_aviso_en_la_consulta(self):
+        db._avisos_precalculados = None
+        self.cur.fetchone.return_value = {'cantidad': 0}
+        manana = datetime.datetime(2025, 6, 11)
+        db.get_audiencias_con_recordatorio_activo(ahora=AHORA, hasta=manana)
+        self.assertIn("information_schema.columns", self.cur.execute.call_args_list[0][0][0])
+        sql, params = self.cur.execute.call_args[0]
+        self.assertNotIn("notify_at", sql)
+        self.assertIn("((a.fecha + a.hora) - COALESCE(NULLIF(a.recordatorio_minutos, 0), 15)", sql)
+        self.assertEqual(params, [AHORA.date(), AHORA, manana])
+
+        db.get_tareas_para_notificacion()
+        sql, _ = self.cur.execute.call_args[0]
+        self.assertNotIn("notify_at", sql)
+        self.assertIn("t.fecha_vencimiento - COALESCE(NULLIF(t.recordatorio_dias_antes, 0), 1)", sql)
+        # La detección se hace una sola vez
+        self.assertEqual(sum("information_schema" in c[0][0] for c in self.cur.execute.call_args_list), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests para el filtrado, la paginación y las estadísticas de prospectos calculadas en SQL
+"""
+
+import sys
+import os
+import unittest
+import datetime
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+from conversion_service import ConversionService
+
+
+class TestFiltrosProspectos(unittest.TestCase):
+    """Test cases for the WHERE clause built from the prospect filters"""
+
+    def test_sin_filtros(self):
+        self.assertEqual(db._filtros_prospectos(), ("", []))
+
+    def test_todos_los_filtros(self):
+        desde, hasta = datetime.date(2025, 1, 1), datetime.date(2025, 6, 30)
+        where, params = db._filtros_prospectos(('Convertido',), '  pérez ', desde, hasta)
+        self.assertEqual(where, " WHERE p.estado = ANY(%s) AND p.nombre ILIKE %s"
+                                " AND p.fecha_primera_consulta >= %s AND p.fecha_primera_consulta <= %s")
+        self.assertEqual(params, [['Convertido'], '%pérez%', desde, hasta])
+
+    def test_comodines_escapados(self):
+        self.assertEqual(db._patron_contiene('50%_a\\b'), '%50\\%\\_a\\\\b%')
+
+
+class TestBuscarProspectos(unittest.TestCase):
+    """Test cases for the paginated server-side search"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        parche = patch.object(db, 'connect_db', return_value=conn)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_pagina_con_total(self):
+        self.cur.fetchall.return_value = [{'id': 1, 'nombre': 'Ana', 'total_filtrado': 41}]
+        prospectos, total = db.buscar_prospectos(estados=['Consulta Inicial'], limite=20, desplazamiento=40)
+        self.assertEqual((prospectos, total), ([{'id': 1, 'nombre': 'Ana'}], 41))
+        sql, params = self.cur.execute.call_args[0]
+        self.assertIn("LIMIT %s OFFSET %s", sql)
+        self.assertEqual(params, [['Consulta Inicial'], 20, 40])
+
+    def test_pagina_fuera_de_rango_cuenta_aparte(self):
+        self.cur.fetchall.return_value = []
+        self.cur.fetchone.return_value = {'total': 12}
+        self.assertEqual(db.buscar_prospectos(limite=20, desplazamiento=20), ([], 12))
+        self.assertEqual(self.cur.execute.call_count, 2)
+
+    def test_estadisticas_conversion(self):
+        self.cur.fetchone.return_value = {'total_prospectos': 8, 'convertidos': 3}
+        self.cur.fetchall.return_value = [{'mes': '2025-06', 'cantidad': 2}, {'mes': '2025-05', 'cantidad': 1}]
+        estadisticas = ConversionService().obtener_estadisticas_conversion()
+        self.assertEqual(estadisticas, {
+            'total_prospectos': 8,
+            'convertidos': 3,
+            'tasa_conversion': 37.5,
+            'conversiones_por_mes': {'2025-06': 2, '2025-05': 1},
+        })
+        self.assertEqual(self.cur.execute.call_args[0][1], (12,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Tests para el servicio de copias de seguridad con pg_dump/pg_restore
+"""
+
+import sys
+import os
+import unittest
+import datetime
+import shutil
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+import servicio_backups
+from servicio_backups import ServicioBackups, confirmar_restauracion, encontrar_herramienta
+
+DB_CONFIG = {'host': 'localhost', 'port': '5433', 'database': 'crm_legal', 'user': 'abogado', 'password': 'secreto'}
+
+SALIDA_LIST = """;
+; Archive created at 2025-06-01 02:30:00 -03
+;     dbname: crm_legal
+;
+215; 1259 16390 TABLE public casos abogado
+216; 1259 16400 TABLE public clientes abogado
+3350; 0 16390 TABLE DATA public casos abogado
+3351; 0 16400 TABLE DATA public clientes abogado
+"""
+
+
+class ProcesoFalso:
+    """pg_dump simulado: escribe la copia en --file y emite la salida de --verbose"""
+
+    def __init__(self, comando, codigo=0, **kwargs):
+        self.comando = comando
+        self.codigo = codigo
+        destino = comando[comando.index('--file') + 1]
+        os.makedirs(destino)
+        with open(os.path.join(destino, 'toc.dat'), 'wb') as archivo:
+            archivo.write(b'x' * 2048)
+        self.stderr = iter([
+            'pg_dump: reading schemas\n',
+            'pg_dump: dumping contents of table "public.casos"\n',
+            'pg_dump: dumping contents of table "public.clientes"\n',
+            'pg_dump: error: connection lost\n' if codigo else 'pg_dump: saving encoding = UTF8\n',
+        ])
+
+    def wait(self):
+        return self.codigo
+
+    def poll(self):
+        return self.codigo
+
+
+class TestEncontrarHerramienta(unittest.TestCase):
+    """Test cases for locating pg_dump and pg_restore"""
+
+    def test_directorio_configurado(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'pg_dump.exe')
+            open(ruta, 'w').close()
+            with patch.object(servicio_backups.shutil, 'which', return_value='/usr/bin/pg_dump'):
+                self.assertEqual(encontrar_herramienta('pg_dump', directorio), ruta)
+
+    def test_path_y_luego_instalaciones_de_windows(self):
+        with patch.object(servicio_backups.shutil, 'which', return_value='/usr/bin/pg_dump'):
+            self.assertEqual(encontrar_herramienta('pg_dump', '/no/existe'), '/usr/bin/pg_dump')
+        instalaciones = [os.path.join('PostgreSQL', version, 'bin', 'pg_dump.exe') for version in ('9.6', '17', '16')]
+        with patch.object(servicio_backups.shutil, 'which', return_value=None), \
+                patch.object(servicio_backups.glob, 'glob', return_value=instalaciones):
+            self.assertEqual(encontrar_herramienta('pg_dump'), instalaciones[1])
+        with patch.object(servicio_backups.shutil, 'which', return_value=None), \
+                patch.object(servicio_backups.glob, 'glob', return_value=[]):
+            self.assertIsNone(encontrar_herramienta('pg_restore'))
+
+
+class TestServicioBackups(unittest.TestCase):
+    """Test cases for dump commands, metrics, verification, retention and scheduling"""
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta, True)
+        self.ahora = datetime.datetime(2025, 6, 1, 2, 30)
+        self.configuracion = dict(servicio_backups.CONFIGURACION_POR_DEFECTO, carpeta=self.carpeta,
+                                  jobs=4, compresion=6, conservar=3, dias_retencion=0)
+        self.servicio = ServicioBackups(self.configuracion, DB_CONFIG, reloj=lambda: self.ahora)
+        parche = patch.object(self.servicio, 'herramienta', side_effect=lambda nombre: f'/usr/bin/{nombre}')
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_comando_directorio_en_paralelo(self):
+        comando = self.servicio.comando_backup('pg_dump', 'destino', 'directory', 4, 12)
+        self.assertEqual(comando[:9], ['pg_dump', '--host', 'localhost', '--username', 'abogado',
+                                       '--dbname', 'crm_legal', '--port', '5433'])
+        self.assertIn('--jobs', comando)
+        self.assertEqual(comando[comando.index('--compress') + 1], '9')
+        self.assertNotIn('--jobs', self.servicio.comando_backup('pg_dump', 'destino', 'custom', 4, 6))
+        restauracion = self.servicio.comando_restauracion('pg_restore', 'ruta', 'prueba', 4, True)
+        self.assertEqual(restauracion[-5:], ['--clean', '--if-exists', '--jobs', '4', 'ruta'])
+        self.assertEqual(restauracion[restauracion.index('--dbname') + 1], 'prueba')
+
+    def test_crear_backup_con_progreso_verificacion_e_historial(self):
+        progreso = []
+        verificacion = MagicMock(returncode=0, stdout=SALIDA_LIST, stderr='')
+        with patch.object(servicio_backups.subprocess, 'Popen', side_effect=ProcesoFalso) as popen, \
+                patch.object(servicio_backups.subprocess, 'run', return_value=verificacion), \
+                patch.object(db, 'contar_tablas_usuario', return_value=2):
+            resultado = self.servicio.crear_backup(al_progreso=lambda *args: progreso.append(args))
+        self.assertEqual(popen.call_args[1]['env']['PGPASSWORD'], 'secreto')
+        self.assertEqual(resultado['ruta'], os.path.join(self.carpeta, 'backup_crm_legal_2025-06-01_02-30-00'))
+        self.assertEqual((resultado['tablas'], resultado['bytes'], resultado['jobs']), (2, 2048, 4))
+        self.assertEqual(resultado['verificacion'], {'ok': True, 'entradas': 4, 'tablas_con_datos': 2, 'error': None})
+        self.assertEqual(progreso, [('volcado', 1, 2), ('volcado', 2, 2), ('verificacion', 2, 2), ('fin', 2, 2)])
+        self.assertEqual(self.servicio.historial()[-1]['ruta'], resultado['ruta'])
+        self.assertFalse(self.servicio.en_curso())
+
+    def test_copia_que_no_verifica_no_rota_ni_cuenta(self):
+        self.configuracion['conservar'] = 1
+        anteriores = self._crear_copias(2)
+        verificacion = MagicMock(returncode=1, stdout='', stderr='pg_restore: error: input file is too short')
+        with patch.object(servicio_backups.subprocess, 'Popen', side_effect=ProcesoFalso), \
+                patch.object(servicio_backups.subprocess, 'run', return_value=verificacion), \
+                patch.object(db, 'contar_tablas_usuario', return_value=2):
+            resultado = self.servicio.crear_backup()
+        self.assertFalse(resultado['verificacion']['ok'])
+        self.assertEqual(resultado['eliminados'], [])
+        self.assertEqual(os.path.basename(resultado['ruta']), 'invalida_crm_legal_2025-06-01_02-30-00')
+        self.assertTrue(os.path.isdir(resultado['ruta']))
+        self.assertEqual(sorted(self.servicio.listar_backups()), sorted(anteriores))
+
+    def test_fallo_de_pg_dump_borra_la_copia_parcial(self):
+        with patch.object(servicio_backups.subprocess, 'Popen',
+                          side_effect=lambda comando, **kwargs: ProcesoFalso(comando, codigo=1)), \
+                patch.object(db, 'contar_tablas_usuario', return_value=None):
+            with self.assertRaisesRegex(RuntimeError, 'connection lost'):
+                self.servicio.crear_backup(verificar=False)
+        self.assertEqual(os.listdir(self.carpeta), [])
+        self.assertFalse(self.servicio.en_curso())
+
+    def test_verificacion_de_copia_invalida(self):
+        salida = MagicMock(returncode=1, stdout='', stderr='pg_restore: error: input file is too short')
+        with patch.object(servicio_backups.subprocess, 'run', return_value=salida):
+            verificacion = self.servicio.verificar_backup('copia.backup')
+            self.assertFalse(verificacion['ok'])
+            self.assertIn('too short', verificacion['error'])
+            with self.assertRaisesRegex(RuntimeError, 'no es válida'):
+                self.servicio.restaurar('copia.backup')
+
+    def test_restaurar_sobre_la_base_configurada_pide_confirmacion(self):
+        preguntar = MagicMock(return_value='crm_legal\n')
+        self.assertTrue(confirmar_restauracion('crm_legal_prueba', 'crm_legal', preguntar))
+        preguntar.assert_not_called()
+        self.assertTrue(confirmar_restauracion('crm_legal', 'crm_legal', preguntar))
+        self.assertFalse(confirmar_restauracion('crm_legal', 'crm_legal', lambda mensaje: 's'))
+
+    def _crear_copias(self, cantidad):
+        rutas = []
+        for dias in range(cantidad):
+            ruta = os.path.join(self.carpeta, f'backup_crm_legal_{dias}')
+            os.makedirs(ruta)
+            instante = time.mktime((self.ahora - datetime.timedelta(days=dias)).timetuple())
+            os.utime(ruta, (instante, instante))
+            rutas.append(ruta)
+        return rutas
+
+    def test_retencion_por_cantidad(self):
+        rutas = self._crear_copias(5)
+        open(os.path.join(self.carpeta, servicio_backups.ARCHIVO_HISTORIAL), 'w').close()
+        self.assertEqual(sorted(self.servicio.aplicar_retencion()), sorted(rutas[3:]))
+        self.assertEqual(self.servicio.listar_backups(), rutas[:3])
+        self.assertTrue(os.path.exists(os.path.join(self.carpeta, servicio_backups.ARCHIVO_HISTORIAL)))
+
+    def test_retencion_por_antiguedad_conserva_la_mas_reciente(self):
+        self.configuracion.update(conservar=0, dias_retencion=2)
+        rutas = self._crear_copias(4)
+        self.assertEqual(self.servicio.aplicar_retencion(), [rutas[3]])
+        self.ahora += datetime.timedelta(days=30)
+        self.assertEqual(self.servicio.aplicar_retencion(), rutas[1:3])
+        self.assertEqual(self.servicio.listar_backups(), rutas[:1])
+
+    def test_proxima_ejecucion_nocturna(self):
+        self.assertIsNone(self.servicio.proxima_ejecucion(self.ahora))
+        self.assertFalse(self.servicio.iniciar_programacion())
+        self.configuracion['hora_nocturna'] = '03:00'
+        self.assertEqual(self.servicio.proxima_ejecucion(self.ahora), datetime.datetime(2025, 6, 1, 3, 0))
+        self.configuracion['hora_nocturna'] = '02:30'
+        self.assertEqual(self.servicio.proxima_ejecucion(self.ahora), datetime.datetime(2025, 6, 2, 2, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()
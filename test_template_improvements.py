@@ -84,7 +84,7 @@ class TestTemplateImprovements(unittest.TestCase):
     def test_get_representatives_for_party(self):
         """Test _get_representatives_for_party method."""
         # Mock the database call
-        with patch('case_dialog_manager.db.get_roles_by_case_id', return_value=[]):
+        with patch('case_dialog_manager.db.get_contexto_caso', return_value=None):
             representantes = self.case_manager._get_representatives_for_party(1, 1, 1)
 
             # Should return empty list when no representatives found
@@ -94,7 +94,7 @@ class TestTemplateImprovements(unittest.TestCase):
     def test_template_context_structure(self):
         """Test that the context includes the new structured data."""
         # Mock the database and other dependencies
-        with patch('case_dialog_manager.db.get_roles_by_case_id', return_value=[]), \
+        with patch('case_dialog_manager.db.get_contexto_caso', return_value=None), \
              patch.object(self.case_manager, '_format_parties_text', return_value='Test Party'):
 
             # Simulate the context creation process
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests para los totales de cuenta corriente por caso y su verificador de consistencia
+"""
+
+import sys
+import os
+import unittest
+import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import crm_database as db
+
+
+def _fila(caso_id, ingresos=(0, 0), gastos=(0, 0), cantidad=(0, 0), ultimo=(None, None)):
+    """Fila de la comparación real vs. registrado que arma verificar_consistencia_totales_cuenta."""
+    return {
+        'caso_id': caso_id,
+        'ingresos_reales': Decimal(ingresos[0]), 'ingresos_registrados': Decimal(ingresos[1]),
+        'gastos_reales': Decimal(gastos[0]), 'gastos_registrados': Decimal(gastos[1]),
+        'cantidad_real': cantidad[0], 'cantidad_registrada': cantidad[1],
+        'ultimo_real': ultimo[0], 'ultimo_registrado': ultimo[1],
+    }
+
+
+HOY = datetime.date(2025, 6, 1)
+AYER = datetime.date(2025, 5, 31)
+
+FILAS = [
+    _fila(1, ingresos=(1000, 1000), gastos=(200, 200), cantidad=(3, 3), ultimo=(HOY, HOY)),
+    _fila(2, ingresos=(500, 400), cantidad=(2, 2), ultimo=(HOY, HOY)),
+    _fila(3, gastos=(50, 50), cantidad=(1, 1), ultimo=(HOY, AYER)),
+    # Fila registrada de un caso que ya no tiene movimientos
+    _fila(4, ingresos=(0, 300), cantidad=(0, 1), ultimo=(None, AYER)),
+]
+
+
+class TestDesviosTotalesCuenta(unittest.TestCase):
+    """Test cases for drift detection between movements and stored totals"""
+
+    def test_detecta_montos_fechas_y_filas_huerfanas(self):
+        desvios = db._desvios_totales_cuenta(FILAS)
+        self.assertEqual([d['caso_id'] for d in desvios], [2, 3, 4])
+
+    def test_totales_coincidentes_no_son_desvio(self):
+        self.assertEqual(db._desvios_totales_cuenta(FILAS[:1]), [])
+
+
+class TestVerificarConsistencia(unittest.TestCase):
+    """Test cases for the consistency check and its repair step"""
+
+    def setUp(self):
+        self.cur = MagicMock()
+        self.cur.fetchall.return_value = FILAS
+        self.conn = MagicMock()
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+        parche = patch.object(db, 'connect_db', return_value=self.conn)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_solo_informa_sin_reparar(self):
+        resultado = db.verificar_consistencia_totales_cuenta()
+        self.assertEqual(resultado['casos_verificados'], 4)
+        self.assertEqual(len(resultado['desvios']), 3)
+        self.assertEqual(resultado['reparados'], 0)
+        self.assertEqual(self.cur.execute.call_count, 1)
+        self.conn.commit.assert_not_called()
+
+    def test_reparar_pone_en_cero_y_recalcula_los_casos_con_desvio(self):
+        resultado = db.verificar_consistencia_totales_cuenta(reparar=True)
+        self.assertEqual(resultado['reparados'], 3)
+        sql_cero, params = self.cur.execute.call_args_list[1][0]
+        self.assertIn("WHERE caso_id = ANY(%s)", sql_cero)
+        self.assertEqual(params, ([2, 3, 4],))
+        self.assertEqual(self.cur.execute.call_args_list[2][0][0], db._SQL_RECALCULAR_TOTALES_CUENTA)
+        self.conn.commit.assert_called_once()
+
+    def test_error_de_base_devuelve_none(self):
+        self.cur.execute.side_effect = Exception("relation totales_cuenta_caso does not exist")
+        self.assertIsNone(db.verificar_consistencia_totales_cuenta())
+        self.conn.rollback.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()